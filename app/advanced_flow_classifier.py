@@ -1,19 +1,78 @@
+import math
+import time
+
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
 import os
 
+from app import metrics, tracing
+from app.log import fields, get_logger
+
+# scikit-learn y joblib se importan al entrenar o cargar un joblib (ver app/ml_model.py)
+from app.artifacts import (
+    ARTIFACT_SUFFIX,
+    ArtifactLabelEncoder,
+    ArtifactScaler,
+    ModelArtifact,
+    atomic_path,
+    build_artifact,
+    is_artifact,
+    write_artifact,
+)
+from app.datasets import (
+    ADVANCED_FEATURES,
+    StreamProgress,
+    default_max_memory_mb,
+    iter_dataset,
+    rows_for_budget,
+)
+from app.forest_engine import CompiledForest
+from app.geo_index import PLUSVALIA_LEVELS, build_zone_index, load_geojson_zones
+from app.prediction_cache import PredictionCache
+from app.zone_raster import DEFAULT_RESOLUTION, load_or_build_raster
+
+logger = get_logger(__name__)
+
+# Nombres legibles de los flujos
+FLOW_NAMES = {
+    'flow-premium': 'Experiencia Premium',
+    'flow-standard': 'Experiencia Estándar',
+    'flow-basic': 'Experiencia Básica',
+    'flow-light': 'Experiencia Ligera',
+    'flow-offline': 'Experiencia Offline'
+}
+
+# Valores deterministas para condiciones no reportadas
+DEFAULT_OFFLINE_SPEED = 1.75  # Media de uniforme(0.5, 3), la velocidad sin WiFi en entrenamiento
+DEFAULT_BATTERY_LEVEL = 60.0
+DEFAULT_TIME_OF_DAY = 12
+
+
 class AdvancedFlowClassifier:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
-        self.label_encoder = LabelEncoder()
+    # A partir de este tamaño de lote el bucle en C de scikit-learn es más rápido
+    compiled_batch_limit = 512
+    
+    def __init__(self, inference_backend: str = 'compiled', model_params: dict = None,
+                 geo_zones_path: str = None):
+        # `model_params` sobrescribe los hiperparámetros del bosque (ver sweep_models.py)
+        self.model_params = {'n_estimators': 100, 'random_state': 42, **(model_params or {})}
+        # Se crean al entrenar o al cargar un modelo guardado
+        self.model = None
+        self.scaler = None
+        self.label_encoder = None
         self.is_trained = False
         self.model_path = "advanced_flow_model.joblib"
         
+        # Backend de inferencia: 'compiled' (arreglos planos) o 'sklearn'
+        if inference_backend not in ('compiled', 'sklearn'):
+            raise ValueError(f"Backend de inferencia no soportado: {inference_backend}")
+        self.inference_backend = inference_backend
+        self.engine = None
+        # Artefacto mapeado en memoria cuando el modelo se carga desde uno
+        self.artifact = None
+        
+        # Caché de predicciones; se invalida al entrenar o recargar el modelo
+        self.prediction_cache = PredictionCache.from_env()
+        
         # Definir geocercas reales de CDMX con plusvalía
         self.geo_zones = {
             'polanco': {
@@ -89,37 +148,37 @@ class AdvancedFlowClassifier:
                 'wifi_coverage': 0.25
             }
         }
+        
+        # Geocercas poligonales de un GeoJSON en lugar de los círculos de arriba
+        self.geo_zones_path = geo_zones_path or os.getenv('GEO_ZONES_FILE') or None
+        if self.geo_zones_path:
+            self.geo_zones = load_geojson_zones(self.geo_zones_path)
+        
+        # Raster de zonas con mmap para resolver la zona con un acceso a arreglo;
+        # Opcional: sin ZONE_RASTER_FILE sólo se usa la búsqueda exacta y no se escribe nada a disco
+        self.zone_raster_path = os.getenv('ZONE_RASTER_FILE', '') or None
+        self.zone_raster_resolution = float(os.getenv('ZONE_RASTER_RESOLUTION', DEFAULT_RESOLUTION))
+        
+        # Geocercas compiladas en arreglos para búsquedas vectorizadas
+        self.refresh_zone_index()
+    
+    def refresh_zone_index(self):
+        """Recompila el índice de geocercas después de modificar `geo_zones`
+        
+        El raster guardado se reutiliza si su huella coincide con `geo_zones`;
+        si las geocercas cambiaron se reconstruye y se reescribe.
+        """
+        self.zone_index = build_zone_index(self.geo_zones)
+        if self.zone_raster_path:
+            self.zone_index.attach_raster(load_or_build_raster(
+                self.zone_index, self.geo_zones, self.zone_raster_path,
+                resolution=self.zone_raster_resolution
+            ))
     
     def _get_zone_info(self, latitude: float, longitude: float):
         """Obtiene información de la zona geográfica más cercana"""
-        closest_zone = None
-        min_distance = float('inf')
-        
-        for zone_name, zone_data in self.geo_zones.items():
-            center_lat, center_lon = zone_data['center']
-            distance = np.sqrt((latitude - center_lat)**2 + (longitude - center_lon)**2)
-            
-            if distance <= zone_data['radius'] and distance < min_distance:
-                closest_zone = zone_name
-                min_distance = distance
-        
-        if closest_zone:
-            zone_data = self.geo_zones[closest_zone]
-            return {
-                'zone_name': closest_zone,
-                'plusvalia': zone_data['plusvalia'],
-                'quality_factor': zone_data['quality_factor'],
-                'wifi_coverage': zone_data['wifi_coverage'],
-                'distance_to_center': min_distance
-            }
-        else:
-            return {
-                'zone_name': 'unknown',
-                'plusvalia': 'baja',
-                'quality_factor': 0.5,
-                'wifi_coverage': 0.3,
-                'distance_to_center': min_distance
-            }
+        zone_id, distance = self.zone_index.lookup_point(latitude, longitude)
+        return self.zone_index.zone_info(zone_id, distance)
     
     def _determine_flow_type(self, wifi: bool, zone_info: dict, network_speed: float, 
                            battery_level: float, time_of_day: int) -> str:
@@ -147,88 +206,205 @@ class AdvancedFlowClassifier:
         # Condiciones básicas
         return 'flow-basic'
     
-    def _create_advanced_training_data(self, n_samples=2000):
-        """Genera datos de entrenamiento sintéticos para el modelo avanzado"""
-        X = []
-        y = []
-        
-        print(f"🔄 Generando {n_samples} muestras de entrenamiento...")
+    def _determine_flow_types(self, wifi, plusvalia_codes, wifi_coverage, network_speed,
+                              battery_level):
+        """Versión vectorizada de `_determine_flow_type` sobre columnas de NumPy"""
+        wifi = np.asarray(wifi).astype(bool)
+        network_speed = np.asarray(network_speed)
+        battery_level = np.asarray(battery_level)
+        
+        offline = ~wifi | (network_speed < 2)
+        light = network_speed < 5
+        premium = (
+            (np.asarray(plusvalia_codes) == PLUSVALIA_LEVELS.index('alta'))
+            & (network_speed > 15)
+            & (battery_level > 30)
+            & (np.asarray(wifi_coverage) > 0.8)
+        )
+        standard = (network_speed > 8) & (battery_level > 20)
         
-        for i in range(n_samples):
+        # np.select respeta el orden de las reglas igual que los `if` encadenados
+        return np.select(
+            [offline, light, premium, standard],
+            ['flow-offline', 'flow-light', 'flow-premium', 'flow-standard'],
+            default='flow-basic'
+        )
+    
+    def iter_advanced_training_chunks(self, n_samples: int = 2000, seed=42,
+                                      chunk_size: int = 100_000):
+        """Genera los datos sintéticos del modelo avanzado por bloques columnares
+        
+        Cada bloque se genera con operaciones vectorizadas y a lo más
+        `chunk_size` filas, así que la memoria no depende de `n_samples`. Con la
+        misma semilla y tamaño de bloque la secuencia es reproducible;
+        `seed=None` usa entropía del sistema.
+        """
+        rng = np.random.default_rng(seed)
+        index = self.zone_index
+        n_zones = len(index)
+        
+        generated = 0
+        while generated < n_samples:
+            size = min(chunk_size, n_samples - generated)
+            
             # Features básicas
-            wifi = np.random.choice([0, 1], p=[0.2, 0.8])  # 80% con WiFi
-            device_android = np.random.choice([0, 1], p=[0.5, 0.5])
+            wifi = (rng.random(size) < 0.8).astype(float)  # 80% con WiFi
+            device_android = rng.integers(0, 2, size).astype(float)
             device_ios = 1 - device_android
             
-            # Seleccionar zona aleatoria
-            zone_name = np.random.choice(list(self.geo_zones.keys()))
-            zone_data = self.geo_zones[zone_name]
-            
-            # Generar coordenadas dentro de la zona
-            center_lat, center_lon = zone_data['center']
-            radius = zone_data['radius']
-            
-            # Usar distribución uniforme en lugar de normal para evitar valores extremos
-            latitude = np.random.uniform(center_lat - radius/2, center_lat + radius/2)
-            longitude = np.random.uniform(center_lon - radius/2, center_lon + radius/2)
-            
-            # Asegurar que las coordenadas estén dentro de límites razonables
-            latitude = np.clip(latitude, 19.0, 20.0)
-            longitude = np.clip(longitude, -99.5, -98.5)
+            # Zona aleatoria y coordenadas uniformes dentro de su cuadrado central
+            zones = rng.integers(0, n_zones, size)
+            half_radius = index.radii[zones] / 2
+            latitude = np.clip(
+                index.centers[zones, 0] + rng.uniform(-1, 1, size) * half_radius, 19.0, 20.0
+            )
+            longitude = np.clip(
+                index.centers[zones, 1] + rng.uniform(-1, 1, size) * half_radius, -99.5, -98.5
+            )
             
-            # Obtener información de la zona
-            zone_info = self._get_zone_info(latitude, longitude)
+            # Información de la zona donde realmente cae cada punto
+            zone_ids, distances = index.lookup(latitude, longitude)
             
-            # Velocidad de red basada en la zona y WiFi
-            min_speed, max_speed = zone_data['network_speed_range']
-            if wifi:
-                network_speed = np.random.uniform(min_speed * 0.7, max_speed)
-            else:
-                network_speed = np.random.uniform(0.5, 3)
+            # Velocidad de red basada en la zona generada y WiFi
+            min_speed = index.speed_ranges[zones, 0]
+            max_speed = index.speed_ranges[zones, 1]
+            wifi_speed = min_speed * 0.7 + rng.random(size) * (max_speed - min_speed * 0.7)
+            offline_speed = rng.uniform(0.5, 3, size)
+            network_speed = np.where(wifi == 1, wifi_speed, offline_speed)
             
             # Factores adicionales
-            battery_level = np.random.uniform(5, 100)
-            time_of_day = np.random.randint(0, 24)
+            battery_level = rng.uniform(5, 100, size)
+            time_of_day = rng.integers(0, 24, size)
             
-            # Determinar flujo basado en condiciones
-            flow_type = self._determine_flow_type(
-                wifi, zone_info, network_speed, battery_level, time_of_day
+            plusvalia_codes = index.plusvalia_codes[zone_ids]
+            wifi_coverage = index.wifi_coverage[zone_ids]
+            y = self._determine_flow_types(
+                wifi, plusvalia_codes, wifi_coverage, network_speed, battery_level
             )
             
-            # Crear feature vector (12 features)
-            features = [
+            # Matriz de 12 features en el mismo orden que `predict`
+            X = np.column_stack([
                 wifi,
                 device_android,
                 device_ios,
                 latitude,
                 longitude,
-                zone_info['distance_to_center'],
-                zone_info['quality_factor'],
-                zone_info['wifi_coverage'],
+                distances,
+                index.quality_factors[zone_ids],
+                wifi_coverage,
                 network_speed,
                 battery_level / 100.0,
                 time_of_day / 24.0,
-                1 if zone_info['plusvalia'] == 'alta' else 0
-            ]
+                plusvalia_codes == PLUSVALIA_LEVELS.index('alta')
+            ])
             
-            X.append(features)
-            y.append(flow_type)
-            
-            if (i + 1) % 500 == 0:
-                print(f"   Generadas {i + 1} muestras...")
+            generated += size
+            yield X, y
+    
+    def _create_advanced_training_data(self, n_samples=2000, seed=42,
+                                       chunk_size: int = 100_000):
+        """Genera datos de entrenamiento sintéticos para el modelo avanzado"""
+        logger.info("🔄 Generando muestras de entrenamiento...", extra=fields(n_samples=n_samples))
+        
+        X = np.empty((n_samples, 12))
+        y = np.empty(n_samples, dtype='<U13')
         
-        return np.array(X), np.array(y)
+        offset = 0
+        for X_chunk, y_chunk in self.iter_advanced_training_chunks(n_samples, seed, chunk_size):
+            X[offset:offset + len(X_chunk)] = X_chunk
+            y[offset:offset + len(y_chunk)] = y_chunk
+            offset += len(X_chunk)
+            logger.debug("Muestras generadas", extra=fields(generated=offset, n_samples=n_samples))
+        
+        return X, y
     
-    def train(self):
-        """Entrena el modelo avanzado"""
-        print('🚀 Iniciando entrenamiento del modelo avanzado...')
+    def train(self, save: bool = True):
+        """Entrena el modelo avanzado; con `save=False` no lo escribe a disco"""
+        logger.info('🚀 Iniciando entrenamiento del modelo avanzado...')
         
         # Generar datos de entrenamiento
         X, y = self._create_advanced_training_data()
+        return self._fit_arrays(X, y, save)
+    
+    def train_from_dataset(self, path: str, max_memory_mb: float = None, save: bool = True,
+                           seed: int = 42):
+        """Entrena desde un dataset en disco (CSV, .npy o directorio columnar)
+        
+        El dataset trae las 12 columnas de `ADVANCED_FEATURES` y la columna
+        `label` con el tipo de flujo. Se recorre por streaming una sola vez:
+        el scaler se ajusta con `partial_fit` sobre todas las filas y al mismo
+        tiempo se mantiene una submuestra uniforme (reservoir sampling) del
+        tamaño que cabe en el tope de memoria; el bosque se entrena sobre esa
+        submuestra.
+        """
+        from sklearn.preprocessing import StandardScaler
+        
+        max_memory_mb = max_memory_mb or default_max_memory_mb()
+        n_columns = len(ADVANCED_FEATURES) + 1
+        # Una cuarta parte del tope para el bloque en lectura y el resto para la submuestra
+        chunk_rows = rows_for_budget(max_memory_mb, n_columns, 0.25)
+        reservoir_size = rows_for_budget(max_memory_mb, n_columns, 0.75)
+        logger.info('🚀 Entrenando modelo avanzado desde dataset en disco', extra=fields(
+            path=path, chunk_rows=chunk_rows, reservoir_size=reservoir_size,
+            max_memory_mb=max_memory_mb
+        ))
+        
+        rng = np.random.default_rng(seed)
+        scaler = StandardScaler()
+        X_sample = np.empty((reservoir_size, len(ADVANCED_FEATURES)))
+        y_sample = np.empty(reservoir_size, dtype=object)
+        seen = 0
+        
+        progress = StreamProgress('Lectura del dataset')
+        for X, y in iter_dataset(path, ADVANCED_FEATURES, chunk_rows=chunk_rows):
+            X = np.nan_to_num(X, nan=0.0, posinf=1.0, neginf=-1.0)
+            y = y.astype(str)
+            scaler.partial_fit(X)
+            
+            # Reservoir sampling vectorizado (algoritmo R) sobre el bloque
+            fill = max(0, min(len(X), reservoir_size - seen))
+            X_sample[seen:seen + fill] = X[:fill]
+            y_sample[seen:seen + fill] = y[:fill]
+            if fill < len(X):
+                positions = np.arange(seen + fill, seen + len(X))
+                slots = (rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+                keep = slots < reservoir_size
+                X_sample[slots[keep]] = X[fill:][keep]
+                y_sample[slots[keep]] = y[fill:][keep]
+            
+            seen += len(X)
+            progress.update(len(X))
+        stream_stats = progress.finish()
+        
+        if seen == 0:
+            raise ValueError(f"El dataset {path} no tiene filas")
+        
+        n_sample = min(seen, reservoir_size)
+        result = self._fit_arrays(
+            X_sample[:n_sample], y_sample[:n_sample].astype(str), save, scaler=scaler
+        )
+        result.update({
+            'total_samples': seen,
+            'sampled_rows': n_sample,
+            'chunk_rows': chunk_rows,
+            'rows_per_second': stream_stats['rows_per_second']
+        })
+        return result
+    
+    def _fit_arrays(self, X, y, save: bool, scaler=None):
+        """Entrena el bosque sobre arreglos en memoria
+        
+        Con `scaler` ya ajustado (p. ej. con `partial_fit` por streaming) sólo
+        se aplica; si no, se ajusta sobre la parte de entrenamiento.
+        """
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
         
         # Verificar que no hay valores infinitos en los datos originales
         if np.any(np.isinf(X)) or np.any(np.isnan(X)):
-            print("⚠️ Detectados valores infinitos en datos originales, limpiando...")
+            logger.warning("⚠️ Detectados valores infinitos en datos originales, limpiando...")
             X = np.nan_to_num(X, nan=0.0, posinf=1.0, neginf=-1.0)
         
         # Dividir datos
@@ -236,43 +412,51 @@ class AdvancedFlowClassifier:
             X, y, test_size=0.3, random_state=42, stratify=y
         )
         
-        print(f'📊 Datos de entrenamiento: {len(X_train)} muestras')
-        print(f'📊 Datos de prueba: {len(X_test)} muestras')
+        logger.info('📊 Datos divididos', extra=fields(
+            train_samples=len(X_train), test_samples=len(X_test)
+        ))
         
         # Escalar features
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        if scaler is None:
+            scaler = StandardScaler().fit(X_train)
+        self.scaler = scaler
+        X_train_scaled = self.scaler.transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
         # Verificar que no hay valores infinitos después del escalado
         if np.any(np.isinf(X_train_scaled)) or np.any(np.isinf(X_test_scaled)):
-            print("⚠️ Detectados valores infinitos después del escalado, reemplazando...")
+            logger.warning("⚠️ Detectados valores infinitos después del escalado, reemplazando...")
             X_train_scaled = np.nan_to_num(X_train_scaled, nan=0.0, posinf=1.0, neginf=-1.0)
             X_test_scaled = np.nan_to_num(X_test_scaled, nan=0.0, posinf=1.0, neginf=-1.0)
         
         # Codificar labels
+        self.label_encoder = LabelEncoder()
         y_train_encoded = self.label_encoder.fit_transform(y_train)
         y_test_encoded = self.label_encoder.transform(y_test)
         
         # Entrenar modelo
-        print('🤖 Entrenando Random Forest...')
+        logger.info('🤖 Entrenando Random Forest...', extra=fields(params=self.model_params))
+        self.model = RandomForestClassifier(**self.model_params)
         self.model.fit(X_train_scaled, y_train_encoded)
+        self.engine = CompiledForest.from_sklearn(self.model)
+        self.artifact = None
         self.is_trained = True
+        self.prediction_cache.invalidate()
         
         # Evaluar modelo
         y_pred = self.model.predict(X_test_scaled)
         accuracy = accuracy_score(y_test_encoded, y_pred)
         
-        print(f'✅ Modelo entrenado exitosamente!')
-        print(f'📈 Precisión en test: {accuracy:.3f}')
-        
-        # Mostrar distribución de flujos
+        # Distribución de flujos en los datos de entrenamiento
         unique, counts = np.unique(y_train, return_counts=True)
-        print(f'📊 Distribución de flujos:')
-        for flow, count in zip(unique, counts):
-            print(f'   {flow}: {count} muestras')
+        logger.info('✅ Modelo entrenado exitosamente!', extra=fields(
+            model='advanced', test_accuracy=round(accuracy, 3),
+            flow_distribution={str(flow): int(count) for flow, count in zip(unique, counts)}
+        ))
         
         # Guardar modelo
-        self.save_model()
+        if save:
+            self.save_model()
         
         return {
             'accuracy': accuracy,
@@ -288,75 +472,313 @@ class AdvancedFlowClassifier:
         """Realiza predicción con el modelo avanzado"""
         
         if not self.is_trained:
-            print('⚠️ Modelo no entrenado. Entrenando...')
+            logger.warning('⚠️ Modelo no entrenado. Entrenando...')
             self.train()
+        started = time.perf_counter()
+        stages = []
         
         # Convertir inputs
         wifi_num = 1 if wifi else 0
         device_android = 1 if device == 'android' else 0
         device_ios = 1 if device == 'ios' else 0
         
+        # El modelo ve la ubicación ya cuantizada: zona, features y llave de caché coinciden
+        latitude, longitude = self.prediction_cache.quantize_location(latitude, longitude)
+        
         # Obtener información de zona
-        zone_info = self._get_zone_info(latitude, longitude)
+        zone_id, distance = self.zone_index.lookup_point(latitude, longitude)
+        zone_info = self.zone_index.zone_info(zone_id, distance)
+        zone_done = time.perf_counter()
+        stages.append(('zone', zone_done - started))
         
-        # Valores por defecto
+        # Valores por defecto deterministas a partir de la zona
         if network_speed is None:
-            if wifi:
-                network_speed = np.random.uniform(5, 25)
-            else:
-                network_speed = np.random.uniform(1, 3)
-        
+            network_speed = self.zone_index.wifi_speed_priors[zone_id] if wifi else DEFAULT_OFFLINE_SPEED
         if battery_level is None:
-            battery_level = np.random.uniform(20, 100)
-        
+            battery_level = DEFAULT_BATTERY_LEVEL
         if time_of_day is None:
-            time_of_day = np.random.randint(0, 24)
-        
-        # Crear feature vector
-        features = np.array([[
-            wifi_num,
-            device_android,
-            device_ios,
-            latitude,
-            longitude,
-            zone_info['distance_to_center'],
-            zone_info['quality_factor'],
-            zone_info['wifi_coverage'],
-            network_speed,
-            battery_level / 100.0,
-            time_of_day / 24.0,
-            1 if zone_info['plusvalia'] == 'alta' else 0
-        ]])
+            time_of_day = DEFAULT_TIME_OF_DAY
+        network_speed, battery_level, time_of_day = self.prediction_cache.quantize_conditions(
+            float(network_speed), battery_level, time_of_day
+        )
+        features_done = time.perf_counter()
+        stages.append(('features', features_done - zone_done))
         
-        # Escalar features
-        features_scaled = self.scaler.transform(features)
+        cache_key = self.prediction_cache.make_key(
+            wifi, device, latitude, longitude, network_speed, battery_level, time_of_day
+        )
+        cached = self.prediction_cache.get(cache_key)
+        cache_done = time.perf_counter()
+        stages.append(('cache', cache_done - features_done))
+        
+        if cached is None:
+            # Crear feature vector
+            features = np.array([[
+                wifi_num,
+                device_android,
+                device_ios,
+                latitude,
+                longitude,
+                zone_info['distance_to_center'],
+                zone_info['quality_factor'],
+                zone_info['wifi_coverage'],
+                network_speed,
+                battery_level / 100.0,
+                time_of_day / 24.0,
+                1 if zone_info['plusvalia'] == 'alta' else 0
+            ]])
+            stages.append(('matrix', time.perf_counter() - cache_done))
+            
+            predictions, confidences = self._predict_features(features, stages)
+            cached = (predictions[0], confidences[0])
+            self.prediction_cache.put(cache_key, cached)
+        
+        response_started = time.perf_counter()
+        result = self._build_result(
+            cached[0], cached[1], zone_info, wifi, device,
+            network_speed, battery_level, time_of_day
+        )
+        stages.append(('response', time.perf_counter() - response_started))
+        if metrics.ENABLED:
+            metrics.observe_stages('advanced', 'single', stages)
+        tracing.record_stages(stages)
+        return result
+    
+    def predict_batch(self, records):
+        """Realiza predicciones para muchos registros con una sola llamada al modelo
+        
+        Cada registro es un dict con las mismas llaves que los argumentos de
+        `predict`. Los resultados se regresan en el mismo orden de entrada.
+        """
+        if not self.is_trained:
+            logger.warning('⚠️ Modelo no entrenado. Entrenando...')
+            self.train()
+        
+        n = len(records)
+        if n == 0:
+            return []
+        started = time.perf_counter()
+        stages = []
+        
+        wifi = np.array([bool(r['wifi']) for r in records])
+        device = [r['device'] for r in records]
+        latitude = np.array([r['latitude'] for r in records], dtype=float)
+        longitude = np.array([r['longitude'] for r in records], dtype=float)
+        network_speed = np.array(
+            [r.get('network_speed') for r in records], dtype=float
+        )
+        battery_level = np.array(
+            [r.get('battery_level') for r in records], dtype=float
+        )
+        time_of_day = np.array(
+            [r.get('time_of_day') for r in records], dtype=float
+        )
+        
+        latitude, longitude = self.prediction_cache.quantize_location(latitude, longitude)
+        
+        zone_started = time.perf_counter()
+        zone_ids, distances = self.zone_index.lookup(latitude, longitude)
+        zone_done = time.perf_counter()
+        
+        self._fill_defaults(wifi, zone_ids, network_speed, battery_level, time_of_day)
+        network_speed, battery_level, time_of_day = self.prediction_cache.quantize_conditions(
+            network_speed, battery_level, time_of_day
+        )
+        features_done = time.perf_counter()
+        stages.append(('zone', zone_done - zone_started))
+        stages.append(('features', (zone_started - started) + (features_done - zone_done)))
+        
+        # Separar aciertos de caché; sólo los fallos pasan por el modelo
+        predictions = np.empty(n, dtype=object)
+        confidences = np.empty(n)
+        cache_keys = [
+            self.prediction_cache.make_key(
+                wifi[i], device[i], latitude[i], longitude[i],
+                network_speed[i], battery_level[i], time_of_day[i]
+            )
+            for i in range(n)
+        ]
+        misses = []
+        for i, key in enumerate(cache_keys):
+            cached = self.prediction_cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                predictions[i], confidences[i] = cached
+        cache_done = time.perf_counter()
+        stages.append(('cache', cache_done - features_done))
+        
+        if misses:
+            rows = np.array(misses)
+            features = self._feature_matrix(
+                wifi[rows],
+                np.array([device[i] == 'android' for i in misses]),
+                np.array([device[i] == 'ios' for i in misses]),
+                latitude[rows], longitude[rows], zone_ids[rows], distances[rows],
+                network_speed[rows], battery_level[rows], time_of_day[rows]
+            )
+            stages.append(('matrix', time.perf_counter() - cache_done))
+            
+            miss_predictions, miss_confidences = self._predict_features(features, stages)
+            predictions[rows] = miss_predictions
+            confidences[rows] = miss_confidences
+            for i, prediction, confidence in zip(misses, miss_predictions, miss_confidences):
+                self.prediction_cache.put(cache_keys[i], (prediction, confidence))
+        
+        response_started = time.perf_counter()
+        results = [
+            self._build_result(
+                predictions[i], confidences[i],
+                self.zone_index.zone_info(zone_ids[i], distances[i]),
+                bool(wifi[i]), device[i], float(network_speed[i]),
+                float(battery_level[i]), int(time_of_day[i])
+            )
+            for i in range(n)
+        ]
+        stages.append(('response', time.perf_counter() - response_started))
+        if metrics.ENABLED:
+            metrics.observe_stages('advanced', 'batch', stages)
+        tracing.record_stages(stages)
+        return results
+    
+    def score_columns(self, wifi, device, latitude, longitude, network_speed=None,
+                      battery_level=None, time_of_day=None) -> dict:
+        """Puntúa arreglos por columna sin armar un diccionario por registro
+        
+        Para re-puntuar millones de filas fuera del servicio (ver bulk_score.py).
+        `device` es un arreglo de texto o bytes; los faltantes de las columnas
+        opcionales van como NaN (o la columna como None) y se completan igual
+        que en `predict`. No usa la caché de predicciones. Regresa arreglos
+        alineados con la entrada: `flow_type`, `confidence_score` (redondeada
+        como en la API), `zone_id` (índice en `zone_index.names`, -1 fuera de
+        geocerca) y `distance_to_center` (inf fuera de geocerca).
+        """
+        if not self.is_trained:
+            raise ValueError("El modelo avanzado no está entrenado")
+        
+        wifi = np.asarray(wifi).astype(bool)
+        device = np.asarray(device)
+        if device.dtype.kind == 'S':
+            device = device.astype('U')
+        latitude = np.asarray(latitude, dtype=float)
+        longitude = np.asarray(longitude, dtype=float)
+        n = len(wifi)
+        
+        def optional(values):
+            if values is None:
+                return np.full(n, np.nan)
+            return np.array(values, dtype=float)
+        
+        network_speed = optional(network_speed)
+        battery_level = optional(battery_level)
+        time_of_day = optional(time_of_day)
+        
+        # Misma cuantización que `predict` y `predict_batch`
+        latitude, longitude = self.prediction_cache.quantize_location(latitude, longitude)
+        zone_ids, distances = self.zone_index.lookup(latitude, longitude)
+        self._fill_defaults(wifi, zone_ids, network_speed, battery_level, time_of_day)
+        network_speed, battery_level, time_of_day = self.prediction_cache.quantize_conditions(
+            network_speed, battery_level, time_of_day
+        )
+        features = self._feature_matrix(
+            wifi, device == 'android', device == 'ios', latitude, longitude,
+            zone_ids, distances, network_speed, battery_level, time_of_day
+        )
+        predictions, confidences = self._predict_features(features)
+        return {
+            'flow_type': np.asarray(predictions).astype(str),
+            # `round` de Python, no `np.round`: los mismos valores que la API
+            'confidence_score': np.array([round(c, 3) for c in confidences.tolist()]),
+            'zone_id': zone_ids,
+            'distance_to_center': distances
+        }
+    
+    def _fill_defaults(self, wifi, zone_ids, network_speed, battery_level, time_of_day):
+        """Completa en su lugar los NaN con los valores por defecto de `predict`"""
+        missing = np.isnan(network_speed)
+        network_speed[missing] = np.where(
+            wifi[missing],
+            self.zone_index.wifi_speed_priors[zone_ids[missing]],
+            DEFAULT_OFFLINE_SPEED
+        )
+        battery_level[np.isnan(battery_level)] = DEFAULT_BATTERY_LEVEL
+        time_of_day[np.isnan(time_of_day)] = DEFAULT_TIME_OF_DAY
+    
+    def _feature_matrix(self, wifi, is_android, is_ios, latitude, longitude, zone_ids,
+                        distances, network_speed, battery_level, time_of_day):
+        """Construye la matriz de features de muchas filas en una sola pasada"""
+        features = np.empty((len(wifi), 12))
+        features[:, 0] = wifi
+        features[:, 1] = is_android
+        features[:, 2] = is_ios
+        features[:, 3] = latitude
+        features[:, 4] = longitude
+        features[:, 5] = distances
+        features[:, 6] = self.zone_index.quality_factors[zone_ids]
+        features[:, 7] = self.zone_index.wifi_coverage[zone_ids]
+        features[:, 8] = network_speed
+        features[:, 9] = battery_level / 100.0
+        features[:, 10] = time_of_day / 24.0
+        features[:, 11] = self.zone_index.plusvalia_codes[zone_ids] == PLUSVALIA_LEVELS.index('alta')
+        return features
+    
+    def _predict_features(self, features, stages: list = None):
+        """Escala la matriz de features y evalúa el bosque una sola vez
+        
+        Con `stages` se agregan las duraciones de las etapas `scaling` y `forest`.
+        """
+        started = time.perf_counter()
+        # Escalar features con los parámetros del scaler; `scaler.transform`
+        # rechaza la distancia infinita de los puntos fuera de geocerca
+        with np.errstate(invalid='ignore'):
+            features_scaled = (features - self.scaler.mean_) / self.scaler.scale_
         
         # Verificar que no hay valores infinitos
-        if np.any(np.isinf(features_scaled)):
+        if not np.all(np.isfinite(features_scaled)):
             features_scaled = np.nan_to_num(features_scaled, nan=0.0, posinf=1.0, neginf=-1.0)
+        scaled = time.perf_counter()
+        
+        # Probabilidades y clase más probable por fila; un modelo cargado desde
+        # artefacto no tiene objeto de scikit-learn y siempre usa el motor
+        use_engine = self.engine is not None and (
+            self.model is None
+            or (self.inference_backend == 'compiled'
+                and len(features_scaled) <= self.compiled_batch_limit)
+        )
+        if use_engine:
+            probabilities = self.engine.predict_proba(features_scaled)
+            classes = self.engine.classes
+        else:
+            probabilities = self.model.predict_proba(features_scaled)
+            classes = self.model.classes_
+        predictions_encoded = classes.take(np.argmax(probabilities, axis=1))
+        predictions = self.label_encoder.inverse_transform(predictions_encoded)
+        if stages is not None:
+            stages.append(('scaling', scaled - started))
+            stages.append(('forest', time.perf_counter() - scaled))
+        
+        return predictions, probabilities.max(axis=1)
+    
+    def _build_result(self, prediction, confidence, zone_info, wifi, device,
+                      network_speed, battery_level, time_of_day):
+        """Construye el diccionario de respuesta de una predicción"""
+        prediction = str(prediction)
         
-        # Predicción
-        prediction_encoded = self.model.predict(features_scaled)[0]
-        prediction = self.label_encoder.inverse_transform([prediction_encoded])[0]
-        
-        # Probabilidades
-        probabilities = self.model.predict_proba(features_scaled)[0]
-        confidence = max(probabilities)
-        
-        # Nombres de flujos
-        flow_names = {
-            'flow-premium': 'Experiencia Premium',
-            'flow-standard': 'Experiencia Estándar',
-            'flow-basic': 'Experiencia Básica',
-            'flow-light': 'Experiencia Ligera',
-            'flow-offline': 'Experiencia Offline'
-        }
+        # Fuera de geocerca la distancia es infinita y no es serializable a JSON
+        distance = zone_info['distance_to_center']
         
+        # Sólo tipos nativos: la respuesta se serializa tal cual, sin conversiones
         return {
             'flow_type': prediction,
-            'flow_name': flow_names.get(prediction, 'Experiencia Desconocida'),
-            'confidence_score': round(confidence, 3),
-            'zone_info': zone_info,
+            'flow_name': FLOW_NAMES.get(prediction, 'Experiencia Desconocida'),
+            'confidence_score': round(float(confidence), 3),
+            'zone_info': {
+                'zone_name': zone_info['zone_name'],
+                'plusvalia': zone_info['plusvalia'],
+                'quality_factor': zone_info['quality_factor'],
+                'wifi_coverage': zone_info['wifi_coverage'],
+                'distance_to_center': distance if math.isfinite(distance) else None
+            },
             'network_conditions': {
                 'wifi_active': wifi,
                 'device_type': device,
@@ -368,29 +790,100 @@ class AdvancedFlowClassifier:
             'model_type': 'AdvancedFlowClassifier'
         }
     
-    def save_model(self):
-        """Guarda el modelo entrenado"""
-        model_data = {
+    def get_model_data(self) -> dict:
+        """Regresa los objetos entrenados que forman el modelo"""
+        return {
             'model': self.model,
             'scaler': self.scaler,
             'label_encoder': self.label_encoder,
             'is_trained': self.is_trained
         }
-        joblib.dump(model_data, self.model_path)
-        print(f'💾 Modelo guardado en {self.model_path}')
+    
+    def apply_model_data(self, model_data: dict):
+        """Reemplaza el modelo con los objetos de `get_model_data`"""
+        self.model = model_data['model']
+        self.scaler = model_data['scaler']
+        self.label_encoder = model_data['label_encoder']
+        self.is_trained = model_data['is_trained']
+        self.engine = CompiledForest.from_sklearn(self.model) if self.is_trained else None
+        self.artifact = None
+        self.prediction_cache.invalidate()
+    
+    def _artifact_contents(self):
+        """Arreglos y metadatos del artefacto: bosque compilado, scaler y clases"""
+        arrays = {f'forest.{name}': array for name, array in self.engine.to_arrays().items()}
+        arrays['scaler.mean'] = self.scaler.mean_
+        arrays['scaler.scale'] = self.scaler.scale_
+        meta = {
+            'max_depth': self.engine.max_depth,
+            'n_features': self.engine.n_features,
+            'label_classes': [str(label) for label in self.label_encoder.classes_],
+            'model_params': {key: value for key, value in self.model_params.items()
+                             if isinstance(value, (int, float, str, type(None)))}
+        }
+        return arrays, meta
+    
+    def export_artifact(self, path: str) -> str:
+        """Exporta bosque, scaler y label encoder como artefacto mapeable (ver app/artifacts.py)"""
+        return write_artifact(path, 'advanced', *self._artifact_contents())
+    
+    def artifact_bytes(self) -> bytes:
+        """El mismo artefacto de `export_artifact`, serializado en memoria"""
+        return build_artifact('advanced', *self._artifact_contents())
+    
+    def load_artifact(self, source, verify: bool = True):
+        """Carga el modelo desde un artefacto (ruta o `ModelArtifact` ya abierto)
+        
+        Los arreglos quedan como vistas de sólo lectura del mmap, sin copias.
+        """
+        if isinstance(source, ModelArtifact):
+            artifact = source
+        else:
+            artifact = ModelArtifact(source, verify=verify, expected_kind='advanced')
+        forest_arrays = {
+            name[len('forest.'):]: array for name, array in artifact.arrays.items()
+            if name.startswith('forest.')
+        }
+        
+        self.model = None
+        self.scaler = ArtifactScaler(artifact['scaler.mean'], artifact['scaler.scale'])
+        self.label_encoder = ArtifactLabelEncoder(artifact.meta['label_classes'])
+        self.engine = CompiledForest.from_arrays(
+            forest_arrays, artifact.meta['max_depth'], artifact.meta['n_features']
+        )
+        self.artifact = artifact
+        self.is_trained = True
+        self.prediction_cache.invalidate()
+    
+    def save_model(self):
+        """Guarda el modelo entrenado (escritura atómica)
+        
+        Con extensión `.artifact` se exporta al formato mapeable; si no, joblib.
+        """
+        if self.model_path.endswith(ARTIFACT_SUFFIX):
+            self.export_artifact(self.model_path)
+        else:
+            if self.model is None:
+                raise ValueError("Un modelo cargado desde artefacto sólo se puede guardar como artefacto")
+            import joblib
+            with atomic_path(self.model_path) as tmp_path:
+                joblib.dump(self.get_model_data(), tmp_path)
+        logger.info('💾 Modelo guardado', extra=fields(model='advanced', path=self.model_path))
     
     def load_model(self):
-        """Carga el modelo entrenado"""
+        """Carga el modelo entrenado (artefacto mapeable o joblib)"""
         if os.path.exists(self.model_path):
-            model_data = joblib.load(self.model_path)
-            self.model = model_data['model']
-            self.scaler = model_data['scaler']
-            self.label_encoder = model_data['label_encoder']
-            self.is_trained = model_data['is_trained']
-            print(f'📂 Modelo cargado desde {self.model_path}')
+            if is_artifact(self.model_path):
+                self.load_artifact(self.model_path)
+            else:
+                import joblib
+                self.apply_model_data(joblib.load(self.model_path))
+            logger.info('📂 Modelo cargado', extra=fields(model='advanced', path=self.model_path))
             return True
         else:
-            print(f'⚠️ No se encontró modelo guardado en {self.model_path}')
+            logger.warning('⚠️ No se encontró modelo guardado', extra=fields(
+                model='advanced', path=self.model_path
+            ))
             return False
     
     def get_model_info(self):
@@ -398,6 +891,8 @@ class AdvancedFlowClassifier:
         return {
             'model_type': 'RandomForestClassifier',
             'is_trained': self.is_trained,
+            'model_format': 'artifact' if self.model is None and self.is_trained else 'joblib',
+            'inference_backend': self.inference_backend,
             'features': [
                 'wifi', 'device_android', 'device_ios', 'latitude', 'longitude',
                 'distance_to_center', 'quality_factor', 'wifi_coverage',
@@ -406,5 +901,8 @@ class AdvancedFlowClassifier:
             'total_features': 12,
             'classes': list(self.label_encoder.classes_) if self.is_trained else [],
             'geo_zones': len(self.geo_zones),
-            'plusvalia_levels': ['alta', 'media', 'baja', 'emergente']
+            'geo_zones_source': self.geo_zones_path or 'builtin',
+            'zone_raster': self.zone_index.raster.path if self.zone_index.raster else None,
+            'plusvalia_levels': ['alta', 'media', 'baja', 'emergente'],
+            'prediction_cache': self.prediction_cache.stats()
         }
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+
+import numpy as np
+
+# Firma al inicio de cada artefacto y versión del esquema del encabezado
+MAGIC = b'HKMODEL\x00'
+SCHEMA_VERSION = 1
+
+# Extensión con la que `save_model` elige este formato en lugar de joblib
+ARTIFACT_SUFFIX = '.artifact'
+
+# Cada arreglo empieza en un múltiplo de este tamaño (línea de caché)
+ALIGNMENT = 64
+
+# Tipos permitidos: sólo numéricos, nunca objetos de Python
+ALLOWED_DTYPES = ('<f8', '<f4', '<i8', '<i4', '<i2', '|i1', '|u1', '|b1')
+
+
+class ArtifactError(Exception):
+    """El archivo no es un artefacto válido o no coincide con su hash/esquema"""
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_artifact(path: str) -> bool:
+    """Indica si `path` es un artefacto de este formato (revisa la firma)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def build_artifact(kind: str, arrays: dict, meta: dict = None) -> bytes:
+    """Serializa un artefacto completo en memoria
+
+    Formato: firma (8 bytes), largo del encabezado (uint32 little-endian),
+    encabezado JSON y después los arreglos alineados a 64 bytes. El
+    encabezado guarda el esquema, el tipo de modelo, el sha256 de la sección
+    de datos, metadatos pequeños y por cada arreglo su dtype, forma y
+    desplazamiento dentro de la sección de datos.
+    """
+    layout = {}
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.byteorder == '>':
+            array = array.astype(array.dtype.newbyteorder('<'))
+        dtype = array.dtype.str
+        if dtype not in ALLOWED_DTYPES:
+            raise ArtifactError(f"Tipo no soportado para '{name}': {dtype}")
+        offset = _aligned(offset)
+        layout[name] = {'dtype': dtype, 'shape': list(array.shape), 'offset': offset}
+        blobs.append((offset, array.tobytes()))
+        offset += array.nbytes
+
+    data = bytearray(offset)
+    for start, blob in blobs:
+        data[start:start + len(blob)] = blob
+
+    header = {
+        'schema_version': SCHEMA_VERSION,
+        'kind': kind,
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'data_bytes': len(data),
+        'arrays': layout,
+        'meta': meta or {}
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    prefix = len(MAGIC) + 4
+    header_bytes += b' ' * (_aligned(prefix + len(header_bytes)) - prefix - len(header_bytes))
+
+    return MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + bytes(data)
+
+
+@contextmanager
+def atomic_path(path: str):
+    """Ruta temporal que se publica en `path` con `os.replace` si el bloque termina bien
+
+    El nombre temporal lleva el pid: varios procesos (workers del supervisor,
+    trabajos de entrenamiento) pueden escribir la misma ruta a la vez sin
+    mezclar sus bytes. Si el bloque falla, el temporal se borra.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path: str, content: bytes):
+    """Escribe `content` en `path` de forma atómica"""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+
+
+def write_artifact(path: str, kind: str, arrays: dict, meta: dict = None) -> str:
+    """Escribe un artefacto con escritura atómica y regresa su sha256"""
+    content = build_artifact(kind, arrays, meta)
+    write_atomic(path, content)
+    return ModelArtifact.from_buffer(content, verify=False).sha256
+
+
+class ArtifactScaler:
+    """Escalado estándar ya ajustado, leído de un artefacto
+
+    Expone `mean_`, `scale_` y `transform` como `StandardScaler`, sin importar
+    scikit-learn para servir un modelo cargado desde artefacto.
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+
+
+class ArtifactLabelEncoder:
+    """Codificador de etiquetas ya ajustado (`classes_` ordenadas como `LabelEncoder`)"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def transform(self, y) -> np.ndarray:
+        return np.searchsorted(self.classes_, y)
+
+    def inverse_transform(self, y) -> np.ndarray:
+        return self.classes_.take(np.asarray(y, dtype=np.intp))
+
+
+class ModelArtifact:
+    """Artefacto abierto con mmap: los arreglos son vistas de sólo lectura del archivo
+
+    No hay deserialización; abrirlo cuesta leer el encabezado y, con
+    `verify=True`, calcular el sha256 de la sección de datos. Las páginas se
+    comparten entre procesos que abren el mismo archivo.
+    """
+
+    def __init__(self, path: str, verify: bool = True, expected_kind: str = None):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._parse(self._mmap, verify, expected_kind)
+
+    @classmethod
+    def from_buffer(cls, buffer, verify: bool = True, expected_kind: str = None,
+                    name: str = '<buffer>'):
+        """Abre un artefacto que ya está en memoria (bytes o memoryview) sin copiarlo"""
+        artifact = cls.__new__(cls)
+        artifact.path = name
+        artifact._mmap = None
+        artifact._parse(buffer, verify, expected_kind)
+        return artifact
+
+    def _parse(self, buffer, verify: bool, expected_kind: str):
+        """Valida firma, esquema y hash y crea las vistas de los arreglos"""
+        path = self.path
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ArtifactError(f"{path} no es un artefacto de modelo")
+        (header_length,) = struct.unpack_from('<I', buffer, len(MAGIC))
+        data_start = len(MAGIC) + 4 + header_length
+        self.header = json.loads(bytes(buffer[len(MAGIC) + 4:data_start]))
+
+        if self.header.get('schema_version') != SCHEMA_VERSION:
+            raise ArtifactError(
+                f"Versión de esquema {self.header.get('schema_version')} no soportada "
+                f"(se esperaba {SCHEMA_VERSION})"
+            )
+        if expected_kind is not None and self.header['kind'] != expected_kind:
+            raise ArtifactError(
+                f"El artefacto es de tipo '{self.header['kind']}', se esperaba '{expected_kind}'"
+            )
+
+        data = memoryview(buffer)[data_start:data_start + self.header['data_bytes']]
+        if len(data) != self.header['data_bytes']:
+            raise ArtifactError(f"{path} está truncado")
+        if verify and hashlib.sha256(data).hexdigest() != self.header['sha256']:
+            raise ArtifactError(f"El hash de {path} no coincide con su contenido")
+
+        self.arrays = {}
+        for name, spec in self.header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=spec['offset'])
+            array.flags.writeable = False
+            self.arrays[name] = array.reshape(spec['shape'])
+
+    @property
+    def kind(self) -> str:
+        return self.header['kind']
+
+    @property
+    def meta(self) -> dict:
+        return self.header['meta']
+
+    @property
+    def sha256(self) -> str:
+        return self.header['sha256']
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import time
+
+from app import tracing
+
+# Límites superiores de los buckets del histograma de tamaño de lote
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class BatcherStoppedError(Exception):
+    """El dispatcher se detuvo antes de despachar el registro"""
+
+
+class MicroBatcher:
+    """Agrupa predicciones concurrentes en una sola llamada matricial
+
+    Las solicitudes que llegan dentro de una ventana corta (o hasta
+    `max_batch_size`) se puntúan juntas con `batch_fn`, una corrutina que
+    recibe la lista de registros y regresa los resultados en el mismo orden;
+    cada llamador recibe sólo el suyo. La ventana se adapta a la carga: se
+    reduce cuando los lotes salen de un solo registro (sin concurrencia no hay
+    nada que esperar) y crece mientras haya lotes parciales con varios
+    registros, sin salir de [min_wait, max_wait].
+    """
+
+    def __init__(self, name: str, batch_fn, max_batch_size: int = 64,
+                 min_wait: float = 0.0, max_wait: float = 0.005, enabled: bool = True):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self.wait = min(max(0.001, min_wait), max_wait)
+
+        self._queue = None
+        self._full = None
+        self._worker = None
+        self._inflight = set()
+
+        self._batches = 0
+        self._items = 0
+        self._max_batch_seen = 0
+        self._size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, batch_fn):
+        """Crea el dispatcher con la configuración de las variables de entorno"""
+        return cls(
+            name,
+            batch_fn,
+            max_batch_size=int(os.getenv('MICROBATCH_MAX_SIZE', '64')),
+            min_wait=float(os.getenv('MICROBATCH_MIN_WAIT_MS', '0')) / 1000,
+            max_wait=float(os.getenv('MICROBATCH_MAX_WAIT_MS', '5')) / 1000,
+            enabled=os.getenv('MICROBATCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        )
+
+    def start(self):
+        """Arranca el ciclo de despacho en el event loop actual"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._worker = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Detiene el ciclo de despacho y espera los lotes en curso
+
+        Los registros que seguían en cola (o en la ventana sin despachar)
+        fallan con `BatcherStoppedError` para que ningún llamador se quede
+        esperando.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(BatcherStoppedError(f"Dispatcher '{self.name}' detenido"))
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def submit(self, record):
+        """Encola un registro y espera su resultado individual"""
+        if self._worker is None or self._worker.done():
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((record, future, time.perf_counter(), tracing.current()))
+        if self._queue.qsize() >= self.max_batch_size - 1:
+            self._full.set()
+        return await future
+
+    async def _dispatch_loop(self):
+        """Junta lotes de la cola y los despacha sin bloquear la recolección"""
+        while True:
+            batch = [await self._queue.get()]
+
+            # Esperar más registros hasta que venza la ventana o se llene el lote
+            if self.wait > 0 and self._queue.qsize() < self.max_batch_size - 1:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.wait)
+                except asyncio.TimeoutError:
+                    pass
+                except asyncio.CancelledError:
+                    # Detenido durante la ventana: el registro tomado vuelve a la cola para que
+                    # `stop()` lo falle junto con los demás
+                    self._queue.put_nowait(batch[0])
+                    raise
+
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            self._record_batch(batch)
+            self._adapt(len(batch))
+
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch):
+        """Puntúa un lote y reparte cada resultado a su llamador
+
+        Las etapas del lote se suman a la traza de cada solicitud trazada.
+        """
+        records = [record for record, _, _, _ in batch]
+        dispatched_at = time.perf_counter()
+        traces = []
+        for _, _, enqueued_at, trace in batch:
+            # Una solicitud con varios registros en el lote cuenta una sola vez
+            if trace is not None and trace not in traces:
+                trace.record('batch_wait', dispatched_at - enqueued_at)
+                trace.record_batch(len(batch))
+                traces.append(trace)
+        try:
+            with tracing.use(tracing.TraceGroup(traces) if traces else None):
+                results = await self.batch_fn(records)
+        except Exception as e:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _adapt(self, batch_size: int):
+        """Ajusta la ventana de espera según el tamaño del último lote"""
+        if batch_size <= 1:
+            self.wait = max(self.min_wait, self.wait * 0.5)
+        elif batch_size >= self.max_batch_size:
+            # Los lotes se llenan antes de que venza la ventana
+            self.wait = max(self.min_wait, self.wait * 0.8)
+        else:
+            self.wait = min(self.max_wait, max(self.wait, 0.0001) * 1.5)
+
+    def _record_batch(self, batch):
+        """Actualiza las métricas de tamaño de lote y espera en cola"""
+        now = time.perf_counter()
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._max_batch_seen = max(self._max_batch_seen, size)
+
+        bucket = len(BATCH_SIZE_BUCKETS)
+        for i, limit in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= limit:
+                bucket = i
+                break
+        self._size_histogram[bucket] += 1
+
+        for _, _, enqueued_at, _ in batch:
+            queue_wait = now - enqueued_at
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+
+    def metrics(self) -> dict:
+        """Métricas de tamaño de lote, espera en cola y ventana actual"""
+        items = self._items or 1
+        labels = [f"<={limit}" for limit in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            'name': self.name,
+            'enabled': self.enabled,
+            'max_batch_size': self.max_batch_size,
+            'current_wait_ms': round(self.wait * 1000, 3),
+            'batches': self._batches,
+            'items': self._items,
+            'avg_batch_size': round(self._items / (self._batches or 1), 2),
+            'max_batch_size_seen': self._max_batch_seen,
+            'batch_size_histogram': dict(zip(labels, self._size_histogram)),
+            'avg_queue_wait_ms': round(self._queue_wait_total / items * 1000, 3),
+            'max_queue_wait_ms': round(self._queue_wait_max * 1000, 3),
+            'queued': self._queue.qsize() if self._queue is not None else 0
+        }
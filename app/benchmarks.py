@@ -0,0 +1,396 @@
+"""
+Microbenchmarks de los caminos críticos con líneas base y detección de regresiones
+
+Cada benchmark prepara su estado una vez (modelo entrenado, archivos
+guardados, cliente ASGI) y regresa una función sin argumentos que se mide:
+primero se calienta, luego se calibra cuántas llamadas caben en una ronda de
+al menos `min_round_time` segundos y se toman `repeats` rondas. El resumen
+(mínimo, mediana, media, desviación estándar y rango intercuartil) es por
+llamada, en microsegundos.
+
+Las líneas base viven en `benchmark_baseline.json`; `compare_results`
+marca como regresión a todo benchmark cuyo tiempo creció más que su umbral.
+Se compara la mejor ronda (`min_us`): el ruido de otros procesos sólo puede
+sumar tiempo, así que el mínimo es mucho más estable que la mediana.
+"""
+
+import asyncio
+import itertools
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+# Umbral de regresión por defecto: 25% más lento que la línea base
+DEFAULT_THRESHOLD = 0.25
+
+# Estadística con la que se compara contra la línea base
+COMPARED_STAT = 'min_us'
+
+# Registro de benchmarks: nombre -> Benchmark (en orden de definición)
+BENCHMARKS = {}
+
+# Estado compartido entre benchmarks (modelos entrenados una sola vez)
+_fixtures = {}
+
+
+class Benchmark:
+    """Un benchmark registrado
+
+    `setup()` regresa la función a medir, o `(función, limpieza)` si deja
+    recursos abiertos. Los benchmarks lentos (entrenamiento) usan menos
+    rondas y un umbral más holgado porque su ruido es mayor.
+    """
+
+    def __init__(self, name: str, group: str, setup, warmup: int = 20, repeats: int = 15,
+                 threshold: float = None):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.warmup = warmup
+        self.repeats = repeats
+        self.threshold = threshold
+        self.description = (setup.__doc__ or '').strip()
+
+
+def benchmark(name: str, group: str, **options):
+    """Decorador que registra la función de preparación de un benchmark"""
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, group, setup, **options)
+        return setup
+    return register
+
+
+def measure(fn, warmup: int = 20, repeats: int = 15, number: int = None,
+            min_round_time: float = 0.05) -> dict:
+    """Mide `fn` y regresa estadísticas por llamada en microsegundos
+
+    Con `number=None` se calibra duplicando las llamadas por ronda hasta que
+    una ronda dure al menos `min_round_time` (como `timeit.autorange`).
+    """
+    for _ in range(warmup):
+        fn()
+
+    if number is None:
+        number = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - started >= min_round_time or number >= 1 << 16:
+                break
+            number *= 2
+
+    rounds = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - started) / number * 1e6)
+
+    quartiles = statistics.quantiles(rounds, n=4) if len(rounds) > 1 else [rounds[0]] * 3
+    return {
+        'min_us': round(min(rounds), 3),
+        'median_us': round(statistics.median(rounds), 3),
+        'mean_us': round(statistics.fmean(rounds), 3),
+        'stdev_us': round(statistics.stdev(rounds), 3) if len(rounds) > 1 else 0.0,
+        'iqr_us': round(quartiles[2] - quartiles[0], 3),
+        'max_us': round(max(rounds), 3),
+        'rounds': repeats,
+        'calls_per_round': number
+    }
+
+
+def _trained_basic():
+    if 'basic' not in _fixtures:
+        from app.ml_model import ConnectionQualityClassifier
+        classifier = ConnectionQualityClassifier()
+        classifier.train()
+        _fixtures['basic'] = classifier
+    return _fixtures['basic']
+
+
+def _trained_advanced():
+    if 'advanced' not in _fixtures:
+        from app.advanced_flow_classifier import AdvancedFlowClassifier
+        from app.prediction_cache import PredictionCache
+        classifier = AdvancedFlowClassifier()
+        classifier.train(save=False)
+        # Sin caché: se mide el modelo, no los aciertos de la caché
+        classifier.prediction_cache = PredictionCache(maxsize=0)
+        _fixtures['advanced'] = classifier
+    return _fixtures['advanced']
+
+
+def _sample_records(n: int = 256) -> list:
+    """Registros completos y variados (dentro y fuera de las geocercas)"""
+    from app.load_generator import TrafficMix
+    mix = TrafficMix(_trained_advanced().geo_zones, seed=7, missing_probability=0.0)
+    return [mix.record() for _ in range(n)]
+
+
+@benchmark('basic_predict', 'predict')
+def _basic_predict():
+    """ConnectionQualityClassifier.predict de un registro"""
+    classifier = _trained_basic()
+    records = itertools.cycle(_sample_records())
+
+    def run():
+        record = next(records)
+        classifier.predict(record['wifi'], record['device'], record['latitude'],
+                           record['longitude'], record['network_speed'])
+    return run
+
+
+@benchmark('advanced_predict', 'predict')
+def _advanced_predict():
+    """AdvancedFlowClassifier.predict de un registro (sin caché de predicciones)"""
+    classifier = _trained_advanced()
+    records = itertools.cycle(_sample_records())
+    return lambda: classifier.predict(**next(records))
+
+
+@benchmark('zone_lookup', 'predict')
+def _zone_lookup():
+    """AdvancedFlowClassifier._get_zone_info de un punto"""
+    classifier = _trained_advanced()
+    points = itertools.cycle([(r['latitude'], r['longitude']) for r in _sample_records()])
+    return lambda: classifier._get_zone_info(*next(points))
+
+
+@benchmark('basic_training_data', 'training', warmup=2, repeats=7)
+def _basic_training_data():
+    """Generación de las 2000 muestras sintéticas del modelo básico"""
+    from app.ml_model import ConnectionQualityClassifier
+    classifier = ConnectionQualityClassifier()
+    return classifier._create_training_data
+
+
+@benchmark('advanced_training_data', 'training', warmup=2, repeats=7)
+def _advanced_training_data():
+    """Generación de las 2000 muestras sintéticas del modelo avanzado"""
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+    classifier = AdvancedFlowClassifier()
+    return classifier._create_advanced_training_data
+
+
+@benchmark('basic_train', 'training', warmup=1, repeats=5, threshold=0.5)
+def _basic_train():
+    """ConnectionQualityClassifier.train completo (datos + ajuste)"""
+    from app.ml_model import ConnectionQualityClassifier
+    return ConnectionQualityClassifier().train
+
+
+@benchmark('advanced_train', 'training', warmup=1, repeats=5, threshold=0.5)
+def _advanced_train():
+    """AdvancedFlowClassifier.train completo sin escribir a disco"""
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+    classifier = AdvancedFlowClassifier()
+    return lambda: classifier.train(save=False)
+
+
+@benchmark('basic_load_model', 'loading', warmup=3)
+def _basic_load_model():
+    """ConnectionQualityClassifier.load_model desde joblib"""
+    from app.ml_model import ConnectionQualityClassifier
+    directory = tempfile.mkdtemp(prefix='bench_')
+    path = os.path.join(directory, 'connection_classifier.joblib')
+    _trained_basic().save_model(path)
+    classifier = ConnectionQualityClassifier()
+    return (lambda: classifier.load_model(path)), (lambda: shutil.rmtree(directory))
+
+
+def _advanced_loader(suffix: str):
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+    directory = tempfile.mkdtemp(prefix='bench_')
+    classifier = AdvancedFlowClassifier()
+    classifier.apply_model_data(_trained_advanced().get_model_data())
+    classifier.model_path = os.path.join(directory, f'advanced_flow_model{suffix}')
+    classifier.save_model()
+    return classifier.load_model, (lambda: shutil.rmtree(directory))
+
+
+@benchmark('advanced_load_model', 'loading', warmup=3)
+def _advanced_load_model():
+    """AdvancedFlowClassifier.load_model desde joblib"""
+    return _advanced_loader('.joblib')
+
+
+@benchmark('advanced_load_artifact', 'loading', warmup=3)
+def _advanced_load_artifact():
+    """AdvancedFlowClassifier.load_model desde un artefacto mapeable"""
+    from app.artifacts import ARTIFACT_SUFFIX
+    return _advanced_loader(ARTIFACT_SUFFIX)
+
+
+def _asgi_round_trip(endpoint: str, **mix_options):
+    """Cliente ASGI en este proceso que repite solicitudes pregeneradas de `endpoint`"""
+    from app.load_generator import TrafficMix, open_client, wait_until_ready
+    import app.main as main
+
+    mix = TrafficMix(_trained_advanced().geo_zones, endpoint_weights={endpoint: 1}, seed=11,
+                     **mix_options)
+    requests = itertools.cycle([mix.next_request() for _ in range(256)])
+
+    loop = asyncio.new_event_loop()
+    context = open_client(app=main.app)
+    client = loop.run_until_complete(context.__aenter__())
+    loop.run_until_complete(wait_until_ready(client))
+
+    def run():
+        _, method, path, params, body = next(requests)
+        response = loop.run_until_complete(client.request(method, path, params=params, json=body))
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path} respondió {response.status_code}: {response.text}")
+
+    def close():
+        loop.run_until_complete(context.__aexit__(None, None, None))
+        loop.close()
+
+    return run, close
+
+
+@benchmark('asgi_web_app_experience', 'asgi')
+def _asgi_web_app_experience():
+    """GET /web-and-app-experience completo por ASGI (middlewares incluidos)"""
+    return _asgi_round_trip('web_app_experience')
+
+
+@benchmark('asgi_advanced_predict', 'asgi')
+def _asgi_advanced_predict():
+    """GET /advanced-flow/predict completo por ASGI (micro-lotes y pool incluidos)"""
+    return _asgi_round_trip('advanced_predict')
+
+
+@benchmark('asgi_advanced_predict_batch', 'asgi', warmup=5)
+def _asgi_advanced_predict_batch():
+    """POST /advanced-flow/predict-batch con 50 registros por ASGI"""
+    return _asgi_round_trip('advanced_predict_batch', batch_sizes=(50, 50))
+
+
+def select(patterns: list = None) -> list:
+    """Benchmarks cuyo nombre contiene alguno de los patrones o cuyo grupo es uno de ellos
+
+    Un patrón `=nombre` selecciona sólo ese benchmark.
+    """
+    if not patterns:
+        return list(BENCHMARKS.values())
+    def matches(bench, pattern):
+        if pattern.startswith('='):
+            return bench.name == pattern[1:]
+        return pattern in bench.name or pattern == bench.group
+
+    selected = [bench for bench in BENCHMARKS.values()
+                if any(matches(bench, pattern) for pattern in patterns)]
+    if not selected:
+        raise ValueError(f"Ningún benchmark coincide con {patterns}; disponibles: {list(BENCHMARKS)}")
+    return selected
+
+
+def run_benchmark(bench: Benchmark, repeats: int = None, min_round_time: float = 0.05) -> dict:
+    setup = bench.setup()
+    fn, cleanup = setup if isinstance(setup, tuple) else (setup, None)
+    try:
+        result = measure(fn, warmup=bench.warmup, repeats=repeats or bench.repeats,
+                         min_round_time=min_round_time)
+    finally:
+        if cleanup is not None:
+            cleanup()
+    result['group'] = bench.group
+    if bench.threshold is not None:
+        result['threshold'] = bench.threshold
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(patterns: list = None, repeats: int = None, min_round_time: float = 0.05,
+              progress=None) -> dict:
+    """Corre los benchmarks seleccionados y regresa el reporte con su entorno"""
+    results = {}
+    for bench in select(patterns):
+        results[bench.name] = run_benchmark(bench, repeats, min_round_time)
+        if progress is not None:
+            progress(bench, results[bench.name])
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': f'{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)',
+        'benchmarks': results
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Compara la mejor ronda (`COMPARED_STAT`) contra la línea base
+
+    Regresa `[(nombre, antes µs, después µs, cambio %, estado), ...]` con
+    estado 'regression', 'faster', 'ok', 'new' (sin línea base) o 'missing'
+    (en la línea base pero no medido). Un benchmark con `threshold` propio
+    usa ese umbral en lugar del global.
+    """
+    rows = []
+    old = baseline['benchmarks']
+    new = current['benchmarks']
+    for name in list(old) + [name for name in new if name not in old]:
+        if name not in new:
+            rows.append((name, old[name][COMPARED_STAT], None, None, 'missing'))
+            continue
+        after = new[name][COMPARED_STAT]
+        if name not in old:
+            rows.append((name, None, after, None, 'new'))
+            continue
+        before = old[name][COMPARED_STAT]
+        limit = old[name].get('threshold', threshold)
+        change = (after - before) / before
+        if change > limit:
+            status = 'regression'
+        elif change < -limit:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, before, after, round(change * 100, 1), status))
+    return rows
+
+
+def regressions(rows: list) -> list:
+    return [row for row in rows if row[4] == 'regression']
+
+
+def keep_best(report: dict, other: dict) -> dict:
+    """Reporte con la mejor medición de cada benchmark entre `report` y `other`"""
+    merged = dict(report['benchmarks'])
+    for name, result in other['benchmarks'].items():
+        if name not in merged or result[COMPARED_STAT] < merged[name][COMPARED_STAT]:
+            merged[name] = result
+    return {**report, 'benchmarks': merged}
+
+
+def confirm_regressions(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+                        attempts: int = 2, progress=None) -> tuple:
+    """Vuelve a medir los benchmarks que salieron como regresión
+
+    Una ráfaga de carga en la máquina puede hacer lenta una corrida entera;
+    sólo es regresión si se repite en cada uno de los `attempts` intentos
+    (se queda la mejor medición). Regresa `(reporte, filas de comparación)`.
+    """
+    rows = compare_results(baseline, current, threshold)
+    for _ in range(attempts):
+        names = [row[0] for row in regressions(rows)]
+        if not names:
+            break
+        retry = run_suite([f'={name}' for name in names], progress=progress)
+        current = keep_best(current, retry)
+        rows = compare_results(baseline, current, threshold)
+    return current, rows
+
@@ -0,0 +1,369 @@
+"""
+Puntuación masiva por streaming: NDJSON o columnar binario de entrada, NDJSON de salida
+
+El cuerpo se lee por pedazos conforme llega. Los registros se agrupan en
+bloques de `chunk_size`, cada bloque se manda al ejecutor de inferencia
+(`predict_batch` del modelo elegido) y sus resultados se escriben como una
+línea JSON por registro, en el orden de entrada, mientras el resto del
+cuerpo sigue llegando. La memoria queda acotada sin importar el tamaño del
+cuerpo: un bloque en armado, a lo más `max_pending` bloques en inferencia y
+una línea o trama incompleta de tamaño máximo fijo.
+
+Formato columnar (`COLUMNAR_MEDIA_TYPE`): la firma `COLUMNAR_MAGIC` y después
+tramas. Cada trama es el largo del encabezado (uint32 little-endian), un
+encabezado JSON `{"rows": n, "columns": [[nombre, dtype], ...]}` y los
+arreglos de cada columna, uno tras otro, con `n` elementos de su dtype.
+"""
+
+import asyncio
+import json
+import math
+import os
+import struct
+from collections import deque
+
+import numpy as np
+import orjson
+from starlette.responses import StreamingResponse
+
+from app.serialization import dumps
+
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+COLUMNAR_MEDIA_TYPE = 'application/x-hk-columnar'
+
+# Firma al inicio de un cuerpo columnar
+COLUMNAR_MAGIC = b'HKCOLS\x00\x01'
+
+# Tipos permitidos por columna: numéricos/booleanos, y bytes para `device`
+NUMERIC_DTYPES = ('<f8', '<f4', '<i8', '<i4', '<i2', '|i1', '|u1', '|b1')
+
+# Campos de cada registro; los de `REQUIRED_FIELDS` no pueden faltar
+FIELDS = {
+    'basic': ('wifi', 'device', 'latitude', 'longitude', 'network_speed'),
+    'advanced': ('wifi', 'device', 'latitude', 'longitude', 'network_speed',
+                 'battery_level', 'time_of_day')
+}
+REQUIRED_FIELDS = {
+    'basic': ('wifi', 'device'),
+    'advanced': ('wifi', 'device', 'latitude', 'longitude')
+}
+DEVICES = ('android', 'ios')
+
+
+class PayloadError(ValueError):
+    """El cuerpo no se puede seguir leyendo (trama o línea inválida o demasiado grande)"""
+
+
+class RecordError:
+    """Registro inválido; en la salida ocupa su lugar como `{"index", "error"}`"""
+
+    __slots__ = ('message',)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def validate_record(kind: str, data) -> dict:
+    """Registro con los campos de `kind` normalizados; ValueError si es inválido"""
+    if not isinstance(data, dict):
+        raise ValueError("El registro debe ser un objeto JSON")
+    record = {}
+    for name in FIELDS[kind]:
+        value = data.get(name)
+        if value is None:
+            if name in REQUIRED_FIELDS[kind]:
+                raise ValueError(f"Falta el campo '{name}'")
+        elif name == 'wifi':
+            if not isinstance(value, bool):
+                raise ValueError("'wifi' debe ser booleano")
+        elif name == 'device':
+            if value not in DEVICES:
+                raise ValueError(f"'device' debe ser uno de {list(DEVICES)}")
+        elif name == 'time_of_day':
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError("'time_of_day' debe ser entero")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"'{name}' debe ser numérico")
+        record[name] = value
+    return record
+
+
+class NDJSONParser:
+    """Parser incremental de NDJSON: un registro JSON por línea
+
+    `feed` recibe bytes en pedazos de cualquier tamaño y regresa los
+    registros de las líneas completas; sólo se guarda la línea incompleta,
+    que no puede pasar de `max_line_bytes`. Las líneas vacías se ignoran.
+    """
+
+    def __init__(self, kind: str, max_line_bytes: int = 64 * 1024):
+        self.kind = kind
+        self.max_line_bytes = max_line_bytes
+        self._partial = b''
+
+    def _parse_line(self, line: bytes):
+        try:
+            return validate_record(self.kind, orjson.loads(line))
+        except orjson.JSONDecodeError:
+            return RecordError("JSON inválido")
+        except ValueError as e:
+            return RecordError(str(e))
+
+    def feed(self, data: bytes) -> list:
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        if len(self._partial) > self.max_line_bytes:
+            raise PayloadError(f"Línea de más de {self.max_line_bytes} bytes")
+        return [self._parse_line(line) for line in lines if line.strip()]
+
+    def close(self) -> list:
+        """Registros de la última línea si no terminaba en salto de línea"""
+        line, self._partial = self._partial, b''
+        return [self._parse_line(line)] if line.strip() else []
+
+
+class ColumnarParser:
+    """Parser incremental del formato columnar (ver el docstring del módulo)
+
+    Guarda los bytes hasta completar una trama y la convierte en registros.
+    Una trama no puede pasar de `max_frame_bytes`, así que el cliente debe
+    partir los datos grandes en varias tramas.
+    """
+
+    def __init__(self, kind: str, max_frame_bytes: int = 16 * 1024 * 1024):
+        self.kind = kind
+        self.max_frame_bytes = max_frame_bytes
+        self._buffer = bytearray()
+        self._magic_checked = False
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        if not self._magic_checked:
+            if len(self._buffer) < len(COLUMNAR_MAGIC):
+                return []
+            if self._buffer[:len(COLUMNAR_MAGIC)] != COLUMNAR_MAGIC:
+                raise PayloadError("El cuerpo no empieza con la firma del formato columnar")
+            del self._buffer[:len(COLUMNAR_MAGIC)]
+            self._magic_checked = True
+
+        records = []
+        while len(self._buffer) >= 4:
+            (header_length,) = struct.unpack_from('<I', self._buffer)
+            if header_length > self.max_frame_bytes:
+                raise PayloadError(f"Trama de más de {self.max_frame_bytes} bytes")
+            if len(self._buffer) < 4 + header_length:
+                break
+            rows, columns = self._read_header(bytes(self._buffer[4:4 + header_length]))
+            frame_bytes = 4 + header_length + sum(rows * dtype.itemsize for _, dtype in columns)
+            if frame_bytes > self.max_frame_bytes:
+                raise PayloadError(f"Trama de más de {self.max_frame_bytes} bytes")
+            if len(self._buffer) < frame_bytes:
+                break
+            records.extend(self._frame_records(rows, columns, 4 + header_length))
+            del self._buffer[:frame_bytes]
+        return records
+
+    def close(self) -> list:
+        """Un cuerpo vacío no trae registros; uno que termina a media trama es inválido"""
+        if self._buffer:
+            raise PayloadError("El cuerpo termina con una trama incompleta")
+        return []
+
+    def _read_header(self, header_bytes: bytes) -> tuple:
+        try:
+            header = json.loads(header_bytes)
+            rows = int(header['rows'])
+            columns = [(str(name), np.dtype(dtype)) for name, dtype in header['columns']]
+        except (ValueError, TypeError, KeyError) as e:
+            raise PayloadError(f"Encabezado de trama inválido: {e}")
+        if rows < 0:
+            raise PayloadError("Número de filas negativo")
+        for name, dtype in columns:
+            if name not in FIELDS[self.kind]:
+                raise PayloadError(f"Columna desconocida: '{name}'")
+            allowed = dtype.kind == 'S' if name == 'device' else dtype.str in NUMERIC_DTYPES
+            if not allowed:
+                raise PayloadError(f"Tipo no soportado para '{name}': {dtype.str}")
+        missing = [name for name in REQUIRED_FIELDS[self.kind] if name not in dict(columns)]
+        if missing:
+            raise PayloadError(f"Columnas faltantes: {missing}")
+        return rows, columns
+
+    def _frame_records(self, rows: int, columns: list, offset: int) -> list:
+        arrays = {}
+        for name, dtype in columns:
+            arrays[name] = np.frombuffer(self._buffer, dtype=dtype, count=rows, offset=offset)
+            offset += rows * dtype.itemsize
+
+        # Errores por fila, revisados por columna completa
+        errors = {}
+
+        def flag(mask, message):
+            for i in np.flatnonzero(mask):
+                errors.setdefault(int(i), message)
+
+        wifi = arrays['wifi']
+        if wifi.dtype.kind != 'b':
+            flag((wifi != 0) & (wifi != 1), "'wifi' debe ser booleano")
+        device = arrays['device'].astype('U')
+        flag(~np.isin(device, DEVICES), f"'device' debe ser uno de {list(DEVICES)}")
+
+        values = {'wifi': (wifi != 0).tolist(), 'device': device.tolist()}
+        for name in FIELDS[self.kind][2:]:
+            if name not in arrays:
+                values[name] = [None] * rows
+                continue
+            column = arrays[name]
+            if column.dtype.kind == 'f':
+                missing = np.isnan(column)
+                flag(np.isinf(column), f"'{name}' debe ser numérico")
+                if name in REQUIRED_FIELDS[self.kind]:
+                    flag(missing, f"Falta el campo '{name}'")
+                if name == 'time_of_day':
+                    flag(~missing & (column != np.floor(column)), "'time_of_day' debe ser entero")
+                    column = np.where(missing, 0, column).astype(np.int64)
+                values[name] = [None if gap else value for gap, value in zip(missing.tolist(), column.tolist())]
+            else:
+                values[name] = column.astype(np.int64 if name == 'time_of_day' else float).tolist()
+
+        names = FIELDS[self.kind]
+        records = [dict(zip(names, row)) for row in zip(*(values[name] for name in names))]
+        for i, message in errors.items():
+            records[i] = RecordError(message)
+        return records
+
+
+def encode_columnar(columns: dict, rows_per_frame: int = 10000):
+    """Genera un cuerpo columnar (firma y tramas) a partir de arreglos por columna
+
+    `device` puede venir como texto; se codifica como bytes. Los valores
+    faltantes de las columnas float van como NaN.
+    """
+    arrays = {}
+    for name, values in columns.items():
+        array = np.asarray(values)
+        if name == 'device':
+            array = array.astype('S')
+        elif array.dtype.byteorder == '>':
+            array = array.astype(array.dtype.newbyteorder('<'))
+        arrays[name] = array
+    rows = len(next(iter(arrays.values()))) if arrays else 0
+
+    yield COLUMNAR_MAGIC
+    for start in range(0, rows, rows_per_frame):
+        chunk = {name: np.ascontiguousarray(array[start:start + rows_per_frame])
+                 for name, array in arrays.items()}
+        header = json.dumps({
+            'rows': len(next(iter(chunk.values()))),
+            'columns': [[name, array.dtype.str] for name, array in chunk.items()]
+        }).encode('utf-8')
+        yield struct.pack('<I', len(header)) + header + b''.join(a.tobytes() for a in chunk.values())
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Respuesta NDJSON en streaming que no consume los mensajes de `receive`
+
+    `StreamingResponse` escucha `receive` para detectar desconexiones y eso
+    se come el cuerpo que el generador todavía está leyendo. Aquí la
+    desconexión se nota al leer el cuerpo o al enviar.
+    """
+
+    media_type = NDJSON_MEDIA_TYPES[0]
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class BulkScorer:
+    """Arma el flujo de resultados NDJSON a partir del cuerpo de una solicitud"""
+
+    def __init__(self, chunk_size: int = 1000, max_pending: int = 2,
+                 max_line_bytes: int = 64 * 1024, max_frame_bytes: int = 16 * 1024 * 1024):
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.max_line_bytes = max_line_bytes
+        self.max_frame_bytes = max_frame_bytes
+
+    @classmethod
+    def from_env(cls):
+        """Crea el puntuador con la configuración de las variables de entorno"""
+        return cls(
+            chunk_size=int(os.getenv('BULK_CHUNK_SIZE', '1000')),
+            max_pending=int(os.getenv('BULK_MAX_PENDING_CHUNKS', '2')),
+            max_line_bytes=int(os.getenv('BULK_MAX_LINE_BYTES', str(64 * 1024))),
+            max_frame_bytes=int(os.getenv('BULK_MAX_FRAME_BYTES', str(16 * 1024 * 1024)))
+        )
+
+    def parser_for(self, content_type: str, kind: str):
+        """Parser según el Content-Type, o None si el formato no está soportado"""
+        media_type = (content_type or '').split(';')[0].strip().lower()
+        if media_type in NDJSON_MEDIA_TYPES:
+            return NDJSONParser(kind, self.max_line_bytes)
+        if media_type == COLUMNAR_MEDIA_TYPE:
+            return ColumnarParser(kind, self.max_frame_bytes)
+        return None
+
+    async def stream(self, body, parser, score, chunk_size: int = None):
+        """Genera las líneas NDJSON de resultados mientras se lee `body`
+
+        `score(records)` es la corrutina que puntúa un bloque. Un registro
+        inválido produce `{"index": i, "error": ...}` en su lugar; si el
+        cuerpo no se puede seguir leyendo o la inferencia falla, la última
+        línea es `{"error": ...}` (el código HTTP ya se envió).
+        """
+        chunk_size = chunk_size or self.chunk_size
+        pending = deque()
+        chunk = []
+        next_index = 0
+
+        async def score_chunk(items: list, first_index: int) -> bytes:
+            records = [item for item in items if not isinstance(item, RecordError)]
+            results = iter(await score(records) if records else ())
+            lines = []
+            for i, item in enumerate(items):
+                if isinstance(item, RecordError):
+                    lines.append(dumps({'index': first_index + i, 'error': item.message}))
+                else:
+                    lines.append(dumps(next(results)))
+            return b'\n'.join(lines) + b'\n'
+
+        def submit():
+            nonlocal chunk, next_index
+            pending.append(asyncio.ensure_future(score_chunk(chunk, next_index)))
+            next_index += len(chunk)
+            chunk = []
+
+        try:
+            try:
+                async for data in body:
+                    for item in parser.feed(data):
+                        chunk.append(item)
+                        if len(chunk) >= chunk_size:
+                            # Con demasiados bloques en vuelo se espera al más antiguo antes
+                            # de mandar otro, aunque el pedazo (o la trama) traiga muchos más
+                            while len(pending) >= self.max_pending:
+                                yield await pending.popleft()
+                            submit()
+                    # Resultados listos salen sin esperar al resto del cuerpo
+                    while pending and pending[0].done():
+                        yield await pending.popleft()
+                chunk.extend(parser.close())
+                if chunk:
+                    submit()
+                while pending:
+                    yield await pending.popleft()
+            except PayloadError as e:
+                # Los registros completos que alcanzaron a llegar sí se puntúan
+                if chunk:
+                    submit()
+                while pending:
+                    yield await pending.popleft()
+                yield dumps({'error': str(e), 'records_read': next_index}) + b'\n'
+        except Exception as e:
+            detail = getattr(e, 'detail', None) or str(e)
+            yield dumps({'error': f"Error puntuando registros: {detail}"}) + b'\n'
+        finally:
+            for task in pending:
+                task.cancel()
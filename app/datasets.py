@@ -0,0 +1,217 @@
+import csv
+import os
+import time
+
+import numpy as np
+
+from app.log import fields, get_logger
+
+# Columnas de features de cada modelo, en el orden de la matriz de entrenamiento
+BASIC_FEATURES = (
+    'wifi', 'device_android', 'device_ios', 'latitude', 'longitude',
+    'distance_to_center', 'is_urban_area', 'network_speed'
+)
+ADVANCED_FEATURES = (
+    'wifi', 'device_android', 'device_ios', 'latitude', 'longitude',
+    'distance_to_center', 'quality_factor', 'wifi_coverage', 'network_speed',
+    'battery_level', 'time_of_day', 'is_high_plusvalia'
+)
+
+# Columna con la etiqueta (0/1 en el modelo básico, tipo de flujo en el avanzado)
+LABEL_COLUMN = 'label'
+
+logger = get_logger(__name__)
+
+# Bytes estimados por celda mientras un bloque está en memoria: el float64
+# original más las copias de escalado/conversión que se hacen al entrenar
+BYTES_PER_CELL = 8 * 4
+
+
+def default_max_memory_mb() -> float:
+    """Tope de memoria para el entrenamiento por streaming (TRAINING_MAX_MEMORY_MB)"""
+    return float(os.getenv('TRAINING_MAX_MEMORY_MB', '512'))
+
+
+def rows_for_budget(max_memory_mb: float, n_columns: int, fraction: float = 1.0) -> int:
+    """Cuántas filas de `n_columns` columnas caben en una fracción del tope de memoria"""
+    budget = max_memory_mb * 1024 * 1024 * fraction
+    return max(1, int(budget // (n_columns * BYTES_PER_CELL)))
+
+
+def dataset_format(path: str) -> str:
+    """Detecta el formato del dataset: 'csv', 'npy' o 'columnar' (directorio)"""
+    if os.path.isdir(path):
+        return 'columnar'
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension == '.npy':
+        return 'npy'
+    raise ValueError(f"Formato de dataset no soportado: {path}")
+
+
+def _npy_columns(path: str, columns: tuple) -> tuple:
+    """Columnas memory-mapped de un .npy estructurado o de una matriz 2D
+
+    En una matriz 2D las columnas son las features en orden y la etiqueta al final.
+    """
+    data = np.load(path, mmap_mode='r')
+    if data.dtype.names:
+        missing = [name for name in columns if name not in data.dtype.names]
+        if missing:
+            raise ValueError(f"Columnas faltantes en {path}: {missing}")
+        return len(data), [data[name] for name in columns]
+    if data.ndim != 2 or data.shape[1] != len(columns):
+        raise ValueError(
+            f"Se esperaba una matriz de {len(columns)} columnas en {path}, se encontró {data.shape}"
+        )
+    return len(data), [data[:, i] for i in range(len(columns))]
+
+
+def _columnar_columns(path: str, columns: tuple) -> tuple:
+    """Columnas memory-mapped de un directorio con un `<columna>.npy` por columna"""
+    arrays = []
+    for name in columns:
+        column_path = os.path.join(path, f'{name}.npy')
+        if not os.path.exists(column_path):
+            raise ValueError(f"Columna faltante en {path}: {name}")
+        arrays.append(np.load(column_path, mmap_mode='r'))
+    n_rows = len(arrays[0])
+    if any(len(array) != n_rows for array in arrays):
+        raise ValueError(f"Las columnas de {path} tienen longitudes distintas")
+    return n_rows, arrays
+
+
+def _iter_csv(path: str, feature_columns: tuple, label_column: str, chunk_rows: int):
+    """Lee un CSV con encabezado en bloques de `chunk_rows` filas"""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        missing = [name for name in feature_columns + (label_column,) if name not in header]
+        if missing:
+            raise ValueError(f"Columnas faltantes en {path}: {missing}")
+        feature_idx = [header.index(name) for name in feature_columns]
+        label_idx = header.index(label_column)
+
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield _csv_block(rows, feature_idx, label_idx)
+                rows = []
+        if rows:
+            yield _csv_block(rows, feature_idx, label_idx)
+
+
+def _csv_block(rows: list, feature_idx: list, label_idx: int):
+    """Convierte filas de texto en la matriz de features y el vector de etiquetas"""
+    X = np.array([[row[i] for i in feature_idx] for row in rows], dtype=float)
+    y = np.array([row[label_idx] for row in rows])
+    return X, _coerce_labels(y)
+
+
+def _coerce_labels(y: np.ndarray) -> np.ndarray:
+    """Las etiquetas numéricas se regresan como enteros y las demás como texto"""
+    if y.dtype.kind in 'iubf':
+        return y.astype(int)
+    try:
+        return y.astype(float).astype(int)
+    except ValueError:
+        return y.astype(str)
+
+
+def iter_dataset(path: str, feature_columns: tuple, label_column: str = LABEL_COLUMN,
+                 chunk_rows: int = 100_000):
+    """Recorre un dataset en disco por bloques `(X, y)` de a lo más `chunk_rows` filas
+
+    Los .npy y los directorios columnares se abren con memory-map, así que
+    sólo el bloque actual se copia a memoria; los CSV se leen en streaming.
+    """
+    fmt = dataset_format(path)
+    if fmt == 'csv':
+        yield from _iter_csv(path, tuple(feature_columns), label_column, chunk_rows)
+        return
+
+    columns = tuple(feature_columns) + (label_column,)
+    if fmt == 'npy':
+        n_rows, arrays = _npy_columns(path, columns)
+    else:
+        n_rows, arrays = _columnar_columns(path, columns)
+
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        X = np.column_stack([np.asarray(array[start:stop], dtype=float) for array in arrays[:-1]])
+        yield X, _coerce_labels(np.asarray(arrays[-1][start:stop]))
+
+
+def write_dataset(path: str, X: np.ndarray, y: np.ndarray, feature_columns: tuple,
+                  label_column: str = LABEL_COLUMN):
+    """Escribe un dataset en el formato indicado por `path` (.csv, .npy o directorio)
+
+    Útil para exportar los datos sintéticos y probar el entrenamiento por streaming.
+    """
+    feature_columns = tuple(feature_columns)
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(feature_columns + (label_column,))
+            for features, label in zip(X.tolist(), y.tolist()):
+                writer.writerow(features + [label])
+    elif path.lower().endswith('.npy'):
+        dtype = [(name, 'f8') for name in feature_columns] + [(label_column, np.asarray(y).dtype)]
+        data = np.empty(len(X), dtype=dtype)
+        for i, name in enumerate(feature_columns):
+            data[name] = X[:, i]
+        data[label_column] = y
+        np.save(path, data)
+    else:
+        os.makedirs(path, exist_ok=True)
+        for i, name in enumerate(feature_columns):
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(X[:, i]))
+        np.save(os.path.join(path, f'{label_column}.npy'), np.asarray(y))
+
+
+class StreamProgress:
+    """Reporta filas procesadas y throughput (filas/s) de un recorrido por streaming
+
+    Con `total` (filas esperadas) también se reporta el porcentaje avanzado.
+    """
+
+    def __init__(self, label: str, report_every: float = 5.0, total: int = None):
+        self.label = label
+        self.report_every = report_every
+        self.total = total
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, n_rows: int):
+        self.rows += n_rows
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            logger.info('⏳ Avance del streaming', extra=fields(
+                stage=self.label,
+                rows=self.rows,
+                progress=round(self.rows / self.total, 4) if self.total else None,
+                rows_per_second=round(self.rows_per_second, 1)
+            ))
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(self.elapsed, 1e-9)
+
+    def finish(self) -> dict:
+        summary = {
+            'rows': self.rows,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1)
+        }
+        logger.info('✅ Streaming terminado', extra=fields(stage=self.label, **summary))
+        return summary
@@ -0,0 +1,175 @@
+import numpy as np
+
+
+class CompiledForest:
+    """Motor de inferencia para RandomForestClassifier sobre arreglos planos
+
+    Exporta todos los árboles del bosque a arreglos de nodos empacados
+    (feature, umbral, hijos y distribución de clases de cada hoja) y los
+    recorre todos a la vez con operaciones vectorizadas, sin pasar por la
+    validación de entrada ni por el despacho por estimador de scikit-learn.
+    Las hojas apuntan a sí mismas; en cada nivel los recorridos que ya llegaron
+    a una hoja se retiran del conjunto activo.
+    """
+
+    # Filas evaluadas por bloque para acotar la memoria de los recorridos
+    block_size = 2048
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes = classes
+        self.n_features = int(n_features)
+        self.n_trees = len(roots)
+        self.is_leaf = children[0::2] == np.arange(len(feature))
+
+        # Para una sola fila el estado es 2 * nodo, así cada nivel cuesta 6 operaciones
+        self._feature2 = np.repeat(feature, 2)
+        self._threshold2 = np.repeat(threshold, 2)
+        self._children2 = 2 * children
+        self._roots2 = 2 * roots
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Construye el motor a partir de un RandomForestClassifier entrenado"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes) + offset
+            is_leaf = tree.children_left < 0
+
+            # Las hojas se enlazan consigo mismas y comparan contra la feature 0
+            left = np.where(is_leaf, node_ids, tree.children_left + offset)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset)
+
+            # Distribución de clases normalizada por nodo (versiones viejas guardan conteos)
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.stack([left, right], axis=1).ravel())
+            values.append(value / totals)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        # Los índices de hijos en `children` son 2 * nodo + (va a la derecha)
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_
+        )
+
+    def to_arrays(self) -> dict:
+        """Arreglos planos del motor, incluidos los derivados, para exportarlo"""
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'value': self.value,
+            'roots': self.roots,
+            'classes': self.classes,
+            'is_leaf': self.is_leaf,
+            'feature2': self._feature2,
+            'threshold2': self._threshold2,
+            'children2': self._children2,
+            'roots2': self._roots2
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, max_depth: int, n_features: int):
+        """Reconstruye el motor sobre arreglos existentes (p. ej. vistas de un mmap)
+
+        No copia ni recalcula nada: los arreglos derivados vienen en `arrays`.
+        """
+        engine = cls.__new__(cls)
+        engine.feature = arrays['feature']
+        engine.threshold = arrays['threshold']
+        engine.children = arrays['children']
+        engine.value = arrays['value']
+        engine.roots = arrays['roots']
+        engine.classes = arrays['classes']
+        engine.is_leaf = arrays['is_leaf']
+        engine._feature2 = arrays['feature2']
+        engine._threshold2 = arrays['threshold2']
+        engine._children2 = arrays['children2']
+        engine._roots2 = arrays['roots2']
+        engine.max_depth = int(max_depth)
+        engine.n_features = int(n_features)
+        engine.n_trees = len(engine.roots)
+        return engine
+
+    def apply(self, X):
+        """Regresa el nodo hoja alcanzado por cada fila en cada árbol, forma (n, n_trees)"""
+        # scikit-learn evalúa los árboles en float32; se replica para obtener los mismos cortes
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] == 1:
+            return self._apply_row(X[0])[None, :]
+        if X.shape[0] <= self.block_size:
+            return self._apply_block(X)
+        return np.concatenate([
+            self._apply_block(X[start:start + self.block_size])
+            for start in range(0, X.shape[0], self.block_size)
+        ])
+
+    def _apply_row(self, x):
+        """Recorre todos los árboles para una sola fila"""
+        state = self._roots2.copy()
+        for _ in range(self.max_depth):
+            state = self._children2[state + (x[self._feature2[state]] > self._threshold2[state])]
+        return state >> 1
+
+    def _apply_block(self, X):
+        """Recorre todos los árboles para un bloque de filas en float32"""
+        n = X.shape[0]
+        flat_X = X.ravel()
+
+        # Un recorrido activo por (fila, árbol)
+        nodes = np.tile(self.roots, n)
+        row_offsets = np.repeat(np.arange(n, dtype=np.intp) * self.n_features, self.n_trees)
+        positions = np.arange(n * self.n_trees)
+        leaves = nodes.copy()
+
+        for _ in range(self.max_depth):
+            go_right = flat_X[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+
+            done = self.is_leaf[nodes]
+            leaves[positions[done]] = nodes[done]
+            active = ~done
+            nodes = nodes[active]
+            if len(nodes) == 0:
+                break
+            positions = positions[active]
+            row_offsets = row_offsets[active]
+
+        return leaves.reshape(n, self.n_trees)
+
+    def predict_proba(self, X):
+        """Probabilidades por clase, equivalentes a `model.predict_proba`"""
+        leaves = self.apply(X)
+        return self.value[leaves].sum(axis=1) / self.n_trees
+
+    def predict(self, X):
+        """Clase más probable por fila, equivalente a `model.predict`"""
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
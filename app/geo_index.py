@@ -0,0 +1,511 @@
+import math
+
+import numpy as np
+
+# Niveles de plusvalía; los códigos numéricos son el índice en esta tupla
+PLUSVALIA_LEVELS = ('alta', 'media', 'baja', 'emergente')
+
+# Atributos asignados a un punto que no cae dentro de ninguna geocerca
+UNKNOWN_ZONE = {
+    'zone_name': 'unknown',
+    'plusvalia': 'baja',
+    'quality_factor': 0.5,
+    'wifi_coverage': 0.3
+}
+
+# Velocidad esperada con WiFi fuera de geocerca (media del rango 5-25 Mbps)
+UNKNOWN_WIFI_SPEED_PRIOR = 15.0
+
+# Tope de celdas de la malla de candidatos
+MAX_GRID_CELLS = 1 << 20
+
+# Id que un raster de zonas (app/zone_raster.py) da a los puntos que no resuelve:
+# celdas cruzadas por un borde o puntos fuera del raster, que van a la búsqueda exacta
+UNRESOLVED_ZONE = -2
+
+
+class GeoZoneIndex:
+    """Índice vectorizado de geocercas circulares
+
+    Compila el diccionario `geo_zones` en arreglos contiguos de NumPy y en una
+    malla gruesa donde cada celda guarda las zonas cuyo círculo la toca, de modo
+    que cada punto sólo se compara contra las zonas cercanas. Los atributos por
+    zona llevan al final un elemento extra con los valores de zona desconocida,
+    así el id -1 se puede usar directamente como índice.
+
+    Con un raster adjunto (`attach_raster`) la mayoría de los puntos se
+    resuelven con un solo acceso a arreglo y la malla sólo se consulta en las
+    celdas del raster que cruza algún borde.
+    """
+
+    def __init__(self, geo_zones: dict, cell_size: float = None):
+        self.zone_names = list(geo_zones.keys())
+        zones = [geo_zones[name] for name in self.zone_names]
+
+        self.centers = np.array([zone['center'] for zone in zones], dtype=float).reshape(-1, 2)
+        self.radii = np.array([zone['radius'] for zone in zones], dtype=float)
+
+        # Atributos por zona + valores de zona desconocida en la última posición
+        self.names = np.array(self.zone_names + [UNKNOWN_ZONE['zone_name']], dtype=object)
+        self.quality_factors = np.array(
+            [zone['quality_factor'] for zone in zones] + [UNKNOWN_ZONE['quality_factor']]
+        )
+        self.wifi_coverage = np.array(
+            [zone['wifi_coverage'] for zone in zones] + [UNKNOWN_ZONE['wifi_coverage']]
+        )
+        self.plusvalia_codes = np.array(
+            [PLUSVALIA_LEVELS.index(zone['plusvalia']) for zone in zones]
+            + [PLUSVALIA_LEVELS.index(UNKNOWN_ZONE['plusvalia'])],
+            dtype=np.int8
+        )
+        self.speed_ranges = np.array(
+            [zone['network_speed_range'] for zone in zones], dtype=float
+        ).reshape(-1, 2)
+
+        # Velocidad esperada con WiFi por zona: media de uniforme(0.7 * min, max),
+        # la distribución con la que se generan los datos de entrenamiento
+        self.wifi_speed_priors = np.append(
+            (0.7 * self.speed_ranges[:, 0] + self.speed_ranges[:, 1]) / 2,
+            UNKNOWN_WIFI_SPEED_PRIOR
+        )
+
+        # Los mismos atributos como tuplas de Python para `zone_info` (camino de cada predicción)
+        self._zone_attributes = [
+            (name, PLUSVALIA_LEVELS[code], quality, coverage)
+            for name, code, quality, coverage in zip(
+                self.names.tolist(), self.plusvalia_codes.tolist(),
+                self.quality_factors.tolist(), self.wifi_coverage.tolist()
+            )
+        ]
+
+        self.raster = None
+        self._build_grid(cell_size)
+
+    def __len__(self):
+        return len(self.zone_names)
+
+    def _build_grid(self, cell_size):
+        """Construye la malla gruesa celda -> zonas candidatas"""
+        if len(self.zone_names) == 0:
+            self.cell_size = 1.0
+            self.origin = np.zeros(2)
+            self.n_rows = self.n_cols = 0
+            self.cell_candidates = np.full((1, 1), -1, dtype=np.int32)
+            self._cell_lists = [()]
+            return
+
+        self.cell_size = float(cell_size or self._default_cell_size())
+
+        # Margen pequeño para que el redondeo en los bordes no deje fuera a una zona
+        margin = 1e-9
+        low, high = self._zone_bounds()
+        low = low - margin
+        high = high + margin
+
+        # Sin pasar de MAX_GRID_CELLS: con zonas muy pequeñas se agranda la celda
+        extent = high.max(axis=0) - low.min(axis=0)
+        cells = np.prod(np.floor(extent / self.cell_size) + 1)
+        if cells > MAX_GRID_CELLS:
+            self.cell_size *= math.sqrt(cells / MAX_GRID_CELLS) * 1.01
+
+        self.origin = low.min(axis=0)
+        first = np.floor((low - self.origin) / self.cell_size).astype(int)
+        last = np.floor((high - self.origin) / self.cell_size).astype(int)
+        self.n_rows = int(last[:, 0].max()) + 1
+        self.n_cols = int(last[:, 1].max()) + 1
+
+        # Una celda extra al final (vacía) para los puntos fuera de la malla
+        cell_lists = [[] for _ in range(self.n_rows * self.n_cols + 1)]
+        for zone_id in range(len(self.zone_names)):
+            for row in range(first[zone_id, 0], last[zone_id, 0] + 1):
+                for col in range(first[zone_id, 1], last[zone_id, 1] + 1):
+                    cell_lists[row * self.n_cols + col].append(zone_id)
+
+        # Los candidatos quedan en orden de zona para respetar el desempate original
+        max_candidates = max(1, max(len(cell) for cell in cell_lists))
+        self.cell_candidates = np.full((len(cell_lists), max_candidates), -1, dtype=np.int32)
+        for cell_id, cell in enumerate(cell_lists):
+            self.cell_candidates[cell_id, :len(cell)] = cell
+
+        self._cell_lists = [tuple(cell) for cell in cell_lists]
+        self._centers_list = [tuple(center) for center in self.centers.tolist()]
+        self._radii_list = self.radii.tolist()
+
+    def _default_cell_size(self) -> float:
+        """Por defecto la celda mide el radio máximo: cada zona toca a lo más 3x3 celdas"""
+        return self.radii.max()
+
+    def _zone_bounds(self) -> tuple:
+        """Esquinas `(low, high)` del rectángulo que cubre a cada zona, en (lat, lon)"""
+        return self.centers - self.radii[:, None], self.centers + self.radii[:, None]
+
+    def _cells(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """Celda de cada punto; los puntos fuera de la malla van a la celda vacía final"""
+        with np.errstate(invalid='ignore'):
+            rows = np.floor((latitude - self.origin[0]) / self.cell_size)
+            cols = np.floor((longitude - self.origin[1]) / self.cell_size)
+            inside = (rows >= 0) & (rows < self.n_rows) & (cols >= 0) & (cols < self.n_cols)
+        return np.where(inside, rows * self.n_cols + cols, self.n_rows * self.n_cols).astype(np.intp)
+
+    def _point_cell(self, latitude: float, longitude: float) -> int:
+        """Versión escalar de `_cells`; -1 fuera de la malla"""
+        if self.n_rows == 0 or not (math.isfinite(latitude) and math.isfinite(longitude)):
+            return -1
+        row = math.floor((latitude - self.origin[0]) / self.cell_size)
+        col = math.floor((longitude - self.origin[1]) / self.cell_size)
+        if not (0 <= row < self.n_rows and 0 <= col < self.n_cols):
+            return -1
+        return row * self.n_cols + col
+
+    def attach_raster(self, raster):
+        """Usa un `ZoneRaster` construido para estas geocercas (None lo quita)"""
+        self.raster = raster
+
+    def lookup(self, latitude, longitude):
+        """Resuelve la zona de uno o muchos puntos en una sola llamada vectorizada
+
+        Regresa `(zone_ids, distances)`: el id de la zona más cercana que contiene
+        a cada punto (-1 si ninguna) y la distancia a su centro (inf si ninguna).
+        Con raster, sólo los puntos que éste no resuelve pasan por la malla.
+        """
+        latitude = np.atleast_1d(np.asarray(latitude, dtype=float))
+        longitude = np.atleast_1d(np.asarray(longitude, dtype=float))
+        if self.raster is None:
+            return self._exact_lookup(latitude, longitude)
+
+        zone_ids = self.raster.lookup(latitude, longitude).astype(np.int32)
+        distances = np.full(len(latitude), np.inf)
+        found = np.flatnonzero(zone_ids >= 0)
+        zones = zone_ids[found]
+        distances[found] = np.sqrt(
+            (latitude[found] - self.centers[zones, 0]) ** 2 + (longitude[found] - self.centers[zones, 1]) ** 2
+        )
+        pending = np.flatnonzero(zone_ids == UNRESOLVED_ZONE)
+        if len(pending):
+            zone_ids[pending], distances[pending] = self._exact_lookup(latitude[pending], longitude[pending])
+        return zone_ids, distances
+
+    def lookup_point(self, latitude: float, longitude: float):
+        """Versión escalar de `lookup` para un solo punto, sin overhead de NumPy"""
+        if self.raster is not None:
+            zone_id = self.raster.lookup_point(latitude, longitude)
+            if zone_id >= 0:
+                center_lat, center_lon = self._centers_list[zone_id]
+                return zone_id, math.sqrt((latitude - center_lat) ** 2 + (longitude - center_lon) ** 2)
+            if zone_id == -1:
+                return -1, float('inf')
+        return self._exact_lookup_point(latitude, longitude)
+
+    def _exact_lookup(self, latitude: np.ndarray, longitude: np.ndarray):
+        """`lookup` sobre la malla de candidatos, sin raster"""
+        n = len(latitude)
+
+        if self.n_rows == 0:
+            return np.full(n, -1, dtype=np.int32), np.full(n, np.inf)
+
+        candidates = self.cell_candidates[self._cells(latitude, longitude)]
+        valid = candidates >= 0
+
+        center_lat = self.centers[candidates, 0]
+        center_lon = self.centers[candidates, 1]
+        distances = np.sqrt(
+            (latitude[:, None] - center_lat) ** 2 + (longitude[:, None] - center_lon) ** 2
+        )
+        distances = np.where(valid & (distances <= self.radii[candidates]), distances, np.inf)
+
+        best = np.argmin(distances, axis=1)
+        rows_idx = np.arange(n)
+        min_distances = distances[rows_idx, best]
+        zone_ids = np.where(
+            np.isfinite(min_distances), candidates[rows_idx, best], -1
+        ).astype(np.int32)
+
+        return zone_ids, min_distances
+
+    def _exact_lookup_point(self, latitude: float, longitude: float):
+        """Versión escalar de `_exact_lookup`"""
+        if self.n_rows == 0 or not (math.isfinite(latitude) and math.isfinite(longitude)):
+            return -1, float('inf')
+
+        # Igual que `_point_cell`, en línea: es el camino de cada predicción
+        row = math.floor((latitude - self.origin[0]) / self.cell_size)
+        col = math.floor((longitude - self.origin[1]) / self.cell_size)
+        if not (0 <= row < self.n_rows and 0 <= col < self.n_cols):
+            return -1, float('inf')
+
+        zone_id = -1
+        min_distance = float('inf')
+        for candidate in self._cell_lists[row * self.n_cols + col]:
+            center_lat, center_lon = self._centers_list[candidate]
+            distance = math.sqrt((latitude - center_lat) ** 2 + (longitude - center_lon) ** 2)
+            if distance <= self._radii_list[candidate] and distance < min_distance:
+                zone_id = candidate
+                min_distance = distance
+
+        return zone_id, min_distance
+
+    def zone_info(self, zone_id: int, distance: float) -> dict:
+        """Construye el diccionario de información de zona para un id"""
+        zone_name, plusvalia, quality_factor, wifi_coverage = self._zone_attributes[zone_id]
+        return {
+            'zone_name': zone_name,
+            'plusvalia': plusvalia,
+            'quality_factor': quality_factor,
+            'wifi_coverage': wifi_coverage,
+            'distance_to_center': float(distance)
+        }
+
+
+# Atributos por defecto de una geocerca de GeoJSON según su plusvalía
+# (los valores típicos de las geocercas definidas en el clasificador)
+PLUSVALIA_DEFAULTS = {
+    'alta': {'quality_factor': 1.2, 'network_speed_range': (15, 45), 'wifi_coverage': 0.9},
+    'media': {'quality_factor': 0.85, 'network_speed_range': (7, 22), 'wifi_coverage': 0.65},
+    'baja': {'quality_factor': 0.65, 'network_speed_range': (3, 11), 'wifi_coverage': 0.42},
+    'emergente': {'quality_factor': 0.45, 'network_speed_range': (1, 6), 'wifi_coverage': 0.28}
+}
+
+# Puntos por bloque en `PolygonZoneIndex.lookup`: acota los pares punto-arista en memoria
+POLYGON_LOOKUP_BLOCK = 2048
+
+
+def _ring_area_centroid(ring: np.ndarray) -> tuple:
+    """Área con signo y centroide (lon, lat) de un anillo con la fórmula del polígono"""
+    x, y = ring[:, 0], ring[:, 1]
+    x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, (float(x.mean()), float(y.mean()))
+    return float(area), (float(((x + x_next) * cross).sum() / (6 * area)),
+                         float(((y + y_next) * cross).sum() / (6 * area)))
+
+
+def polygon_zone(polygons: list, plusvalia: str, center: tuple = None, **attributes) -> dict:
+    """Arma una geocerca poligonal con las mismas llaves que las circulares
+
+    `polygons` es una lista de polígonos en coordenadas GeoJSON: cada uno es
+    una lista de anillos `[[lon, lat], ...]`, el exterior primero y después
+    los huecos. El centro (para `distance_to_center`) es el centroide, salvo
+    que se indique `center` como `(lat, lon)`; `radius` es el radio del círculo
+    de la misma área y sólo se usa para muestrear puntos de la zona. Los
+    atributos que falten toman los valores típicos de su plusvalía.
+    """
+    if plusvalia not in PLUSVALIA_LEVELS:
+        raise ValueError(f"Plusvalía no soportada: {plusvalia}")
+
+    rings = []
+    total_area = 0.0
+    weighted = np.zeros(2)
+    for polygon in polygons:
+        for position, ring in enumerate(polygon):
+            ring = np.asarray(ring, dtype=float)[:, :2]
+            if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+                ring = ring[:-1]
+            if len(ring) < 3:
+                raise ValueError("Un anillo necesita al menos 3 vértices")
+            area, centroid = _ring_area_centroid(ring)
+            # Los huecos restan sin importar la orientación del anillo
+            area = abs(area) if position == 0 else -abs(area)
+            total_area += area
+            weighted += area * np.array(centroid)
+            rings.append(ring)
+    if total_area <= 0:
+        raise ValueError("El polígono no tiene área")
+
+    if center is None:
+        center_lon, center_lat = weighted / total_area
+        center = (float(center_lat), float(center_lon))
+    zone = {
+        'center': (float(center[0]), float(center[1])),
+        'radius': math.sqrt(total_area / math.pi),
+        'polygon': [ring.tolist() for ring in rings],
+        'plusvalia': plusvalia
+    }
+    for key, default in PLUSVALIA_DEFAULTS[plusvalia].items():
+        value = attributes.get(key, default)
+        zone[key] = tuple(float(v) for v in value) if key == 'network_speed_range' else float(value)
+    return zone
+
+
+def load_geojson_zones(path: str) -> dict:
+    """Lee geocercas de un GeoJSON (FeatureCollection de Polygon o MultiPolygon)
+
+    Cada feature lleva en `properties` su `name` y su `plusvalia`; opcionalmente
+    `quality_factor`, `wifi_coverage`, `network_speed_range` (`[min, max]`) y
+    `center` (`[lat, lon]`). Regresa un diccionario con la forma de `geo_zones`.
+    """
+    import json
+
+    with open(path) as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+
+    zones = {}
+    for i, feature in enumerate(features):
+        properties = feature.get('properties') or {}
+        name = str(properties.get('name') or properties.get('zone_name') or f'zona_{i}')
+        if name in zones:
+            raise ValueError(f"Geocerca duplicada en {path}: {name}")
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            raise ValueError(f"Geometría no soportada en {name}: {geometry.get('type')}")
+        attributes = {key: properties[key] for key in PLUSVALIA_DEFAULTS['alta'] if key in properties}
+        try:
+            zones[name] = polygon_zone(polygons, properties.get('plusvalia'),
+                                       center=properties.get('center'), **attributes)
+        except ValueError as e:
+            raise ValueError(f"Geocerca inválida {name} en {path}: {e}") from e
+    return zones
+
+
+class PolygonZoneIndex(GeoZoneIndex):
+    """Índice de geocercas poligonales (y circulares) con malla sobre sus rectángulos
+
+    Las aristas de todos los anillos se guardan en arreglos planos, por zona
+    en rangos contiguos. Cada celda de la malla guarda las zonas cuyo
+    rectángulo la toca; un punto se prueba sólo contra ellas, primero con el
+    rectángulo y después con la regla par-impar sobre las aristas (los huecos
+    y los multipolígonos salen solos). Las zonas sin `polygon` se prueban por
+    distancia al centro, como en `GeoZoneIndex`. Entre varias zonas que
+    contienen al punto gana la de centro más cercano.
+    """
+
+    def __init__(self, geo_zones: dict, cell_size: float = None):
+        zones = list(geo_zones.values())
+        edges = []
+        starts = [0]
+        bounds = []
+        for zone in zones:
+            lat, lon = zone['center']
+            if 'polygon' in zone:
+                rings = [np.asarray(ring, dtype=float) for ring in zone['polygon']]
+                for ring in rings:
+                    edges.append(np.column_stack([ring, np.roll(ring, -1, axis=0)]))
+                points = np.concatenate(rings)
+                bounds.append((points[:, 1].min(), points[:, 0].min(),
+                               points[:, 1].max(), points[:, 0].max()))
+            else:
+                radius = zone['radius']
+                bounds.append((lat - radius, lon - radius, lat + radius, lon + radius))
+            starts.append(starts[-1] + sum(len(ring) for ring in zone.get('polygon', ())))
+
+        # Aristas como (x1, y1, x2, y2) = (lon, lat) de sus extremos
+        edges = np.concatenate(edges) if edges else np.empty((0, 4))
+        self.edge_x1, self.edge_y1, self.edge_x2, self.edge_y2 = (
+            np.ascontiguousarray(edges[:, i]) for i in range(4)
+        )
+        # Pendiente dx/dy; las aristas horizontales nunca cruzan el rayo
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.edge_slope = np.where(
+                self.edge_y1 != self.edge_y2,
+                (self.edge_x2 - self.edge_x1) / (self.edge_y2 - self.edge_y1), 0.0
+            )
+        self.edge_starts = np.array(starts, dtype=np.int64)
+        self.is_polygon = np.array(['polygon' in zone for zone in zones], dtype=bool)
+        self.bboxes = np.array(bounds, dtype=float).reshape(-1, 4)
+        self._bbox_list = [tuple(bbox) for bbox in self.bboxes.tolist()]
+
+        super().__init__(geo_zones, cell_size)
+
+    def _default_cell_size(self) -> float:
+        """La mediana del lado de los rectángulos: cada zona toca pocas celdas"""
+        sides = np.maximum(self.bboxes[:, 2] - self.bboxes[:, 0], self.bboxes[:, 3] - self.bboxes[:, 1])
+        return float(np.median(sides)) or 1e-3
+
+    def _zone_bounds(self) -> tuple:
+        return self.bboxes[:, :2], self.bboxes[:, 2:]
+
+    def _crossings(self, edges, latitude, longitude) -> np.ndarray:
+        """¿El rayo hacia +lon desde cada punto cruza su arista? (`edges`: índices o slice)"""
+        y1 = self.edge_y1[edges]
+        straddles = (y1 > latitude) != (self.edge_y2[edges] > latitude)
+        x_cross = self.edge_x1[edges] + (latitude - y1) * self.edge_slope[edges]
+        return straddles & (longitude < x_cross)
+
+    def _exact_lookup(self, latitude: np.ndarray, longitude: np.ndarray):
+        """`lookup` sobre la malla, por bloques de `POLYGON_LOOKUP_BLOCK` puntos"""
+        n = len(latitude)
+        zone_ids = np.full(n, -1, dtype=np.int32)
+        distances = np.full(n, np.inf)
+        if self.n_rows == 0:
+            return zone_ids, distances
+
+        for start in range(0, n, POLYGON_LOOKUP_BLOCK):
+            stop = min(start + POLYGON_LOOKUP_BLOCK, n)
+            zone_ids[start:stop], distances[start:stop] = self._lookup_block(
+                latitude[start:stop], longitude[start:stop]
+            )
+        return zone_ids, distances
+
+    def _lookup_block(self, latitude: np.ndarray, longitude: np.ndarray) -> tuple:
+        candidates = self.cell_candidates[self._cells(latitude, longitude)]
+        points, slots = np.nonzero(candidates >= 0)
+        zones = candidates[points, slots]
+
+        # Filtro por rectángulo
+        lat, lon = latitude[points], longitude[points]
+        bbox = self.bboxes[zones]
+        keep = (lat >= bbox[:, 0]) & (lat <= bbox[:, 2]) & (lon >= bbox[:, 1]) & (lon <= bbox[:, 3])
+        points, slots, zones, lat, lon = points[keep], slots[keep], zones[keep], lat[keep], lon[keep]
+
+        distance = np.sqrt((lat - self.centers[zones, 0]) ** 2 + (lon - self.centers[zones, 1]) ** 2)
+        inside = distance <= self.radii[zones]
+
+        # Regla par-impar: cada par (punto, zona poligonal) contra todas las aristas de la zona
+        polygon_pairs = np.flatnonzero(self.is_polygon[zones])
+        if len(polygon_pairs):
+            pair_zones = zones[polygon_pairs]
+            counts = self.edge_starts[pair_zones + 1] - self.edge_starts[pair_zones]
+            pair_of_edge = np.repeat(np.arange(len(polygon_pairs)), counts)
+            first_edge = np.cumsum(counts) - counts
+            edges = (np.arange(counts.sum()) - np.repeat(first_edge - self.edge_starts[pair_zones], counts))
+            crossings = self._crossings(edges, lat[polygon_pairs][pair_of_edge], lon[polygon_pairs][pair_of_edge])
+            inside[polygon_pairs] = np.bincount(
+                pair_of_edge, weights=crossings, minlength=len(polygon_pairs)
+            ).astype(np.int64) % 2 == 1
+
+        # La zona de centro más cercano entre las que contienen al punto
+        block_distances = np.full(candidates.shape, np.inf)
+        block_distances[points[inside], slots[inside]] = distance[inside]
+        best = np.argmin(block_distances, axis=1)
+        rows = np.arange(len(latitude))
+        min_distances = block_distances[rows, best]
+        zone_ids = np.where(np.isfinite(min_distances), candidates[rows, best], -1)
+        return zone_ids, min_distances
+
+    def _exact_lookup_point(self, latitude: float, longitude: float):
+        """Versión escalar de `_exact_lookup`; la prueba de cada polígono es vectorizada"""
+        cell = self._point_cell(latitude, longitude)
+        if cell < 0:
+            return -1, float('inf')
+
+        zone_id = -1
+        min_distance = float('inf')
+        for candidate in self._cell_lists[cell]:
+            min_lat, min_lon, max_lat, max_lon = self._bbox_list[candidate]
+            if not (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon):
+                continue
+            center_lat, center_lon = self._centers_list[candidate]
+            distance = math.sqrt((latitude - center_lat) ** 2 + (longitude - center_lon) ** 2)
+            if self.is_polygon[candidate]:
+                edges = slice(self.edge_starts[candidate], self.edge_starts[candidate + 1])
+                inside = np.count_nonzero(self._crossings(edges, latitude, longitude)) % 2 == 1
+            else:
+                inside = distance <= self._radii_list[candidate]
+            if inside and distance < min_distance:
+                zone_id = candidate
+                min_distance = distance
+
+        return zone_id, min_distance
+
+
+def build_zone_index(geo_zones: dict):
+    """Índice de geocercas: `PolygonZoneIndex` si alguna zona es poligonal"""
+    if any('polygon' in zone for zone in geo_zones.values()):
+        return PolygonZoneIndex(geo_zones)
+    return GeoZoneIndex(geo_zones)
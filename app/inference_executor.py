@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app import tracing
+
+# Tareas de inferencia disponibles: nombre -> (modelo, método)
+TASKS = {
+    'basic_predict': ('basic', 'predict'),
+    'basic_predict_batch': ('basic', 'predict_batch'),
+    'advanced_predict': ('advanced', 'predict'),
+    'advanced_predict_batch': ('advanced', 'predict_batch'),
+}
+
+# Modelos precargados en cada proceso del pool (modo 'process')
+_worker_models = {}
+
+
+class ExecutorOverloadedError(Exception):
+    """La cola de inferencia está llena; la solicitud se rechaza sin encolarla"""
+
+
+class InferenceTimeoutError(Exception):
+    """La inferencia no terminó dentro del tiempo límite por solicitud"""
+
+
+def _init_worker(basic_model_path: str, advanced_model_path: str):
+    """Carga los modelos una sola vez al arrancar cada proceso del pool"""
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+    from app.ml_model import ConnectionQualityClassifier
+
+    basic = ConnectionQualityClassifier()
+    basic.load_model(basic_model_path)
+
+    advanced = AdvancedFlowClassifier()
+    advanced.model_path = advanced_model_path
+    advanced.load_model()
+
+    _worker_models['basic'] = basic
+    _worker_models['advanced'] = advanced
+
+
+def _call_task(models: dict, task: str, args: tuple):
+    """Ejecuta una tarea y regresa (resultado, segundos de ejecución)"""
+    model_name, method = TASKS[task]
+    started = time.perf_counter()
+    result = getattr(models[model_name], method)(*args)
+    return result, time.perf_counter() - started
+
+
+def _run_in_worker(task: str, args: tuple):
+    """Punto de entrada de las tareas dentro de un proceso del pool"""
+    return _call_task(_worker_models, task, args)
+
+
+class InferenceExecutor:
+    """Ejecuta la inferencia fuera del event loop en un pool acotado
+
+    En modo 'thread' las tareas usan los modelos del proceso actual, obtenidos
+    con `model_provider` en cada llamada para ver siempre la versión vigente.
+    En modo 'process' cada proceso del pool carga sus propios modelos desde los
+    archivos joblib al arrancar; `reload()` reinicia el pool para recargarlos.
+    Las solicitudes que exceden `max_pending` (en ejecución + en cola) se
+    rechazan de inmediato y cada una tiene un tiempo límite propio.
+    """
+
+    def __init__(self, model_provider=None, mode: str = 'thread', max_workers: int = None,
+                 max_pending: int = 64, timeout: float = 5.0,
+                 basic_model_path: str = "connection_classifier.joblib",
+                 advanced_model_path: str = "advanced_flow_model.joblib"):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Modo de ejecutor no soportado: {mode}")
+        if mode == 'thread' and model_provider is None:
+            raise ValueError("El modo 'thread' requiere un model_provider")
+
+        self.model_provider = model_provider
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.basic_model_path = basic_model_path
+        self.advanced_model_path = advanced_model_path
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._exec_total = 0.0
+        self._observed = 0
+
+    @classmethod
+    def from_env(cls, model_provider=None):
+        """Crea el ejecutor con la configuración de las variables de entorno"""
+        max_workers = os.getenv('INFERENCE_WORKERS')
+        return cls(
+            model_provider=model_provider,
+            mode=os.getenv('INFERENCE_EXECUTOR_MODE', 'thread'),
+            max_workers=int(max_workers) if max_workers else None,
+            max_pending=int(os.getenv('INFERENCE_MAX_PENDING', '64')),
+            timeout=float(os.getenv('INFERENCE_TIMEOUT_SECONDS', '5.0')),
+            basic_model_path=os.getenv('BASIC_MODEL_PATH', 'connection_classifier.joblib'),
+            advanced_model_path=os.getenv('ADVANCED_MODEL_PATH', 'advanced_flow_model.joblib')
+        )
+
+    def start(self):
+        """Crea el pool de workers"""
+        if self._pool is not None:
+            return
+        if self.mode == 'process':
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.basic_model_path, self.advanced_model_path)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='inference'
+            )
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool de workers"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    def reload(self):
+        """Reinicia el pool para que los procesos carguen los modelos guardados"""
+        if self.mode != 'process':
+            return
+        old_pool = self._pool
+        self._pool = None
+        self.start()
+        if old_pool is not None:
+            # Las tareas en curso del pool anterior terminan en segundo plano
+            old_pool.shutdown(wait=False)
+
+    async def run(self, task: str, *args):
+        """Ejecuta una tarea de inferencia en el pool y espera su resultado"""
+        if task not in TASKS:
+            raise ValueError(f"Tarea de inferencia desconocida: {task}")
+        if self._pool is None:
+            self.start()
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise ExecutorOverloadedError(
+                    f"Cola de inferencia llena ({self._pending}/{self.max_pending})"
+                )
+            self._pending += 1
+            self._submitted += 1
+
+        submitted_at = time.perf_counter()
+        try:
+            if self.mode == 'process':
+                future = self._pool.submit(_run_in_worker, task, args)
+            else:
+                # La traza de la solicitud (si hay) sigue a la tarea al hilo del pool
+                future = self._pool.submit(contextvars.copy_context().run, self._run_local, task, args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._failed += 1
+            raise
+        future.add_done_callback(self._on_done)
+
+        try:
+            result, exec_seconds = await asyncio.wait_for(
+                asyncio.wrap_future(future), self.timeout
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            raise InferenceTimeoutError(
+                f"La inferencia '{task}' excedió {self.timeout}s"
+            )
+
+        latency = time.perf_counter() - submitted_at
+        with self._lock:
+            self._observed += 1
+            self._latency_total += latency
+            self._exec_total += exec_seconds
+            self._latency_max = max(self._latency_max, latency)
+        tracing.record('queue', latency - exec_seconds)
+
+        return result
+
+    def _run_local(self, task: str, args: tuple):
+        """Ejecuta una tarea en un hilo del pool con los modelos vigentes"""
+        return _call_task(self.model_provider(), task, args)
+
+    def _on_done(self, future):
+        """Libera el lugar en la cola cuando la tarea realmente termina"""
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+    def metrics(self) -> dict:
+        """Métricas del pool de inferencia"""
+        with self._lock:
+            observed = self._observed or 1
+            return {
+                'mode': self.mode,
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'timeout_seconds': self.timeout,
+                'pending': self._pending,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'avg_latency_ms': round(self._latency_total / observed * 1000, 3),
+                'avg_exec_ms': round(self._exec_total / observed * 1000, 3),
+                'avg_queue_wait_ms': round(
+                    (self._latency_total - self._exec_total) / observed * 1000, 3
+                ),
+                'max_latency_ms': round(self._latency_max * 1000, 3)
+            }
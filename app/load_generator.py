@@ -0,0 +1,346 @@
+"""
+Generador de carga con mezclas de tráfico realistas (ver load_test.py)
+
+Las solicitudes se reparten entre todos los endpoints de predicción. Las
+ubicaciones caen en las geocercas de `geo_zones` con probabilidad
+proporcional a su área (más una fracción fuera de todas). WiFi, velocidad de
+red y dispositivo siguen a la zona, y los parámetros opcionales se omiten a
+veces. La carga se genera a una tasa fija (lazo abierto: la latencia se mide
+desde el momento programado, así que una cola en el servidor no se esconde)
+o con N clientes concurrentes (lazo cerrado), contra la app ASGI en el mismo
+proceso o contra un servidor HTTP.
+"""
+
+import asyncio
+import math
+import platform
+import random
+import subprocess
+import time
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+# Peso de cada endpoint en la mezcla por defecto
+DEFAULT_ENDPOINT_WEIGHTS = {
+    'web_app_experience': 0.45,
+    'advanced_predict': 0.40,
+    'advanced_predict_batch': 0.10,
+    'advanced_compare': 0.05
+}
+
+# Fracción de las ubicaciones que caen fuera de todas las geocercas
+OUTSIDE_ZONE_SHARE = 0.1
+
+# Rectángulo de CDMX donde se generan las ubicaciones fuera de geocerca
+CDMX_BOUNDS = ((19.15, 19.60), (-99.35, -98.95))
+
+# Percentiles de latencia que se reportan
+PERCENTILES = (('p50', 50), ('p95', 95), ('p99', 99), ('p999', 99.9))
+
+
+class TrafficMix:
+    """Genera solicitudes con una mezcla de endpoints, zonas y condiciones de red"""
+
+    def __init__(self, geo_zones: dict, endpoint_weights: dict = None, seed: int = 0,
+                 missing_probability: float = 0.25, batch_sizes: tuple = (10, 100)):
+        self.rng = random.Random(seed)
+        self.zones = list(geo_zones.values())
+        self.zone_weights = [zone['radius'] ** 2 for zone in self.zones]
+        weights = endpoint_weights or DEFAULT_ENDPOINT_WEIGHTS
+        unknown = set(weights) - set(DEFAULT_ENDPOINT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Endpoints desconocidos en la mezcla: {sorted(unknown)}")
+        self.endpoints = [name for name, weight in weights.items() if weight > 0]
+        self.endpoint_weights = [weights[name] for name in self.endpoints]
+        self.missing_probability = missing_probability
+        self.batch_sizes = batch_sizes
+
+    @classmethod
+    def from_classifier(cls, **kwargs):
+        """Mezcla con las geocercas que usa el modelo avanzado"""
+        from app.advanced_flow_classifier import AdvancedFlowClassifier
+        return cls(AdvancedFlowClassifier().geo_zones, **kwargs)
+
+    def _missing(self) -> bool:
+        return self.rng.random() < self.missing_probability
+
+    def location(self):
+        """`(latitud, longitud, zona)`; la zona es None fuera de las geocercas"""
+        rng = self.rng
+        if rng.random() < OUTSIDE_ZONE_SHARE:
+            (lat_min, lat_max), (lon_min, lon_max) = CDMX_BOUNDS
+            return round(rng.uniform(lat_min, lat_max), 6), round(rng.uniform(lon_min, lon_max), 6), None
+        zone = rng.choices(self.zones, self.zone_weights)[0]
+        # Uniforme dentro del círculo de la geocerca
+        distance = zone['radius'] * math.sqrt(rng.random())
+        angle = rng.uniform(0, 2 * math.pi)
+        latitude = zone['center'][0] + distance * math.sin(angle)
+        longitude = zone['center'][1] + distance * math.cos(angle)
+        return round(latitude, 6), round(longitude, 6), zone
+
+    def record(self) -> dict:
+        """Registro completo de una solicitud; los opcionales pueden faltar"""
+        rng = self.rng
+        latitude, longitude, zone = self.location()
+        wifi = rng.random() < (zone['wifi_coverage'] if zone else 0.5)
+        if not wifi:
+            network_speed = rng.uniform(0.5, 3.0)
+        elif zone:
+            network_speed = rng.uniform(*zone['network_speed_range'])
+        else:
+            network_speed = rng.uniform(2.0, 15.0)
+
+        record = {
+            'wifi': wifi,
+            'device': 'android' if rng.random() < 0.6 else 'ios',
+            'latitude': latitude,
+            'longitude': longitude
+        }
+        if not self._missing():
+            record['network_speed'] = round(network_speed, 1)
+        if not self._missing():
+            record['battery_level'] = round(rng.uniform(5.0, 100.0), 1)
+        if not self._missing():
+            record['time_of_day'] = rng.randrange(24)
+        return record
+
+    def next_request(self):
+        """`(endpoint, método, ruta, query params, cuerpo JSON)` de la siguiente solicitud"""
+        endpoint = self.rng.choices(self.endpoints, self.endpoint_weights)[0]
+        record = self.record()
+
+        if endpoint == 'web_app_experience':
+            params = {'wifi': record['wifi'], 'device': record['device']}
+            if not self._missing():
+                params['latitude'] = record['latitude']
+                params['longitude'] = record['longitude']
+            if 'network_speed' in record:
+                params['network_speed'] = record['network_speed']
+            return endpoint, 'GET', '/web-and-app-experience', params, None
+
+        if endpoint == 'advanced_predict':
+            return endpoint, 'GET', '/advanced-flow/predict', record, None
+
+        if endpoint == 'advanced_predict_batch':
+            size = self.rng.randint(*self.batch_sizes)
+            records = [record] + [self.record() for _ in range(size - 1)]
+            return endpoint, 'POST', '/advanced-flow/predict-batch', None, {'records': records}
+
+        other = self.record()
+        params = {
+            'wifi1': record['wifi'], 'device1': record['device'],
+            'lat1': record['latitude'], 'lon1': record['longitude'],
+            'wifi2': other['wifi'], 'device2': other['device'],
+            'lat2': other['latitude'], 'lon2': other['longitude']
+        }
+        return endpoint, 'GET', '/advanced-flow/compare', params, None
+
+
+class LatencyRecorder:
+    """Latencias, códigos de estado y errores de un endpoint"""
+
+    def __init__(self):
+        self.latencies = []
+        self.status_counts = {}
+        self.errors = 0
+
+    def add(self, latency: float, status):
+        self.latencies.append(latency)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def merge(self, other: 'LatencyRecorder'):
+        self.latencies.extend(other.latencies)
+        for status, count in other.status_counts.items():
+            self.status_counts[status] = self.status_counts.get(status, 0) + count
+        self.errors += other.errors
+
+    def summary(self, elapsed: float) -> dict:
+        n = len(self.latencies)
+        latency_ms = {}
+        if n:
+            values = np.array(self.latencies) * 1000
+            latency_ms['mean'] = round(float(values.mean()), 3)
+            for name, q in PERCENTILES:
+                latency_ms[name] = round(float(np.percentile(values, q)), 3)
+            latency_ms['max'] = round(float(values.max()), 3)
+        return {
+            'requests': n,
+            'errors': self.errors,
+            'error_rate': round(self.errors / n, 5) if n else 0.0,
+            'status_counts': {str(status): count for status, count in sorted(
+                self.status_counts.items(), key=lambda item: str(item[0])
+            )},
+            'throughput_rps': round(n / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency_ms': latency_ms
+        }
+
+
+@asynccontextmanager
+async def asgi_lifespan(app):
+    """Corre el arranque y el apagado de una app ASGI (`httpx` no manda los eventos)"""
+    received = asyncio.Queue()
+    sent = asyncio.Queue()
+    task = asyncio.get_running_loop().create_task(
+        app({'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}}, received.get, sent.put)
+    )
+    await received.put({'type': 'lifespan.startup'})
+    message = await sent.get()
+    if message['type'] != 'lifespan.startup.complete':
+        raise RuntimeError(f"El arranque de la app falló: {message.get('message')}")
+    try:
+        yield
+    finally:
+        await received.put({'type': 'lifespan.shutdown'})
+        await sent.get()
+        await task
+
+
+@asynccontextmanager
+async def open_client(url: str = None, app=None, timeout: float = 30.0):
+    """Cliente HTTP hacia `url`, o hacia `app` en este mismo proceso si no hay URL"""
+    import httpx
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    if app is None:
+        from app.main import app
+    async with asgi_lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest',
+                                     timeout=timeout) as client:
+            yield client
+
+
+async def wait_until_ready(client, timeout: float = 120.0):
+    """Espera a que `/ready` responda 200 (modelos cargados o entrenados y calientes)"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        response = await client.get('/ready')
+        if response.status_code == 200:
+            return
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"El servicio no estuvo listo en {timeout}s: {response.text}")
+        await asyncio.sleep(0.5)
+
+
+async def _send(client, request, scheduled: float, recorders: dict):
+    endpoint, method, path, params, body = request
+    try:
+        response = await client.request(
+            method, path, params=params, json=body
+        )
+        status = response.status_code
+    except Exception as e:
+        status = type(e).__name__
+    recorders[endpoint].add(time.perf_counter() - scheduled, status)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run_load(client, mix: TrafficMix, duration: float = None, total_requests: int = None,
+                   rate: float = None, concurrency: int = None, warmup_requests: int = 50) -> dict:
+    """Genera carga y regresa el reporte (throughput, percentiles y errores por endpoint)
+
+    Con `rate` las solicitudes salen a esa tasa sin esperar respuestas (lazo
+    abierto); con `concurrency` hay N clientes que mandan la siguiente al
+    recibir la anterior. Termina al cumplir `duration` segundos o
+    `total_requests` solicitudes. Las de calentamiento no cuentan.
+    """
+    if (rate is None) == (concurrency is None):
+        raise ValueError("Indica exactamente uno de `rate` o `concurrency`")
+    if duration is None and total_requests is None:
+        raise ValueError("Indica `duration` o `total_requests`")
+
+    warmup = {endpoint: LatencyRecorder() for endpoint in mix.endpoints}
+    for _ in range(warmup_requests):
+        await _send(client, mix.next_request(), time.perf_counter(), warmup)
+
+    recorders = {endpoint: LatencyRecorder() for endpoint in mix.endpoints}
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else float('inf')
+    limit = total_requests if total_requests is not None else float('inf')
+
+    if concurrency is not None:
+        issued = 0
+
+        async def worker():
+            nonlocal issued
+            while issued < limit and time.perf_counter() < deadline:
+                issued += 1
+                await _send(client, mix.next_request(), time.perf_counter(), recorders)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        pending = set()
+        i = 0
+        while i < limit:
+            scheduled = started + i / rate
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.get_running_loop().create_task(
+                _send(client, mix.next_request(), scheduled, recorders)
+            )
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            i += 1
+        if pending:
+            await asyncio.gather(*pending)
+
+    elapsed = time.perf_counter() - started
+    total = LatencyRecorder()
+    for recorder in recorders.values():
+        total.merge(recorder)
+
+    return {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'mode': 'rate' if rate is not None else 'concurrency',
+        'target_rate_rps': rate,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'warmup_requests': warmup_requests,
+        'endpoint_weights': dict(zip(mix.endpoints, mix.endpoint_weights)),
+        'total': total.summary(elapsed),
+        'endpoints': {endpoint: recorder.summary(elapsed) for endpoint, recorder in recorders.items()}
+    }
+
+
+def compare_reports(baseline: dict, current: dict) -> list:
+    """Cambios de throughput y latencia entre dos reportes, por endpoint
+
+    Regresa `[(endpoint, métrica, antes, después, cambio %), ...]`.
+    """
+    rows = []
+    for endpoint in ['total'] + sorted(current['endpoints']):
+        old = baseline['total'] if endpoint == 'total' else baseline['endpoints'].get(endpoint)
+        new = current['total'] if endpoint == 'total' else current['endpoints'][endpoint]
+        if old is None:
+            continue
+        pairs = [('throughput_rps', old['throughput_rps'], new['throughput_rps']),
+                 ('error_rate', old['error_rate'], new['error_rate'])]
+        pairs += [(f'{name}_ms', old['latency_ms'].get(name), new['latency_ms'].get(name))
+                  for name, _ in PERCENTILES]
+        for metric, before, after in pairs:
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else None
+            rows.append((endpoint, metric, before, after, change))
+    return rows
@@ -0,0 +1,186 @@
+"""
+Logs estructurados con escritura en segundo plano y muestreo por ruta
+
+Los módulos del servicio usan `get_logger(__name__)` en lugar de `print`.
+Emitir un log sólo crea el registro y lo encola sin bloquear; un hilo de
+fondo lo formatea (una línea JSON, o texto con `LOG_FORMAT=text`) y lo
+escribe en stdout. Si la cola está llena el registro se descarta y se cuenta
+en `log_records_dropped_total`: un pico de logs nunca frena las solicitudes.
+
+Los logs por solicitud pasan por `log_request`, que aplica la tasa de
+muestreo de la ruta (`LOG_SAMPLE_RATES`) antes de crear el registro.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from app import metrics
+
+# Logger raíz del servicio; los módulos cuelgan de él (`app.main`, `app.ml_model`, ...)
+ROOT_LOGGER = 'app'
+
+# Tasas de muestreo por defecto de los logs por solicitud de las rutas más calientes
+DEFAULT_SAMPLE_RATES = '/web-and-app-experience=0.01,/advanced-flow/predict=0.01'
+
+_handler = None
+_listener = None
+_sampler = None
+
+
+def parse_sample_rates(value: str) -> dict:
+    """`"/ruta=0.1,/otra=1"` -> `{'/ruta': 0.1, '/otra': 1.0}`"""
+    rates = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        route, rate = item.rsplit('=', 1)
+        rates[route.strip()] = float(rate)
+    return rates
+
+
+class RouteSampler:
+    """Decide si se registra un log por solicitud según la tasa de su ruta"""
+
+    def __init__(self, rates: dict, default: float = 1.0):
+        self.rates = rates
+        self.default = default
+
+    def sample(self, route: str) -> bool:
+        rate = self.rates.get(route, self.default)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro con nivel, logger, mensaje y campos"""
+
+    def format(self, record) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Mensaje seguido de los campos como `llave=valor`, para desarrollo local"""
+
+    def format(self, record) -> str:
+        text = record.getMessage()
+        fields = getattr(record, 'fields', None)
+        if fields:
+            text += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+
+class StdoutHandler(logging.Handler):
+    """Escribe en el `sys.stdout` vigente (que pytest o uvicorn pueden reemplazar)"""
+
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + '\n')
+            sys.stdout.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Encola los registros sin bloquear; con la cola llena los descarta"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # El mensaje se formatea en el hilo de fondo, no en el que emite el log
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.LOG_RECORDS_DROPPED_TOTAL.inc()
+
+
+def configure(level: str = None, fmt: str = None, queue_size: int = None,
+              sample_rates: str = None, default_sample_rate: float = None):
+    """(Re)configura los logs del servicio; lo que no se pasa sale de las variables de entorno"""
+    global _handler, _listener, _sampler
+    shutdown()
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = fmt or os.getenv('LOG_FORMAT', 'json')
+    queue_size = queue_size or int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    if sample_rates is None:
+        sample_rates = os.getenv('LOG_SAMPLE_RATES', DEFAULT_SAMPLE_RATES)
+    if default_sample_rate is None:
+        default_sample_rate = float(os.getenv('LOG_SAMPLE_DEFAULT', '1.0'))
+
+    output = StdoutHandler()
+    output.setFormatter(TextFormatter() if fmt == 'text' else JsonFormatter())
+    log_queue = queue.Queue(maxsize=queue_size)
+    _handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    _sampler = RouteSampler(parse_sample_rates(sample_rates), default_sample_rate)
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers = [_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def shutdown():
+    """Escribe los registros pendientes y detiene el hilo de fondo"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger de un módulo del servicio; configura los logs la primera vez"""
+    if _listener is None:
+        configure()
+    return logging.getLogger(name)
+
+
+def fields(**values) -> dict:
+    """Campos estructurados de un registro: `logger.info('...', extra=fields(kind=kind))`"""
+    return {'fields': values}
+
+
+def log_request(logger: logging.Logger, route: str, message: str,
+                level: int = logging.INFO, **values):
+    """Log por solicitud, sujeto a la tasa de muestreo de la ruta
+
+    Las advertencias y errores nunca se descartan por muestreo.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING and not _sampler.sample(route):
+        return
+    logger.log(level, message, extra={'fields': dict(values, route=route)})
+
+
+def dropped() -> int:
+    """Registros descartados por la configuración actual"""
+    return _handler.dropped if _handler is not None else 0
@@ -1,17 +1,91 @@
-from fastapi import FastAPI, HTTPException, Query
+import time
+
+# Inicio de los imports del servicio, para el desglose de tiempos de arranque
+_imports_started = time.perf_counter()
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
-from app.models import DeviceType, WebAppExperienceResponse
-from app.ml_model import classifier
+from app import metrics, serialization, tracing
+from app.log import fields, get_logger, log_request
+from app.models import (
+    MAX_BATCH_SIZE,
+    AdvancedFlowBatchRequest,
+    DeviceType,
+    ModelKind,
+    WebAppExperienceResponse,
+)
+from app.ml_model import ConnectionQualityClassifier, classifier
 from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.artifacts import ArtifactError
+from app.batching import MicroBatcher
+from app.bulk_scoring import COLUMNAR_MEDIA_TYPE, NDJSON_MEDIA_TYPES, BulkScorer, NDJSONStreamingResponse
+from app.inference_executor import (
+    ExecutorOverloadedError,
+    InferenceExecutor,
+    InferenceTimeoutError,
+)
+from app.model_registry import ModelRegistry, RegistryError, RegistryWatcher
+from app.shared_models import SharedModelClient
+from app.startup import (
+    StartupTimer,
+    basic_record,
+    default_warmup_size,
+    warm_up_model,
+    warmup_records,
+)
+from app.training_jobs import ModelValidationError, TrainingConflictError, TrainingJobManager
+
+logger = get_logger(__name__)
+
+# Medición del arranque; `ready` indica que los modelos están cargados y calientes
+startup_timer = StartupTimer(started=_imports_started)
+startup_timer.record('imports', time.perf_counter() - _imports_started)
+startup_state = {'ready': False, 'training': [], 'training_started': None, 'report': None}
+
+class TimedJSONResponse(JSONResponse):
+    """Respuesta JSON serializada con orjson que registra su tiempo en las métricas
+
+    Los bytes son los mismos que los de `JSONResponse` (ver
+    `app.serialization`). Los endpoints de predicción la regresan directamente
+    con el resultado ya en tipos nativos, así que FastAPI no lo vuelve a
+    validar ni a recorrer con `jsonable_encoder`. En las solicitudes
+    trazadas, `serialize` va desde que terminó la inferencia hasta aquí.
+    """
+    
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = serialization.dumps(content)
+        metrics.SERIALIZATION_SECONDS.observe(time.perf_counter() - started)
+        tracing.mark('serialize')
+        return body
+
 
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="Web App Experience Service",
     description="Servicio para procesar experiencia web y app con ML",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=TimedJSONResponse
+)
+
+# Desglose de tiempos (Server-Timing) de las solicitudes que lo piden o salen en la muestra
+trace_writer = tracing.TraceWriter.from_env()
+app.add_middleware(
+    tracing.TracingMiddleware,
+    writer=trace_writer,
+    sample_percent=float(os.getenv('TRACE_SAMPLE_PERCENT', '0'))
 )
 
+# Latencia y respuestas por ruta para /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Configurar CORS para permitir requests desde frontend
 app.add_middleware(
     CORSMiddleware,
@@ -21,31 +95,350 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar los modelos al arrancar la aplicación
-@app.on_event("startup")
-async def startup_event():
-    """Inicializa los modelos de ML al arrancar la aplicación"""
+# Modelo avanzado, se inicializa al arrancar la aplicación
+advanced_classifier = None
+
+
+def current_models():
+    """Modelos vigentes que usa el ejecutor de inferencia"""
+    return {'basic': classifier, 'advanced': advanced_classifier}
+
+
+# Ejecutor acotado para correr la inferencia fuera del event loop
+inference_executor = InferenceExecutor.from_env(current_models)
+
+
+async def run_inference(task: str, *args):
+    """Ejecuta una tarea en el ejecutor y traduce saturación y timeouts a HTTP"""
+    kind = task.split('_')[0]
+    model = current_models()[kind]
+    if model is None or not model.is_trained:
+        raise HTTPException(status_code=503, detail=f"El modelo '{kind}' aún no está listo")
     try:
-        classifier.load_model()
-        print("✅ Modelo básico de clasificación inicializado correctamente")
-    except Exception as e:
-        print(f"⚠️ Error cargando modelo básico: {e}")
-        print("🔄 Entrenando nuevo modelo básico...")
-        classifier.train()
+        return await inference_executor.run(task, *args)
+    except ExecutorOverloadedError as e:
+        raise HTTPException(status_code=503, detail=f"Servicio saturado: {str(e)}")
+    except InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Tiempo de inferencia agotado: {str(e)}")
+
+
+def swap_model(kind: str, new_model, version: str = None):
+    """Intercambia la referencia del modelo vigente (atómico para las solicitudes)
+
+    Las solicitudes en curso terminan con la instancia anterior y las nuevas
+    ya ven la nueva. Con registro, los procesos del pool cargan la versión
+    activa desde su artefacto.
+    """
+    global classifier, advanced_classifier
+    if kind == 'basic':
+        classifier = new_model
+    else:
+        advanced_classifier = new_model
+    model_versions[kind] = version
+    if version is not None:
+        path = model_registry.artifact_path(kind, version)
+        if kind == 'basic':
+            inference_executor.basic_model_path = path
+        else:
+            inference_executor.advanced_model_path = path
+    inference_executor.reload()
+    if kind in startup_state['training']:
+        startup_state['training'].remove(kind)
+        update_readiness()
+
+
+def publish_model(kind: str, new_model):
+    """Publica un modelo recién entrenado con un intercambio atómico de referencia
+
+    Con registro (MODEL_REGISTRY_DIR) el modelo se registra como versión
+    nueva; el watcher la valida, la calienta, la activa y la aplica. Sin
+    registro se guarda en disco (escritura atómica) para que los procesos del
+    pool lo carguen, se calienta y se intercambia la referencia.
+    """
+    if model_registry is not None and shared_models is None:
+        registry_watcher.activate(kind, model_registry.register(kind, new_model))
+        return
     
-    # Inicializar modelo avanzado
-    global advanced_classifier
-    advanced_classifier = AdvancedFlowClassifier()
+    warm_up_model(kind, new_model)
+    if kind == 'basic':
+        new_model.save_model(inference_executor.basic_model_path)
+    else:
+        new_model.model_path = inference_executor.advanced_model_path
+        new_model.save_model()
+    if shared_models is not None:
+        # El supervisor detecta el archivo nuevo y lo publica a todos los workers
+        return
+    swap_model(kind, new_model)
+    logger.info("🔁 Modelo publicado", extra=fields(kind=kind))
+
+
+# Registro de versiones de los modelos; sin MODEL_REGISTRY_DIR se usan las rutas fijas
+model_registry = ModelRegistry(os.environ['MODEL_REGISTRY_DIR']) if os.getenv('MODEL_REGISTRY_DIR') else None
+registry_watcher = RegistryWatcher(
+    model_registry, swap_model, float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', '1.0'))
+) if model_registry is not None else None
+# Versión del registro que está sirviendo cada modelo
+model_versions = {'basic': None, 'advanced': None}
+
+
+# Entrenamientos en procesos separados; publican con `publish_model` al terminar
+training_jobs = TrainingJobManager.from_env(publish_model)
+
+
+def submit_training(kind: str, dataset_path: str = None) -> dict:
+    """Lanza un entrenamiento en segundo plano y arma la respuesta 202"""
     try:
-        if advanced_classifier.load_model():
-            print("✅ Modelo avanzado de flujos inicializado correctamente")
+        job = training_jobs.submit(kind, dataset_path)
+    except TrainingConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "message": "Entrenamiento iniciado en segundo plano",
+        "job_id": job['job_id'],
+        "status": job['status'],
+        "status_url": f"/training-jobs/{job['job_id']}"
+    }
+
+
+# Dispatchers que agrupan predicciones concurrentes en una sola llamada matricial
+basic_batcher = MicroBatcher.from_env(
+    'basic', lambda records: run_inference('basic_predict_batch', records)
+)
+advanced_batcher = MicroBatcher.from_env(
+    'advanced', lambda records: run_inference('advanced_predict_batch', records)
+)
+
+# Puntuación masiva en streaming (NDJSON o columnar) por bloques
+bulk_scorer = BulkScorer.from_env()
+
+
+async def predict_basic(record: dict):
+    """Predicción del modelo básico, agrupada en micro-lotes si está habilitado"""
+    tracing.mark('parse')
+    if basic_batcher.enabled:
+        prediction = await basic_batcher.submit(record)
+    else:
+        prediction = await run_inference(
+            'basic_predict', record['wifi'], record['device'], record['latitude'],
+            record['longitude'], record['network_speed']
+        )
+    tracing.checkpoint()
+    return prediction
+
+
+async def predict_advanced(record: dict):
+    """Predicción del modelo avanzado, agrupada en micro-lotes si está habilitado"""
+    tracing.mark('parse')
+    if advanced_batcher.enabled:
+        prediction = await advanced_batcher.submit(record)
+    else:
+        prediction = await run_inference(
+            'advanced_predict', record['wifi'], record['device'], record['latitude'],
+            record['longitude'], record.get('network_speed'), record.get('battery_level'),
+            record.get('time_of_day')
+        )
+    tracing.checkpoint()
+    return prediction
+
+
+# Modelos publicados en memoria compartida por el supervisor (python -m app.supervisor)
+shared_models = None
+shared_models_task = None
+
+
+def apply_shared_models() -> bool:
+    """Cambia a la versión de modelos publicada en memoria compartida, si hay una nueva"""
+    global classifier, advanced_classifier
+    update = shared_models.poll()
+    if update is None:
+        return False
+    version, artifacts = update
+    
+    basic = ConnectionQualityClassifier()
+    basic.load_artifact(artifacts['basic'])
+    advanced = AdvancedFlowClassifier()
+    advanced.model_path = inference_executor.advanced_model_path
+    advanced.load_artifact(artifacts['advanced'])
+    warm_up_model('basic', basic)
+    warm_up_model('advanced', advanced)
+    
+    classifier, advanced_classifier = basic, advanced
+    logger.info("🔁 Worker usando modelos compartidos", extra=fields(pid=os.getpid(), version=version))
+    return True
+
+
+async def watch_shared_models(interval: float):
+    """Revisa periódicamente si el supervisor publicó una versión nueva"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            apply_shared_models()
+        except Exception as e:
+            logger.warning("⚠️ Error cambiando a los modelos compartidos", extra=fields(error=str(e)))
+
+
+def _load_local_model(kind: str):
+    """Carga un modelo guardado; regresa None si no existe o no se puede leer"""
+    if kind == 'basic':
+        path = inference_executor.basic_model_path
+        model = ConnectionQualityClassifier()
+    else:
+        path = inference_executor.advanced_model_path
+        model = AdvancedFlowClassifier()
+        model.model_path = path
+    if not os.path.exists(path):
+        logger.warning("⚠️ No se encontró el modelo", extra=fields(kind=kind, path=path))
+        return None
+    try:
+        if kind == 'basic':
+            model.load_model(path)
         else:
-            print("🔄 Entrenando modelo avanzado...")
-            advanced_classifier.train()
+            model.load_model()
     except Exception as e:
-        print(f"⚠️ Error con modelo avanzado: {e}")
-        print("🔄 Entrenando nuevo modelo avanzado...")
-        advanced_classifier.train()
+        logger.warning("⚠️ Error cargando el modelo", extra=fields(kind=kind, error=str(e)))
+        return None
+    return model
+
+
+def load_local_models() -> list:
+    """Carga los modelos dentro de este proceso, en paralelo
+
+    La lectura de artefactos (mmap y sha256) libera el GIL, así que cargar
+    ambos modelos a la vez reduce el tiempo de arranque. Regresa los tipos de
+    modelo que no se pudieron cargar y hay que entrenar.
+    """
+    global classifier, advanced_classifier
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='model-load') as pool:
+        basic, advanced = pool.map(_load_local_model, ('basic', 'advanced'))
+    
+    if basic is not None:
+        classifier = basic
+        logger.info("✅ Modelo básico de clasificación inicializado correctamente")
+    if advanced is not None:
+        advanced_classifier = advanced
+        logger.info("✅ Modelo avanzado de flujos inicializado correctamente")
+    else:
+        # Instancia sin entrenar hasta que termine el entrenamiento en segundo plano
+        advanced_classifier = AdvancedFlowClassifier()
+        advanced_classifier.model_path = inference_executor.advanced_model_path
+    return [kind for kind, model in (('basic', basic), ('advanced', advanced)) if model is None]
+
+
+def load_registry_models() -> list:
+    """Carga las versiones activas del registro y regresa los modelos que faltan
+
+    Si un tipo de modelo aún no tiene versión activa, el modelo de la ruta
+    fija (si existe) se registra como su primera versión.
+    """
+    global advanced_classifier
+    for kind in ('basic', 'advanced'):
+        if model_registry.active_version(kind) is None:
+            model = _load_local_model(kind)
+            if model is not None:
+                model_registry.register(kind, model, activate=True)
+    registry_watcher.sync()
+    
+    if advanced_classifier is None:
+        advanced_classifier = AdvancedFlowClassifier()
+        advanced_classifier.model_path = inference_executor.advanced_model_path
+    return [kind for kind in ('basic', 'advanced') if registry_watcher.loaded[kind] is None]
+
+
+async def warm_up_serving(n: int):
+    """Calienta el ejecutor, los micro-lotes y las rutas individuales y por lote"""
+    records = warmup_records(n)
+    singles = records[:8]
+    ready = {kind for kind, model in current_models().items() if model is not None and model.is_trained}
+    calls = []
+    if 'basic' in ready:
+        calls += [predict_basic(basic_record(record)) for record in singles]
+        calls.append(run_inference('basic_predict_batch', [basic_record(r) for r in records]))
+    if 'advanced' in ready:
+        calls += [predict_advanced(record) for record in singles]
+        calls.append(run_inference('advanced_predict_batch', records))
+    await asyncio.gather(*calls)
+    
+    # La ruta de scikit-learn (lotes grandes) y la caché limpia, modelo por modelo
+    if 'advanced' in ready:
+        warm_up_model('advanced', advanced_classifier, n)
+
+
+def update_readiness():
+    """El servicio está listo cuando ambos modelos están cargados y calientes"""
+    was_ready = startup_state['ready']
+    startup_state['ready'] = not startup_state['training'] and all(
+        model is not None and model.is_trained for model in current_models().values()
+    )
+    if startup_state['ready'] and not was_ready:
+        if startup_state['training_started'] is not None:
+            startup_timer.record(
+                'background_training', time.perf_counter() - startup_state['training_started']
+            )
+        startup_state['report'] = report = startup_timer.report()
+        logger.info("🟢 Servicio listo", extra=fields(
+            total_ms=report['total_ms'], phases_ms=report['phases_ms']
+        ))
+
+
+# Inicializar los modelos al arrancar la aplicación
+@app.on_event("startup")
+async def startup_event():
+    """Inicializa los modelos de ML al arrancar la aplicación
+
+    Carga los modelos guardados (o se conecta a los compartidos), arranca el
+    ejecutor y corre el lote de calentamiento. Los modelos que faltan se
+    entrenan como trabajos en segundo plano: el servicio responde `/live`
+    de inmediato y `/ready` hasta que todo está publicado y caliente.
+    """
+    global shared_models, shared_models_task
+    prefix = os.getenv('SHARED_MODELS_PREFIX')
+    missing = []
+    if prefix:
+        # Worker del supervisor: los modelos ya están cargados en memoria compartida
+        with startup_timer.phase('attach_shared_models'):
+            shared_models = SharedModelClient(prefix)
+            apply_shared_models()
+        interval = float(os.getenv('SHARED_MODELS_POLL_MS', '200')) / 1000
+        shared_models_task = asyncio.get_running_loop().create_task(watch_shared_models(interval))
+    elif model_registry is not None:
+        with startup_timer.phase('load_models'):
+            missing = await asyncio.get_running_loop().run_in_executor(None, load_registry_models)
+        registry_watcher.start()
+    else:
+        with startup_timer.phase('load_models'):
+            missing = await asyncio.get_running_loop().run_in_executor(None, load_local_models)
+    
+    with startup_timer.phase('start_executor'):
+        inference_executor.start()
+        basic_batcher.start()
+        advanced_batcher.start()
+    
+    warmup_size = default_warmup_size()
+    if warmup_size > 0:
+        with startup_timer.phase('warmup'):
+            await warm_up_serving(warmup_size)
+    
+    if missing:
+        startup_state['training_started'] = time.perf_counter()
+    for kind in missing:
+        logger.info("🔄 Entrenando el modelo en segundo plano...", extra=fields(kind=kind))
+        submit_training(kind)
+        startup_state['training'].append(kind)
+    update_readiness()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detiene los dispatchers y el pool de inferencia al apagar la aplicación"""
+    if shared_models_task is not None:
+        shared_models_task.cancel()
+    if registry_watcher is not None:
+        registry_watcher.stop()
+    await basic_batcher.stop()
+    await advanced_batcher.stop()
+    inference_executor.shutdown(wait=False)
+    trace_writer.close()
 
 
 @app.get("/")
@@ -77,45 +470,196 @@ async def get_web_app_experience(
         WebAppExperienceResponse: Clasificación de la calidad de conexión
     """
     try:
-        print(f"Procesando request: wifi={wifi}, device={device}, lat={latitude}, lon={longitude}, speed={network_speed}")
-        
         # Usar el modelo de ML para clasificar la conexión
-        prediction = classifier.predict(wifi, device.value, latitude, longitude, network_speed)
+        prediction = await predict_basic({
+            'wifi': wifi,
+            'device': device.value,
+            'latitude': latitude,
+            'longitude': longitude,
+            'network_speed': network_speed
+        })
         
-        # Crear la respuesta
-        response = WebAppExperienceResponse(
-            flow_type=prediction["flow_type"],
-            connection_quality=prediction["connection_quality"],
-            confidence_score=prediction["confidence_score"],
-            prediction_reason=prediction["prediction_reason"],
-            features_used=prediction["features_used"],
-            location_info=prediction["location_info"]
-        )
+        metrics.count_predictions('basic', [prediction])
         
-        print(f"Predicción: {prediction}")
-        return response
+        log_request(
+            logger, '/web-and-app-experience', "Predicción",
+            wifi=wifi, device=device.value, latitude=latitude, longitude=longitude,
+            network_speed=network_speed, flow_type=prediction['flow_type'],
+            connection_quality=prediction['connection_quality'],
+            confidence_score=prediction['confidence_score']
+        )
+        # El resultado ya tiene la forma de `WebAppExperienceResponse`
+        return TimedJSONResponse(prediction)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error procesando la solicitud: {str(e)}")
 
 
+@app.get("/live")
+async def liveness():
+    """Liveness: el proceso responde (no depende de los modelos)"""
+    return {"status": "alive"}
+
+
+@app.get("/ready")
+async def readiness():
+    """Readiness: 200 sólo cuando los modelos están cargados y calientes
+
+    Incluye el desglose de tiempos del arranque; responde 503 mientras se
+    cargan o entrenan los modelos para que el orquestador no envíe tráfico.
+    """
+    body = {
+        "status": "ready" if startup_state['ready'] else "starting",
+        "training": list(startup_state['training']),
+        "startup": startup_state['report'] or {'phases_ms': dict(startup_timer.phases)}
+    }
+    return JSONResponse(status_code=200 if startup_state['ready'] else 503, content=body)
+
+
 @app.get("/health")
 async def health_check():
     """Endpoint de health check"""
-    return {"status": "healthy", "model_trained": classifier.is_trained}
+    return {
+        "status": "healthy",
+        "model_trained": classifier.is_trained,
+        "shared_model_version": shared_models.version if shared_models is not None else None
+    }
+
+
+def refresh_model_metrics():
+    """Actualiza los gauges de versión de modelo y duración del último entrenamiento"""
+    metrics.MODEL_INFO.clear()
+    for kind, model in current_models().items():
+        if model is None or not model.is_trained:
+            continue
+        if model_versions[kind] is not None:
+            version = model_versions[kind]
+        elif shared_models is not None:
+            version = f'shared-{shared_models.version}'
+        else:
+            version = 'local'
+        model_format = 'artifact' if model.model is None else 'joblib'
+        metrics.MODEL_INFO.set(1, (kind, version, model_format))
+    
+    # Trabajos del más reciente al más antiguo: el primero exitoso de cada tipo
+    seen = set()
+    for job in training_jobs.list():
+        if job['status'] == 'succeeded' and job['kind'] not in seen:
+            seen.add(job['kind'])
+            duration = job['phase_durations'].get('running', 0.0)
+            metrics.MODEL_TRAINING_SECONDS.set(duration, (job['kind'],))
+
 
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas en formato de texto de Prometheus"""
+    refresh_model_metrics()
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
-@app.post("/retrain-model")
-async def retrain_model():
-    """Endpoint para re-entrenar el modelo con nuevos datos"""
+
+@app.get("/inference/metrics")
+async def get_inference_metrics():
+    """Métricas del pool de inferencia y de los dispatchers de micro-lotes"""
+    return {
+        **inference_executor.metrics(),
+        'micro_batching': {
+            'basic': basic_batcher.metrics(),
+            'advanced': advanced_batcher.metrics()
+        }
+    }
+
+
+@app.post("/retrain-model", status_code=202)
+async def retrain_model(
+    dataset_path: str = Query(None, description="Dataset en disco (CSV, .npy o directorio columnar)")
+):
+    """Lanza el re-entrenamiento del modelo básico como trabajo en segundo plano"""
     try:
-        classifier.train()
-        classifier.save_model()
-        return {"message": "Modelo re-entrenado exitosamente", "accuracy": classifier.model.score(*classifier._create_training_data())}
+        return submit_training('basic', dataset_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error re-entrenando el modelo: {str(e)}")
 
 
+@app.get("/training-jobs")
+async def list_training_jobs():
+    """Lista los trabajos de entrenamiento, del más reciente al más antiguo"""
+    jobs = training_jobs.list()
+    return {"jobs": jobs, "total": len(jobs)}
+
+
+@app.get("/training-jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """Estado, duración por fase y métricas de un trabajo de entrenamiento"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo de entrenamiento no encontrado: {job_id}")
+    return job
+
+
+def require_registry():
+    if model_registry is None:
+        raise HTTPException(
+            status_code=400, detail="El registro de modelos no está habilitado (MODEL_REGISTRY_DIR)"
+        )
+
+
+@app.get("/models/registry")
+async def get_model_registry():
+    """Versiones registradas de cada modelo, la activa y la que se está sirviendo"""
+    require_registry()
+    return {
+        kind: {
+            "active_version": model_registry.active_version(kind),
+            "serving_version": model_versions[kind],
+            "error": registry_watcher.errors.get(kind),
+            "versions": model_registry.versions(kind)
+        }
+        for kind in ('basic', 'advanced')
+    }
+
+
+async def change_active_version(kind: str, version: str = None, rollback: bool = False) -> dict:
+    """Valida y activa una versión (o regresa a la anterior) sin reiniciar el servicio
+
+    Si la versión no pasa la validación la activa no cambia y se responde 422.
+    """
+    require_registry()
+    try:
+        previous = model_registry.active_version(kind)
+        version = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(registry_watcher.activate, kind, version, rollback)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RegistryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ArtifactError, ModelValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Versión no válida: {e}")
+    return {"kind": kind, "active_version": version, "previous_version": previous}
+
+
+@app.post("/models/{kind}/activate")
+async def activate_model_version(
+    kind: str,
+    version: str = Query(..., description="Versión registrada a activar")
+):
+    """Activa una versión registrada sin reiniciar el servicio"""
+    return await change_active_version(kind, version)
+
+
+@app.post("/models/{kind}/rollback")
+async def rollback_model_version(
+    kind: str,
+    version: str = Query(None, description="Versión a la cual regresar (default: la anterior)")
+):
+    """Regresa a la versión activa anterior (o a la indicada) al instante"""
+    return await change_active_version(kind, version, rollback=True)
+
+
 @app.get("/model-info")
 async def get_model_info():
     """Endpoint para obtener información del modelo básico"""
@@ -130,7 +674,8 @@ async def get_model_info():
             ],
             "total_features": 8,
             "classes": ["mala_conexion", "buena_conexion"],
-            "geofencing_enabled": True
+            "geofencing_enabled": True,
+            "active_version": model_versions['basic']
         }
     else:
         return {"is_trained": False, "message": "Modelo no entrenado"}
@@ -153,30 +698,106 @@ async def predict_advanced_flow(
     basado en 12 features incluyendo geocercas, plusvalía, batería y hora del día
     """
     try:
-        print(f"Predicción avanzada: wifi={wifi}, device={device}, lat={latitude}, lon={longitude}")
-        
-        prediction = advanced_classifier.predict(
-            wifi, device.value, latitude, longitude, 
-            network_speed, battery_level, time_of_day
+        prediction = await predict_advanced({
+            'wifi': wifi,
+            'device': device.value,
+            'latitude': latitude,
+            'longitude': longitude,
+            'network_speed': network_speed,
+            'battery_level': battery_level,
+            'time_of_day': time_of_day
+        })
+        metrics.count_predictions('advanced', [prediction])
+        log_request(
+            logger, '/advanced-flow/predict', "Predicción avanzada",
+            wifi=wifi, device=device.value, latitude=latitude, longitude=longitude,
+            flow_type=prediction['flow_type'], zone=prediction['zone_info']['zone_name'],
+            confidence_score=prediction['confidence_score']
         )
         
-        return prediction
+        return TimedJSONResponse(prediction)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en predicción avanzada: {str(e)}")
 
 
-@app.post("/advanced-flow/train")
-async def train_advanced_model():
-    """Entrena el modelo avanzado con nuevos datos"""
+@app.post("/advanced-flow/predict-batch")
+async def predict_advanced_flow_batch(request: AdvancedFlowBatchRequest):
+    """
+    Predice el flujo de experiencia para muchos registros a la vez.
+    La matriz de features se construye en una pasada y el bosque se evalúa
+    una sola vez; los resultados se regresan en el orden de entrada.
+    """
     try:
-        result = advanced_classifier.train()
-        return {
-            "message": "Modelo avanzado entrenado exitosamente",
-            "accuracy": result['accuracy'],
-            "total_samples": result['total_samples'],
-            "flow_distribution": result['flow_distribution']
-        }
+        records = [
+            {
+                'wifi': record.wifi,
+                'device': record.device.value,
+                'latitude': record.latitude,
+                'longitude': record.longitude,
+                'network_speed': record.network_speed,
+                'battery_level': record.battery_level,
+                'time_of_day': record.time_of_day
+            }
+            for record in request.records
+        ]
+        tracing.mark('parse')
+        predictions = await run_inference('advanced_predict_batch', records)
+        tracing.checkpoint()
+        metrics.count_predictions('advanced', predictions)
+        
+        return TimedJSONResponse({"predictions": predictions, "total": len(predictions)})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en predicción avanzada por lotes: {str(e)}")
+
+
+@app.post("/bulk/score")
+async def bulk_score(
+    request: Request,
+    model: ModelKind = Query(ModelKind.ADVANCED, description="Modelo que puntúa los registros"),
+    chunk_size: int = Query(None, ge=1, le=MAX_BATCH_SIZE, description="Registros por bloque de inferencia")
+):
+    """
+    Puntúa un cuerpo NDJSON (un registro por línea) o columnar binario
+    (`application/x-hk-columnar`) conforme llega, por bloques de
+    `chunk_size` registros. Responde NDJSON en streaming: un resultado por
+    registro, en el orden de entrada; los registros inválidos llevan
+    `{"index", "error"}` en su lugar.
+    """
+    kind = model.value
+    parser = bulk_scorer.parser_for(request.headers.get('content-type'), kind)
+    if parser is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type no soportado; usa {NDJSON_MEDIA_TYPES[0]} o {COLUMNAR_MEDIA_TYPE}"
+        )
+    # Antes de empezar a responder: después el código HTTP ya no se puede cambiar
+    current = current_models()[kind]
+    if current is None or not current.is_trained:
+        raise HTTPException(status_code=503, detail=f"El modelo '{kind}' aún no está listo")
+
+    async def score(records: list) -> list:
+        predictions = await run_inference(f'{kind}_predict_batch', records)
+        metrics.count_predictions(kind, predictions)
+        return predictions
+
+    return NDJSONStreamingResponse(bulk_scorer.stream(request.stream(), parser, score, chunk_size))
+
+
+@app.post("/advanced-flow/train", status_code=202)
+async def train_advanced_model(
+    dataset_path: str = Query(None, description="Dataset en disco (CSV, .npy o directorio columnar)")
+):
+    """Lanza el entrenamiento del modelo avanzado como trabajo en segundo plano"""
+    try:
+        return submit_training('advanced', dataset_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error entrenando modelo avanzado: {str(e)}")
 
@@ -185,7 +806,7 @@ async def train_advanced_model():
 async def get_advanced_model_info():
     """Obtiene información del modelo avanzado"""
     try:
-        return advanced_classifier.get_model_info()
+        return {**advanced_classifier.get_model_info(), 'active_version': model_versions['advanced']}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo info del modelo avanzado: {str(e)}")
 
@@ -203,10 +824,13 @@ async def compare_flows(
 ):
     """Compara flujos entre dos ubicaciones diferentes"""
     try:
-        prediction1 = advanced_classifier.predict(wifi1, device1.value, lat1, lon1)
-        prediction2 = advanced_classifier.predict(wifi2, device2.value, lat2, lon2)
+        prediction1, prediction2 = await asyncio.gather(
+            predict_advanced({'wifi': wifi1, 'device': device1.value, 'latitude': lat1, 'longitude': lon1}),
+            predict_advanced({'wifi': wifi2, 'device': device2.value, 'latitude': lat2, 'longitude': lon2})
+        )
+        metrics.count_predictions('advanced', [prediction1, prediction2])
         
-        return {
+        return TimedJSONResponse({
             "location_1": {
                 "coordinates": (lat1, lon1),
                 "prediction": prediction1
@@ -219,7 +843,9 @@ async def compare_flows(
                 "same_flow": prediction1['flow_type'] == prediction2['flow_type'],
                 "flow_difference": f"{prediction1['flow_name']} vs {prediction2['flow_name']}"
             }
-        }
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error comparando flujos: {str(e)}")
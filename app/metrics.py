@@ -0,0 +1,352 @@
+"""
+Métricas del servicio en formato de texto de Prometheus
+
+Contadores, gauges e histogramas mínimos (sin dependencias) pensados para el
+camino caliente: registrar una observación es una búsqueda binaria en los
+límites del histograma y dos sumas bajo un candado. `METRICS_ENABLED=0`
+apaga la instrumentación de las etapas de predicción.
+
+Medir el costo de la instrumentación:
+    python -m app.metrics
+"""
+
+import bisect
+import os
+import threading
+import time
+
+# Límites de los histogramas de latencia, en segundos (de 5 µs a 2.5 s)
+LATENCY_BUCKETS = (
+    5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3,
+    5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+# Instrumentación de las etapas de predicción (METRICS_ENABLED)
+ENABLED = os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items: list) -> list:
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in items
+        ]
+
+
+class Counter(_Metric):
+    """Contador monotónico por combinación de etiquetas"""
+    type_name = 'counter'
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja (o que se reemplaza en cada lectura)"""
+    type_name = 'gauge'
+
+    def set(self, value: float, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+
+class Histogram(_Metric):
+    """Histograma acumulativo con límites fijos, suma y conteo por etiquetas"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def _entry(self, labels: tuple) -> list:
+        """[conteos por límite, suma, conteo] de una serie; se crea si no existe"""
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        return entry
+
+    def observe(self, value: float, labels: tuple = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._entry(labels)
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, labels: tuple = ()) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def _render_samples(self, items: list) -> list:
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}'
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas que se exponen juntas en `/metrics`"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Latencia de las solicitudes HTTP por ruta',
+    ('method', 'route')
+)
+REQUESTS_TOTAL = Counter(
+    'http_requests_total', 'Solicitudes HTTP por ruta y código de estado',
+    ('method', 'route', 'status')
+)
+SERIALIZATION_SECONDS = Histogram(
+    'http_response_serialization_seconds', 'Tiempo de serializar las respuestas JSON'
+)
+PREDICTION_STAGE_SECONDS = Histogram(
+    'prediction_stage_seconds',
+    'Duración de cada etapa de una predicción (path: single o batch)',
+    ('model', 'path', 'stage')
+)
+PREDICTIONS_TOTAL = Counter(
+    'predictions_total', 'Predicciones servidas por modelo y tipo de flujo',
+    ('model', 'flow_type')
+)
+PREDICTION_ZONES_TOTAL = Counter(
+    'prediction_zones_total', 'Predicciones del modelo avanzado por geocerca',
+    ('zone', 'plusvalia')
+)
+MODEL_INFO = Gauge(
+    'model_info', 'Versión y formato del modelo que se está sirviendo (siempre 1)',
+    ('model', 'version', 'format')
+)
+MODEL_TRAINING_SECONDS = Gauge(
+    'model_training_duration_seconds', 'Duración del último entrenamiento exitoso por modelo',
+    ('model',)
+)
+LOG_RECORDS_DROPPED_TOTAL = Counter(
+    'log_records_dropped_total', 'Registros de log descartados porque la cola de escritura estaba llena'
+)
+
+
+class StageRecorder:
+    """Series de etapas de un histograma ya resueltas para el camino caliente
+
+    Registrar todas las etapas de una predicción toma el candado una sola vez
+    y no construye tuplas de etiquetas.
+    """
+
+    def __init__(self, histogram: Histogram, labels: tuple, stages: tuple):
+        self._buckets = histogram.buckets
+        self._lock = histogram._lock
+        with histogram._lock:
+            self._entries = {stage: histogram._entry(labels + (stage,)) for stage in stages}
+
+    def observe(self, stages: list):
+        buckets = self._buckets
+        with self._lock:
+            for stage, seconds in stages:
+                entry = self._entries[stage]
+                entry[0][bisect.bisect_left(buckets, seconds)] += 1
+                entry[1] += seconds
+                entry[2] += 1
+
+
+# Etapas de cada modelo; en el avanzado `matrix`, `scaling` y `forest` sólo corren en fallos de caché
+PREDICTION_STAGES = {
+    'basic': ('features', 'model', 'response'),
+    'advanced': ('zone', 'features', 'cache', 'matrix', 'scaling', 'forest', 'response')
+}
+_stage_recorders = {
+    (model, path): StageRecorder(PREDICTION_STAGE_SECONDS, (model, path), stages)
+    for model, stages in PREDICTION_STAGES.items()
+    for path in ('single', 'batch')
+}
+
+
+def observe_stages(model: str, path: str, stages: list):
+    """Registra las etapas `[(nombre, segundos), ...]` de una predicción o un lote"""
+    _stage_recorders[model, path].observe(stages)
+
+
+def count_predictions(model: str, results: list):
+    """Cuenta las predicciones servidas por tipo de flujo (y por zona en el avanzado)"""
+    for result in results:
+        PREDICTIONS_TOTAL.inc((model, result['flow_type']))
+        zone_info = result.get('zone_info')
+        if zone_info is not None:
+            PREDICTION_ZONES_TOTAL.inc((zone_info['zone_name'], zone_info['plusvalia']))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide la latencia y cuenta las respuestas por ruta
+
+    La ruta es la plantilla (`/training-jobs/{job_id}`), no la URL, para que
+    el número de series no crezca con los parámetros.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._endpoint_paths = None
+
+    def _route(self, scope) -> str:
+        route = scope.get('route')
+        if route is not None:
+            return route.path
+        # Versiones de Starlette que no dejan la ruta en el scope
+        if self._endpoint_paths is None:
+            self._endpoint_paths = {
+                getattr(r, 'endpoint', None): r.path for r in scope['app'].routes
+            }
+        return self._endpoint_paths.get(scope.get('endpoint'), 'unmatched')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, (scope['method'], route))
+            REQUESTS_TOTAL.inc((scope['method'], route, str(status)))
+
+
+def _time_per_call(fn, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def benchmark_overhead(repeats: int = 20000) -> dict:
+    """Costo de la instrumentación (µs por llamada) en el camino caliente"""
+    # Con `python -m` este archivo es `__main__`; los clasificadores leen `app.metrics`
+    from app import metrics
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+    from app.ml_model import ConnectionQualityClassifier
+    from app.prediction_cache import PredictionCache
+
+    registry = MetricsRegistry()
+    histogram = Histogram('bench_seconds', 'benchmark', ('model', 'path'), registry=registry)
+    counter = Counter('bench_total', 'benchmark', ('model',), registry=registry)
+
+    basic = ConnectionQualityClassifier()
+    basic.train()
+    advanced = AdvancedFlowClassifier(model_params={'n_estimators': 50})
+    advanced.train(save=False)
+    # Sin caché: se mide la predicción completa, no los aciertos repetidos
+    advanced.prediction_cache = PredictionCache(maxsize=0)
+
+    basic_record = {'wifi': True, 'device': 'ios', 'latitude': 19.43,
+                    'longitude': -99.2, 'network_speed': 25.0}
+    advanced_record = dict(basic_record, battery_level=80.0, time_of_day=14)
+
+    report = {
+        'histogram_observe_us': _time_per_call(lambda: histogram.observe(3e-5, ('basic', 'single')), repeats),
+        'counter_inc_us': _time_per_call(lambda: counter.inc(('basic',)), repeats)
+    }
+    previous = metrics.ENABLED
+    try:
+        for name, model, record, n in (
+            ('basic', basic, basic_record, repeats),
+            ('advanced', advanced, advanced_record, repeats // 10)
+        ):
+            timings = {}
+            # Se alterna varias veces para que el ruido afecte igual a ambos casos
+            for enabled in (False, True) * 3:
+                metrics.ENABLED = enabled
+                elapsed = _time_per_call(lambda: model.predict(**record), n)
+                timings[enabled] = min(timings.get(enabled, elapsed), elapsed)
+            report[f'{name}_predict_us'] = timings[False]
+            report[f'{name}_predict_instrumented_us'] = timings[True]
+            report[f'{name}_overhead_us'] = timings[True] - timings[False]
+    finally:
+        metrics.ENABLED = previous
+    return {key: round(value, 2) for key, value in report.items()}
+
+
+if __name__ == "__main__":
+    print("⏱️ Midiendo el costo de la instrumentación...")
+    for key, value in benchmark_overhead().items():
+        print(f"   {key}: {value} µs")
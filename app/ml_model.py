@@ -1,98 +1,217 @@
+import math
+import time
+
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
-import joblib
 import os
 
+from app import metrics, tracing
+from app.log import fields, get_logger
+
+# scikit-learn y joblib se importan al entrenar o cargar un joblib: servir
+# desde un artefacto no los necesita y el arranque es más rápido sin ellos
+from app.artifacts import (
+    ARTIFACT_SUFFIX,
+    ArtifactScaler,
+    ModelArtifact,
+    atomic_path,
+    build_artifact,
+    is_artifact,
+    write_artifact,
+)
+from app.datasets import (
+    BASIC_FEATURES,
+    StreamProgress,
+    default_max_memory_mb,
+    iter_dataset,
+    rows_for_budget,
+)
+
+logger = get_logger(__name__)
+
 
 class ConnectionQualityClassifier:
     """Clasificador de calidad de conexión usando regresión logística"""
     
     def __init__(self):
-        self.model = LogisticRegression(random_state=42)
-        self.scaler = StandardScaler()
+        # Se crean al entrenar o al cargar un modelo guardado
+        self.model = None
+        self.scaler = None
         self.is_trained = False
         
-    def _create_training_data(self):
-        """Crea datos de entrenamiento sintéticos con 8 features incluyendo geocercas"""
-        # Generamos 2000 muestras de entrenamiento (más datos para más features)
-        n_samples = 2000
+        # Representación plegada scaler + regresión logística usada para servir
+        self.weights = None
+        self.bias = None
         
-        # Features: [wifi, device_android, device_ios, latitude, longitude, distance_to_center, is_urban_area, network_speed]
+    def iter_training_chunks(self, n_samples: int = 2000, seed=42, chunk_size: int = 100_000):
+        """Genera los datos sintéticos por bloques columnares de a lo más `chunk_size` filas
         
-        X = []
-        y = []
+        Con la misma semilla y tamaño de bloque la secuencia es reproducible;
+        `seed=None` usa entropía del sistema.
+        """
+        rng = np.random.default_rng(seed)
+        center_lat, center_lon = 19.4326, -99.1332  # Centro CDMX
         
-        for _ in range(n_samples):
+        generated = 0
+        while generated < n_samples:
+            size = min(chunk_size, n_samples - generated)
+            
             # Features básicas
-            wifi = np.random.choice([0, 1], p=[0.3, 0.7])  # 70% con wifi
-            device_android = np.random.choice([0, 1], p=[0.5, 0.5])
-            device_ios = 1 - device_android if device_android == 1 else np.random.choice([0, 1], p=[0.5, 0.5])
+            wifi = (rng.random(size) < 0.7).astype(float)  # 70% con wifi
+            device_android = rng.integers(0, 2, size).astype(float)
+            device_ios = np.where(device_android == 1, 0.0, rng.integers(0, 2, size))
             
             # Features de geocercas (ejemplo: Ciudad de México)
-            latitude = np.random.uniform(19.0, 20.0)
-            longitude = np.random.uniform(-99.5, -98.5)
-            
-            # Calcular distancia al centro
-            center_lat, center_lon = 19.4326, -99.1332  # Centro CDMX
+            latitude = rng.uniform(19.0, 20.0, size)
+            longitude = rng.uniform(-99.5, -98.5, size)
             distance_to_center = np.sqrt((latitude - center_lat)**2 + (longitude - center_lon)**2)
             
             # Features de ubicación y red
-            is_urban_area = 1 if distance_to_center < 0.1 else 0
-            network_speed = np.random.exponential(10) if wifi else np.random.exponential(2)
-            
-            # Regla de negocio mejorada con geocercas
-            base_good_connection = wifi == 1 and (device_android == 1 or device_ios == 1)
-            
-            # Factores adicionales
-            good_location = is_urban_area == 1
-            good_speed = network_speed > 5
-            
-            # Calcular score de calidad
-            quality_score = sum([
-                base_good_connection * 3,  # Factor principal
-                good_location * 1,         # Ubicación urbana
-                good_speed * 1             # Buena velocidad
-            ])
+            is_urban_area = (distance_to_center < 0.1).astype(float)
+            network_speed = rng.exponential(1.0, size) * np.where(wifi == 1, 10.0, 2.0)
             
-            # Clasificar como buena conexión si score >= 3
+            # Regla de negocio: score de calidad >= 3 es buena conexión
+            base_good_connection = (wifi == 1) & ((device_android == 1) | (device_ios == 1))
+            quality_score = base_good_connection * 3 + is_urban_area + (network_speed > 5)
             is_good_connection = quality_score >= 3
             
-            # Agregar ruido para robustez
-            if np.random.random() < 0.05:  # 5% de ruido
-                is_good_connection = not is_good_connection
+            # Agregar ruido para robustez (5%)
+            is_good_connection ^= rng.random(size) < 0.05
             
-            # Crear feature vector con 8 features
-            features = [
+            X = np.column_stack([
                 wifi, device_android, device_ios,
                 latitude, longitude, distance_to_center,
                 is_urban_area, network_speed
-            ]
+            ])
             
-            X.append(features)
-            y.append(1 if is_good_connection else 0)
+            generated += size
+            yield X, is_good_connection.astype(int)
+    
+    def _create_training_data(self, n_samples: int = 2000, seed=42, chunk_size: int = 100_000):
+        """Crea datos de entrenamiento sintéticos con 8 features incluyendo geocercas"""
+        # Features: [wifi, device_android, device_ios, latitude, longitude, distance_to_center, is_urban_area, network_speed]
+        X = np.empty((n_samples, 8))
+        y = np.empty(n_samples, dtype=int)
         
-        return np.array(X), np.array(y)
+        offset = 0
+        for X_chunk, y_chunk in self.iter_training_chunks(n_samples, seed, chunk_size):
+            X[offset:offset + len(X_chunk)] = X_chunk
+            y[offset:offset + len(y_chunk)] = y_chunk
+            offset += len(X_chunk)
+        
+        return X, y
     
     def train(self):
         """Entrena el modelo con datos sintéticos"""
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+        
         X, y = self._create_training_data()
         
+        # Objetos nuevos: el modelo actual pudo venir de un artefacto de sólo lectura
+        self.model = LogisticRegression(random_state=42)
+        self.scaler = StandardScaler()
+        
         # Escalamos los datos
         X_scaled = self.scaler.fit_transform(X)
         
         # Entrenamos el modelo
         self.model.fit(X_scaled, y)
+        self._fold_linear_model()
         self.is_trained = True
         
-        print(f"Modelo entrenado con {len(X)} muestras")
-        print(f"Precisión en entrenamiento: {self.model.score(X_scaled, y):.3f}")
+        accuracy = self.model.score(X_scaled, y)
+        logger.info("Modelo entrenado", extra=fields(
+            model='basic', samples=len(X), train_accuracy=round(accuracy, 3)
+        ))
+        
+        return {
+            'accuracy': accuracy,
+            'total_samples': len(X)
+        }
+    
+    def train_from_dataset(self, path: str, max_memory_mb: float = None, epochs: int = 3):
+        """Entrena por streaming desde un dataset en disco (CSV, .npy o directorio columnar)
+        
+        El dataset trae las 8 columnas de `BASIC_FEATURES` y la columna `label`
+        (0/1). Una primera pasada ajusta el scaler con `partial_fit`; las
+        siguientes entrenan un `SGDClassifier` con pérdida logística, también
+        con `partial_fit`, así que sólo un bloque vive en memoria. La precisión
+        reportada es progresiva: cada bloque de la última época se evalúa antes
+        de entrenar con él.
+        """
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        max_memory_mb = max_memory_mb or default_max_memory_mb()
+        chunk_rows = rows_for_budget(max_memory_mb, len(BASIC_FEATURES) + 1)
+        logger.info("🔄 Entrenando desde dataset en disco", extra=fields(
+            model='basic', path=path, chunk_rows=chunk_rows, max_memory_mb=max_memory_mb
+        ))
+        
+        scaler = StandardScaler()
+        progress = StreamProgress('Ajuste del scaler')
+        for X, _ in iter_dataset(path, BASIC_FEATURES, chunk_rows=chunk_rows):
+            scaler.partial_fit(X)
+            progress.update(len(X))
+        scaler_stats = progress.finish()
+        
+        model = SGDClassifier(loss='log_loss', random_state=42)
+        correct = seen = 0
+        for epoch in range(epochs):
+            progress = StreamProgress(f'Época {epoch + 1}/{epochs}')
+            for X, y in iter_dataset(path, BASIC_FEATURES, chunk_rows=chunk_rows):
+                X_scaled = scaler.transform(X)
+                if epoch == epochs - 1 and hasattr(model, 'coef_'):
+                    correct += int((model.predict(X_scaled) == y).sum())
+                    seen += len(y)
+                model.partial_fit(X_scaled, y, classes=np.array([0, 1]))
+                progress.update(len(X))
+            epoch_stats = progress.finish()
+        
+        self.model = model
+        self.scaler = scaler
+        self._fold_linear_model()
+        self.is_trained = True
+        
+        accuracy = correct / seen if seen else 0.0
+        logger.info("Modelo entrenado", extra=fields(
+            model='basic', samples=scaler_stats['rows'], progressive_accuracy=round(accuracy, 3)
+        ))
+        
+        return {
+            'accuracy': accuracy,
+            'total_samples': scaler_stats['rows'],
+            'epochs': epochs,
+            'chunk_rows': chunk_rows,
+            'rows_per_second': epoch_stats['rows_per_second']
+        }
+    
+    def _fold_linear_model(self):
+        """Pliega la media y escala del scaler en los coeficientes del modelo
+        
+        z = coef · (x - mean) / scale + intercept = weights · x + bias, así
+        servir una predicción es un producto punto y una sigmoide.
+        """
+        coef = np.asarray(self.model.coef_, dtype=float)[0]
+        weights = coef / self.scaler.scale_
+        self.weights = weights.tolist()
+        self.bias = float(self.model.intercept_[0] - np.dot(weights, self.scaler.mean_))
+        self._weights_array = weights
+    
+    @staticmethod
+    def _sigmoid(z: float) -> float:
+        """Sigmoide numéricamente estable para un escalar"""
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
     
     def predict(self, wifi: bool, device: str, latitude: float = None, longitude: float = None, 
                 network_speed: float = None) -> dict:
         """Predice la calidad de conexión con 8 features incluyendo geocercas"""
         if not self.is_trained:
             self.train()
+        started = time.perf_counter()
         
         # Convertir inputs a formato numérico
         wifi_num = 1 if wifi else 0
@@ -109,23 +228,115 @@ class ConnectionQualityClassifier:
         
         # Calcular distancia al centro
         center_lat, center_lon = 19.4326, -99.1332
-        distance_to_center = np.sqrt((latitude - center_lat)**2 + (longitude - center_lon)**2)
+        distance_to_center = math.sqrt((latitude - center_lat)**2 + (longitude - center_lon)**2)
         
         # Determinar si es área urbana
         is_urban_area = 1 if distance_to_center < 0.1 else 0
         
         # Preparar features con 8 parámetros
-        features = np.array([[
+        features = (
             wifi_num, device_android, device_ios,
             latitude, longitude, distance_to_center,
             is_urban_area, network_speed
-        ]])
+        )
+        features_done = time.perf_counter()
+        
+        # Predicción con el modelo plegado: producto punto + sigmoide
+        z = self.bias
+        for weight, value in zip(self.weights, features):
+            z += weight * value
+        positive = self._sigmoid(z)
+        prediction = 1 if z > 0 else 0
+        probability = (1.0 - positive, positive)
+        model_done = time.perf_counter()
+        
+        result = self._build_result(
+            prediction, probability, wifi, device, latitude, longitude,
+            distance_to_center, is_urban_area, network_speed
+        )
+        stages = [
+            ('features', features_done - started),
+            ('model', model_done - features_done),
+            ('response', time.perf_counter() - model_done)
+        ]
+        if metrics.ENABLED:
+            metrics.observe_stages('basic', 'single', stages)
+        tracing.record_stages(stages)
+        return result
+    
+    def predict_batch(self, records) -> list:
+        """Predice la calidad de conexión de muchos registros con una sola llamada al modelo
         
-        features_scaled = self.scaler.transform(features)
+        Cada registro es un dict con las mismas llaves que los argumentos de
+        `predict`. Los resultados se regresan en el mismo orden de entrada.
+        """
+        if not self.is_trained:
+            self.train()
+        
+        n = len(records)
+        if n == 0:
+            return []
+        started = time.perf_counter()
+        
+        wifi = np.array([bool(r['wifi']) for r in records])
+        device = [r['device'] for r in records]
+        
+        # Valores por defecto para geocercas si no se proporcionan
+        latitude = np.array([r.get('latitude') for r in records], dtype=float)
+        longitude = np.array([r.get('longitude') for r in records], dtype=float)
+        network_speed = np.array([r.get('network_speed') for r in records], dtype=float)
+        latitude[np.isnan(latitude)] = 19.4326
+        longitude[np.isnan(longitude)] = -99.1332
+        missing = np.isnan(network_speed)
+        network_speed[missing] = np.where(wifi[missing], 10.0, 2.0)
+        
+        # Calcular distancia al centro y área urbana
+        center_lat, center_lon = 19.4326, -99.1332
+        distance_to_center = np.sqrt((latitude - center_lat)**2 + (longitude - center_lon)**2)
+        is_urban_area = distance_to_center < 0.1
         
-        # Predicción
-        prediction = self.model.predict(features_scaled)[0]
-        probability = self.model.predict_proba(features_scaled)[0]
+        features = np.empty((n, 8))
+        features[:, 0] = wifi
+        features[:, 1] = [d == "android" for d in device]
+        features[:, 2] = [d == "ios" for d in device]
+        features[:, 3] = latitude
+        features[:, 4] = longitude
+        features[:, 5] = distance_to_center
+        features[:, 6] = is_urban_area
+        features[:, 7] = network_speed
+        features_done = time.perf_counter()
+        
+        # Predicción con el modelo plegado para todo el lote
+        z = features @ self._weights_array + self.bias
+        with np.errstate(over='ignore'):
+            positive = 1.0 / (1.0 + np.exp(-z))
+        probabilities = np.column_stack([1.0 - positive, positive])
+        predictions = (z > 0).astype(int)
+        model_done = time.perf_counter()
+        
+        results = [
+            self._build_result(
+                predictions[i], probabilities[i], bool(wifi[i]), device[i],
+                float(latitude[i]), float(longitude[i]), float(distance_to_center[i]),
+                int(is_urban_area[i]), float(network_speed[i])
+            )
+            for i in range(n)
+        ]
+        stages = [
+            ('features', features_done - started),
+            ('model', model_done - features_done),
+            ('response', time.perf_counter() - model_done)
+        ]
+        if metrics.ENABLED:
+            metrics.observe_stages('basic', 'batch', stages)
+        tracing.record_stages(stages)
+        return results
+    
+    def _build_result(self, prediction, probability, wifi, device, latitude, longitude,
+                      distance_to_center, is_urban_area, network_speed) -> dict:
+        """Construye el diccionario de respuesta de una predicción"""
+        device_android = device == "android"
+        device_ios = device == "ios"
         
         # Determinar el flujo y calidad
         if prediction == 1:
@@ -166,38 +377,91 @@ class ConnectionQualityClassifier:
         return {
             "flow_type": flow_type,
             "connection_quality": connection_quality,
-            "confidence_score": round(confidence_score, 3),
+            "confidence_score": round(float(confidence_score), 3),
             "prediction_reason": prediction_reason,
             "features_used": 8,
             "location_info": {
-                "latitude": round(latitude, 4),
-                "longitude": round(longitude, 4),
-                "distance_to_center": round(distance_to_center, 4),
+                "latitude": round(float(latitude), 4),
+                "longitude": round(float(longitude), 4),
+                "distance_to_center": round(float(distance_to_center), 4),
                 "is_urban_area": bool(is_urban_area)
             }
         }
     
+    def get_model_data(self) -> dict:
+        """Regresa los objetos entrenados que forman el modelo"""
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'is_trained': self.is_trained
+        }
+    
+    def apply_model_data(self, model_data: dict):
+        """Reemplaza el modelo con los objetos de `get_model_data`"""
+        self.model = model_data['model']
+        self.scaler = model_data['scaler']
+        self.is_trained = model_data['is_trained']
+        if self.is_trained:
+            self._fold_linear_model()
+    
+    def _artifact_contents(self):
+        """Arreglos y metadatos del artefacto: scaler y coeficientes plegados"""
+        arrays = {
+            'scaler.mean': self.scaler.mean_,
+            'scaler.scale': self.scaler.scale_,
+            'weights': self._weights_array
+        }
+        return arrays, {'bias': self.bias}
+    
+    def export_artifact(self, filepath: str) -> str:
+        """Exporta coeficientes y scaler como artefacto mapeable (ver app/artifacts.py)"""
+        return write_artifact(filepath, 'basic', *self._artifact_contents())
+    
+    def artifact_bytes(self) -> bytes:
+        """El mismo artefacto de `export_artifact`, serializado en memoria"""
+        return build_artifact('basic', *self._artifact_contents())
+    
+    def load_artifact(self, source, verify: bool = True):
+        """Carga el modelo plegado desde un artefacto (ruta o `ModelArtifact` ya abierto)"""
+        if isinstance(source, ModelArtifact):
+            artifact = source
+        else:
+            artifact = ModelArtifact(source, verify=verify, expected_kind='basic')
+        self.model = None
+        self.scaler = ArtifactScaler(artifact['scaler.mean'], artifact['scaler.scale'])
+        self._weights_array = artifact['weights']
+        self.weights = self._weights_array.tolist()
+        self.bias = float(artifact.meta['bias'])
+        self.is_trained = True
+    
     def save_model(self, filepath: str = "connection_classifier.joblib"):
-        """Guarda el modelo entrenado"""
+        """Guarda el modelo entrenado (escritura atómica)
+        
+        Con extensión `.artifact` se exporta al formato mapeable; si no, joblib.
+        """
         if self.is_trained:
-            model_data = {
-                'model': self.model,
-                'scaler': self.scaler,
-                'is_trained': self.is_trained
-            }
-            joblib.dump(model_data, filepath)
-            print(f"Modelo guardado en {filepath}")
+            if filepath.endswith(ARTIFACT_SUFFIX):
+                self.export_artifact(filepath)
+            else:
+                if self.model is None:
+                    raise ValueError("Un modelo cargado desde artefacto sólo se puede guardar como artefacto")
+                import joblib
+                with atomic_path(filepath) as tmp_path:
+                    joblib.dump(self.get_model_data(), tmp_path)
+            logger.info("Modelo guardado", extra=fields(model='basic', path=filepath))
     
     def load_model(self, filepath: str = "connection_classifier.joblib"):
-        """Carga un modelo pre-entrenado"""
+        """Carga un modelo pre-entrenado (artefacto mapeable o joblib)"""
         if os.path.exists(filepath):
-            model_data = joblib.load(filepath)
-            self.model = model_data['model']
-            self.scaler = model_data['scaler']
-            self.is_trained = model_data['is_trained']
-            print(f"Modelo cargado desde {filepath}")
+            if is_artifact(filepath):
+                self.load_artifact(filepath)
+            else:
+                import joblib
+                self.apply_model_data(joblib.load(filepath))
+            logger.info("Modelo cargado", extra=fields(model='basic', path=filepath))
         else:
-            print("No se encontró modelo pre-entrenado, entrenando nuevo modelo...")
+            logger.warning("No se encontró modelo pre-entrenado, entrenando nuevo modelo...",
+                           extra=fields(model='basic', path=filepath))
             self.train()
 
 
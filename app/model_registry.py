@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.artifacts import ARTIFACT_SUFFIX, write_atomic
+from app.log import fields, get_logger
+
+logger = get_logger(__name__)
+
+# Tipos de modelo que guarda el registro
+REGISTRY_KINDS = ('basic', 'advanced')
+
+# Archivo con la versión activa de cada tipo de modelo
+ACTIVE_FILE = 'ACTIVE'
+
+# Bitácora de activaciones (una línea JSON por cambio), usada para el rollback
+HISTORY_FILE = 'history.jsonl'
+
+
+class RegistryError(Exception):
+    """Versión inexistente o sin versión anterior a la cual regresar"""
+
+
+class ModelRegistry:
+    """Registro local de versiones de los modelos
+
+    Estructura del directorio:
+
+        <root>/<kind>/versions/<version>.artifact   artefactos inmutables
+        <root>/<kind>/ACTIVE                        versión activa
+        <root>/<kind>/history.jsonl                 activaciones, para el rollback
+
+    La versión es el prefijo del sha256 del artefacto, así que registrar dos
+    veces el mismo modelo no duplica archivos. Cambiar la versión activa es
+    reescribir `ACTIVE` de forma atómica; los procesos que vigilan el
+    registro (ver `RegistryWatcher`) cargan la nueva versión por su cuenta.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        for kind in REGISTRY_KINDS:
+            os.makedirs(os.path.join(root, kind, 'versions'), exist_ok=True)
+
+    def _kind_dir(self, kind: str) -> str:
+        if kind not in REGISTRY_KINDS:
+            raise ValueError(f"Tipo de modelo desconocido: {kind}")
+        return os.path.join(self.root, kind)
+
+    def artifact_path(self, kind: str, version: str) -> str:
+        return os.path.join(self._kind_dir(kind), 'versions', f'{version}{ARTIFACT_SUFFIX}')
+
+    def register(self, kind: str, model, activate: bool = False) -> str:
+        """Guarda el modelo como artefacto con versión por contenido y la regresa"""
+        content = model.artifact_bytes()
+        version = hashlib.sha256(content).hexdigest()[:16]
+        path = self.artifact_path(kind, version)
+        if not os.path.exists(path):
+            write_atomic(path, content)
+            logger.info("🗃️ Modelo registrado", extra=fields(kind=kind, version=version))
+        if activate:
+            self.activate(kind, version)
+        return version
+
+    def versions(self, kind: str) -> list:
+        """Versiones registradas, de la más reciente a la más antigua"""
+        versions_dir = os.path.join(self._kind_dir(kind), 'versions')
+        active = self.active_version(kind)
+        entries = []
+        for name in os.listdir(versions_dir):
+            if not name.endswith(ARTIFACT_SUFFIX):
+                continue
+            stat = os.stat(os.path.join(versions_dir, name))
+            version = name[:-len(ARTIFACT_SUFFIX)]
+            entries.append({
+                'version': version,
+                'registered_at': stat.st_mtime,
+                'size_bytes': stat.st_size,
+                'active': version == active
+            })
+        return sorted(entries, key=lambda entry: entry['registered_at'], reverse=True)
+
+    def active_version(self, kind: str) -> str:
+        """Versión activa de un tipo de modelo, o None si aún no hay ninguna"""
+        try:
+            with open(os.path.join(self._kind_dir(kind), ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, kind: str, version: str, action: str = 'activate'):
+        """Marca una versión registrada como activa"""
+        if not os.path.exists(self.artifact_path(kind, version)):
+            raise RegistryError(f"La versión {version} del modelo '{kind}' no existe")
+        kind_dir = self._kind_dir(kind)
+        previous = self.active_version(kind)
+        write_atomic(os.path.join(kind_dir, ACTIVE_FILE), version.encode())
+        with open(os.path.join(kind_dir, HISTORY_FILE), 'a') as f:
+            f.write(json.dumps({
+                'version': version, 'previous': previous,
+                'action': action, 'at': time.time()
+            }) + '\n')
+
+    def history(self, kind: str) -> list:
+        """Activaciones registradas, de la más antigua a la más reciente"""
+        try:
+            with open(os.path.join(self._kind_dir(kind), HISTORY_FILE)) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def previous_version(self, kind: str) -> str:
+        """Versión que estaba activa antes de la última activación (destino del rollback)"""
+        history = self.history(kind)
+        if not history or not history[-1]['previous']:
+            raise RegistryError(f"El modelo '{kind}' no tiene una versión anterior")
+        return history[-1]['previous']
+
+    def load(self, kind: str, version: str):
+        """Carga una versión registrada en una instancia nueva del clasificador"""
+        path = self.artifact_path(kind, version)
+        if kind == 'basic':
+            from app.ml_model import ConnectionQualityClassifier
+            model = ConnectionQualityClassifier()
+        else:
+            from app.advanced_flow_classifier import AdvancedFlowClassifier
+            model = AdvancedFlowClassifier()
+            model.model_path = path
+        model.load_artifact(path)
+        return model
+
+
+class RegistryWatcher:
+    """Sigue la versión activa del registro y cambia los modelos en caliente
+
+    Cuando `ACTIVE` cambia, la nueva versión se carga en segundo plano, se
+    valida con un lote de prueba y se calienta; sólo entonces se llama a
+    `apply_fn(kind, model, version)`, que intercambia la referencia. Las
+    solicitudes en curso terminan con la instancia anterior. Si la versión
+    nueva falla, se conserva la actual y el error queda en `errors`.
+    """
+
+    def __init__(self, registry: ModelRegistry, apply_fn, interval: float = 1.0):
+        self.registry = registry
+        self.apply_fn = apply_fn
+        self.interval = interval
+        self.loaded = {kind: None for kind in REGISTRY_KINDS}
+        self.errors = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_version(self, kind: str, version: str):
+        from app.startup import warm_up_model
+        from app.training_jobs import validate_model
+
+        model = self.registry.load(kind, version)
+        validate_model(kind, model)
+        warm_up_model(kind, model)
+        return model
+
+    def sync(self) -> dict:
+        """Carga y aplica las versiones activas que cambiaron; regresa `{kind: version}`
+
+        Las versiones de ambos modelos se cargan en paralelo.
+        """
+        with self._lock:
+            pending = {}
+            for kind in REGISTRY_KINDS:
+                version = self.registry.active_version(kind)
+                if version and version != self.loaded[kind] and version != self._failed.get(kind):
+                    pending[kind] = version
+            if not pending:
+                return {}
+
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='registry-load') as pool:
+                futures = {kind: pool.submit(self._load_version, kind, version)
+                           for kind, version in pending.items()}
+
+            applied = {}
+            for kind, future in futures.items():
+                version = pending[kind]
+                try:
+                    model = future.result()
+                except Exception as e:
+                    self._failed[kind] = version
+                    self.errors[kind] = {'version': version, 'error': str(e)}
+                    logger.warning("⚠️ La versión no pasó la validación", extra=fields(
+                        kind=kind, version=version, error=str(e)
+                    ))
+                    continue
+                self.apply_fn(kind, model, version)
+                self.loaded[kind] = version
+                self._failed.pop(kind, None)
+                self.errors.pop(kind, None)
+                applied[kind] = version
+                logger.info("🔁 Modelo en una versión nueva", extra=fields(kind=kind, version=version))
+            return applied
+
+    def activate(self, kind: str, version: str = None, rollback: bool = False) -> str:
+        """Valida una versión y sólo si pasa la marca como activa y la aplica
+
+        Con `rollback=True` y sin versión se regresa a la activa anterior. Si
+        la validación falla la excepción se propaga y nada cambia.
+        """
+        with self._lock:
+            if rollback and version is None:
+                version = self.registry.previous_version(kind)
+            if not os.path.exists(self.registry.artifact_path(kind, version)):
+                raise RegistryError(f"La versión {version} del modelo '{kind}' no existe")
+            model = self._load_version(kind, version)
+            self.registry.activate(kind, version, action='rollback' if rollback else 'activate')
+            self.apply_fn(kind, model, version)
+            self.loaded[kind] = version
+            self._failed.pop(kind, None)
+            self.errors.pop(kind, None)
+            logger.info("🔁 Modelo en una versión nueva", extra=fields(kind=kind, version=version))
+            return version
+
+    def start(self):
+        """Vigila el registro en un hilo de fondo"""
+        self._thread = threading.Thread(target=self._watch, name='registry-watcher', daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning("⚠️ Error revisando el registro de modelos", extra=fields(error=str(e)))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
@@ -0,0 +1,266 @@
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from app.log import fields, get_logger
+
+# Espacio de búsqueda por defecto de cada modelo
+ADVANCED_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 8, 16],
+    'max_features': ['sqrt', 0.5, None]
+}
+BASIC_GRID = {
+    'C': [0.001, 0.01, 0.1, 1.0, 10.0, 100.0]
+}
+
+# Datos y folds del sweep cargados una vez en cada proceso (memory-mapped)
+_worker_data = {}
+
+logger = get_logger(__name__)
+
+
+def dataset_cache_dir(cache_dir: str, kind: str, n_samples: int, seed: int, n_folds: int) -> str:
+    """Directorio de caché de un dataset; la llave incluye todo lo que lo define"""
+    return os.path.join(cache_dir, f'{kind}_{n_samples}_s{seed}_k{n_folds}')
+
+
+def prepare_dataset(kind: str, n_samples: int, seed: int, n_folds: int, cache_dir: str) -> str:
+    """Genera (o reutiliza) el dataset sintético y la asignación de folds
+
+    Se guardan como `X.npy`, `y.npy` y `folds.npy` para que cada trial los
+    abra con memory-map en lugar de regenerarlos o recibirlos serializados.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    path = dataset_cache_dir(cache_dir, kind, n_samples, seed, n_folds)
+    if os.path.exists(os.path.join(path, 'folds.npy')):
+        logger.info('📦 Usando dataset en caché', extra=fields(path=path))
+        return path
+
+    logger.info('🔄 Generando dataset para el sweep', extra=fields(kind=kind, n_samples=n_samples))
+    if kind == 'basic':
+        from app.ml_model import ConnectionQualityClassifier
+        X, y = ConnectionQualityClassifier()._create_training_data(n_samples, seed=seed)
+    else:
+        from app.advanced_flow_classifier import AdvancedFlowClassifier
+        X, y = AdvancedFlowClassifier()._create_advanced_training_data(n_samples, seed=seed)
+
+    folds = np.empty(len(y), dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for fold, (_, test_idx) in enumerate(splitter.split(X, y)):
+        folds[test_idx] = fold
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'X.npy'), X)
+    np.save(os.path.join(path, 'y.npy'), y)
+    # folds.npy se escribe al final: su existencia marca la caché como completa
+    np.save(os.path.join(path, 'folds.npy'), folds)
+    return path
+
+
+def expand_grid(grid: dict) -> list:
+    """Producto cartesiano de un espacio de búsqueda como lista de diccionarios"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def _init_worker(dataset_path: str):
+    """Abre el dataset en caché una sola vez por proceso"""
+    _worker_data['X'] = np.load(os.path.join(dataset_path, 'X.npy'), mmap_mode='r')
+    _worker_data['y'] = np.load(os.path.join(dataset_path, 'y.npy'), mmap_mode='r')
+    _worker_data['folds'] = np.load(os.path.join(dataset_path, 'folds.npy'), mmap_mode='r')
+
+
+def _build_model(kind: str, params: dict):
+    """Crea el clasificador de scikit-learn de un candidato"""
+    if kind == 'basic':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(random_state=42, **params)
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(random_state=42, n_jobs=1, **params)
+
+
+def _run_trial(kind: str, params: dict):
+    """Valida cruzadamente un candidato y regresa su precisión y el último modelo
+
+    El modelo del último fold se regresa para medir su latencia en el proceso
+    principal, sin competir por CPU con los trials que siguen entrenando.
+    """
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    X, y, folds = _worker_data['X'], _worker_data['y'], _worker_data['folds']
+    scores = []
+    started = time.perf_counter()
+    for fold in range(int(folds.max()) + 1):
+        train_mask = folds != fold
+        scaler = StandardScaler().fit(X[train_mask])
+        label_encoder = LabelEncoder().fit(y)
+        model = _build_model(kind, params)
+        model.fit(scaler.transform(X[train_mask]), label_encoder.transform(y[train_mask]))
+        scores.append(model.score(
+            scaler.transform(X[~train_mask]), label_encoder.transform(y[~train_mask])
+        ))
+
+    model_data = {'model': model, 'scaler': scaler, 'is_trained': True}
+    if kind == 'advanced':
+        model_data['label_encoder'] = label_encoder
+    return {
+        'params': params,
+        'accuracy': float(np.mean(scores)),
+        'accuracy_std': float(np.std(scores)),
+        'fit_seconds': round(time.perf_counter() - started, 3)
+    }, model_data
+
+
+def _sample_records(kind: str, X: np.ndarray, n: int) -> list:
+    """Reconstruye solicitudes crudas a partir de filas del dataset"""
+    records = []
+    for row in X[:n]:
+        record = {
+            'wifi': bool(row[0]),
+            'device': 'android' if row[1] else 'ios',
+            'latitude': float(row[3]),
+            'longitude': float(row[4])
+        }
+        if kind == 'basic':
+            record['network_speed'] = float(row[7])
+        else:
+            record['network_speed'] = float(row[8])
+            record['battery_level'] = float(row[9] * 100)
+            record['time_of_day'] = int(round(row[10] * 24)) % 24
+        records.append(record)
+    return records
+
+
+def measure_latency(kind: str, model_data: dict, records: list, repeats: int = 200,
+                    batch_size: int = 256) -> dict:
+    """Latencia de servir el candidato por la misma ruta que usa el servicio
+
+    Regresa p50/p95 de una fila (en µs) y el costo por fila de un lote.
+    """
+    if kind == 'basic':
+        from app.ml_model import ConnectionQualityClassifier
+        classifier = ConnectionQualityClassifier()
+    else:
+        from app.advanced_flow_classifier import AdvancedFlowClassifier
+        from app.prediction_cache import PredictionCache
+        classifier = AdvancedFlowClassifier()
+        # Sin caché: se mide el modelo, no los aciertos repetidos
+        classifier.prediction_cache = PredictionCache(maxsize=0)
+    classifier.apply_model_data(model_data)
+
+    # Calentamiento: la primera llamada paga cachés e imports perezosos
+    for record in records[:20]:
+        classifier.predict(**record)
+
+    single = []
+    for i in range(repeats):
+        record = records[i % len(records)]
+        started = time.perf_counter()
+        classifier.predict(**record)
+        single.append(time.perf_counter() - started)
+
+    batch = (records * (batch_size // len(records) + 1))[:batch_size]
+    classifier.predict_batch(batch)
+    batch_times = []
+    for _ in range(5):
+        started = time.perf_counter()
+        classifier.predict_batch(batch)
+        batch_times.append(time.perf_counter() - started)
+
+    single_us = np.array(single) * 1e6
+    return {
+        'single_p50_us': round(float(np.percentile(single_us, 50)), 1),
+        'single_p95_us': round(float(np.percentile(single_us, 95)), 1),
+        'batch_per_row_us': round(float(np.median(batch_times)) / batch_size * 1e6, 2)
+    }
+
+
+def pareto_front(results: list) -> list:
+    """Candidatos que ningún otro supera en precisión y ambas latencias a la vez"""
+    def dominates(a, b):
+        better_or_equal = (
+            a['accuracy'] >= b['accuracy']
+            and a['single_p50_us'] <= b['single_p50_us']
+            and a['batch_per_row_us'] <= b['batch_per_row_us']
+        )
+        strictly_better = (
+            a['accuracy'] > b['accuracy']
+            or a['single_p50_us'] < b['single_p50_us']
+            or a['batch_per_row_us'] < b['batch_per_row_us']
+        )
+        return better_or_equal and strictly_better
+
+    front = [r for r in results if not any(dominates(other, r) for other in results)]
+    return sorted(front, key=lambda r: r['single_p50_us'])
+
+
+def run_sweep(kind: str = 'advanced', grid: dict = None, n_samples: int = 20000, n_folds: int = 3,
+              seed: int = 42, max_workers: int = None, accuracy_floor: float = 0.0,
+              cache_dir: str = '.sweep_cache') -> dict:
+    """Entrena y valida todos los candidatos en paralelo y arma el reporte
+
+    Los trials corren en un pool de procesos (todos los núcleos por defecto);
+    el dataset y los folds se generan una vez y se comparten vía memory-map.
+    La latencia se mide después, candidato por candidato, en el proceso
+    principal para que las mediciones no se contaminen entre sí.
+    """
+    if kind not in ('basic', 'advanced'):
+        raise ValueError(f"Tipo de modelo desconocido: {kind}")
+    grid = grid or (BASIC_GRID if kind == 'basic' else ADVANCED_GRID)
+    candidates = expand_grid(grid)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    dataset_path = prepare_dataset(kind, n_samples, seed, n_folds, cache_dir)
+    X = np.load(os.path.join(dataset_path, 'X.npy'), mmap_mode='r')
+    folds = np.load(os.path.join(dataset_path, 'folds.npy'), mmap_mode='r')
+    records = _sample_records(kind, np.asarray(X[folds == 0][:64]), 64)
+
+    logger.info('🔬 Iniciando sweep', extra=fields(
+        kind=kind, candidates=len(candidates), n_folds=n_folds, workers=max_workers
+    ))
+    started = time.perf_counter()
+    trials = []
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(dataset_path,)
+    ) as pool:
+        futures = [pool.submit(_run_trial, kind, params) for params in candidates]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result, model_data = future.result()
+            trials.append((result, model_data))
+            logger.info('✅ Candidato validado', extra=fields(
+                done=done, total=len(candidates), params=result['params'],
+                accuracy=round(result['accuracy'], 4), fit_seconds=result['fit_seconds']
+            ))
+    train_seconds = time.perf_counter() - started
+
+    logger.info('⏱️ Midiendo latencia de inferencia', extra=fields(candidates=len(trials)))
+    results = []
+    for result, model_data in trials:
+        result.update(measure_latency(kind, model_data, records))
+        results.append(result)
+    results.sort(key=lambda r: (-r['accuracy'], r['single_p50_us']))
+
+    eligible = [r for r in results if r['accuracy'] >= accuracy_floor]
+    recommended = min(eligible, key=lambda r: r['single_p50_us']) if eligible else None
+
+    return {
+        'kind': kind,
+        'n_samples': n_samples,
+        'n_folds': n_folds,
+        'seed': seed,
+        'workers': max_workers,
+        'accuracy_floor': accuracy_floor,
+        'train_seconds': round(train_seconds, 2),
+        'candidates': results,
+        'pareto_front': pareto_front(results),
+        'recommended': recommended
+    }
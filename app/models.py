@@ -1,5 +1,10 @@
 from enum import Enum
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Máximo de registros aceptados en una predicción por lotes
+MAX_BATCH_SIZE = 10000
 
 
 class DeviceType(str, Enum):
@@ -8,6 +13,12 @@ class DeviceType(str, Enum):
     IOS = "ios"
 
 
+class ModelKind(str, Enum):
+    """Modelos que pueden puntuar registros"""
+    BASIC = "basic"
+    ADVANCED = "advanced"
+
+
 class WebAppExperienceRequest(BaseModel):
     """Modelo para la solicitud de experiencia web y app"""
     wifi: bool
@@ -25,3 +36,19 @@ class WebAppExperienceResponse(BaseModel):
     prediction_reason: str
     features_used: int
     location_info: dict
+
+
+class AdvancedFlowRecord(BaseModel):
+    """Registro individual para la predicción avanzada por lotes"""
+    wifi: bool
+    device: DeviceType
+    latitude: float
+    longitude: float
+    network_speed: Optional[float] = None
+    battery_level: Optional[float] = None
+    time_of_day: Optional[int] = None
+
+
+class AdvancedFlowBatchRequest(BaseModel):
+    """Modelo para la solicitud de predicción avanzada por lotes"""
+    records: List[AdvancedFlowRecord] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
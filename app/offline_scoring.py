@@ -0,0 +1,490 @@
+"""
+Re-puntuación masiva fuera del servicio: datasets en disco por bloques en un pool de procesos
+
+El archivo de entrada (CSV con encabezado, .npy estructurado o directorio
+columnar con un `<columna>.npy` por columna, como en `app/datasets.py`) se
+parte en bloques de `chunk_rows` filas. Cada bloque se puntúa en un proceso
+del pool, que carga el modelo una sola vez al arrancar, y su resultado se
+escribe como un archivo de parte en `<salida>.parts/`. Al terminar, las
+partes se unen en orden en el archivo de salida.
+
+Una parte se escribe primero como temporal y se renombra, así que su
+existencia significa que el bloque está completo: si la corrida se cae,
+volver a lanzarla sólo puntúa los bloques que faltan. `manifest.json` guarda
+la entrada, el modelo y el tamaño de bloque de la corrida para no mezclar
+partes de corridas distintas.
+"""
+
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from app.datasets import StreamProgress, dataset_format
+from app.geo_index import PLUSVALIA_LEVELS
+from app.log import fields, get_logger
+
+# Columnas de entrada; las opcionales pueden faltar o venir vacías (NaN)
+REQUIRED_COLUMNS = ('wifi', 'device', 'latitude', 'longitude')
+OPTIONAL_COLUMNS = ('network_speed', 'battery_level', 'time_of_day')
+
+# Columnas de salida, en orden; `row` es el número de fila en la entrada
+OUTPUT_COLUMNS = (
+    'row', 'flow_type', 'confidence_score', 'zone_name', 'plusvalia',
+    'quality_factor', 'wifi_coverage', 'distance_to_center'
+)
+
+DEVICES = ('android', 'ios')
+
+logger = get_logger(__name__)
+
+# Texto aceptado en la columna `wifi` de un CSV
+WIFI_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+# Línea de una parte CSV con `flow_type` vacío (registro inválido)
+INVALID_CSV_ROW = re.compile(rb'^\d+,,', re.MULTILINE)
+
+MANIFEST_NAME = 'manifest.json'
+
+# Modelo y columnas de entrada abiertos una vez en cada proceso del pool
+_worker_state = {}
+
+
+def output_format(path: str) -> str:
+    """Formato de la salida: 'csv' o 'columnar' (directorio, sin extensión)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension == '' or os.path.isdir(path):
+        return 'columnar'
+    raise ValueError(f"Formato de salida no soportado: {path} (usa .csv o un directorio)")
+
+
+def _open_columns(path: str, fmt: str) -> tuple:
+    """Columnas memory-mapped de un .npy estructurado o de un directorio columnar"""
+    if fmt == 'npy':
+        data = np.load(path, mmap_mode='r')
+        if not data.dtype.names:
+            raise ValueError(f"{path} debe ser un .npy estructurado con una columna por campo")
+        names = data.dtype.names
+        columns = {name: data[name] for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in names}
+    else:
+        columns = {}
+        for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+            column_path = os.path.join(path, f'{name}.npy')
+            if os.path.exists(column_path):
+                columns[name] = np.load(column_path, mmap_mode='r')
+
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Columnas faltantes en {path}: {missing}")
+    lengths = {len(array) for array in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"Las columnas de {path} tienen longitudes distintas")
+    return lengths.pop(), columns
+
+
+def _csv_header(path: str) -> list:
+    with open(path, newline='') as f:
+        header = next(csv.reader(f), None)
+    if header is None:
+        raise ValueError(f"{path} está vacío")
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"Columnas faltantes en {path}: {missing}")
+    return header
+
+
+def _csv_chunks(path: str, chunk_rows: int):
+    """Recorre las líneas de datos de un CSV en bloques de bytes de `chunk_rows` líneas
+
+    El texto se parsea en los workers; el proceso principal sólo corta líneas.
+    Un campo no puede contener saltos de línea.
+    """
+    with open(path, 'rb') as f:
+        f.readline()
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            yield len(lines), b''.join(lines)
+
+
+def _csv_columns(header: list, data: bytes) -> dict:
+    """Columnas de texto de un bloque de líneas CSV; una línea vacía queda inválida"""
+    rows = list(csv.reader(io.StringIO(data.decode('utf-8'))))
+    width = len(header)
+    columns = {}
+    for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+        if name in header:
+            i = header.index(name)
+            columns[name] = [row[i] if len(row) == width else '' for row in rows]
+    return columns
+
+
+def _floats(values) -> np.ndarray:
+    """Convierte una columna a float; lo vacío o no numérico queda como NaN"""
+    array = np.asarray(values)
+    if array.dtype.kind in 'biuf':
+        return array.astype(float)
+    try:
+        return np.array([value if value != '' else 'nan' for value in array.tolist()], dtype=float)
+    except ValueError:
+        result = np.full(len(array), np.nan)
+        for i, value in enumerate(array.tolist()):
+            try:
+                result[i] = float(value)
+            except ValueError:
+                pass
+        return result
+
+
+def parse_columns(columns: dict) -> tuple:
+    """Normaliza las columnas crudas de un bloque y marca las filas válidas
+
+    Regresa `(inputs, valid)`: los argumentos de `score_columns` y una
+    máscara con las filas que tienen `wifi`, `device` y coordenadas válidas.
+    """
+    wifi = np.asarray(columns['wifi'])
+    if wifi.dtype.kind in 'SUO':
+        text = [str(value).strip().lower() for value in wifi.astype('U').tolist()]
+        valid = np.array([value in WIFI_VALUES for value in text], dtype=bool)
+        wifi = np.array([WIFI_VALUES.get(value, False) for value in text], dtype=bool)
+    else:
+        wifi_float = wifi.astype(float)
+        valid = np.isfinite(wifi_float)
+        wifi = wifi_float == 1
+
+    device = np.asarray(columns['device'])
+    device = device.astype('U') if device.dtype.kind in 'SO' else device
+    valid &= np.isin(device, DEVICES)
+
+    inputs = {
+        'wifi': wifi,
+        'device': device,
+        'latitude': _floats(columns['latitude']),
+        'longitude': _floats(columns['longitude'])
+    }
+    valid &= np.isfinite(inputs['latitude']) & np.isfinite(inputs['longitude'])
+    for name in OPTIONAL_COLUMNS:
+        inputs[name] = _floats(columns[name]) if name in columns else None
+    return inputs, valid
+
+
+def score_block(classifier, columns: dict, start: int) -> dict:
+    """Puntúa un bloque y regresa las columnas de salida (ver `OUTPUT_COLUMNS`)
+
+    Las filas inválidas quedan con `flow_type` vacío y NaN en lo numérico.
+    """
+    inputs, valid = parse_columns(columns)
+    n = len(valid)
+    zones = classifier.zone_index
+
+    flow_type = np.full(n, '', dtype=object)
+    confidence = np.full(n, np.nan)
+    zone_ids = np.full(n, -1, dtype=np.int32)
+    distance = np.full(n, np.nan)
+    if valid.any():
+        selected = {name: (values[valid] if values is not None else None)
+                    for name, values in inputs.items()}
+        scores = classifier.score_columns(**selected)
+        flow_type[valid] = scores['flow_type']
+        confidence[valid] = scores['confidence_score']
+        zone_ids[valid] = scores['zone_id']
+        # Fuera de geocerca la distancia es infinita: se escribe vacía, como el null de la API
+        distance[valid] = np.where(np.isfinite(scores['distance_to_center']),
+                                   scores['distance_to_center'], np.nan)
+
+    plusvalia = np.array(PLUSVALIA_LEVELS, dtype=object)[zones.plusvalia_codes[zone_ids]]
+    return {
+        'row': np.arange(start, start + n, dtype=np.int64),
+        'flow_type': flow_type.astype(str),
+        'confidence_score': confidence,
+        'zone_name': np.where(valid, zones.names[zone_ids], '').astype(str),
+        'plusvalia': np.where(valid, plusvalia, '').astype(str),
+        'quality_factor': np.where(valid, zones.quality_factors[zone_ids], np.nan),
+        'wifi_coverage': np.where(valid, zones.wifi_coverage[zone_ids], np.nan),
+        'distance_to_center': distance
+    }
+
+
+def _csv_text(block: dict) -> str:
+    """Líneas CSV (sin encabezado) de un bloque de salida; NaN se escribe vacío"""
+    columns = []
+    for name in OUTPUT_COLUMNS:
+        values = block[name].tolist()
+        if block[name].dtype.kind == 'f':
+            values = ['' if value != value else repr(value) for value in values]
+        columns.append(values)
+    text = io.StringIO()
+    csv.writer(text, lineterminator='\n').writerows(zip(*columns))
+    return text.getvalue()
+
+
+def part_path(parts_dir: str, index: int, fmt: str) -> str:
+    extension = 'csv' if fmt == 'csv' else 'npz'
+    return os.path.join(parts_dir, f'part-{index:08d}.{extension}')
+
+
+def _write_part(path: str, block: dict, fmt: str):
+    """Escribe una parte de forma atómica: temporal y después renombrar"""
+    tmp_path = f'{path}.tmp'
+    if fmt == 'csv':
+        with open(tmp_path, 'w', newline='') as f:
+            f.write(_csv_text(block))
+    else:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **block)
+    os.replace(tmp_path, path)
+
+
+def _load_classifier(model_path: str):
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+
+    classifier = AdvancedFlowClassifier()
+    classifier.model_path = model_path
+    if not classifier.load_model():
+        raise FileNotFoundError(f"No se encontró el modelo {model_path}")
+    return classifier
+
+
+def _init_worker(model_path: str, input_path: str, input_fmt: str):
+    """Carga el modelo y abre las columnas de entrada una sola vez por proceso"""
+    _worker_state['classifier'] = _load_classifier(model_path)
+    if input_fmt == 'csv':
+        _worker_state['header'] = _csv_header(input_path)
+    else:
+        _worker_state['columns'] = _open_columns(input_path, input_fmt)[1]
+
+
+def _score_chunk(index: int, start: int, payload, path: str, fmt: str) -> tuple:
+    """Puntúa un bloque dentro del pool y escribe su parte
+
+    `payload` son las líneas CSV del bloque, o su fila final en un .npy o
+    directorio columnar (los datos se leen del memory-map del worker).
+    Regresa `(índice, filas)`.
+    """
+    if isinstance(payload, bytes):
+        columns = _csv_columns(_worker_state['header'], payload)
+    else:
+        columns = {name: np.asarray(array[start:payload])
+                   for name, array in _worker_state['columns'].items()}
+    block = score_block(_worker_state['classifier'], columns, start)
+    _write_part(path, block, fmt)
+    return index, len(block['row'])
+
+
+def _file_signature(path: str) -> dict:
+    """Tamaño y fecha de modificación de un archivo o de los archivos de un directorio"""
+    paths = [path]
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path))
+    stats = [os.stat(p) for p in paths]
+    return {
+        'path': os.path.abspath(path),
+        'size': sum(stat.st_size for stat in stats),
+        'mtime_ns': max((stat.st_mtime_ns for stat in stats), default=0)
+    }
+
+
+def prepare_parts_dir(parts_dir: str, manifest: dict, restart: bool = False) -> set:
+    """Crea el directorio de partes o valida el de una corrida anterior
+
+    Regresa los índices de los bloques ya terminados. Si las partes son de
+    otra entrada, otro modelo u otro tamaño de bloque se rechazan, salvo
+    con `restart`, que las borra.
+    """
+    manifest_path = os.path.join(parts_dir, MANIFEST_NAME)
+    if restart and os.path.isdir(parts_dir):
+        shutil.rmtree(parts_dir)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(
+                f"Las partes en {parts_dir} son de otra corrida (entrada, modelo o tamaño de "
+                f"bloque distintos); usa --restart para descartarlas"
+            )
+    else:
+        os.makedirs(parts_dir, exist_ok=True)
+        with open(f'{manifest_path}.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+
+    done = set()
+    for name in os.listdir(parts_dir):
+        if name.startswith('part-') and not name.endswith('.tmp'):
+            done.add(int(name[len('part-'):].split('.')[0]))
+        elif name.endswith('.tmp') and name != f'{MANIFEST_NAME}.tmp':
+            # Parte a medio escribir de una corrida que se cayó
+            os.remove(os.path.join(parts_dir, name))
+    return done
+
+
+def merge_parts(parts_dir: str, n_chunks: int, output_path: str, fmt: str) -> tuple:
+    """Une las partes en orden en el archivo de salida (escritura atómica)
+
+    Regresa `(filas, filas_inválidas)` de todas las partes, incluidas las de
+    una corrida anterior que se reanudó. Una fila inválida es la que tiene
+    `flow_type` vacío.
+    """
+    paths = [part_path(parts_dir, index, fmt) for index in range(n_chunks)]
+    tmp_path = f'{output_path}.tmp'
+    rows = 0
+    invalid_rows = 0
+    if fmt == 'csv':
+        with open(tmp_path, 'wb') as out:
+            out.write((','.join(OUTPUT_COLUMNS) + '\n').encode('utf-8'))
+            for path in paths:
+                # Una parte mide a lo más `chunk_rows` filas: se lee completa
+                with open(path, 'rb') as part:
+                    data = part.read()
+                rows += data.count(b'\n')
+                invalid_rows += len(INVALID_CSV_ROW.findall(data))
+                out.write(data)
+        os.replace(tmp_path, output_path)
+        return rows, invalid_rows
+
+    # Columnar: un .npy por columna; los textos toman el ancho máximo de las partes
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    lengths = []
+    for path in paths:
+        with np.load(path) as part:
+            lengths.append(len(part['row']))
+            invalid_rows += int(np.count_nonzero(part['flow_type'] == ''))
+    rows = sum(lengths)
+    for name in OUTPUT_COLUMNS:
+        dtypes = []
+        for path in paths:
+            with np.load(path) as part:
+                dtypes.append(part[name].dtype)
+        column = np.lib.format.open_memmap(
+            os.path.join(tmp_path, f'{name}.npy'), mode='w+',
+            dtype=np.result_type(*dtypes) if dtypes else np.float64, shape=(rows,)
+        )
+        offset = 0
+        for path, length in zip(paths, lengths):
+            with np.load(path) as part:
+                column[offset:offset + length] = part[name]
+            offset += length
+        column.flush()
+        del column
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    os.replace(tmp_path, output_path)
+    return rows, invalid_rows
+
+
+def run_bulk_scoring(input_path: str, output_path: str,
+                     model_path: str = 'advanced_flow_model.joblib',
+                     chunk_rows: int = 100_000, max_workers: int = None,
+                     parts_dir: str = None, keep_parts: bool = False,
+                     restart: bool = False, report_every: float = 5.0) -> dict:
+    """Puntúa `input_path` con el modelo avanzado y escribe `output_path`
+
+    Reanuda los bloques que faltan si `parts_dir` tiene partes de una corrida
+    anterior con la misma entrada, modelo y `chunk_rows`. Regresa un resumen
+    con filas, bloques, filas inválidas y filas/s.
+    """
+    started = time.perf_counter()
+    input_fmt = dataset_format(input_path)
+    fmt = output_format(output_path)
+    parts_dir = parts_dir or f'{output_path}.parts'
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # Validar la entrada antes de lanzar el pool
+    if input_fmt == 'csv':
+        _csv_header(input_path)
+        total_rows = None
+    else:
+        total_rows = _open_columns(input_path, input_fmt)[0]
+
+    manifest = {
+        'input': _file_signature(input_path),
+        'model': _file_signature(model_path),
+        'chunk_rows': chunk_rows,
+        'output_format': fmt
+    }
+    done = prepare_parts_dir(parts_dir, manifest, restart=restart)
+
+    if input_fmt == 'csv':
+        chunks = _csv_chunks(input_path, chunk_rows)
+    else:
+        chunks = ((min(chunk_rows, total_rows - start), min(start + chunk_rows, total_rows))
+                  for start in range(0, total_rows, chunk_rows))
+
+    remaining = None
+    if total_rows is not None:
+        remaining = total_rows - sum(
+            min(chunk_rows, total_rows - index * chunk_rows) for index in done
+            if index * chunk_rows < total_rows
+        )
+    logger.info('🔄 Puntuando archivo', extra=fields(
+        input=input_path, workers=max_workers, chunks_done=len(done)
+    ))
+    progress = StreamProgress('Puntuación', report_every=report_every, total=remaining)
+
+    n_chunks = 0
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(model_path, input_path, input_fmt)
+    )
+    pending = set()
+    try:
+        start = 0
+        for index, (n_rows, payload) in enumerate(chunks):
+            n_chunks = index + 1
+            if index not in done:
+                # Acota los bloques en vuelo: las líneas CSV viajan a los workers
+                while len(pending) >= max_workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _collect(future, progress)
+                pending.add(pool.submit(
+                    _score_chunk, index, start, payload, part_path(parts_dir, index, fmt), fmt
+                ))
+            start += n_rows
+        for future in wait(pending).done:
+            _collect(future, progress)
+    finally:
+        # Si algo falló, los bloques que no han empezado no se puntúan (se reanudan después)
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+    scoring = progress.finish()
+    rows, invalid_rows = merge_parts(parts_dir, n_chunks, output_path, fmt)
+    if not keep_parts:
+        shutil.rmtree(parts_dir)
+
+    return {
+        'input': input_path,
+        'output': output_path,
+        'rows': rows,
+        'chunks': n_chunks,
+        'resumed_chunks': len(done),
+        'scored_rows': scoring['rows'],
+        'invalid_rows': invalid_rows,
+        'workers': max_workers,
+        'scoring_seconds': scoring['seconds'],
+        'rows_per_second': scoring['rows_per_second'],
+        'total_seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def _collect(future, progress: StreamProgress):
+    """Registra el avance de un bloque terminado"""
+    _, n_rows = future.result()
+    progress.update(n_rows)
@@ -0,0 +1,145 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def snap(value, step: float):
+    """Centro de la celda de ancho `step` que contiene a `value` (escalar o arreglo)
+
+    La ruta escalar y la de NumPy hacen las mismas operaciones, así que dan
+    exactamente el mismo flotante. Los valores no finitos se dejan igual.
+    """
+    if isinstance(value, np.ndarray):
+        return (np.floor(value / step) + 0.5) * step
+    if not math.isfinite(value):
+        return value
+    return (math.floor(value / step) + 0.5) * step
+
+
+class PredictionCache:
+    """Caché en proceso de predicciones con desalojo LRU y expiración por TTL
+
+    El modelo avanzado no ve las entradas crudas: `quantize_location` y
+    `quantize_conditions` las llevan al centro de su celda de lat/lon y de su
+    cubeta de velocidad y batería (y a la hora entera) antes de calcular la
+    zona, las features y la llave. Las solicitudes cercanas comparten entrada
+    y un acierto regresa lo mismo que calcularía el modelo sin caché. Es
+    segura para usarse desde varios hilos. Con `maxsize=0` queda deshabilitada
+    (la cuantización se aplica igual).
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, location_step: float = 0.001,
+                 speed_step: float = 1.0, battery_step: float = 10.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.location_step = location_step
+        self.speed_step = speed_step
+        self.battery_step = battery_step
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Crea la caché con la configuración de las variables de entorno"""
+        return cls(
+            maxsize=int(os.getenv('PREDICTION_CACHE_SIZE', '10000')),
+            ttl=float(os.getenv('PREDICTION_CACHE_TTL_SECONDS', '300'))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def quantize_location(self, latitude, longitude) -> tuple:
+        """Centro de la celda de ~`location_step` grados (escalares o arreglos)"""
+        return snap(latitude, self.location_step), snap(longitude, self.location_step)
+
+    def quantize_conditions(self, network_speed, battery_level, time_of_day) -> tuple:
+        """Centro de la cubeta de velocidad y batería (sin pasar de 100%) y hora entera"""
+        battery_level = snap(battery_level, self.battery_step)
+        if isinstance(time_of_day, np.ndarray):
+            return snap(network_speed, self.speed_step), np.minimum(battery_level, 100.0), np.floor(time_of_day)
+        return (snap(network_speed, self.speed_step), min(battery_level, 100.0),
+                math.floor(time_of_day) if math.isfinite(time_of_day) else time_of_day)
+
+    def make_key(self, wifi: bool, device: str, latitude: float, longitude: float,
+                 network_speed: float, battery_level: float, time_of_day: int) -> tuple:
+        """Llave de una solicitud con los valores ya imputados y cuantizados
+
+        Los valores se normalizan a `bool`/`float` para que la ruta escalar y
+        la de lotes (escalares de NumPy) compartan entradas.
+        """
+        return (
+            bool(wifi),
+            device,
+            float(latitude),
+            float(longitude),
+            float(network_speed),
+            float(battery_level),
+            float(time_of_day)
+        )
+
+    def get(self, key):
+        """Regresa el valor guardado para la llave o None si no existe o expiró"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """Guarda un valor desalojando la entrada usada menos recientemente"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self):
+        """Vacía la caché; se llama cada vez que el modelo se entrena o recarga"""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self) -> dict:
+        """Contadores de aciertos, fallos, desalojos y expiraciones"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations
+            }
@@ -0,0 +1,57 @@
+"""
+Serialización JSON de las respuestas con orjson, idéntica byte a byte a la de Starlette
+
+`JSONResponse` de Starlette usa `json.dumps` compacto y sin escapar no-ASCII;
+orjson produce lo mismo salvo en la notación de algunos floats: Python usa
+exponente fuera de [1e-4, 1e16) (`1e-05`, `1e+16`) y orjson escribe
+`0.00001` y `1e16`. Cuando la salida de orjson trae cualquiera de las dos
+formas se serializa de nuevo con `json.dumps`, así que los bytes siempre son
+los mismos; en las respuestas de predicción (valores redondeados) casi
+nunca pasa.
+"""
+
+import json
+
+import orjson
+
+# Tabla para `bytes.translate`: dígitos -> '0', 'e' -> 'e' y todo lo demás -> ' '.
+# Un float con exponente queda con '0e' (p. ej. `1e16` -> `0e00`).
+_DIGITS_AND_E = bytes(
+    ord('0') if chr(i).isdigit() else ord('e') if chr(i) == 'e' else ord(' ')
+    for i in range(128)
+) + b' ' * 128
+
+
+def _float_notation_differs(body: bytes) -> bool:
+    """¿Hay floats que orjson escribe distinto que `json.dumps`?
+
+    Busca exponentes (`1e16`, `1e-5`) y floats menores a 1e-4 (`0.00001`).
+    Todo corre en C (`translate` y búsqueda de subcadenas): una expresión
+    regular tarda más que el propio orjson. Un texto con un dígito seguido
+    de 'e' o con `0.0000` sólo cuesta una serialización extra.
+    """
+    return b'0.0000' in body or b'0e' in body.translate(_DIGITS_AND_E)
+
+
+def dumps_stdlib(content) -> bytes:
+    """Serialización de `JSONResponse.render` de Starlette"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps(content) -> bytes:
+    """JSON compacto en UTF-8 con los mismos bytes que `dumps_stdlib`
+
+    El contenido debe venir ya en tipos nativos (dict, list, str, int, float,
+    bool, None). Lo que orjson no soporta (llaves no str, enteros de más de
+    64 bits) también se delega a `json.dumps`. A diferencia de `json.dumps`,
+    NaN e infinito se escriben como `null` en lugar de fallar.
+    """
+    try:
+        body = orjson.dumps(content)
+    except orjson.JSONEncodeError:
+        return dumps_stdlib(content)
+    if _float_notation_differs(body):
+        return dumps_stdlib(content)
+    return body
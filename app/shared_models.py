@@ -0,0 +1,116 @@
+import mmap
+import os
+import struct
+from multiprocessing import shared_memory
+
+from app.artifacts import ModelArtifact
+
+# Modelos que se publican en memoria compartida
+SHARED_KINDS = ('basic', 'advanced')
+
+# Directorio donde Linux expone los segmentos de memoria compartida POSIX
+SHM_DIR = '/dev/shm'
+
+# Segmento de control: versión publicada (uint64) al inicio
+CONTROL_SIZE = 64
+
+
+def segment_name(prefix: str, kind: str, version: int) -> str:
+    """Nombre del segmento con el artefacto de un modelo en una versión"""
+    return f'{prefix}_{kind}_v{version}'
+
+
+def control_name(prefix: str) -> str:
+    return f'{prefix}_control'
+
+
+class SharedModelPublisher:
+    """Publica los artefactos de los modelos en memoria compartida (proceso padre)
+
+    Cada versión escribe un segmento por modelo con el artefacto completo y,
+    sólo cuando todos están escritos, actualiza la versión en el segmento de
+    control; los workers ven el cambio de versión y cambian de modelo juntos.
+    La versión anterior se conserva para los workers que aún no la sueltan.
+    """
+
+    def __init__(self, prefix: str = None):
+        self.prefix = prefix or f'hkmodels_{os.getpid()}'
+        self.version = 0
+        self._segments = {}
+        self._control = shared_memory.SharedMemory(
+            name=control_name(self.prefix), create=True, size=CONTROL_SIZE
+        )
+        struct.pack_into('<Q', self._control.buf, 0, 0)
+
+    def publish(self, artifacts: dict) -> int:
+        """Publica `{kind: bytes del artefacto}` como una nueva versión y la regresa"""
+        version = self.version + 1
+        segments = []
+        for kind, content in artifacts.items():
+            segment = shared_memory.SharedMemory(
+                name=segment_name(self.prefix, kind, version), create=True, size=len(content)
+            )
+            segment.buf[:len(content)] = content
+            segments.append(segment)
+        self._segments[version] = segments
+
+        # Escritura alineada de 8 bytes: los lectores ven la versión vieja o la nueva
+        struct.pack_into('<Q', self._control.buf, 0, version)
+        self.version = version
+
+        for old_version in [v for v in self._segments if v < version - 1]:
+            self._release(old_version)
+        return version
+
+    def _release(self, version: int):
+        """Desliga los segmentos de una versión; los mapeos existentes siguen válidos"""
+        for segment in self._segments.pop(version):
+            segment.close()
+            segment.unlink()
+
+    def close(self):
+        """Libera todos los segmentos publicados y el de control"""
+        for version in list(self._segments):
+            self._release(version)
+        self._control.close()
+        self._control.unlink()
+
+
+class SharedModelClient:
+    """Lee los modelos publicados en memoria compartida (procesos worker)
+
+    Los segmentos se abren con `mmap` de sólo lectura, así que los arreglos de
+    los modelos son vistas de las mismas páginas físicas en todos los workers
+    y no se pueden modificar. `poll()` es barato (lee 8 bytes) y regresa los
+    artefactos de la nueva versión cuando el padre publica una.
+    """
+
+    def __init__(self, prefix: str):
+        if not os.path.isdir(SHM_DIR):
+            raise RuntimeError(f"La memoria compartida requiere {SHM_DIR} (POSIX)")
+        self.prefix = prefix
+        self.version = 0
+        self._control = self._open(control_name(prefix))
+
+    @staticmethod
+    def _open(name: str) -> mmap.mmap:
+        with open(os.path.join(SHM_DIR, name), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def published_version(self) -> int:
+        """Versión vigente según el segmento de control"""
+        return struct.unpack_from('<Q', self._control, 0)[0]
+
+    def poll(self):
+        """Regresa `(version, {kind: ModelArtifact})` si hay una versión nueva, si no None"""
+        version = self.published_version()
+        if version == 0 or version == self.version:
+            return None
+        artifacts = {}
+        for kind in SHARED_KINDS:
+            name = segment_name(self.prefix, kind, version)
+            artifacts[kind] = ModelArtifact(
+                os.path.join(SHM_DIR, name), expected_kind=kind
+            )
+        self.version = version
+        return version, artifacts
@@ -0,0 +1,84 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+
+# Campos que recibe el modelo básico (el avanzado además usa batería y hora)
+BASIC_FIELDS = ('wifi', 'device', 'latitude', 'longitude', 'network_speed')
+
+
+def default_warmup_size() -> int:
+    """Solicitudes del lote de calentamiento (WARMUP_BATCH_SIZE); 0 lo deshabilita"""
+    return int(os.getenv('WARMUP_BATCH_SIZE', '64'))
+
+
+class StartupTimer:
+    """Mide la duración de cada fase del arranque en milisegundos"""
+
+    def __init__(self, started: float = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def record(self, name: str, seconds: float):
+        """Registra una fase medida por fuera (p. ej. los imports del módulo)"""
+        self.phases[name] = round(seconds * 1000, 1)
+
+    def report(self) -> dict:
+        return {
+            'phases_ms': dict(self.phases),
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 1)
+        }
+
+
+def warmup_records(n: int, seed: int = 0) -> list:
+    """Solicitudes sintéticas repartidas por CDMX, dentro y fuera de las geocercas"""
+    rng = random.Random(seed)
+    return [
+        {
+            'wifi': rng.random() < 0.7,
+            'device': rng.choice(('android', 'ios')),
+            'latitude': rng.uniform(19.0, 20.0),
+            'longitude': rng.uniform(-99.5, -98.5),
+            'network_speed': rng.uniform(0.5, 60.0),
+            'battery_level': rng.uniform(5.0, 100.0),
+            'time_of_day': rng.randrange(24)
+        }
+        for _ in range(n)
+    ]
+
+
+def basic_record(record: dict) -> dict:
+    """Subconjunto de una solicitud que acepta el modelo básico"""
+    return {field: record[field] for field in BASIC_FIELDS}
+
+
+def warm_up_model(kind: str, model, n: int = None):
+    """Corre el lote de calentamiento por todas las rutas de predicción de un modelo
+
+    La primera llamada de cada ruta paga imports perezosos, cachés de NumPy y
+    la construcción de índices; se hace antes de que el modelo reciba tráfico.
+    En el avanzado también se recorre la ruta de scikit-learn (lotes grandes)
+    si el modelo la tiene, y al final se vacía la caché de predicciones.
+    """
+    n = default_warmup_size() if n is None else n
+    if n <= 0 or model is None or not model.is_trained:
+        return
+    records = warmup_records(n)
+    if kind == 'basic':
+        model.predict(**basic_record(records[0]))
+        model.predict_batch([basic_record(record) for record in records])
+        return
+
+    model.predict(**records[0])
+    model.predict_batch(records)
+    if model.model is not None and n <= model.compiled_batch_limit:
+        model.predict_batch(warmup_records(model.compiled_batch_limit + 1, seed=1))
+    model.prediction_cache.invalidate()
@@ -0,0 +1,126 @@
+"""
+Servicio multi-proceso con los modelos compartidos en memoria
+
+El proceso padre carga (o entrena) los modelos una sola vez, los publica en
+memoria compartida y arranca los workers de uvicorn, que se conectan a esos
+segmentos en modo de sólo lectura. Cuando los archivos de modelo cambian
+(p. ej. tras un re-entrenamiento en cualquier worker) el padre publica una
+nueva versión y todos los workers cambian a ella.
+
+Uso:
+    python -m app.supervisor --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import threading
+
+from app.log import fields, get_logger
+from app.shared_models import SharedModelPublisher
+
+logger = get_logger(__name__)
+
+
+class ModelSupervisor:
+    """Carga los modelos en el proceso padre y publica sus versiones"""
+
+    def __init__(self, basic_model_path: str, advanced_model_path: str,
+                 watch_interval: float = 1.0, publisher: SharedModelPublisher = None):
+        self.basic_model_path = basic_model_path
+        self.advanced_model_path = advanced_model_path
+        self.watch_interval = watch_interval
+        self.publisher = publisher or SharedModelPublisher()
+        self._mtimes = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    @classmethod
+    def from_env(cls):
+        """Crea el supervisor con la configuración de las variables de entorno"""
+        return cls(
+            basic_model_path=os.getenv('BASIC_MODEL_PATH', 'connection_classifier.joblib'),
+            advanced_model_path=os.getenv('ADVANCED_MODEL_PATH', 'advanced_flow_model.joblib'),
+            watch_interval=float(os.getenv('SHARED_MODELS_WATCH_SECONDS', '1.0'))
+        )
+
+    def _file_mtimes(self):
+        return tuple(
+            os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            for path in (self.basic_model_path, self.advanced_model_path)
+        )
+
+    def load_models(self) -> dict:
+        """Carga ambos modelos (entrenándolos y guardándolos si faltan)"""
+        from app.advanced_flow_classifier import AdvancedFlowClassifier
+        from app.ml_model import ConnectionQualityClassifier
+
+        basic = ConnectionQualityClassifier()
+        missing_basic = not os.path.exists(self.basic_model_path)
+        basic.load_model(self.basic_model_path)
+        if missing_basic:
+            basic.save_model(self.basic_model_path)
+
+        advanced = AdvancedFlowClassifier()
+        advanced.model_path = self.advanced_model_path
+        if not advanced.load_model():
+            advanced.train()
+
+        return {'basic': basic, 'advanced': advanced}
+
+    def publish(self) -> int:
+        """Carga los modelos actuales de disco y los publica como nueva versión"""
+        self._mtimes = self._file_mtimes()
+        models = self.load_models()
+        version = self.publisher.publish({
+            kind: model.artifact_bytes() for kind, model in models.items()
+        })
+        logger.info("📡 Modelos publicados en memoria compartida", extra=fields(version=version))
+        return version
+
+    def start_watcher(self):
+        """Vigila los archivos de modelo y publica una versión nueva cuando cambian"""
+        self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            if self._file_mtimes() == self._mtimes:
+                continue
+            try:
+                self.publish()
+            except Exception as e:
+                logger.warning("⚠️ Error publicando modelos", extra=fields(error=str(e)))
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.watch_interval * 2)
+        self.publisher.close()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servicio multi-proceso con modelos compartidos")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    supervisor = ModelSupervisor.from_env()
+    supervisor.publish()
+    supervisor.start_watcher()
+
+    # Los workers de uvicorn heredan el entorno y se conectan a estos segmentos
+    os.environ['SHARED_MODELS_PREFIX'] = supervisor.publisher.prefix
+    logger.info("🚀 Iniciando workers con modelos compartidos", extra=fields(
+        workers=args.workers, prefix=supervisor.publisher.prefix
+    ))
+    try:
+        uvicorn.run('app.main:app', host=args.host, port=args.port, workers=args.workers)
+    finally:
+        supervisor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Desglose de tiempos por solicitud (Server-Timing) y trazas muestreadas
+
+Sin perfilar todo el servicio: sólo las solicitudes que lo piden con el
+encabezado `X-Request-Timing: 1`, o el porcentaje muestreado con
+`TRACE_SAMPLE_PERCENT`, llevan una traza. Las rutas de predicción responden
+con `Server-Timing` (parseo, espera en micro-lote y en el pool, geocerca,
+features, caché, escalado, inferencia, respuesta y serialización) y la traza
+se escribe como una línea JSON en `TRACE_FILE`, con rotación por tamaño.
+
+Buscar las solicitudes más lentas en las trazas guardadas:
+    python -m app.tracing traces.jsonl --top 10
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from app.log import fields, get_logger
+
+logger = get_logger(__name__)
+
+# Encabezado con el que un cliente pide el desglose de tiempos de su solicitud
+TRACE_HEADER = b'x-request-timing'
+
+# Rutas con desglose de tiempos: la del modelo básico y todas las del avanzado
+TRACED_PATHS = ('/web-and-app-experience',)
+TRACED_PREFIXES = ('/advanced-flow/',)
+
+# Etapas de los clasificadores -> nombre en `Server-Timing`
+STAGE_NAMES = {
+    'zone': 'zone',
+    'features': 'features',
+    'matrix': 'features',
+    'cache': 'cache',
+    'scaling': 'scaling',
+    'forest': 'inference',
+    'model': 'inference',
+    'response': 'response'
+}
+
+# Orden de las etapas en el encabezado y en las trazas
+TIMING_ORDER = (
+    'parse', 'batch_wait', 'queue', 'zone', 'features', 'cache',
+    'scaling', 'inference', 'response', 'serialize'
+)
+
+_current = contextvars.ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Duraciones acumuladas por etapa de una solicitud
+
+    Las etapas que corren en los hilos del pool se suman con `record_stages`;
+    `mark` mide desde el último punto de control (inicio de la solicitud,
+    fin de la inferencia) hasta ahora, para el parseo y la serialización.
+    """
+
+    def __init__(self, reason: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.total = None
+        self.spans = {}
+        self.batch_sizes = []
+        self._checkpoint = self.started
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def record_stages(self, stages: list):
+        with self._lock:
+            for stage, seconds in stages:
+                name = STAGE_NAMES.get(stage, stage)
+                self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def record_batch(self, size: int):
+        with self._lock:
+            self.batch_sizes.append(size)
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.record(name, now - self._checkpoint)
+        self._checkpoint = now
+
+    def checkpoint(self):
+        self._checkpoint = time.perf_counter()
+
+    def finish(self) -> float:
+        if self.total is None:
+            self.total = time.perf_counter() - self.started
+        return self.total
+
+    def ordered_spans(self) -> list:
+        """`[(etapa, milisegundos), ...]` en el orden de `TIMING_ORDER`"""
+        with self._lock:
+            spans = dict(self.spans)
+        names = [name for name in TIMING_ORDER if name in spans]
+        names += sorted(name for name in spans if name not in TIMING_ORDER)
+        return [(name, spans[name] * 1000) for name in names]
+
+    def server_timing(self) -> str:
+        """Valor del encabezado `Server-Timing` (duraciones en ms)"""
+        parts = [f'{name};dur={ms:.3f}' for name, ms in self.ordered_spans()]
+        parts.append(f'total;dur={self.finish() * 1000:.3f}')
+        return ', '.join(parts)
+
+    def to_dict(self, method: str, path: str, status: int) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'at': time.time(),
+            'method': method,
+            'path': path,
+            'status': status,
+            'reason': self.reason,
+            'total_ms': round(self.finish() * 1000, 3),
+            'stages_ms': {name: round(ms, 3) for name, ms in self.ordered_spans()},
+            'batch_sizes': list(self.batch_sizes)
+        }
+
+
+class TraceGroup:
+    """Reparte las etapas de un micro-lote entre las solicitudes que lo forman
+
+    Cada solicitud esperó el lote completo, así que a cada una se le suma la
+    duración total de cada etapa.
+    """
+
+    def __init__(self, traces: list):
+        self.traces = traces
+
+    def record(self, name: str, seconds: float):
+        for trace in self.traces:
+            trace.record(name, seconds)
+
+    def record_stages(self, stages: list):
+        for trace in self.traces:
+            trace.record_stages(stages)
+
+
+def current():
+    """Traza de la solicitud en curso, o None si no se está trazando"""
+    return _current.get()
+
+
+@contextmanager
+def use(trace):
+    """Hace de `trace` (una traza o un `TraceGroup`) la traza en curso"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, seconds: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, seconds)
+
+
+def record_stages(stages: list):
+    """Suma las etapas `[(nombre, segundos), ...]` de una predicción a la traza en curso"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record_stages(stages)
+
+
+def mark(name: str):
+    trace = _current.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+def checkpoint():
+    trace = _current.get()
+    if trace is not None:
+        trace.checkpoint()
+
+
+def is_traced_path(path: str) -> bool:
+    return path in TRACED_PATHS or path.startswith(TRACED_PREFIXES)
+
+
+class TraceWriter:
+    """Escribe las trazas como líneas JSON en un archivo que rota por tamaño
+
+    Las solicitudes sólo agregan su traza a un buffer circular en memoria (si
+    se llena se descartan las más viejas); un hilo de fondo lo vacía al
+    archivo cada `flush_interval` segundos. Cuando el archivo pasa de
+    `max_bytes` se renombra a `.1` (y los anteriores a `.2`, ...), conservando
+    `backups` archivos viejos.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, backups: int = 3,
+                 buffer_size: int = 1000, flush_interval: float = 1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Crea el escritor con la configuración de las variables de entorno"""
+        return cls(
+            path=os.getenv('TRACE_FILE', 'traces.jsonl'),
+            max_bytes=int(os.getenv('TRACE_FILE_MAX_BYTES', str(5 * 1024 * 1024))),
+            backups=int(os.getenv('TRACE_FILE_BACKUPS', '3')),
+            buffer_size=int(os.getenv('TRACE_BUFFER_SIZE', '1000'))
+        )
+
+    def write(self, trace: dict):
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(trace)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name='trace-writer', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("⚠️ Error escribiendo trazas", extra=fields(path=self.path, error=str(e)))
+
+    def flush(self):
+        """Vacía el buffer al archivo y rota si pasó del tamaño máximo"""
+        with self._flush_lock:
+            lines = []
+            while self._buffer:
+                lines.append(json.dumps(self._buffer.popleft()) + '\n')
+            if not lines:
+                return
+            with open(self.path, 'a') as f:
+                f.writelines(lines)
+                size = f.tell()
+            self.written += len(lines)
+            if size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+
+class TracingMiddleware:
+    """Middleware ASGI que traza las solicitudes que lo piden o salen en la muestra
+
+    Las solicitudes trazadas responden con `Server-Timing` y `X-Trace-Id`, y
+    su traza se manda a `writer`. El resto sólo paga revisar la ruta.
+    """
+
+    def __init__(self, app, writer: TraceWriter = None, sample_percent: float = 0.0):
+        self.app = app
+        self.writer = writer
+        self.sample_percent = sample_percent
+
+    def _reason(self, scope):
+        for name, value in scope['headers']:
+            if name == TRACE_HEADER:
+                if value.lower() in (b'1', b'true', b'yes'):
+                    return 'header'
+                break
+        if self.sample_percent > 0 and random.random() * 100 < self.sample_percent:
+            return 'sampled'
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not is_traced_path(scope['path']):
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(reason)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', trace.server_timing().encode()))
+                headers.append((b'x-trace-id', trace.trace_id.encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            with use(trace):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.writer is not None:
+                self.writer.write(trace.to_dict(scope['method'], scope['path'], status))
+
+
+def read_traces(path: str) -> list:
+    """Trazas del archivo y de sus rotaciones (`.1`, `.2`, ...)"""
+    paths = [path]
+    i = 1
+    while os.path.exists(f'{path}.{i}'):
+        paths.append(f'{path}.{i}')
+        i += 1
+    traces = []
+    for trace_path in paths:
+        if not os.path.exists(trace_path):
+            continue
+        with open(trace_path) as f:
+            traces.extend(json.loads(line) for line in f if line.strip())
+    return traces
+
+
+def slowest(traces: list, top: int = 10) -> list:
+    return sorted(traces, key=lambda trace: trace['total_ms'], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solicitudes más lentas de las trazas guardadas")
+    parser.add_argument('path', nargs='?', default=os.getenv('TRACE_FILE', 'traces.jsonl'))
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    traces = read_traces(args.path)
+    if not traces:
+        print(f"⚠️ No hay trazas en {args.path}")
+        return
+    totals = sorted(trace['total_ms'] for trace in traces)
+    p50 = totals[len(totals) // 2]
+    p99 = totals[min(len(totals) - 1, int(len(totals) * 0.99))]
+    print(f"🔎 {len(traces)} trazas: p50={p50:.2f} ms, p99={p99:.2f} ms, max={totals[-1]:.2f} ms")
+    for trace in slowest(traces, args.top):
+        stages = ', '.join(f'{name}={ms:.2f}' for name, ms in trace['stages_ms'].items())
+        print(f"   {trace['total_ms']:8.2f} ms  {trace['method']} {trace['path']} "
+              f"[{trace['status']}] {trace['trace_id']}  {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from app.log import fields, get_logger
+
+logger = get_logger(__name__)
+
+# Tipos de modelo que se pueden entrenar como trabajo en segundo plano
+MODEL_KINDS = ('basic', 'advanced')
+
+# Estados de un trabajo de entrenamiento
+JOB_STATES = ('queued', 'running', 'validating', 'publishing', 'succeeded', 'failed')
+
+# Registros de prueba con los que se valida un modelo recién entrenado
+VALIDATION_RECORDS = [
+    {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000,
+     'network_speed': 25.0, 'battery_level': 85.0, 'time_of_day': 14},
+    {'wifi': False, 'device': 'android', 'latitude': 19.3550, 'longitude': -99.0900,
+     'network_speed': 3.0, 'battery_level': 15.0, 'time_of_day': 8},
+    {'wifi': True, 'device': 'android', 'latitude': 19.9000, 'longitude': -99.4000,
+     'network_speed': 12.0, 'battery_level': 50.0, 'time_of_day': 9},
+    {'wifi': True, 'device': 'ios', 'latitude': 19.4326, 'longitude': -99.1332,
+     'network_speed': None, 'battery_level': None, 'time_of_day': None}
+]
+
+
+class TrainingConflictError(Exception):
+    """Ya hay un trabajo en curso para el mismo tipo de modelo"""
+
+
+class ModelValidationError(Exception):
+    """El modelo entrenado no pasó la validación previa a publicarse"""
+
+
+def _new_model(kind: str):
+    """Instancia vacía del clasificador de un tipo"""
+    if kind == 'basic':
+        from app.ml_model import ConnectionQualityClassifier
+        return ConnectionQualityClassifier()
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+    return AdvancedFlowClassifier()
+
+
+def _train_in_child(kind: str, conn, dataset_path: str = None):
+    """Punto de entrada del proceso hijo: entrena y manda el resultado por el pipe
+
+    El proceso baja su prioridad para no competir con los workers que sirven
+    predicciones; no escribe nada a disco, el padre decide si se publica.
+    """
+    try:
+        if hasattr(os, 'nice'):
+            os.nice(10)
+        conn.send(('phase', 'running'))
+        model = _new_model(kind)
+        if dataset_path and kind == 'basic':
+            metrics = model.train_from_dataset(dataset_path)
+        elif dataset_path:
+            metrics = model.train_from_dataset(dataset_path, save=False)
+        elif kind == 'basic':
+            metrics = model.train()
+        else:
+            metrics = model.train(save=False)
+        conn.send(('result', model.get_model_data(), metrics))
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _to_native(value):
+    """Convierte escalares y diccionarios de NumPy a tipos nativos serializables"""
+    if isinstance(value, dict):
+        return {_to_native(key): _to_native(item) for key, item in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def validate_model(kind: str, model):
+    """Verifica que un modelo nuevo prediga valores sanos antes de publicarlo"""
+    if not model.is_trained:
+        raise ModelValidationError("El modelo no quedó entrenado")
+
+    if kind == 'basic':
+        records = [
+            {key: record[key] for key in ('wifi', 'device', 'latitude', 'longitude', 'network_speed')}
+            for record in VALIDATION_RECORDS
+        ]
+        results = model.predict_batch(records)
+        valid_flows = ('flow-1', 'flow-2')
+    else:
+        from app.advanced_flow_classifier import FLOW_NAMES
+        results = model.predict_batch(VALIDATION_RECORDS)
+        valid_flows = tuple(FLOW_NAMES)
+
+    for result in results:
+        if result['flow_type'] not in valid_flows:
+            raise ModelValidationError(f"Flujo inválido: {result['flow_type']}")
+        confidence = result['confidence_score']
+        if not (np.isfinite(confidence) and 0.0 <= confidence <= 1.0):
+            raise ModelValidationError(f"Confianza fuera de rango: {confidence}")
+
+
+class TrainingJobManager:
+    """Corre entrenamientos en procesos separados y publica el modelo al terminar
+
+    Cada trabajo entrena en un proceso hijo (contexto spawn) con prioridad
+    baja, así el event loop y el pool de inferencia no se detienen. Un hilo
+    del proceso principal espera el resultado, reconstruye el modelo en una
+    instancia nueva, lo valida y sólo entonces llama a `publish_fn(kind, model)`,
+    que hace el intercambio atómico de la referencia. Sólo se permite un
+    trabajo en curso por tipo de modelo.
+    """
+
+    def __init__(self, publish_fn, min_accuracy: float = 0.0, max_history: int = 50):
+        self.publish_fn = publish_fn
+        self.min_accuracy = min_accuracy
+        self.max_history = max_history
+
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context('spawn')
+
+    @classmethod
+    def from_env(cls, publish_fn):
+        """Crea el administrador con la configuración de las variables de entorno"""
+        return cls(
+            publish_fn,
+            min_accuracy=float(os.getenv('TRAINING_MIN_ACCURACY', '0.0'))
+        )
+
+    def submit(self, kind: str, dataset_path: str = None) -> dict:
+        """Encola un entrenamiento y regresa el estado inicial del trabajo
+
+        Sin `dataset_path` se entrena con datos sintéticos; con él, por
+        streaming desde el dataset en disco (ver `app/datasets.py`).
+        """
+        if kind not in MODEL_KINDS:
+            raise ValueError(f"Tipo de modelo desconocido: {kind}")
+        if dataset_path is not None and not os.path.exists(dataset_path):
+            raise ValueError(f"No existe el dataset: {dataset_path}")
+
+        with self._lock:
+            if kind in self._active:
+                raise TrainingConflictError(
+                    f"Ya hay un entrenamiento '{kind}' en curso: {self._active[kind]}"
+                )
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'kind': kind,
+                'dataset_path': dataset_path,
+                'status': 'queued',
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'phase_durations': {},
+                'metrics': None,
+                'error': None
+            }
+            self._jobs[job_id] = job
+            self._active[kind] = job_id
+            self._trim_history()
+
+        thread = threading.Thread(
+            target=self._run_job, args=(job_id,), name=f'training-{kind}', daemon=True
+        )
+        thread.start()
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        """Copia del estado de un trabajo o None si no existe"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def list(self) -> list:
+        """Estado de los trabajos, del más reciente al más antiguo"""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job['created_at'], reverse=True)
+            return [self._snapshot(job) for job in jobs]
+
+    def _snapshot(self, job: dict) -> dict:
+        snapshot = dict(job)
+        snapshot['phase_durations'] = dict(job['phase_durations'])
+        return snapshot
+
+    def _trim_history(self):
+        """Descarta los trabajos terminados más antiguos"""
+        finished = [
+            job for job in self._jobs.values() if job['status'] in ('succeeded', 'failed')
+        ]
+        finished.sort(key=lambda job: job['created_at'])
+        while len(self._jobs) > self.max_history and finished:
+            del self._jobs[finished.pop(0)['job_id']]
+
+    def _set_phase(self, job_id: str, status: str, phase_started: dict):
+        """Cambia de fase registrando la duración de la anterior"""
+        now = time.perf_counter()
+        with self._lock:
+            job = self._jobs[job_id]
+            previous = job['status']
+            if previous in phase_started:
+                job['phase_durations'][previous] = round(now - phase_started[previous], 3)
+            if status == 'running' and job['started_at'] is None:
+                job['started_at'] = time.time()
+            job['status'] = status
+        phase_started[status] = now
+
+    def _run_job(self, job_id: str):
+        """Supervisa el proceso hijo, valida y publica el modelo resultante"""
+        kind = self._jobs[job_id]['kind']
+        dataset_path = self._jobs[job_id]['dataset_path']
+        phase_started = {'queued': time.perf_counter()}
+        parent_conn, child_conn = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_train_in_child, args=(kind, child_conn, dataset_path), name=f'training-{kind}'
+        )
+
+        try:
+            process.start()
+            child_conn.close()
+
+            model_data = metrics = None
+            while True:
+                try:
+                    message = parent_conn.recv()
+                except EOFError:
+                    raise RuntimeError("El proceso de entrenamiento terminó sin resultado")
+                if message[0] == 'phase':
+                    self._set_phase(job_id, message[1], phase_started)
+                elif message[0] == 'error':
+                    raise RuntimeError(message[1])
+                else:
+                    _, model_data, metrics = message
+                    break
+            process.join()
+
+            self._set_phase(job_id, 'validating', phase_started)
+            model = _new_model(kind)
+            model.apply_model_data(model_data)
+            validate_model(kind, model)
+            accuracy = float(metrics.get('accuracy', 0.0))
+            if accuracy < self.min_accuracy:
+                raise ModelValidationError(
+                    f"Precisión {accuracy:.3f} menor al mínimo {self.min_accuracy:.3f}"
+                )
+
+            self._set_phase(job_id, 'publishing', phase_started)
+            self.publish_fn(kind, model)
+
+            with self._lock:
+                self._jobs[job_id]['metrics'] = _to_native(metrics)
+            self._set_phase(job_id, 'succeeded', phase_started)
+        except Exception as e:
+            logger.error("❌ Error en entrenamiento", extra=fields(kind=kind, job_id=job_id, error=str(e)))
+            with self._lock:
+                self._jobs[job_id]['error'] = str(e)
+            self._set_phase(job_id, 'failed', phase_started)
+            if process.is_alive():
+                process.terminate()
+        finally:
+            parent_conn.close()
+            if process.pid is not None:
+                process.join(timeout=1)
+            with self._lock:
+                self._jobs[job_id]['finished_at'] = time.time()
+                self._active.pop(kind, None)
@@ -0,0 +1,345 @@
+"""
+Raster precalculado de geocercas para resolver la zona de un punto en O(1)
+
+Las features de zona (`zone_name`, `plusvalia`, `quality_factor`,
+`wifi_coverage`, `distance_to_center`) sólo dependen de la latitud y la
+longitud. `rasterize_zones` divide el rectángulo de CDMX del entrenamiento en
+celdas de `resolution` grados y guarda por celda un entero:
+
+- el id de la zona cuando toda la celda cae dentro de esa única zona,
+- -1 cuando toda la celda queda fuera de todas las zonas,
+- `UNRESOLVED_ZONE` cuando la cruza algún borde o la cubren dos zonas que se
+  traslapan (ahí el ganador depende del punto exacto).
+
+Sólo las celdas del último tipo, y los puntos fuera del rectángulo, pasan por
+la búsqueda exacta del índice. La distancia al centro se calcula siempre con
+el punto real, así que el resultado es idéntico al de la búsqueda exacta; la
+resolución sólo cambia qué fracción de los puntos cae en celdas de borde.
+
+El raster se guarda como artefacto (app/artifacts.py) y se abre con mmap. Su
+encabezado guarda la huella de `geo_zones`, el rectángulo y la resolución:
+`load_or_build_raster` lo reconstruye cuando cualquiera de ellos cambia.
+"""
+
+import hashlib
+import json
+import math
+import time
+
+import numpy as np
+
+from app.artifacts import ArtifactError, ModelArtifact, build_artifact, write_atomic
+from app.geo_index import UNRESOLVED_ZONE
+from app.log import fields, get_logger
+
+logger = get_logger(__name__)
+
+RASTER_KIND = 'zone_raster'
+
+# Sube cuando cambie la forma de clasificar las celdas: invalida los rasters guardados
+RASTER_VERSION = 1
+
+# Rectángulo de coordenadas del entrenamiento: (lat_min, lon_min, lat_max, lon_max)
+CDMX_BOUNDS = (19.0, -99.5, 20.0, -98.5)
+
+# Grados por celda: 0.001° (~110 m) da 1000x1000 celdas, 2 MB con ids int16
+DEFAULT_RESOLUTION = 0.001
+
+# Holgura al decidir si un borde toca una celda (cubre el redondeo de `floor`)
+CELL_MARGIN = 1e-9
+
+# Pares (celda, arista) por paso al probar un polígono contra los centros de celda
+RASTERIZE_BLOCK = 1 << 22
+
+
+def zones_fingerprint(geo_zones: dict) -> str:
+    """sha256 de las geocercas en orden (el orden define los ids de zona)"""
+    payload = json.dumps([RASTER_VERSION, list(geo_zones.items())], sort_keys=True, default=float)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ZoneRaster:
+    """Raster de ids de zona abierto desde un artefacto (o desde memoria)"""
+
+    def __init__(self, artifact: ModelArtifact):
+        meta = artifact.meta
+        self.path = artifact.path
+        self.fingerprint = meta['zones_fingerprint']
+        self.resolution = meta['resolution']
+        self.lat_min, self.lon_min = meta['origin']
+        self.n_rows, self.n_cols = meta['shape']
+        self.lat_max = self.lat_min + self.n_rows * self.resolution
+        self.lon_max = self.lon_min + self.n_cols * self.resolution
+        self.unresolved_fraction = meta['unresolved_fraction']
+        self.zones = artifact['zones']
+
+        # La vista plana de memoryview regresa enteros de Python sin pasar por NumPy
+        self._artifact = artifact
+        self._cells = memoryview(self.zones.reshape(-1))
+
+    def lookup(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """Id de zona por punto; `UNRESOLVED_ZONE` en celdas de borde y fuera del raster"""
+        with np.errstate(invalid='ignore'):
+            rows = np.floor((latitude - self.lat_min) / self.resolution)
+            cols = np.floor((longitude - self.lon_min) / self.resolution)
+            inside = (rows >= 0) & (rows < self.n_rows) & (cols >= 0) & (cols < self.n_cols)
+        cells = np.where(inside, rows * self.n_cols + cols, 0).astype(np.intp)
+        return np.where(inside, self.zones.reshape(-1)[cells], UNRESOLVED_ZONE)
+
+    def lookup_point(self, latitude: float, longitude: float) -> int:
+        """Versión escalar de `lookup`: un acceso al arreglo"""
+        if not (self.lat_min <= latitude < self.lat_max and self.lon_min <= longitude < self.lon_max):
+            return UNRESOLVED_ZONE
+        row = math.floor((latitude - self.lat_min) / self.resolution)
+        col = math.floor((longitude - self.lon_min) / self.resolution)
+        if row >= self.n_rows or col >= self.n_cols:
+            return UNRESOLVED_ZONE
+        return self._cells[row * self.n_cols + col]
+
+
+def _grid_shape(bounds: tuple, resolution: float) -> tuple:
+    lat_min, lon_min, lat_max, lon_max = bounds
+    # El redondeo evita una fila de más cuando el lado es múltiplo exacto de la resolución
+    n_rows = math.ceil(round((lat_max - lat_min) / resolution, 6))
+    n_cols = math.ceil(round((lon_max - lon_min) / resolution, 6))
+    return n_rows, n_cols
+
+
+def _polygon_inside(index, zone_id: int, lat_centers: np.ndarray, lon_centers: np.ndarray) -> np.ndarray:
+    """Regla par-impar de `PolygonZoneIndex` en los centros de una ventana de celdas"""
+    edges = np.arange(index.edge_starts[zone_id], index.edge_starts[zone_id + 1])
+    y1, y2 = index.edge_y1[edges], index.edge_y2[edges]
+    x1, slope = index.edge_x1[edges], index.edge_slope[edges]
+
+    inside = np.zeros((len(lat_centers), len(lon_centers)), dtype=bool)
+    step = max(1, RASTERIZE_BLOCK // max(1, len(edges) * len(lon_centers)))
+    for start in range(0, len(lat_centers), step):
+        lat = lat_centers[start:start + step, None]
+        straddles = (y1 > lat) != (y2 > lat)
+        x_cross = x1 + (lat - y1) * slope
+        crossings = straddles[:, None, :] & (lon_centers[None, :, None] < x_cross[:, None, :])
+        inside[start:start + step] = np.count_nonzero(crossings, axis=2) % 2 == 1
+    return inside
+
+
+def _mark_edges(index, boundary: np.ndarray, bounds: tuple, resolution: float):
+    """Marca en `boundary` todas las celdas que atraviesan las aristas de los polígonos
+
+    Por cada fila de celdas que cruza una arista se toma el tramo de la arista
+    dentro de la fila (con `CELL_MARGIN` de holgura) y se marcan las columnas
+    entre sus extremos.
+    """
+    x1, y1, x2, y2 = index.edge_x1, index.edge_y1, index.edge_x2, index.edge_y2
+    n_rows, n_cols = boundary.shape
+    y_low, y_high = np.minimum(y1, y2), np.maximum(y1, y2)
+    first = np.floor((y_low - CELL_MARGIN - bounds[0]) / resolution).astype(np.int64).clip(0, n_rows)
+    last = np.floor((y_high + CELL_MARGIN - bounds[0]) / resolution).astype(np.int64).clip(-1, n_rows - 1)
+    counts = (last - first + 1).clip(0)
+
+    # Un par (arista, fila) por cada fila que cruza la arista
+    pair_edge = np.repeat(np.arange(len(counts)), counts)
+    rows = first[pair_edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    low = np.maximum(bounds[0] + rows * resolution - CELL_MARGIN, y_low[pair_edge])
+    high = np.minimum(bounds[0] + (rows + 1) * resolution + CELL_MARGIN, y_high[pair_edge])
+
+    # Extremos del tramo en longitud; una arista horizontal ocupa de x1 a x2
+    horizontal = y1[pair_edge] == y2[pair_edge]
+    slope = index.edge_slope[pair_edge]
+    x_low = np.where(horizontal, x1[pair_edge], x1[pair_edge] + (low - y1[pair_edge]) * slope)
+    x_high = np.where(horizontal, x2[pair_edge], x1[pair_edge] + (high - y1[pair_edge]) * slope)
+    col_first = np.floor((np.minimum(x_low, x_high) - CELL_MARGIN - bounds[1]) / resolution)
+    col_last = np.floor((np.maximum(x_low, x_high) + CELL_MARGIN - bounds[1]) / resolution)
+    col_first = col_first.astype(np.int64).clip(0, n_cols)
+    col_last = col_last.astype(np.int64).clip(-1, n_cols - 1)
+    widths = (col_last - col_first + 1).clip(0)
+
+    pair_of_cell = np.repeat(np.arange(len(widths)), widths)
+    cols = col_first[pair_of_cell] + np.arange(widths.sum()) - np.repeat(np.cumsum(widths) - widths, widths)
+    boundary[rows[pair_of_cell], cols] = True
+
+
+def rasterize_zones(index, bounds: tuple = CDMX_BOUNDS, resolution: float = DEFAULT_RESOLUTION) -> np.ndarray:
+    """Clasifica cada celda del rectángulo: id de zona, -1 o `UNRESOLVED_ZONE`
+
+    Una celda se resuelve cuando ningún borde la toca (su pertenencia a cada
+    zona es la de su centro) y a lo más una zona la contiene.
+    """
+    n_rows, n_cols = _grid_shape(bounds, resolution)
+    owner = np.full((n_rows, n_cols), -1, dtype=np.int32)
+    owners = np.zeros((n_rows, n_cols), dtype=np.int32)
+    boundary = np.zeros((n_rows, n_cols), dtype=bool)
+    is_polygon = getattr(index, 'is_polygon', np.zeros(len(index), dtype=bool))
+    if is_polygon.any():
+        _mark_edges(index, boundary, bounds, resolution)
+
+    # Ventana de celdas de cada zona: su rectángulo más una celda de holgura
+    low, high = index._zone_bounds()
+    first = (np.floor((low - bounds[:2]) / resolution).astype(np.int64) - 1).clip(0)
+    last = np.minimum(np.floor((high - bounds[:2]) / resolution).astype(np.int64) + 2, (n_rows, n_cols))
+    half_diagonal = resolution * math.sqrt(2) / 2 + CELL_MARGIN
+
+    for zone_id, (row0, col0), (row1, col1) in zip(range(len(index)), first.tolist(), last.tolist()):
+        if row0 >= row1 or col0 >= col1:
+            continue
+
+        lat_centers = bounds[0] + (np.arange(row0, row1) + 0.5) * resolution
+        lon_centers = bounds[1] + (np.arange(col0, col1) + 0.5) * resolution
+        window = (slice(row0, row1), slice(col0, col1))
+        if is_polygon[zone_id]:
+            inside = _polygon_inside(index, zone_id, lat_centers, lon_centers)
+        else:
+            center_lat, center_lon = index.centers[zone_id]
+            distance = np.sqrt((lat_centers[:, None] - center_lat) ** 2 + (lon_centers[None, :] - center_lon) ** 2)
+            radius = index.radii[zone_id]
+            inside = distance <= radius
+            boundary[window] |= np.abs(distance - radius) <= half_diagonal
+
+        owners[window] += inside
+        owner[window][inside] = zone_id
+
+    zones = np.where(boundary | (owners > 1), UNRESOLVED_ZONE, owner)
+    dtype = np.int16 if len(index) < np.iinfo(np.int16).max else np.int32
+    return zones.astype(dtype)
+
+
+def boundary_points(index, resolution: float, max_points: int = 50_000, seed: int = 0) -> tuple:
+    """Puntos sobre y junto a los bordes de cada zona, para comparar con la búsqueda exacta
+
+    Círculos: puntos sobre la circunferencia desplazados radialmente de -1 a 1
+    celdas. Polígonos: puntos sobre aristas al azar desplazados de la misma forma
+    en perpendicular (incluye vértices y el borde exacto). Hasta 64 puntos por
+    zona y `max_points` en total.
+    """
+    rng = np.random.default_rng(seed)
+    per_zone = int(np.clip(max_points // max(1, len(index)), 1, 64))
+    offsets = np.array([-resolution, -resolution / 2, -1e-7, 0.0, 1e-7, resolution / 2, resolution])
+    is_polygon = getattr(index, 'is_polygon', np.zeros(len(index), dtype=bool))
+    latitude, longitude = [], []
+    for zone_id in range(len(index)):
+        shift = offsets[rng.integers(0, len(offsets), per_zone)]
+        if is_polygon[zone_id]:
+            edges = rng.integers(index.edge_starts[zone_id], index.edge_starts[zone_id + 1], per_zone)
+            t = rng.random(per_zone)
+            t[:per_zone // 8] = 0.0
+            dx = index.edge_x2[edges] - index.edge_x1[edges]
+            dy = index.edge_y2[edges] - index.edge_y1[edges]
+            length = np.hypot(dx, dy).clip(1e-12)
+            latitude.append(index.edge_y1[edges] + t * dy + shift * dx / length)
+            longitude.append(index.edge_x1[edges] + t * dx - shift * dy / length)
+        else:
+            angle = rng.uniform(0, 2 * np.pi, per_zone)
+            radius = index.radii[zone_id] + shift
+            latitude.append(index.centers[zone_id, 0] + radius * np.sin(angle))
+            longitude.append(index.centers[zone_id, 1] + radius * np.cos(angle))
+    if not latitude:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(latitude), np.concatenate(longitude)
+
+
+def check_raster(index, raster: ZoneRaster, bounds: tuple = CDMX_BOUNDS, n_random: int = 20_000,
+                 max_boundary_points: int = 50_000, max_single_points: int = 5_000, seed: int = 0) -> dict:
+    """Compara el raster contra la búsqueda exacta en bordes de zona y puntos al azar
+
+    Todos los puntos se comparan por lote y hasta `max_single_points` también
+    por punto. Regresa los puntos comparados, cuántos difieren (en id o
+    distancia) y la fracción de los puntos de borde que el raster no resolvió.
+    """
+    rng = np.random.default_rng(seed)
+    edge_lat, edge_lon = boundary_points(index, raster.resolution, max_boundary_points, seed)
+    latitude = np.concatenate([edge_lat, rng.uniform(bounds[0], bounds[2], n_random)])
+    longitude = np.concatenate([edge_lon, rng.uniform(bounds[1], bounds[3], n_random)])
+
+    every = max(1, len(latitude) // max_single_points)
+    sample = list(zip(latitude[::every].tolist(), longitude[::every].tolist()))
+    expected_ids, expected_distances = index._exact_lookup(latitude, longitude)
+    expected_singles = [index._exact_lookup_point(lat, lon) for lat, lon in sample]
+    previous = index.raster
+    index.attach_raster(raster)
+    try:
+        zone_ids, distances = index.lookup(latitude, longitude)
+        singles = [index.lookup_point(lat, lon) for lat, lon in sample]
+    finally:
+        index.attach_raster(previous)
+
+    mismatches = np.count_nonzero((zone_ids != expected_ids) | (distances != expected_distances))
+    mismatches += sum(single != expected for single, expected in zip(singles, expected_singles))
+    unresolved = raster.lookup(edge_lat, edge_lon) == UNRESOLVED_ZONE
+    return {
+        'points': len(latitude),
+        'boundary_points': len(edge_lat),
+        'mismatches': int(mismatches),
+        'boundary_unresolved_fraction': round(float(unresolved.mean()) if len(edge_lat) else 0.0, 4)
+    }
+
+
+def build_raster(index, geo_zones: dict, bounds: tuple = CDMX_BOUNDS,
+                 resolution: float = DEFAULT_RESOLUTION) -> bytes:
+    """Rasteriza, verifica contra la búsqueda exacta y serializa el artefacto
+
+    Lanza `ArtifactError` si el raster no coincide con la búsqueda exacta.
+    """
+    started = time.perf_counter()
+    zones = rasterize_zones(index, bounds, resolution)
+    meta = {
+        'zones_fingerprint': zones_fingerprint(geo_zones),
+        'bounds': list(bounds),
+        'origin': list(bounds[:2]),
+        'resolution': resolution,
+        'shape': list(zones.shape),
+        'unresolved_fraction': round(float(np.mean(zones == UNRESOLVED_ZONE)), 6)
+    }
+    content = build_artifact(RASTER_KIND, {'zones': zones}, meta)
+
+    accuracy = check_raster(index, ZoneRaster(ModelArtifact.from_buffer(content, verify=False)), bounds)
+    if accuracy['mismatches']:
+        raise ArtifactError(f"El raster de zonas difiere de la búsqueda exacta en "
+                            f"{accuracy['mismatches']} de {accuracy['points']} puntos")
+    logger.info('🗺️ Raster de zonas construido', extra=fields(
+        shape=meta['shape'], resolution=resolution, zones=len(index),
+        unresolved_fraction=meta['unresolved_fraction'], accuracy=accuracy,
+        seconds=round(time.perf_counter() - started, 3)
+    ))
+    return content
+
+
+def _open_raster(path: str, fingerprint: str, bounds: tuple, resolution: float):
+    """El raster guardado en `path` si corresponde a estas geocercas y parámetros"""
+    try:
+        artifact = ModelArtifact(path, expected_kind=RASTER_KIND)
+    except (OSError, ValueError, KeyError, ArtifactError):
+        return None
+    meta = artifact.meta
+    if (meta.get('zones_fingerprint') != fingerprint or meta.get('bounds') != list(bounds)
+            or meta.get('resolution') != resolution):
+        return None
+    return ZoneRaster(artifact)
+
+
+def load_or_build_raster(index, geo_zones: dict, path: str, bounds: tuple = CDMX_BOUNDS,
+                         resolution: float = DEFAULT_RESOLUTION):
+    """Abre con mmap el raster de `path` o lo reconstruye si las geocercas cambiaron
+
+    Si el archivo no se puede escribir, el raster se usa desde memoria. Regresa
+    None (búsqueda exacta) si el raster no pasa la verificación.
+    """
+    fingerprint = zones_fingerprint(geo_zones)
+    raster = _open_raster(path, fingerprint, bounds, resolution)
+    if raster is not None:
+        return raster
+
+    try:
+        content = build_raster(index, geo_zones, bounds, resolution)
+    except ArtifactError as e:
+        logger.error('❌ Raster de zonas descartado; se usa la búsqueda exacta', extra=fields(error=str(e)))
+        return None
+
+    # Varios workers pueden reconstruirlo a la vez: cada uno escribe su propio temporal
+    try:
+        write_atomic(path, content)
+    except OSError as e:
+        logger.warning('⚠️ No se pudo guardar el raster de zonas; se usa desde memoria',
+                       extra=fields(path=path, error=str(e)))
+        return ZoneRaster(ModelArtifact.from_buffer(content, verify=False, name=path))
+
+    logger.info('💾 Raster de zonas guardado', extra=fields(path=path, bytes=len(content)))
+    return ZoneRaster(ModelArtifact(path, verify=False, expected_kind=RASTER_KIND))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks de predicción, geocercas, entrenamiento, carga de modelos y
+solicitudes ASGI, con comparación contra la línea base guardada
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.benchmarks import (
+    BENCHMARKS,
+    DEFAULT_THRESHOLD,
+    compare_results,
+    confirm_regressions,
+    keep_best,
+    regressions,
+    run_suite,
+)
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+
+def print_progress(bench, result):
+    print(f"   {bench.name:<30} mín {result['min_us']:>12.2f} µs  mediana {result['median_us']:>12.2f} µs  "
+          f"(iqr {result['iqr_us']:.2f}, {result['rounds']}x{result['calls_per_round']})")
+
+
+def print_comparison(rows: list, baseline_path: str):
+    labels = {'regression': '❌ regresión', 'faster': '🚀 más rápido', 'ok': '✅',
+              'new': '🆕 sin línea base', 'missing': '⚠️ no medido'}
+    print(f"\n🔁 COMPARACIÓN CONTRA {baseline_path}")
+    print("=" * 90)
+    print(f"{'benchmark':<30} {'antes µs':>12} {'después µs':>12} {'cambio':>9}")
+    for name, before, after, change, status in rows:
+        before_text = f"{before:.2f}" if before is not None else '-'
+        after_text = f"{after:.2f}" if after is not None else '-'
+        change_text = f"{change:+.1f}%" if change is not None else '-'
+        print(f"{name:<30} {before_text:>12} {after_text:>12} {change_text:>9}  {labels[status]}")
+
+
+def run(args) -> dict:
+    print(f"⏱️ Corriendo benchmarks: {', '.join(args.only) if args.only else 'todos'}")
+    return run_suite(args.only, repeats=args.repeats, progress=print_progress)
+
+
+def load_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(report: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_run_options(subparser):
+        subparser.add_argument('--only', nargs='+', default=None,
+                               help=f"Nombres o grupos a correr (predict, training, loading, asgi); "
+                                    f"benchmarks: {', '.join(BENCHMARKS)}")
+        subparser.add_argument('--repeats', type=int, default=None,
+                               help="Rondas por benchmark (default: las de cada benchmark)")
+
+    run_parser = subparsers.add_parser('run', help="Corre los benchmarks y guarda los resultados")
+    add_run_options(run_parser)
+    run_parser.add_argument('--output', default='benchmark_results.json')
+
+    compare_parser = subparsers.add_parser(
+        'compare', help="Compara contra la línea base; sale con código 1 si algo se hizo más lento"
+    )
+    add_run_options(compare_parser)
+    compare_parser.add_argument('--results', default=None,
+                                help="Resultados ya medidos (default: correr los benchmarks ahora)")
+    compare_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('--threshold', type=float,
+                                default=float(os.getenv('BENCHMARK_THRESHOLD', str(DEFAULT_THRESHOLD))),
+                                help="Fracción de aumento del tiempo que cuenta como regresión")
+    compare_parser.add_argument('--confirm', type=int, default=2,
+                                help="Veces que se vuelve a medir una regresión antes de reportarla")
+
+    baseline_parser = subparsers.add_parser('update-baseline', help="Corre los benchmarks y reescribe la línea base")
+    add_run_options(baseline_parser)
+    baseline_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    baseline_parser.add_argument('--runs', type=int, default=3,
+                                 help="Corridas completas; se guarda la mejor medición de cada benchmark")
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        save_json(run(args), args.output)
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+    elif args.command == 'update-baseline':
+        report = run(args)
+        for _ in range(args.runs - 1):
+            report = keep_best(report, run(args))
+        if args.only and os.path.exists(args.baseline):
+            # Sólo se reemplazan los benchmarks que se corrieron
+            baseline = load_json(args.baseline)
+            baseline['benchmarks'].update(report['benchmarks'])
+            report = {**report, 'benchmarks': baseline['benchmarks']}
+        save_json(report, args.baseline)
+        print(f"\n💾 Línea base actualizada en {args.baseline}")
+
+    else:
+        current = load_json(args.results) if args.results else run(args)
+        baseline = load_json(args.baseline)
+        if args.results:
+            rows = compare_results(baseline, current, args.threshold)
+        else:
+            current, rows = confirm_regressions(baseline, current, args.threshold,
+                                                attempts=args.confirm, progress=print_progress)
+        if args.only or args.results:
+            measured = set(current['benchmarks'])
+            rows = [row for row in rows if row[0] in measured]
+        print_comparison(rows, args.baseline)
+        slower = regressions(rows)
+        if slower:
+            print(f"\n❌ {len(slower)} benchmark(s) más lentos que la línea base por más de su umbral")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Re-puntuación masiva de tráfico histórico con el modelo avanzado, en paralelo y reanudable
+"""
+
+import argparse
+import json
+import os
+
+from app.offline_scoring import run_bulk_scoring
+
+
+def print_summary(summary: dict):
+    """Imprime filas, bloques reanudados y throughput de la corrida"""
+    print("\n📊 RESUMEN")
+    print("=" * 60)
+    print(f"   Salida: {summary['output']} ({summary['rows']:,} filas, {summary['chunks']} bloques)")
+    if summary['resumed_chunks']:
+        print(f"   Bloques reanudados de una corrida anterior: {summary['resumed_chunks']}")
+    print(f"   Filas puntuadas en esta corrida: {summary['scored_rows']:,} "
+          f"({summary['invalid_rows']:,} inválidas)")
+    print(f"   Throughput: {summary['rows_per_second']:,.0f} filas/s con {summary['workers']} procesos")
+    print(f"   Tiempo total: {summary['total_seconds']}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('input', help="Dataset de entrada: .csv, .npy estructurado o directorio columnar")
+    parser.add_argument('output', help="Archivo .csv o directorio columnar de salida")
+    parser.add_argument('--model', default=os.getenv('ADVANCED_MODEL_PATH', 'advanced_flow_model.joblib'),
+                        help="Modelo avanzado, joblib o .artifact")
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help="Filas por bloque")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (default: todos los núcleos)")
+    parser.add_argument('--parts-dir', default=None, help="Partes por bloque (default: <salida>.parts)")
+    parser.add_argument('--keep-parts', action='store_true', help="No borrar las partes al terminar")
+    parser.add_argument('--restart', action='store_true', help="Descartar las partes de una corrida anterior")
+    parser.add_argument('--summary', default=None, help="Archivo JSON donde guardar el resumen")
+    args = parser.parse_args()
+
+    summary = run_bulk_scoring(
+        args.input,
+        args.output,
+        model_path=args.model,
+        chunk_rows=args.chunk_rows,
+        max_workers=args.workers,
+        parts_dir=args.parts_dir,
+        keep_parts=args.keep_parts,
+        restart=args.restart
+    )
+    print_summary(summary)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Resumen guardado en {args.summary}")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Script para exportar los modelos joblib al formato de artefacto mapeable
+"""
+
+import argparse
+import os
+import time
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.ml_model import ConnectionQualityClassifier
+
+
+def timed(fn):
+    """Ejecuta `fn` y regresa los milisegundos que tardó"""
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--basic', default='connection_classifier.joblib')
+    parser.add_argument('--advanced', default='advanced_flow_model.joblib')
+    args = parser.parse_args()
+
+    print("📦 Exportando artefactos de modelo")
+    print("=" * 60)
+
+    basic = ConnectionQualityClassifier()
+    basic.load_model(args.basic)
+    basic_artifact = os.path.splitext(args.basic)[0] + '.artifact'
+    basic.save_model(basic_artifact)
+
+    advanced = AdvancedFlowClassifier()
+    advanced.model_path = args.advanced
+    if not advanced.load_model():
+        advanced.train(save=False)
+    advanced.model_path = os.path.splitext(args.advanced)[0] + '.artifact'
+    advanced.save_model()
+
+    for source, target in ((args.basic, basic_artifact), (args.advanced, advanced.model_path)):
+        if not os.path.exists(source):
+            continue
+        if source == args.basic:
+            joblib_ms = timed(lambda: ConnectionQualityClassifier().load_model(source))
+            artifact_ms = timed(lambda: ConnectionQualityClassifier().load_model(target))
+        else:
+            def load(path):
+                model = AdvancedFlowClassifier()
+                model.model_path = path
+                model.load_model()
+            joblib_ms = timed(lambda: load(source))
+            artifact_ms = timed(lambda: load(target))
+        print(f"   {source} ({os.path.getsize(source) / 1024:.0f} KB): {joblib_ms:.1f} ms")
+        print(f"   {target} ({os.path.getsize(target) / 1024:.0f} KB): {artifact_ms:.1f} ms")
+
+    print("\n✅ Usa BASIC_MODEL_PATH / ADVANCED_MODEL_PATH para servir los artefactos")
@@ -0,0 +1,25 @@
+"""
+Geocercas de prueba compartidas por test_geo_zones.py y test_zone_raster.py
+"""
+
+from app.geo_index import polygon_zone
+
+
+def square(lon: float, lat: float, half: float) -> list:
+    return [[lon - half, lat - half], [lon + half, lat - half], [lon + half, lat + half],
+            [lon - half, lat + half], [lon - half, lat - half]]
+
+
+def sample_zones() -> dict:
+    """Geocercas de prueba: hueco, multipolígono, traslape y un círculo mezclado"""
+    return {
+        # Cuadrado con un hueco en medio
+        'dona': polygon_zone([[square(-99.2, 19.4, 0.02), square(-99.2, 19.4, 0.005)]], 'alta'),
+        # Dos islas
+        'islas': polygon_zone([[square(-99.0, 19.3, 0.01)], [square(-98.95, 19.3, 0.01)]], 'baja'),
+        # Se traslapa con la dona; gana el centro más cercano
+        'vecina': polygon_zone([[square(-99.17, 19.4, 0.015)]], 'media'),
+        # Una geocerca circular mezclada con las poligonales
+        'circulo': {'center': (19.2, -99.1), 'radius': 0.02, 'plusvalia': 'emergente',
+                    'quality_factor': 0.5, 'network_speed_range': (1, 8), 'wifi_coverage': 0.3}
+    }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de los endpoints de predicción con tráfico realista
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.load_generator import (
+    DEFAULT_ENDPOINT_WEIGHTS,
+    PERCENTILES,
+    TrafficMix,
+    compare_reports,
+    open_client,
+    run_load,
+    wait_until_ready,
+)
+
+
+def parse_weights(value: str) -> dict:
+    """`"advanced_predict=1,web_app_experience=3"` -> pesos por endpoint"""
+    weights = {}
+    for item in value.split(','):
+        name, weight = item.split('=')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def print_report(report: dict):
+    """Imprime throughput, percentiles y errores por endpoint"""
+    names = [name for name, _ in PERCENTILES]
+    print(f"\n📊 RESULTADOS ({report['mode']}, {report['elapsed_s']}s)")
+    print("=" * 90)
+    print(f"{'endpoint':<24} {'solicitudes':>11} {'rps':>9} {'errores':>8} "
+          + ' '.join(f'{name + " ms":>9}' for name in names))
+    rows = [('total', report['total'])] + sorted(report['endpoints'].items())
+    for endpoint, summary in rows:
+        latency = summary['latency_ms']
+        print(f"{endpoint:<24} {summary['requests']:>11} {summary['throughput_rps']:>9.1f} "
+              f"{summary['error_rate']:>8.2%} "
+              + ' '.join(f"{latency.get(name, 0):>9.2f}" for name in names))
+    if report['total']['errors']:
+        print(f"\n⚠️ Códigos de estado: {report['total']['status_counts']}")
+
+
+def print_comparison(rows: list, baseline_path: str):
+    print(f"\n🔁 COMPARACIÓN CONTRA {baseline_path}")
+    print("=" * 90)
+    for endpoint, metric, before, after, change in rows:
+        change_text = f"{change:+.1f}%" if change is not None else "n/a"
+        print(f"{endpoint:<24} {metric:<16} {before:>10} -> {after:>10}  {change_text}")
+
+
+async def main(args):
+    mix = TrafficMix.from_classifier(
+        endpoint_weights=parse_weights(args.mix) if args.mix else None,
+        seed=args.seed,
+        missing_probability=args.missing
+    )
+    target = args.url or 'la app en este proceso'
+    mode = f"{args.rate} rps" if args.rate else f"{args.concurrency} clientes"
+    print(f"🚀 Prueba de carga contra {target} ({mode})")
+
+    async with open_client(args.url) as client:
+        await wait_until_ready(client)
+        return await run_load(
+            client, mix,
+            duration=args.duration,
+            total_requests=args.requests,
+            rate=args.rate,
+            concurrency=None if args.rate else args.concurrency,
+            warmup_requests=args.warmup
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=None,
+                        help="Servidor a probar (p. ej. http://localhost:8000); sin URL se usa la app en el mismo proceso")
+    parser.add_argument('--rate', type=float, default=None, help="Solicitudes por segundo (lazo abierto)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Clientes concurrentes (lazo cerrado)")
+    parser.add_argument('--duration', type=float, default=None, help="Segundos de carga (default: 10)")
+    parser.add_argument('--requests', type=int, default=None, help="Total de solicitudes en lugar de duración")
+    parser.add_argument('--warmup', type=int, default=50, help="Solicitudes de calentamiento (no cuentan)")
+    parser.add_argument('--mix', default=None,
+                        help=f"Pesos por endpoint, p. ej. advanced_predict=1,web_app_experience=3 "
+                             f"(endpoints: {', '.join(DEFAULT_ENDPOINT_WEIGHTS)})")
+    parser.add_argument('--missing', type=float, default=0.25, help="Probabilidad de omitir cada parámetro opcional")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load_test_report.json', help="Archivo JSON del reporte")
+    parser.add_argument('--compare', default=None, help="Reporte anterior contra el cual comparar")
+    args = parser.parse_args()
+    if args.duration is None and args.requests is None:
+        args.duration = 10.0
+
+    report = asyncio.run(main(args))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(compare_reports(json.load(f), report), args.compare)
+    print(f"\n💾 Reporte guardado en {args.output}")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Script de búsqueda de hiperparámetros: precisión vs latencia de inferencia
+"""
+
+import argparse
+import json
+
+from app.model_sweep import run_sweep
+
+
+def print_report(report: dict):
+    """Imprime los candidatos del frente de Pareto y la recomendación"""
+    print(f"\n📊 FRENTE DE PARETO ({report['kind']})")
+    print("=" * 60)
+    print(f"{'precisión':>10} {'p50 1 fila':>12} {'lote/fila':>10}  parámetros")
+    for result in report['pareto_front']:
+        print(f"{result['accuracy']:>10.4f} {result['single_p50_us']:>10.1f}µs "
+              f"{result['batch_per_row_us']:>8.2f}µs  {result['params']}")
+
+    recommended = report['recommended']
+    if recommended:
+        print(f"\n✅ Más rápido con precisión >= {report['accuracy_floor']}: {recommended['params']} "
+              f"({recommended['accuracy']:.4f}, {recommended['single_p50_us']}µs)")
+    else:
+        print(f"\n⚠️ Ningún candidato alcanza la precisión mínima {report['accuracy_floor']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kind', choices=['basic', 'advanced'], default='advanced')
+    parser.add_argument('--samples', type=int, default=20000, help="Filas del dataset sintético")
+    parser.add_argument('--folds', type=int, default=3, help="Folds de validación cruzada")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (default: todos los núcleos)")
+    parser.add_argument('--accuracy-floor', type=float, default=0.0, help="Precisión mínima aceptable")
+    parser.add_argument('--cache-dir', default='.sweep_cache', help="Caché del dataset y los folds")
+    parser.add_argument('--output', default='sweep_report.json', help="Archivo JSON del reporte")
+    args = parser.parse_args()
+
+    report = run_sweep(
+        kind=args.kind,
+        n_samples=args.samples,
+        n_folds=args.folds,
+        seed=args.seed,
+        max_workers=args.workers,
+        accuracy_floor=args.accuracy_floor,
+        cache_dir=args.cache_dir
+    )
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\n💾 Reporte guardado en {args.output}")
@@ -7,8 +7,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import numpy as np
+
 from app.advanced_flow_classifier import AdvancedFlowClassifier
 from app.ml_model import classifier
+from app.prediction_cache import PredictionCache
 
 def test_advanced_model():
     """Prueba el modelo avanzado con diferentes escenarios"""
@@ -217,6 +220,140 @@ def test_plusvalia_comparison():
         print(f"   Cobertura WiFi: {result['zone_info']['wifi_coverage']:.2f}")
         print(f"   Confianza: {result['confidence_score']}")
 
+def test_predict_batch():
+    """Verifica que la predicción por lotes coincide con la predicción individual"""
+    
+    print(f"\n📦 PREDICCIÓN POR LOTES")
+    print("=" * 60)
+    
+    advanced = AdvancedFlowClassifier()
+    if not advanced.is_trained:
+        advanced.train()
+    
+    records = [
+        {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000,
+         'network_speed': 25.0, 'battery_level': 85.0, 'time_of_day': 14},
+        {'wifi': False, 'device': 'android', 'latitude': 19.1900, 'longitude': -99.0200,
+         'network_speed': 1.0, 'battery_level': 5.0, 'time_of_day': 22},
+        {'wifi': True, 'device': 'android', 'latitude': 19.9000, 'longitude': -99.4000,
+         'network_speed': 12.0, 'battery_level': 50.0, 'time_of_day': 9},
+        {'wifi': True, 'device': 'ios', 'latitude': 19.3550, 'longitude': -99.0900,
+         'network_speed': 3.0, 'battery_level': 15.0, 'time_of_day': 8}
+    ]
+    
+    batch_results = advanced.predict_batch(records)
+    assert len(batch_results) == len(records)
+    
+    for record, batch_result in zip(records, batch_results):
+        single_result = advanced.predict(**record)
+        print(f"   {record['latitude']}, {record['longitude']}: {batch_result['flow_type']} "
+              f"(zona {batch_result['zone_info']['zone_name']})")
+        assert batch_result == single_result
+
+def test_deterministic_predictions_and_cache():
+    """Las condiciones faltantes se imputan de forma determinista y se cachean"""
+    
+    print(f"\n🗄️ CACHÉ DE PREDICCIONES")
+    print("=" * 60)
+    
+    advanced = AdvancedFlowClassifier()
+    advanced.model_path = "/tmp/advanced_flow_model_cache.joblib"
+    advanced.train()
+    
+    first = advanced.predict(True, 'android', 19.4100, -99.1800)
+    second = advanced.predict(True, 'android', 19.4100, -99.1800)
+    assert first == second
+    
+    stats = advanced.prediction_cache.stats()
+    print(f"   Aciertos: {stats['hits']}, fallos: {stats['misses']}")
+    assert stats['hits'] >= 1
+    
+    # Re-entrenar invalida la caché
+    advanced.train()
+    assert advanced.prediction_cache.stats()['size'] == 0
+
+def test_cache_matches_uncached():
+    """Con la caché activa las predicciones son idénticas a las calculadas sin caché"""
+    
+    print(f"\n🧷 CACHÉ CONTRA SIN CACHÉ")
+    print("=" * 60)
+    
+    advanced = AdvancedFlowClassifier()
+    if not advanced.is_trained:
+        advanced.train()
+    
+    # Pares de solicitudes vecinas: la segunda cae en la misma celda de ~0.001° y en las
+    # mismas cubetas de velocidad (1 Mbps) y batería (10%) que la primera
+    rng = np.random.default_rng(11)
+    centers = np.array([zone['center'] for zone in advanced.geo_zones.values()])
+    records = []
+    for _ in range(1500):
+        lat, lon = centers[rng.integers(0, len(centers))] + rng.normal(0, 0.03, 2)
+        base = {'wifi': bool(rng.integers(0, 2)), 'device': str(rng.choice(['ios', 'android'])),
+                'latitude': float(lat), 'longitude': float(lon),
+                'network_speed': float(rng.uniform(0.5, 30)), 'battery_level': float(rng.uniform(5, 99)),
+                'time_of_day': int(rng.integers(0, 24))}
+        near = dict(base,
+                    latitude=(np.floor(lat / 0.001) + rng.uniform(0.1, 0.9)) * 0.001,
+                    longitude=(np.floor(lon / 0.001) + rng.uniform(0.1, 0.9)) * 0.001,
+                    network_speed=np.floor(base['network_speed']) + rng.uniform(0.1, 0.9),
+                    battery_level=np.floor(base['battery_level'] / 10) * 10 + rng.uniform(1, 9))
+        records.extend([base, near])
+    pairs = len(records)
+    # Y algunas sin condiciones, que se imputan
+    records.extend({'wifi': r['wifi'], 'device': r['device'], 'latitude': r['latitude'],
+                    'longitude': r['longitude']} for r in records[:200])
+    
+    cache = advanced.prediction_cache
+    advanced.prediction_cache = PredictionCache(maxsize=0)
+    expected = [advanced.predict(**record) for record in records]
+    expected_batch = advanced.predict_batch(records)
+    
+    # La vecina de cada par sale de la caché con la predicción de la primera
+    advanced.prediction_cache = PredictionCache()
+    try:
+        assert [advanced.predict(**record) for record in records[:pairs]] == expected[:pairs]
+        hit_rate = advanced.prediction_cache.stats()['hit_rate']
+    finally:
+        advanced.prediction_cache = cache
+    assert all(expected[i] == expected[i + 1] for i in range(0, pairs, 2))
+    assert hit_rate >= 0.5
+    
+    # Caché pequeña para forzar desalojos; se consulta dos veces para tener aciertos
+    advanced.prediction_cache = PredictionCache(maxsize=500)
+    try:
+        for _ in range(2):
+            assert [advanced.predict(**record) for record in records] == expected
+            assert advanced.predict_batch(records) == expected_batch
+    finally:
+        stats = advanced.prediction_cache.stats()
+        advanced.prediction_cache = cache
+    print(f"   {len(records)} solicitudes iguales; {hit_rate:.0%} de aciertos en pares vecinos, "
+          f"desalojos {stats['evictions']}")
+    assert stats['hits'] > 0 and stats['evictions'] > 0
+
+def test_vectorized_training_data():
+    """El generador vectorizado es reproducible y etiqueta igual que la regla escalar"""
+    
+    print(f"\n🧮 GENERADOR VECTORIZADO")
+    print("=" * 60)
+    
+    advanced = AdvancedFlowClassifier()
+    X, y = advanced._create_advanced_training_data(5000, seed=7, chunk_size=1000)
+    X_again, y_again = advanced._create_advanced_training_data(5000, seed=7, chunk_size=1000)
+    assert (X == X_again).all() and (y == y_again).all()
+    assert X.shape == (5000, 12)
+    
+    for row in range(0, len(X), 50):
+        zone_info = advanced._get_zone_info(X[row, 3], X[row, 4])
+        expected = advanced._determine_flow_type(
+            X[row, 0], zone_info, X[row, 8], X[row, 9] * 100, int(X[row, 10] * 24)
+        )
+        assert y[row] == expected
+        assert X[row, 5] == zone_info['distance_to_center']
+    
+    print(f"   Flujos generados: {sorted(set(y))}")
+
 if __name__ == "__main__":
     try:
         # Probar modelo avanzado
@@ -228,6 +365,16 @@ if __name__ == "__main__":
         # Probar por plusvalía
         test_plusvalia_comparison()
         
+        # Probar predicción por lotes
+        test_predict_batch()
+        
+        # Probar caché de predicciones
+        test_deterministic_predictions_and_cache()
+        test_cache_matches_uncached()
+        
+        # Probar generador vectorizado
+        test_vectorized_training_data()
+        
         print(f"\n✅ ¡Todas las pruebas completadas exitosamente!")
         
     except Exception as e:
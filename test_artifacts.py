@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del formato de artefacto mapeable
+"""
+
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.artifacts import ArtifactError, ModelArtifact, is_artifact, write_artifact
+from app.ml_model import ConnectionQualityClassifier
+
+RECORDS = [
+    {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000,
+     'network_speed': 25.0, 'battery_level': 85.0, 'time_of_day': 14},
+    {'wifi': False, 'device': 'android', 'latitude': 19.3550, 'longitude': -99.0900,
+     'network_speed': 3.0, 'battery_level': 15.0, 'time_of_day': 8},
+    {'wifi': True, 'device': 'android', 'latitude': 19.9000, 'longitude': -99.4000,
+     'network_speed': 12.0, 'battery_level': 50.0, 'time_of_day': 9}
+]
+
+
+def test_advanced_artifact_roundtrip():
+    """El modelo avanzado cargado desde artefacto predice igual que el original"""
+
+    print("📦 Probando artefacto del modelo avanzado")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        advanced = AdvancedFlowClassifier()
+        advanced.model_path = os.path.join(tmp, 'advanced.artifact')
+        advanced.train()
+        assert is_artifact(advanced.model_path)
+
+        loaded = AdvancedFlowClassifier()
+        loaded.model_path = advanced.model_path
+        assert loaded.load_model()
+        assert loaded.model is None
+        assert not loaded.engine.feature.flags.writeable
+
+        assert loaded.predict_batch(RECORDS) == advanced.predict_batch(RECORDS)
+        for record in RECORDS:
+            assert loaded.predict(**record) == advanced.predict(**record)
+
+        # Lotes grandes también usan el motor: no hay objeto de scikit-learn
+        assert len(loaded.predict_batch(RECORDS * 300)) == 900
+        print(f"   Tamaño: {os.path.getsize(advanced.model_path) / 1024:.0f} KB")
+
+
+def test_basic_artifact_roundtrip():
+    """El modelo básico cargado desde artefacto predice igual que el original"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'basic.artifact')
+        basic = ConnectionQualityClassifier()
+        basic.train()
+        basic.save_model(path)
+
+        loaded = ConnectionQualityClassifier()
+        loaded.load_model(path)
+        records = [
+            {key: record[key] for key in ('wifi', 'device', 'latitude', 'longitude', 'network_speed')}
+            for record in RECORDS
+        ]
+        assert loaded.predict_batch(records) == basic.predict_batch(records)
+        assert loaded.predict(**records[0]) == basic.predict(**records[0])
+
+
+def test_artifact_integrity():
+    """Un artefacto alterado o de otro tipo se rechaza"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'basic.artifact')
+        basic = ConnectionQualityClassifier()
+        basic.train()
+        basic.save_model(path)
+
+        assert ModelArtifact(path, expected_kind='basic').kind == 'basic'
+        try:
+            ModelArtifact(path, expected_kind='advanced')
+            raise AssertionError("Se esperaba ArtifactError")
+        except ArtifactError as e:
+            assert 'tipo' in str(e)
+
+        with open(path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        try:
+            ModelArtifact(path)
+            raise AssertionError("Se esperaba ArtifactError")
+        except ArtifactError as e:
+            assert 'hash' in str(e)
+
+
+def _write_many(path: str, seed: int, times: int) -> list:
+    """Escribe `times` artefactos distintos en la misma ruta y regresa sus sha256"""
+    rng = np.random.default_rng(seed)
+    return [write_artifact(path, 'prueba', {'values': rng.random(500_000)}) for _ in range(times)]
+
+
+def test_concurrent_writers():
+    """Varios procesos escribiendo la misma ruta nunca publican un artefacto mezclado"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'shared.artifact')
+        with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context('spawn')) as pool:
+            written = [future.result() for future in
+                       [pool.submit(_write_many, path, seed, 10) for seed in range(4)]]
+
+        artifact = ModelArtifact(path, expected_kind='prueba')
+        assert artifact.sha256 in {sha for shas in written for sha in shas}
+        assert os.listdir(tmp) == ['shared.artifact']
+
+
+if __name__ == "__main__":
+    test_advanced_artifact_roundtrip()
+    test_basic_artifact_roundtrip()
+    test_artifact_integrity()
+    test_concurrent_writers()
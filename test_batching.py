@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del micro-batching de predicciones (app/batching.py)
+"""
+
+import asyncio
+import time
+
+from app.batching import BatcherStoppedError, MicroBatcher
+
+
+class RecordingBatchFn:
+    """`batch_fn` falso: multiplica cada registro por 10, anota los lotes y falla con registros negativos"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = None
+
+    async def __call__(self, records):
+        self.batches.append(list(records))
+        if self.release is not None:
+            await self.release.wait()
+        if any(record < 0 for record in records):
+            raise ValueError(f"registro inválido en {records}")
+        return [record * 10 for record in records]
+
+
+def test_window_and_fan_out():
+    """Los registros concurrentes comparten lote y cada llamador recibe sólo su resultado"""
+
+    print("📥 Probando la ventana y el reparto de resultados")
+    print("=" * 60)
+
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher('prueba', batch_fn, max_batch_size=64, min_wait=0.02, max_wait=0.05)
+
+    async def run():
+        # Llegan escalonados pero dentro de la ventana de 20 ms
+        first = asyncio.create_task(batcher.submit(1))
+        await asyncio.sleep(0.005)
+        rest = [asyncio.create_task(batcher.submit(value)) for value in (2, 3, 2)]
+        results = await asyncio.gather(first, *rest)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    print(f"   Lotes: {batch_fn.batches} → {results}")
+    assert batch_fn.batches == [[1, 2, 3, 2]]
+    assert results == [10, 20, 30, 20]
+
+
+def test_full_batch_flush():
+    """Un lote lleno sale sin esperar a que venza la ventana"""
+
+    print("\n🚚 Probando el despacho de lotes llenos")
+    print("=" * 60)
+
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher('prueba', batch_fn, max_batch_size=4, min_wait=1.0, max_wait=1.0)
+
+    async def run():
+        started = time.perf_counter()
+        results = await asyncio.gather(*(batcher.submit(value) for value in range(8)))
+        elapsed = time.perf_counter() - started
+        await batcher.stop()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    print(f"   Lotes: {batch_fn.batches} en {elapsed * 1000:.1f} ms (ventana de 1000 ms)")
+    assert batch_fn.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert results == [value * 10 for value in range(8)]
+    assert elapsed < 0.5
+
+
+def test_adaptive_wait():
+    """La ventana se encoge sin concurrencia y crece con lotes parciales, dentro de [min_wait, max_wait]"""
+
+    print("\n📐 Probando la ventana adaptativa")
+    print("=" * 60)
+
+    batcher = MicroBatcher('prueba', RecordingBatchFn(), max_batch_size=64, min_wait=0.0, max_wait=0.01)
+    initial = batcher.wait
+
+    async def run():
+        # Una solicitud a la vez: no hay nada que esperar
+        for value in range(5):
+            await batcher.submit(value)
+        shrunk = batcher.wait
+
+        # Grupos concurrentes de 3: lotes parciales, la ventana crece hasta el máximo
+        for _ in range(30):
+            await asyncio.gather(*(batcher.submit(value) for value in range(3)))
+        grown = batcher.wait
+        await batcher.stop()
+        return shrunk, grown
+
+    shrunk, grown = asyncio.run(run())
+    print(f"   Inicial {initial * 1000:.3f} ms → secuencial {shrunk * 1000:.3f} ms → concurrente {grown * 1000:.3f} ms")
+    assert shrunk < initial
+    assert grown == batcher.max_wait
+
+    # Lotes llenos: la ventana baja sin salir del mínimo
+    batcher = MicroBatcher('prueba', RecordingBatchFn(), max_batch_size=4, min_wait=0.002, max_wait=0.01)
+    for _ in range(20):
+        batcher._adapt(4)
+    assert batcher.wait == batcher.min_wait
+
+
+def test_error_propagation():
+    """Si el lote falla, todos sus llamadores reciben el error; el siguiente lote no se ve afectado"""
+
+    print("\n💥 Probando la propagación de errores")
+    print("=" * 60)
+
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher('prueba', batch_fn, max_batch_size=64, min_wait=0.02, max_wait=0.05)
+
+    async def run():
+        failed = await asyncio.gather(*(batcher.submit(value) for value in (1, -1, 2)), return_exceptions=True)
+        ok = await asyncio.gather(*(batcher.submit(value) for value in (3, 4)))
+        await batcher.stop()
+        return failed, ok
+
+    failed, ok = asyncio.run(run())
+    print(f"   Lote fallido: {[type(result).__name__ for result in failed]}, siguiente: {ok}")
+    assert all(isinstance(result, ValueError) for result in failed)
+    assert ok == [30, 40]
+
+
+def test_metrics():
+    """Lotes, registros, histograma de tamaños y espera en cola"""
+
+    print("\n📊 Probando las métricas del dispatcher")
+    print("=" * 60)
+
+    batcher = MicroBatcher('prueba', RecordingBatchFn(), max_batch_size=4, min_wait=0.01, max_wait=0.05)
+
+    async def run():
+        await asyncio.gather(*(batcher.submit(value) for value in range(4)))
+        await asyncio.gather(*(batcher.submit(value) for value in range(2)))
+        await batcher.submit(0)
+        await batcher.stop()
+
+    asyncio.run(run())
+    stats = batcher.metrics()
+    print(f"   {stats}")
+    assert stats['name'] == 'prueba' and stats['enabled']
+    assert stats['batches'] == 3 and stats['items'] == 7
+    assert stats['avg_batch_size'] == round(7 / 3, 2) and stats['max_batch_size_seen'] == 4
+    assert stats['batch_size_histogram']['<=1'] == 1
+    assert stats['batch_size_histogram']['<=2'] == 1
+    assert stats['batch_size_histogram']['<=4'] == 1
+    assert sum(stats['batch_size_histogram'].values()) == 3
+    assert stats['max_queue_wait_ms'] >= stats['avg_queue_wait_ms'] > 0
+    assert stats['queued'] == 0
+
+
+def test_stop_fails_pending():
+    """`stop()` termina los lotes en curso y falla los registros sin despachar"""
+
+    print("\n🛑 Probando el apagado con registros pendientes")
+    print("=" * 60)
+
+    batch_fn = RecordingBatchFn()
+    batcher = MicroBatcher('prueba', batch_fn, max_batch_size=4, min_wait=1.0, max_wait=1.0)
+
+    async def run():
+        batch_fn.release = asyncio.Event()
+        # Lote lleno en curso, bloqueado dentro de batch_fn
+        inflight = [asyncio.create_task(batcher.submit(value)) for value in range(4)]
+        await asyncio.sleep(0.01)
+        # Uno tomado por la ventana de 1 s y otro todavía en la cola
+        pending = [asyncio.create_task(batcher.submit(value)) for value in (5, 6)]
+        await asyncio.sleep(0.01)
+        assert batch_fn.batches == [[0, 1, 2, 3]]
+
+        batch_fn.release.set()
+        started = time.perf_counter()
+        await batcher.stop()
+        elapsed = time.perf_counter() - started
+        results = await asyncio.wait_for(asyncio.gather(*inflight, *pending, return_exceptions=True), 1)
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+    print(f"   Resultados: {[r if isinstance(r, int) else type(r).__name__ for r in results]} "
+          f"({elapsed * 1000:.1f} ms)")
+    assert results[:4] == [0, 10, 20, 30]
+    assert all(isinstance(result, BatcherStoppedError) for result in results[4:])
+    assert elapsed < 0.5
+    assert batch_fn.batches == [[0, 1, 2, 3]]
+
+
+if __name__ == "__main__":
+    test_window_and_fan_out()
+    test_full_batch_flush()
+    test_adaptive_wait()
+    test_error_propagation()
+    test_metrics()
+    test_stop_fails_pending()
+    print("\n🎉 Prueba del micro-batching completada")
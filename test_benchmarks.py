@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los microbenchmarks (medición, comparación y línea base)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import benchmarks
+from app.benchmarks import (
+    BENCHMARKS,
+    compare_results,
+    confirm_regressions,
+    measure,
+    regressions,
+    run_suite,
+)
+
+
+def fake_report(times: dict) -> dict:
+    return {'benchmarks': {name: {'min_us': value, 'median_us': value} for name, value in times.items()}}
+
+
+def test_measure():
+    """La medición calienta, calibra las llamadas por ronda y resume por llamada"""
+
+    print("⏱️ Probando la medición")
+    print("=" * 60)
+
+    calls = []
+    result = measure(lambda: calls.append(time.sleep(0.001)), warmup=3, repeats=5,
+                     min_round_time=0.01)
+    print(f"   {result}")
+    assert 1000 <= result['min_us'] <= result['median_us'] <= result['max_us']
+    assert result['rounds'] == 5 and result['calls_per_round'] >= 8
+    # Calentamiento + calibración + rondas
+    assert len(calls) > 3 + 5 * result['calls_per_round']
+
+
+def test_compare():
+    """Regresiones, mejoras, umbral por benchmark y benchmarks nuevos o faltantes"""
+
+    print("\n🔁 Probando la comparación contra la línea base")
+    print("=" * 60)
+
+    baseline = fake_report({'estable': 100.0, 'lento': 100.0, 'rapido': 100.0,
+                            'ruidoso': 100.0, 'quitado': 100.0})
+    baseline['benchmarks']['ruidoso']['threshold'] = 0.5
+    current = fake_report({'estable': 110.0, 'lento': 140.0, 'rapido': 60.0,
+                           'ruidoso': 140.0, 'nuevo': 5.0})
+
+    rows = compare_results(baseline, current, threshold=0.25)
+    for row in rows:
+        print(f"   {row}")
+    status = {name: state for name, _, _, _, state in rows}
+    assert status == {'estable': 'ok', 'lento': 'regression', 'rapido': 'faster',
+                      'ruidoso': 'ok', 'quitado': 'missing', 'nuevo': 'new'}
+    assert [row[0] for row in regressions(rows)] == ['lento']
+    assert compare_results(baseline, current, threshold=0.5)[1][4] == 'ok'
+
+
+def test_confirm_regressions():
+    """Una lentitud pasajera se descarta al volver a medir; una real se confirma"""
+
+    print("\n🔂 Probando la confirmación de regresiones")
+    print("=" * 60)
+
+    @benchmarks.benchmark('prueba_real', 'prueba', warmup=0, repeats=3)
+    def _real():
+        return lambda: time.sleep(0.002)
+
+    @benchmarks.benchmark('prueba_pasajera', 'prueba', warmup=0, repeats=3)
+    def _transient():
+        return lambda: None
+
+    try:
+        baseline = fake_report({'prueba_real': 100.0, 'prueba_pasajera': 100.0})
+        # La primera corrida salió lenta en los dos
+        current = fake_report({'prueba_real': 2000.0, 'prueba_pasajera': 2000.0})
+        current, rows = confirm_regressions(baseline, current, attempts=2)
+        for row in rows:
+            print(f"   {row}")
+        assert [row[0] for row in regressions(rows)] == ['prueba_real']
+        assert current['benchmarks']['prueba_pasajera']['min_us'] < 100.0
+    finally:
+        del BENCHMARKS['prueba_real'], BENCHMARKS['prueba_pasajera']
+
+
+def test_suite_and_baseline():
+    """Los benchmarks reales corren y la línea base del repo los cubre a todos"""
+
+    print("\n📏 Probando la suite y la línea base guardada")
+    print("=" * 60)
+
+    report = run_suite(['zone_lookup', 'basic_predict', 'basic_load_model'], repeats=3,
+                       min_round_time=0.01)
+    for name, result in report['benchmarks'].items():
+        print(f"   {name}: {result['min_us']} µs")
+    assert set(report['benchmarks']) == {'zone_lookup', 'basic_predict', 'basic_load_model'}
+    assert report['benchmarks']['basic_load_model']['group'] == 'loading'
+
+    with open('benchmark_baseline.json') as f:
+        baseline = json.load(f)
+    assert set(baseline['benchmarks']) == set(BENCHMARKS), "Actualiza la línea base: benchmark.py update-baseline"
+
+    # El comando de comparación sale con código 1 ante una regresión
+    slower = {'benchmarks': {'zone_lookup': {
+        **baseline['benchmarks']['zone_lookup'],
+        'min_us': baseline['benchmarks']['zone_lookup']['min_us'] * 3
+    }}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'resultados.json')
+        with open(path, 'w') as f:
+            json.dump(slower, f)
+        completed = subprocess.run([sys.executable, 'benchmark.py', 'compare', '--results', path],
+                                   capture_output=True, text=True)
+    print(f"   compare --results -> código {completed.returncode}")
+    assert completed.returncode == 1, completed.stdout + completed.stderr
+    assert 'zone_lookup' in completed.stdout
+
+
+if __name__ == "__main__":
+    test_measure()
+    test_compare()
+    test_confirm_regressions()
+    test_suite_and_baseline()
+    print("\n🎉 Prueba de benchmarks completada")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la puntuación masiva en streaming (NDJSON y columnar)
+"""
+
+import asyncio
+import json
+import random
+
+import numpy as np
+
+from app.bulk_scoring import (
+    COLUMNAR_MEDIA_TYPE,
+    ColumnarParser,
+    NDJSONParser,
+    PayloadError,
+    RecordError,
+    encode_columnar,
+)
+from app.load_generator import TrafficMix, asgi_lifespan
+
+
+def split_randomly(data: bytes, rng: random.Random, max_piece: int = 300) -> list:
+    pieces = []
+    while data:
+        size = rng.randint(1, max_piece)
+        pieces.append(data[:size])
+        data = data[size:]
+    return pieces
+
+
+def test_ndjson_parser():
+    """Las líneas se arman sin importar dónde se corte el cuerpo"""
+
+    print("📜 Probando el parser NDJSON")
+    print("=" * 60)
+
+    body = (b'{"wifi": true, "device": "ios", "latitude": 19.42, "longitude": -99.16}\n'
+            b'\n'
+            b'{"wifi": "si", "device": "ios", "latitude": 19.42, "longitude": -99.16}\n'
+            b'no es json\n'
+            b'{"wifi": false, "device": "android", "latitude": 19.3, "longitude": -99.2, "time_of_day": 7}')
+    parser = NDJSONParser('advanced')
+    items = []
+    for byte in range(len(body)):
+        items.extend(parser.feed(body[byte:byte + 1]))
+    items.extend(parser.close())
+
+    assert len(items) == 4
+    assert items[0] == {'wifi': True, 'device': 'ios', 'latitude': 19.42, 'longitude': -99.16,
+                        'network_speed': None, 'battery_level': None, 'time_of_day': None}
+    assert isinstance(items[1], RecordError) and 'wifi' in items[1].message
+    assert isinstance(items[2], RecordError) and items[2].message == "JSON inválido"
+    assert items[3]['time_of_day'] == 7 and items[3]['device'] == 'android'
+    print(f"   {len(items)} registros, {sum(isinstance(i, RecordError) for i in items)} inválidos")
+
+    # Una línea sin fin no puede crecer sin límite
+    parser = NDJSONParser('advanced', max_line_bytes=100)
+    try:
+        parser.feed(b'{"wifi": true' + b' ' * 200)
+        raise AssertionError("Debió rechazar la línea")
+    except PayloadError:
+        pass
+
+
+def test_columnar_parser():
+    """Las tramas columnares se leen por pedazos, con faltantes como NaN"""
+
+    print("\n🧱 Probando el parser columnar")
+    print("=" * 60)
+
+    n = 2500
+    rng = np.random.default_rng(0)
+    speed = rng.uniform(0.5, 20, n)
+    speed[::7] = np.nan
+    columns = {
+        'wifi': rng.random(n) < 0.5,
+        'device': np.where(rng.random(n) < 0.6, 'android', 'ios'),
+        'latitude': rng.uniform(19.3, 19.5, n),
+        'longitude': rng.uniform(-99.25, -99.05, n),
+        'network_speed': speed,
+        'time_of_day': rng.integers(0, 24, n).astype(np.int8)
+    }
+    columns['device'][5] = 'blackberry'
+    body = b''.join(encode_columnar(columns, rows_per_frame=1000))
+
+    parser = ColumnarParser('advanced')
+    items = []
+    for piece in split_randomly(body, random.Random(1), max_piece=5000):
+        items.extend(parser.feed(piece))
+    items.extend(parser.close())
+
+    assert len(items) == n
+    assert isinstance(items[5], RecordError) and 'device' in items[5].message
+    assert items[0]['network_speed'] is None and items[1]['network_speed'] == float(speed[1])
+    assert items[1]['time_of_day'] == int(columns['time_of_day'][1])
+    assert items[1]['battery_level'] is None
+    assert items[3]['wifi'] is bool(columns['wifi'][3])
+    print(f"   {n} registros en {len(body)} bytes ({len(body) / n:.0f} bytes/registro)")
+
+    # Cortado a media trama
+    parser = ColumnarParser('advanced')
+    parser.feed(body[:-10])
+    try:
+        parser.close()
+        raise AssertionError("Debió rechazar el cuerpo incompleto")
+    except PayloadError:
+        pass
+
+
+async def call_app(app, query: str, content_type: str, pieces: list, events: list):
+    """Llama a la app ASGI con el cuerpo en pedazos y anota el orden de lecturas y envíos"""
+    pieces = iter(pieces)
+    status = None
+    body = []
+
+    async def receive():
+        piece = next(pieces, None)
+        events.append('receive')
+        # Ceder el turno, como cuando el siguiente pedazo aún viene por la red
+        await asyncio.sleep(0)
+        if piece is None:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        return {'type': 'http.request', 'body': piece, 'more_body': True}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message.get('body'):
+            events.append('send')
+            body.append(message['body'])
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0', 'spec_version': '2.3'}, 'http_version': '1.1',
+        'method': 'POST', 'scheme': 'http', 'path': '/bulk/score', 'raw_path': b'/bulk/score',
+        'root_path': '', 'query_string': query.encode(), 'server': ('test', 80), 'client': ('test', 1),
+        'headers': [(b'content-type', content_type.encode())]
+    }
+    await app(scope, receive, send)
+    return status, b''.join(body)
+
+
+def test_streaming_endpoint():
+    """Los resultados salen mientras el cuerpo sigue llegando, en orden y con memoria acotada"""
+
+    print("\n🌊 Probando el endpoint de puntuación en streaming")
+    print("=" * 60)
+
+    import app.main as main
+
+    async def run():
+        async with asgi_lifespan(main.app):
+            mix = TrafficMix(main.advanced_classifier.geo_zones, seed=4)
+            records = [mix.record() for _ in range(3000)]
+            lines = [json.dumps(record) for record in records]
+            lines[10] = '{"wifi": true}'
+            body = ('\n'.join(lines) + '\n').encode()
+            pieces = split_randomly(body, random.Random(2), max_piece=2000)
+
+            events = []
+            status, output = await call_app(main.app, 'model=advanced&chunk_size=200',
+                                            'application/x-ndjson', pieces, events)
+            assert status == 200
+            results = [json.loads(line) for line in output.splitlines()]
+            assert len(results) == len(records)
+            assert results[10] == {'index': 10, 'error': "Falta el campo 'device'"}
+
+            expected = main.advanced_classifier.predict_batch(records[:10] + records[11:])
+            assert results[:10] + results[11:] == json.loads(json.dumps(expected))
+
+            # El primer resultado salió antes de terminar de leer el cuerpo
+            first_send = events.index('send')
+            reads_after = events[first_send:].count('receive')
+            print(f"   {len(results)} resultados; {reads_after} de {events.count('receive')} "
+                  f"lecturas del cuerpo ocurrieron después del primer envío")
+            assert reads_after > len(pieces) // 2
+
+            # Memoria acotada: registros leídos pero aún sin responder
+            in_flight = 0
+            worst = 0
+            piece_records = iter([piece.count(b'\n') for piece in pieces] + [0])
+            for event in events:
+                if event == 'receive':
+                    in_flight += next(piece_records, 0)
+                else:
+                    in_flight -= 200
+                worst = max(worst, in_flight)
+            limit = (main.bulk_scorer.max_pending + 2) * 200 + 2000 // 20
+            print(f"   Máximo de registros en vuelo: ~{worst} (límite {limit})")
+            assert worst <= limit
+
+            # Modelo básico con el cuerpo columnar
+            columns = {
+                'wifi': [r['wifi'] for r in records[:500]],
+                'device': [r['device'] for r in records[:500]],
+                'latitude': [r['latitude'] for r in records[:500]],
+                'longitude': [r['longitude'] for r in records[:500]]
+            }
+            pieces = list(encode_columnar(columns, rows_per_frame=100))
+            status, output = await call_app(main.app, 'model=basic', COLUMNAR_MEDIA_TYPE, pieces, [])
+            results = [json.loads(line) for line in output.splitlines()]
+            assert status == 200 and len(results) == 500
+            assert results[0]['flow_type'] in ('flow-1', 'flow-2') and 'location_info' in results[0]
+
+            # Cuerpo columnar cortado: se puntúa lo completo y la última línea es el error
+            body = b''.join(encode_columnar(columns, rows_per_frame=100))[:-50]
+            status, output = await call_app(main.app, 'model=basic', COLUMNAR_MEDIA_TYPE, [body], [])
+            results = [json.loads(line) for line in output.splitlines()]
+            assert len(results) == 401 and results[-1]['records_read'] == 400
+            print(f"   Cuerpo cortado: {results[-1]['error']}")
+
+            # Una sola trama con muchos bloques: la contrapresión actúa dentro de la trama
+            big = 20000
+            columns = {
+                'wifi': [records[i % len(records)]['wifi'] for i in range(big)],
+                'device': [records[i % len(records)]['device'] for i in range(big)],
+                'latitude': [records[i % len(records)]['latitude'] for i in range(big)],
+                'longitude': [records[i % len(records)]['longitude'] for i in range(big)]
+            }
+            frame = b''.join(encode_columnar(columns, rows_per_frame=big))
+            status, output = await call_app(main.app, 'model=basic&chunk_size=100',
+                                            COLUMNAR_MEDIA_TYPE, [frame], [])
+            results = [json.loads(line) for line in output.splitlines()]
+            assert status == 200 and len(results) == big
+            assert all('error' not in result for result in results)
+
+            in_flight = 0
+            worst = 0
+
+            async def score(chunk):
+                nonlocal in_flight, worst
+                in_flight += 1
+                worst = max(worst, in_flight)
+                await asyncio.sleep(0)
+                in_flight -= 1
+                return chunk
+
+            async def body():
+                yield frame
+
+            parser = main.bulk_scorer.parser_for(COLUMNAR_MEDIA_TYPE, 'basic')
+            lines = [line async for line in main.bulk_scorer.stream(body(), parser, score, chunk_size=100)]
+            print(f"   Trama de {big} filas: máximo {worst} bloques en vuelo "
+                  f"(límite {main.bulk_scorer.max_pending})")
+            assert sum(line.count(b'\n') for line in lines) == big
+            assert worst <= main.bulk_scorer.max_pending
+
+            status, _ = await call_app(main.app, '', 'text/csv', [b'a,b\n'], [])
+            assert status == 415
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_ndjson_parser()
+    test_columnar_parser()
+    test_streaming_endpoint()
+    print("\n🎉 Prueba de puntuación masiva completada")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de paridad entre el motor compilado y scikit-learn
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.forest_engine import CompiledForest
+
+
+def test_compiled_forest_parity():
+    """El motor compilado debe dar las mismas clases y probabilidades que sklearn"""
+
+    print("🌲 Probando paridad del motor compilado contra scikit-learn")
+    print("=" * 60)
+
+    advanced = AdvancedFlowClassifier()
+    X, y = advanced._create_advanced_training_data()
+
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X, y)
+    engine = CompiledForest.from_sklearn(model)
+
+    # Datos de entrenamiento más una versión con ruido para salir de las hojas conocidas
+    rng = np.random.default_rng(0)
+    X_eval = np.vstack([X, X + rng.normal(0, 0.5, X.shape)])
+
+    expected = model.predict_proba(X_eval)
+
+    # Lote completo, lotes pequeños y fila por fila
+    assert np.allclose(engine.predict_proba(X_eval), expected, rtol=0, atol=1e-12)
+    assert np.allclose(engine.predict_proba(X_eval[:7]), expected[:7], rtol=0, atol=1e-12)
+    for row in range(10):
+        assert np.allclose(engine.predict_proba(X_eval[row:row + 1]), expected[row:row + 1],
+                           rtol=0, atol=1e-12)
+
+    assert (engine.predict(X_eval) == model.predict(X_eval)).all()
+
+    print(f"   Filas comparadas: {len(X_eval)}")
+    print(f"   Nodos empacados: {len(engine.feature)}, profundidad máxima: {engine.max_depth}")
+    print("✅ Paridad verificada")
+
+
+def test_classifier_backends_match():
+    """Las predicciones del clasificador deben coincidir con ambos backends"""
+
+    advanced = AdvancedFlowClassifier()
+    advanced.model_path = "/tmp/advanced_flow_model_parity.joblib"
+    advanced.train()
+
+    reference = AdvancedFlowClassifier(inference_backend='sklearn')
+    reference.model = advanced.model
+    reference.scaler = advanced.scaler
+    reference.label_encoder = advanced.label_encoder
+    reference.is_trained = True
+
+    records = [
+        {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000,
+         'network_speed': 25.0, 'battery_level': 85.0, 'time_of_day': 14},
+        {'wifi': True, 'device': 'android', 'latitude': 19.3550, 'longitude': -99.0900,
+         'network_speed': 3.0, 'battery_level': 15.0, 'time_of_day': 8},
+        {'wifi': True, 'device': 'android', 'latitude': 19.9000, 'longitude': -99.4000,
+         'network_speed': 12.0, 'battery_level': 50.0, 'time_of_day': 9}
+    ]
+
+    assert advanced.predict_batch(records) == reference.predict_batch(records)
+    for record in records:
+        assert advanced.predict(**record) == reference.predict(**record)
+
+
+if __name__ == "__main__":
+    test_compiled_forest_parity()
+    test_classifier_backends_match()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del índice de geocercas circulares (app/geo_index.py)
+"""
+
+import numpy as np
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.geo_index import GeoZoneIndex
+
+
+def reference_zone(geo_zones: dict, latitude: float, longitude: float) -> tuple:
+    """El bucle original de `_get_zone_info`: centro más cercano entre los círculos que contienen al punto"""
+    closest_zone = None
+    min_distance = float('inf')
+    for zone_name, zone_data in geo_zones.items():
+        center_lat, center_lon = zone_data['center']
+        distance = np.sqrt((latitude - center_lat)**2 + (longitude - center_lon)**2)
+        if distance <= zone_data['radius'] and distance < min_distance:
+            closest_zone = zone_name
+            min_distance = distance
+    return closest_zone or 'unknown', min_distance
+
+
+def circle(center: tuple, radius: float, plusvalia: str = 'media') -> dict:
+    return {'center': center, 'radius': radius, 'plusvalia': plusvalia, 'quality_factor': 0.8,
+            'network_speed_range': (5, 20), 'wifi_coverage': 0.6}
+
+
+def check_parity(geo_zones: dict, latitude: np.ndarray, longitude: np.ndarray) -> int:
+    """Compara `lookup_point` y `lookup` contra el bucle original; regresa los puntos dentro de zona"""
+    index = GeoZoneIndex(geo_zones)
+    names = index.names
+    zone_ids, distances = index.lookup(latitude, longitude)
+    for i, (lat, lon) in enumerate(zip(latitude.tolist(), longitude.tolist())):
+        expected_name, expected_distance = reference_zone(geo_zones, lat, lon)
+        zone_id, distance = index.lookup_point(lat, lon)
+        assert names[zone_id] == expected_name == names[zone_ids[i]], (lat, lon)
+        assert distance == expected_distance, (lat, lon)
+        # El lote eleva al cuadrado con x*x y el bucle con pow(): pueden diferir en el último bit
+        assert distances[i] == expected_distance or \
+            abs(distances[i] - expected_distance) <= np.spacing(expected_distance), (lat, lon)
+        info = index.zone_info(zone_id, distance)
+        assert info['zone_name'] == expected_name
+        if expected_name != 'unknown':
+            assert info['plusvalia'] == geo_zones[expected_name]['plusvalia']
+    return int(np.count_nonzero(zone_ids >= 0))
+
+
+def test_builtin_zones():
+    """Con las geocercas del clasificador el índice da lo mismo que el bucle original"""
+
+    print("🗺️ Probando paridad con el bucle original")
+    print("=" * 60)
+
+    geo_zones = AdvancedFlowClassifier().geo_zones
+    rng = np.random.default_rng(0)
+    centers = np.array([zone['center'] for zone in geo_zones.values()])[rng.integers(0, len(geo_zones), 5000)]
+    latitude = np.concatenate([centers[:, 0] + rng.normal(0, 0.04, 5000), rng.uniform(19.0, 20.0, 2000)])
+    longitude = np.concatenate([centers[:, 1] + rng.normal(0, 0.04, 5000), rng.uniform(-99.5, -98.5, 2000)])
+    inside = check_parity(geo_zones, latitude, longitude)
+    print(f"   {len(latitude)} puntos iguales, {inside} dentro de alguna geocerca")
+
+
+def test_overlaps_and_edges():
+    """Traslapes, puntos justo sobre el radio y puntos fuera de todas las zonas"""
+
+    print("\n⭕ Probando traslapes y bordes")
+    print("=" * 60)
+
+    # El punto de borde define el radio: su distancia al centro es exactamente el radio
+    edge_lat, edge_lon = 19.4123, -99.1811
+    center = (19.4, -99.17)
+    radius = float(np.sqrt((edge_lat - center[0])**2 + (edge_lon - center[1])**2))
+    geo_zones = {
+        'a': circle(center, radius, 'alta'),
+        'b': circle((19.41, -99.16), 0.02, 'baja'),   # se traslapa con 'a'
+        'c': circle((19.41, -99.16), 0.02, 'media'),  # mismo centro que 'b': gana el primero
+        'd': circle((19.2, -99.0), 0.01, 'emergente')
+    }
+    index = GeoZoneIndex(geo_zones)
+    names = index.names
+    assert names[index.lookup_point(edge_lat, edge_lon)[0]] == 'a'
+    assert names[index.lookup_point(19.41, -99.16)[0]] == 'b'
+    assert names[index.lookup_point(19.6, -98.7)[0]] == 'unknown'
+    assert index.lookup_point(19.6, -98.7)[1] == float('inf')
+    assert names[index.lookup_point(float('nan'), -99.0)[0]] == 'unknown'
+
+    rng = np.random.default_rng(1)
+    centers = index.centers[rng.integers(0, len(geo_zones), 5000)]
+    latitude = np.concatenate([[edge_lat], centers[:, 0] + rng.normal(0, 0.015, 5000)])
+    longitude = np.concatenate([[edge_lon], centers[:, 1] + rng.normal(0, 0.015, 5000)])
+    inside = check_parity(geo_zones, latitude, longitude)
+    print(f"   {len(latitude)} puntos iguales, {inside} dentro de alguna geocerca")
+
+    # Sin geocercas todo es desconocido
+    empty = GeoZoneIndex({})
+    assert empty.lookup_point(19.4, -99.1) == (-1, float('inf'))
+    assert (empty.lookup(latitude, longitude)[0] == -1).all()
+
+
+if __name__ == "__main__":
+    test_builtin_zones()
+    test_overlaps_and_edges()
+    print("\n🎉 Prueba del índice de geocercas completada")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de las geocercas poligonales (GeoJSON) y su índice espacial
+"""
+
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.geo_index import GeoZoneIndex, PolygonZoneIndex, load_geojson_zones, polygon_zone
+from geo_fixtures import sample_zones, square
+
+
+def point_in_ring(ring: list, x: float, y: float) -> bool:
+    """Regla par-impar escrita a mano para comparar"""
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def brute_force(zones: dict, latitude: float, longitude: float) -> str:
+    """Zona de centro más cercano entre todas las que contienen al punto"""
+    best, best_distance = 'unknown', math.inf
+    for name, zone in zones.items():
+        if 'polygon' in zone:
+            crossings = sum(point_in_ring(ring, longitude, latitude) for ring in zone['polygon'])
+            inside = crossings % 2 == 1
+        else:
+            inside = math.dist(zone['center'], (latitude, longitude)) <= zone['radius']
+        distance = math.dist(zone['center'], (latitude, longitude))
+        if inside and distance < best_distance:
+            best, best_distance = name, distance
+    return best
+
+
+def random_polygon_zones(n_side: int, seed: int = 0) -> dict:
+    """Una malla de `n_side` x `n_side` polígonos irregulares sobre CDMX"""
+    rng = np.random.default_rng(seed)
+    step = 1.0 / n_side
+    zones = {}
+    for i in range(n_side):
+        for j in range(n_side):
+            lat, lon = 19 + (i + 0.5) * step, -99.5 + (j + 0.5) * step
+            angles = np.sort(rng.uniform(0, 2 * np.pi, 20))
+            radii = step * rng.uniform(0.3, 0.75, 20)
+            ring = np.column_stack([lon + radii * np.cos(angles), lat + radii * np.sin(angles)]).tolist()
+            zones[f'colonia_{i}_{j}'] = polygon_zone([[ring + ring[:1]]], 'media')
+    return zones
+
+
+def test_polygon_lookup():
+    """Huecos, multipolígonos, traslapes y círculos resuelven igual que a fuerza bruta"""
+
+    print("🗺️ Probando la búsqueda en polígonos")
+    print("=" * 60)
+
+    zones = sample_zones()
+    index = PolygonZoneIndex(zones)
+    names = index.names
+
+    assert names[index.lookup_point(19.4, -99.2)[0]] == 'unknown'   # en el hueco
+    assert names[index.lookup_point(19.41, -99.21)[0]] == 'dona'
+    assert names[index.lookup_point(19.3, -98.95)[0]] == 'islas'     # segunda isla
+    assert names[index.lookup_point(19.3, -98.975)[0]] == 'unknown'  # entre islas
+    assert names[index.lookup_point(19.4, -99.165)[0]] == 'vecina'
+    assert names[index.lookup_point(19.21, -99.1)[0]] == 'circulo'
+    assert np.allclose(zones['islas']['center'], (19.3, -98.975))
+
+    # Puntos alrededor de cada zona, dentro y fuera de sus bordes
+    rng = np.random.default_rng(0)
+    centers = np.array([zone['center'] for zone in zones.values()])[rng.integers(0, len(zones), 20000)]
+    latitude = centers[:, 0] + rng.uniform(-0.03, 0.03, 20000)
+    longitude = centers[:, 1] + rng.uniform(-0.03, 0.03, 20000)
+    zone_ids, distances = index.lookup(latitude, longitude)
+    for i in range(0, 20000, 10):
+        single = index.lookup_point(latitude[i], longitude[i])
+        assert single == (zone_ids[i], distances[i]) or (single[0] == zone_ids[i] == -1)
+        assert names[zone_ids[i]] == brute_force(zones, latitude[i], longitude[i])
+    print(f"   {np.mean(zone_ids >= 0):.0%} de los puntos dentro de alguna geocerca")
+
+    # Sólo círculos: mismo resultado que el índice circular
+    circles = AdvancedFlowClassifier().geo_zones
+    expected = GeoZoneIndex(circles).lookup(latitude, longitude)
+    actual = PolygonZoneIndex(circles).lookup(latitude, longitude)
+    assert (expected[0] == actual[0]).all() and np.array_equal(expected[1], actual[1])
+
+
+def test_geojson_loading():
+    """Un GeoJSON con atributos opcionales se carga con los valores por plusvalía"""
+
+    print("\n📄 Probando la carga de GeoJSON")
+    print("=" * 60)
+
+    collection = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'name': 'norte', 'plusvalia': 'alta', 'wifi_coverage': 0.97},
+         'geometry': {'type': 'Polygon', 'coordinates': [square(-99.1, 19.5, 0.02)]}},
+        {'type': 'Feature', 'properties': {'name': 'sur', 'plusvalia': 'emergente',
+                                           'network_speed_range': [1, 4], 'center': [19.25, -99.05]},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [[square(-99.05, 19.25, 0.01)]]}}
+    ]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'colonias.geojson')
+        with open(path, 'w') as f:
+            json.dump(collection, f)
+        zones = load_geojson_zones(path)
+
+        assert list(zones) == ['norte', 'sur']
+        assert zones['norte']['wifi_coverage'] == 0.97 and zones['norte']['quality_factor'] == 1.2
+        assert zones['sur']['network_speed_range'] == (1.0, 4.0)
+        assert zones['sur']['center'] == (19.25, -99.05)
+        assert abs(zones['norte']['radius'] - math.sqrt(0.04 ** 2 / math.pi)) < 1e-12
+
+        collection['features'][0]['properties']['plusvalia'] = 'altísima'
+        with open(path, 'w') as f:
+            json.dump(collection, f)
+        try:
+            load_geojson_zones(path)
+            raise AssertionError("Debió rechazar la plusvalía desconocida")
+        except ValueError as e:
+            print(f"   Rechazado: {e}")
+
+
+def test_many_zones():
+    """Con 10,000 polígonos la búsqueda de un punto sigue bajo el milisegundo"""
+
+    print("\n⚡ Probando 10,000 geocercas")
+    print("=" * 60)
+
+    zones = random_polygon_zones(100)
+    started = time.perf_counter()
+    index = PolygonZoneIndex(zones)
+    print(f"   Índice construido en {time.perf_counter() - started:.2f}s "
+          f"(malla {index.n_rows}x{index.n_cols})")
+
+    rng = np.random.default_rng(1)
+    latitude = rng.uniform(19, 20, 20000)
+    longitude = rng.uniform(-99.5, -98.5, 20000)
+    started = time.perf_counter()
+    zone_ids, _ = index.lookup(latitude, longitude)
+    batch_us = (time.perf_counter() - started) / len(latitude) * 1e6
+
+    points = list(zip(latitude[:2000].tolist(), longitude[:2000].tolist()))
+    started = time.perf_counter()
+    singles = [index.lookup_point(lat, lon)[0] for lat, lon in points]
+    single_us = (time.perf_counter() - started) / len(points) * 1e6
+    print(f"   Un punto: {single_us:.1f} µs; por lote: {batch_us:.2f} µs por punto")
+    assert singles == zone_ids[:2000].tolist()
+    assert single_us < 1000 and batch_us < 1000
+
+    names = list(zones)
+    for i in range(0, 2000, 100):
+        assert (names[zone_ids[i]] if zone_ids[i] >= 0 else 'unknown') == \
+            brute_force(zones, latitude[i], longitude[i])
+
+
+def test_classifier_with_geojson():
+    """El entrenamiento y la inferencia usan las geocercas del GeoJSON"""
+
+    print("\n🤖 Probando el modelo avanzado con geocercas poligonales")
+    print("=" * 60)
+
+    features = []
+    for name, zone in random_polygon_zones(12, seed=3).items():
+        features.append({'type': 'Feature', 'properties': {'name': name, 'plusvalia': zone['plusvalia']},
+                         'geometry': {'type': 'Polygon', 'coordinates': zone['polygon']}})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'colonias.geojson')
+        with open(path, 'w') as f:
+            json.dump({'type': 'FeatureCollection', 'features': features}, f)
+        os.environ['GEO_ZONES_FILE'] = path
+        try:
+            classifier = AdvancedFlowClassifier()
+        finally:
+            del os.environ['GEO_ZONES_FILE']
+
+    assert len(classifier.geo_zones) == 144 and isinstance(classifier.zone_index, PolygonZoneIndex)
+    assert classifier.get_model_info()['geo_zones_source'] == path
+
+    X, _ = classifier._create_advanced_training_data(2000, seed=5)
+    zone_ids, distances = classifier.zone_index.lookup(X[:, 3], X[:, 4])
+    assert np.array_equal(X[:, 5], distances)
+    print(f"   {np.mean(zone_ids >= 0):.0%} de las muestras de entrenamiento dentro de una colonia")
+
+    classifier.train(save=False)
+    zone = classifier.geo_zones['colonia_5_5']
+    result = classifier.predict(True, 'ios', *zone['center'])
+    assert result['zone_info']['zone_name'] == 'colonia_5_5'
+    batch = classifier.predict_batch([{'wifi': True, 'device': 'ios', 'latitude': zone['center'][0],
+                                       'longitude': zone['center'][1]}])
+    assert batch[0] == result
+    print(f"   {result['zone_info']['zone_name']}: {result['flow_type']} ({result['confidence_score']})")
+
+
+if __name__ == "__main__":
+    test_polygon_lookup()
+    test_geojson_loading()
+    test_many_zones()
+    test_classifier_with_geojson()
+    print("\n🎉 Prueba de geocercas poligonales completada")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del ejecutor de inferencia (app/inference_executor.py)
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+
+from fastapi import HTTPException
+
+from app.inference_executor import ExecutorOverloadedError, InferenceExecutor, InferenceTimeoutError
+from app.ml_model import ConnectionQualityClassifier
+
+BASIC_ARGS = (True, 'ios', 19.4333, -99.2000, 25.0)
+
+
+class BlockingModel:
+    """Modelo falso: cada predicción espera a `release` (o falla si se le pide)"""
+
+    is_trained = True
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict(self, value, fail: bool = False):
+        self.release.wait(5)
+        if fail:
+            raise RuntimeError("falla del modelo")
+        return {'value': value}
+
+    predict_batch = predict
+
+
+def test_limits_and_metrics():
+    """La cola llena rechaza de inmediato, el tiempo límite corta la espera y las métricas cuadran"""
+
+    print("🧵 Probando límites y métricas del ejecutor")
+    print("=" * 60)
+
+    model = BlockingModel()
+    executor = InferenceExecutor(lambda: {'basic': model, 'advanced': model},
+                                 max_workers=1, max_pending=2, timeout=0.2)
+
+    async def run():
+        # Dos en vuelo (una corriendo, una en cola): la tercera se rechaza sin encolarse
+        first = asyncio.create_task(executor.run('basic_predict', 1))
+        second = asyncio.create_task(executor.run('advanced_predict', 2))
+        await asyncio.sleep(0.05)
+        try:
+            await executor.run('basic_predict', 3)
+            raise AssertionError("Debió rechazar la tercera solicitud")
+        except ExecutorOverloadedError as e:
+            print(f"   Rechazada: {e}")
+        assert executor.metrics()['pending'] == 2
+
+        model.release.set()
+        assert await first == {'value': 1} and await second == {'value': 2}
+
+        # Un error del modelo llega al que llamó y cuenta como fallida
+        try:
+            await executor.run('basic_predict', 4, True)
+            raise AssertionError("Debió propagar el error del modelo")
+        except RuntimeError:
+            pass
+
+        # Una inferencia lenta excede el tiempo límite; su lugar se libera al terminar de verdad
+        model.release.clear()
+        try:
+            await executor.run('basic_predict', 5)
+            raise AssertionError("Debió exceder el tiempo límite")
+        except InferenceTimeoutError as e:
+            print(f"   Tiempo agotado: {e}")
+        assert executor.metrics()['pending'] == 1
+        model.release.set()
+        await asyncio.sleep(0.05)
+
+        try:
+            await executor.run('unknown_task')
+            raise AssertionError("Debió rechazar la tarea desconocida")
+        except ValueError:
+            pass
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    stats = executor.metrics()
+    print(f"   {stats}")
+    assert stats['submitted'] == 4 and stats['rejected'] == 1 and stats['timed_out'] == 1
+    assert stats['completed'] == 3 and stats['failed'] == 1 and stats['pending'] == 0
+    assert stats['max_latency_ms'] >= stats['avg_latency_ms'] > 0
+    assert stats['avg_queue_wait_ms'] >= 0
+
+
+def test_http_mapping():
+    """Cola llena responde 503 y tiempo agotado 504"""
+
+    print("\n🌐 Probando la traducción a códigos HTTP")
+    print("=" * 60)
+
+    import app.main as main
+
+    model = BlockingModel()
+    saved = main.inference_executor, main.classifier
+    main.classifier = model
+    main.inference_executor = InferenceExecutor(lambda: {'basic': model, 'advanced': model},
+                                                max_workers=1, max_pending=1, timeout=0.1)
+
+    async def run():
+        statuses = []
+        # La primera ocupa el único lugar: la segunda se rechaza y la primera se queda sin tiempo
+        blocked = asyncio.create_task(main.run_inference('basic_predict', 1))
+        await asyncio.sleep(0.02)
+        for call in (main.run_inference('basic_predict', 2), blocked):
+            try:
+                await call
+            except HTTPException as e:
+                statuses.append(e.status_code)
+                print(f"   {e.status_code}: {e.detail}")
+        model.release.set()
+        return statuses
+
+    try:
+        statuses = asyncio.run(run())
+    finally:
+        main.inference_executor.shutdown()
+        main.inference_executor, main.classifier = saved
+    assert statuses == [503, 504], statuses
+
+
+def test_process_reload():
+    """En modo 'process' los workers cargan los modelos guardados y `reload()` toma los nuevos"""
+
+    print("\n🔁 Probando recarga del pool de procesos")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        basic_path = os.path.join(tmp, 'basic.joblib')
+        advanced_path = os.path.join(tmp, 'advanced.joblib')
+        shutil.copy('advanced_flow_model.joblib', advanced_path)
+        basic = ConnectionQualityClassifier()
+        basic.train()
+        basic.save_model(basic_path)
+
+        # Otro modelo con los coeficientes invertidos: predice lo contrario
+        flipped = ConnectionQualityClassifier()
+        flipped.train()
+        flipped.model.coef_ = -flipped.model.coef_
+        flipped.model.intercept_ = -flipped.model.intercept_
+        flipped._fold_linear_model()
+
+        executor = InferenceExecutor(mode='process', max_workers=1, timeout=60,
+                                     basic_model_path=basic_path, advanced_model_path=advanced_path)
+
+        async def predict():
+            return await executor.run('basic_predict', *BASIC_ARGS)
+
+        try:
+            assert asyncio.run(predict()) == basic.predict(*BASIC_ARGS)
+
+            flipped.save_model(basic_path)
+            # Sin recargar, el worker sigue con el modelo que cargó al arrancar
+            assert asyncio.run(predict()) == basic.predict(*BASIC_ARGS)
+            executor.reload()
+            reloaded = asyncio.run(predict())
+            assert reloaded == flipped.predict(*BASIC_ARGS) != basic.predict(*BASIC_ARGS)
+            print(f"   Antes: {basic.predict(*BASIC_ARGS)['flow_type']} · "
+                  f"después de reload(): {reloaded['flow_type']}")
+        finally:
+            executor.shutdown()
+        assert executor.metrics()['completed'] == 3
+
+
+if __name__ == "__main__":
+    test_limits_and_metrics()
+    test_http_mapping()
+    test_process_reload()
+    print("\n🎉 Prueba del ejecutor de inferencia completada")
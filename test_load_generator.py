@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del generador de carga (mezcla de tráfico y reporte)
+"""
+
+import asyncio
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.load_generator import (
+    PERCENTILES,
+    TrafficMix,
+    compare_reports,
+    open_client,
+    run_load,
+    wait_until_ready,
+)
+
+
+def test_traffic_mix():
+    """La mezcla cubre todos los endpoints, cae en las geocercas y omite opcionales"""
+
+    print("🚦 Probando la mezcla de tráfico")
+    print("=" * 60)
+
+    classifier = AdvancedFlowClassifier()
+    mix = TrafficMix(classifier.geo_zones, seed=1)
+    requests = [mix.next_request() for _ in range(2000)]
+
+    endpoints = {}
+    for endpoint, _, _, _, _ in requests:
+        endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+    print(f"   Solicitudes por endpoint: {endpoints}")
+    assert set(endpoints) == set(mix.endpoints)
+    assert endpoints['web_app_experience'] > endpoints['advanced_compare']
+
+    # La mayoría de las ubicaciones caen dentro de alguna geocerca
+    records = [params for endpoint, _, _, params, _ in requests if endpoint == 'advanced_predict']
+    zones = [classifier._get_zone_info(r['latitude'], r['longitude'])['zone_name'] for r in records]
+    inside = sum(zone != 'unknown' for zone in zones) / len(zones)
+    print(f"   Dentro de geocerca: {inside:.0%}, zonas distintas: {len(set(zones))}")
+    assert 0.8 < inside < 1.0
+    assert len(set(zones)) >= 6
+
+    # Parámetros parciales y combinaciones de wifi/dispositivo
+    assert any('network_speed' not in r for r in records)
+    assert any('time_of_day' in r for r in records)
+    assert {(r['wifi'], r['device']) for r in records} == {
+        (True, 'android'), (True, 'ios'), (False, 'android'), (False, 'ios')
+    }
+
+    # Con la misma semilla se repite el tráfico
+    again = TrafficMix(classifier.geo_zones, seed=1)
+    assert [again.next_request() for _ in range(50)] == requests[:50]
+
+
+def test_in_process_run():
+    """Una corrida corta contra la app ASGI reporta percentiles sin errores"""
+
+    print("\n🏃 Probando una corrida en el mismo proceso")
+    print("=" * 60)
+
+    import app.main as main
+
+    async def run():
+        mix = TrafficMix.from_classifier(seed=2)
+        async with open_client(app=main.app) as client:
+            await wait_until_ready(client)
+            return await run_load(client, mix, total_requests=120, concurrency=4, warmup_requests=10)
+
+    report = asyncio.run(run())
+    total = report['total']
+    print(f"   {total['requests']} solicitudes, {total['throughput_rps']} rps, {total['latency_ms']}")
+    assert total['requests'] == 120
+    assert total['errors'] == 0, total['status_counts']
+    latencies = [total['latency_ms'][name] for name, _ in PERCENTILES]
+    assert latencies == sorted(latencies)
+    assert sum(summary['requests'] for summary in report['endpoints'].values()) == 120
+
+    rows = compare_reports(report, report)
+    assert rows and all(change in (0.0, None) for _, _, _, _, change in rows)
+
+
+if __name__ == "__main__":
+    test_traffic_mix()
+    test_in_process_run()
+    print("\n🎉 Prueba del generador de carga completada")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los logs estructurados (JSON, muestreo por ruta y descarte)
+"""
+
+import io
+import json
+import logging
+import queue
+import time
+from contextlib import redirect_stdout
+
+from app import log, metrics
+
+
+def capture_logs(emit, **config) -> list:
+    """Corre `emit` con los logs configurados y regresa las líneas escritas"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        log.configure(**config)
+        try:
+            emit(log.get_logger('app.test'))
+        finally:
+            # Detener el hilo de fondo escribe lo que quedaba en la cola
+            log.shutdown()
+    log.configure()
+    return [line for line in output.getvalue().splitlines() if line]
+
+
+def test_json_and_levels():
+    """Una línea JSON por registro con sus campos; los niveles bajos se filtran"""
+
+    print("🪵 Probando el formato JSON y los niveles")
+    print("=" * 60)
+
+    def emit(logger):
+        logger.debug("no aparece")
+        logger.info("✅ Modelo cargado", extra=log.fields(model='basic', path='modelo.artifact'))
+        try:
+            raise ValueError("falla de prueba")
+        except ValueError:
+            logger.exception("❌ Error")
+
+    lines = capture_logs(emit, level='INFO', fmt='json')
+    for line in lines:
+        print(f"   {line[:120]}")
+    entries = [json.loads(line) for line in lines]
+    assert len(entries) == 2
+    assert entries[0]['message'] == "✅ Modelo cargado"
+    assert entries[0]['level'] == 'INFO' and entries[0]['logger'] == 'app.test'
+    assert entries[0]['model'] == 'basic' and entries[0]['path'] == 'modelo.artifact'
+    assert entries[1]['level'] == 'ERROR' and 'falla de prueba' in entries[1]['exception']
+
+    lines = capture_logs(lambda logger: logger.info("texto", extra=log.fields(a=1)), fmt='text')
+    assert lines == ['texto a=1']
+
+
+def test_route_sampling():
+    """Los logs por solicitud respetan la tasa de su ruta; las advertencias nunca se muestrean"""
+
+    print("\n🎲 Probando el muestreo por ruta")
+    print("=" * 60)
+
+    def emit(logger):
+        for i in range(200):
+            log.log_request(logger, '/silenciosa', "Predicción", i=i)
+            log.log_request(logger, '/mitad', "Predicción", i=i)
+            log.log_request(logger, '/otra', "Predicción", i=i)
+        log.log_request(logger, '/silenciosa', "⚠️ Lenta", level=logging.WARNING)
+
+    lines = capture_logs(emit, sample_rates='/silenciosa=0,/mitad=0.5', default_sample_rate=1.0)
+    routes = [json.loads(line)['route'] for line in lines]
+    counts = {route: routes.count(route) for route in ('/silenciosa', '/mitad', '/otra')}
+    print(f"   Registros por ruta: {counts}")
+    assert counts['/silenciosa'] == 1
+    assert 50 < counts['/mitad'] < 150
+    assert counts['/otra'] == 200
+
+
+def test_drop_when_saturated():
+    """Con la cola llena los registros se descartan sin bloquear a quien los emite"""
+
+    print("\n🚰 Probando el descarte bajo saturación")
+    print("=" * 60)
+
+    handler = log.DroppingQueueHandler(queue.Queue(maxsize=10))
+    logger = logging.Logger('saturado')
+    logger.addHandler(handler)
+    before = metrics.LOG_RECORDS_DROPPED_TOTAL.value()
+
+    # Nadie consume la cola: sólo caben 10 registros
+    started = time.perf_counter()
+    for i in range(1000):
+        logger.info("Predicción", extra=log.fields(i=i))
+    elapsed = time.perf_counter() - started
+
+    print(f"   1000 registros en {elapsed * 1000:.1f} ms, descartados: {handler.dropped}")
+    assert handler.queue.qsize() == 10
+    assert handler.dropped == 990
+    assert metrics.LOG_RECORDS_DROPPED_TOTAL.value() - before == 990
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    test_json_and_levels()
+    test_route_sampling()
+    test_drop_when_saturated()
+    print("\n🎉 Prueba de logs completada")
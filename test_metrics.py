@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de las métricas en formato Prometheus
+"""
+
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_metrics_format():
+    """Histogramas acumulativos, contadores con etiquetas y escape de valores"""
+
+    print("📈 Probando el formato de las métricas")
+    print("=" * 60)
+
+    registry = MetricsRegistry()
+    histogram = Histogram('demo_seconds', 'Demo', ('route',), buckets=(0.1, 1.0), registry=registry)
+    counter = Counter('demo_total', 'Demo', ('zone',), registry=registry)
+    histogram.observe(0.05, ('/a',))
+    histogram.observe(0.5, ('/a',))
+    histogram.observe(5.0, ('/a',))
+    counter.inc(('con "comillas"',))
+    counter.inc(('con "comillas"',), amount=2)
+
+    text = registry.render()
+    print(text)
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+    assert 'demo_seconds_sum{route="/a"} 5.55' in text
+    assert 'demo_total{zone="con \\"comillas\\""} 3' in text
+
+
+def test_metrics_endpoint():
+    """`/metrics` expone latencia por ruta, etapas, flujos, zonas y versión del modelo"""
+
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        params = {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000}
+        for speed in (5.0, 15.0, 45.0):
+            assert client.get('/advanced-flow/predict', params=dict(params, network_speed=speed)).status_code == 200
+        assert client.get('/web-and-app-experience', params={'wifi': False, 'device': 'android'}).status_code == 200
+        assert client.get('/training-jobs/no-existe').status_code == 404
+
+        response = client.get('/metrics')
+        assert response.headers['content-type'].startswith('text/plain')
+        text = response.text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/advanced-flow/predict"}' in text
+    assert 'http_requests_total{method="GET",route="/training-jobs/{job_id}",status="404"} 1' in text
+    assert 'prediction_zones_total{zone="polanco",plusvalia="alta"}' in text
+    assert 'predictions_total{model="basic",flow_type="flow-2"}' in text
+    assert 'model_info{model="advanced",version=' in text
+    for stage in metrics.PREDICTION_STAGES['advanced']:
+        assert f'prediction_stage_seconds_count{{model="advanced",path="batch",stage="{stage}"}}' in text
+    assert 'http_response_serialization_seconds_count' in text
+
+
+def test_instrumentation_overhead():
+    """La instrumentación cuesta microsegundos por predicción"""
+
+    report = metrics.benchmark_overhead(repeats=2000)
+    print(f"   {report}")
+    assert report['histogram_observe_us'] < 50
+    assert report['basic_overhead_us'] < 50
+
+
+if __name__ == "__main__":
+    test_metrics_format()
+    test_metrics_endpoint()
+    test_instrumentation_overhead()
+    print("\n🎉 Prueba de métricas completada")
@@ -3,6 +3,8 @@
 Script de prueba para el modelo de clasificación con geocercas
 """
 
+import numpy as np
+
 from app.ml_model import classifier
 from app.models import DeviceType
 
@@ -72,5 +74,48 @@ def test_model_predictions():
     print("\n" + "=" * 70)
     print("✅ Pruebas completadas")
 
+def test_predict_batch():
+    """Verifica que la predicción por lotes coincide con la predicción individual"""
+    
+    records = [
+        {'wifi': True, 'device': 'android', 'latitude': 19.4326, 'longitude': -99.1332, 'network_speed': 15.0},
+        {'wifi': False, 'device': 'ios', 'latitude': 19.8, 'longitude': -99.0, 'network_speed': 1.5},
+        {'wifi': True, 'device': 'ios', 'latitude': None, 'longitude': None, 'network_speed': None},
+        {'wifi': False, 'device': 'android', 'latitude': 19.3, 'longitude': -99.2, 'network_speed': None}
+    ]
+    
+    batch_results = classifier.predict_batch(records)
+    assert len(batch_results) == len(records)
+    
+    for record, batch_result in zip(records, batch_results):
+        assert batch_result == classifier.predict(**record)
+    
+    print("✅ Predicción por lotes consistente con la predicción individual")
+
+def test_folded_model_matches_sklearn():
+    """El modelo plegado debe dar las mismas probabilidades que scaler + predict_proba"""
+    
+    if not classifier.is_trained:
+        classifier.train()
+    
+    rng = np.random.default_rng(0)
+    n = 5000
+    X = np.column_stack([
+        rng.integers(0, 2, n), rng.integers(0, 2, n), rng.integers(0, 2, n),
+        rng.uniform(19.0, 20.0, n), rng.uniform(-99.5, -98.5, n),
+        rng.uniform(0.0, 1.0, n), rng.integers(0, 2, n), rng.exponential(10, n)
+    ])
+    
+    expected = classifier.model.predict_proba(classifier.scaler.transform(X))[:, 1]
+    z = X @ np.array(classifier.weights) + classifier.bias
+    folded = 1.0 / (1.0 + np.exp(-z))
+    
+    assert np.allclose(folded, expected, rtol=0, atol=1e-12)
+    assert ((z > 0) == (classifier.model.predict(classifier.scaler.transform(X)) == 1)).all()
+    
+    print("✅ Modelo plegado equivalente a StandardScaler + LogisticRegression")
+
 if __name__ == "__main__":
     test_model_predictions()
+    test_predict_batch()
+    test_folded_model_matches_sklearn()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del registro de versiones de modelos y el cambio en caliente
+"""
+
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.model_registry import ModelRegistry, RegistryError, RegistryWatcher
+from app.startup import warmup_records
+
+
+def _train_advanced(n_estimators: int) -> AdvancedFlowClassifier:
+    model = AdvancedFlowClassifier(model_params={'n_estimators': n_estimators})
+    model.train(save=False)
+    return model
+
+
+def test_registry_versions_and_rollback():
+    """Versiones por contenido, activación, cambio en caliente y rollback"""
+
+    print("🗃️ Probando el registro de modelos")
+    print("=" * 60)
+
+    records = warmup_records(40)
+    first, second = _train_advanced(5), _train_advanced(15)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(tmp)
+        applied = []
+        watcher = RegistryWatcher(registry, lambda kind, model, version: applied.append((kind, model, version)))
+
+        v1 = registry.register('advanced', first, activate=True)
+        assert registry.register('advanced', first) == v1  # mismo contenido, misma versión
+        assert watcher.sync() == {'advanced': v1}
+        assert watcher.sync() == {}
+        served = applied[-1][1]
+        assert served.model is None
+        assert served.predict_batch(records) == first.predict_batch(records)
+
+        v2 = registry.register('advanced', second)
+        assert v2 != v1
+        assert registry.active_version('advanced') == v1
+        assert watcher.activate('advanced', v2) == v2
+        assert applied[-1][2] == v2
+        assert applied[-1][1].predict_batch(records) == second.predict_batch(records)
+        print(f"   ✅ Versión {v1} → {v2}")
+
+        # Rollback a la versión anterior
+        assert watcher.activate('advanced', rollback=True) == v1
+        assert registry.active_version('advanced') == v1
+        assert [entry['action'] for entry in registry.history('advanced')] == [
+            'activate', 'activate', 'rollback'
+        ]
+
+        # Una versión corrupta no se aplica y la activa no cambia
+        bad_path = registry.artifact_path('advanced', 'corrupta')
+        with open(bad_path, 'wb') as f:
+            f.write(b'no es un artefacto')
+        try:
+            watcher.activate('advanced', 'corrupta')
+            assert False, "Se esperaba un error de validación"
+        except Exception:
+            pass
+        assert registry.active_version('advanced') == v1
+        assert watcher.loaded['advanced'] == v1
+
+        # Si alguien apunta ACTIVE a la versión corrupta, el watcher la ignora
+        registry.activate('advanced', 'corrupta')
+        assert watcher.sync() == {}
+        assert watcher.errors['advanced']['version'] == 'corrupta'
+        assert applied[-1][2] == v1
+
+        try:
+            registry.activate('advanced', 'no-existe')
+            assert False, "Se esperaba RegistryError"
+        except RegistryError:
+            pass
+
+
+def test_registry_endpoints():
+    """El servicio reporta la versión activa y permite activar y regresar versiones"""
+
+    import app.main as main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ModelRegistry(tmp)
+        basic_model = main.ConnectionQualityClassifier()
+        basic_model.train()
+        registry.register('basic', basic_model, activate=True)
+        v1 = registry.register('advanced', _train_advanced(5), activate=True)
+        v2 = registry.register('advanced', _train_advanced(15))
+
+        paths = (main.inference_executor.basic_model_path, main.inference_executor.advanced_model_path)
+        main.model_registry = registry
+        main.registry_watcher = RegistryWatcher(registry, main.swap_model, interval=60)
+        try:
+            with TestClient(main.app) as client:
+                assert client.get('/advanced-flow/info').json()['active_version'] == v1
+                assert client.get('/model-info').json()['active_version'] is not None
+
+                response = client.post('/models/advanced/activate', params={'version': v2})
+                assert response.status_code == 200
+                assert client.get('/advanced-flow/info').json()['active_version'] == v2
+                assert client.get('/models/registry').json()['advanced']['serving_version'] == v2
+
+                response = client.post('/models/advanced/rollback')
+                assert response.json()['active_version'] == v1
+                assert client.get('/advanced-flow/info').json()['active_version'] == v1
+
+                assert client.post('/models/advanced/activate', params={'version': 'x'}).status_code == 404
+                assert client.post('/models/otro/rollback').status_code == 400
+        finally:
+            main.model_registry = None
+            main.registry_watcher = None
+            main.model_versions.update(basic=None, advanced=None)
+            main.inference_executor.basic_model_path, main.inference_executor.advanced_model_path = paths
+
+
+if __name__ == "__main__":
+    test_registry_versions_and_rollback()
+    test_registry_endpoints()
+    print("\n🎉 Prueba del registro de modelos completada")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del sweep de hiperparámetros
+"""
+
+import os
+import tempfile
+
+from app.model_sweep import dataset_cache_dir, pareto_front, run_sweep
+
+
+def test_pareto_front():
+    """Sólo quedan los candidatos no dominados"""
+    results = [
+        {'name': 'lento_preciso', 'accuracy': 0.99, 'single_p50_us': 300, 'batch_per_row_us': 30},
+        {'name': 'rapido', 'accuracy': 0.95, 'single_p50_us': 100, 'batch_per_row_us': 10},
+        {'name': 'dominado', 'accuracy': 0.94, 'single_p50_us': 200, 'batch_per_row_us': 20}
+    ]
+    assert [r['name'] for r in pareto_front(results)] == ['rapido', 'lento_preciso']
+
+
+def test_run_sweep():
+    """El sweep valida todos los candidatos, mide latencia y recomienda uno"""
+
+    print("🔬 Probando sweep de hiperparámetros")
+    print("=" * 60)
+
+    grid = {'n_estimators': [5, 20], 'max_depth': [4, None], 'max_features': ['sqrt']}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        report = run_sweep('advanced', grid=grid, n_samples=2000, n_folds=2, max_workers=2,
+                           accuracy_floor=0.9, cache_dir=cache_dir)
+
+        assert len(report['candidates']) == 4
+        for result in report['candidates']:
+            assert 0.0 <= result['accuracy'] <= 1.0
+            assert result['single_p50_us'] > 0 and result['batch_per_row_us'] > 0
+        assert report['pareto_front']
+        assert report['recommended']['accuracy'] >= 0.9
+
+        accuracy = {str(r['params']): r['accuracy'] for r in report['candidates']}
+
+        # Mismo tipo, filas, semilla y folds: se reutiliza el dataset y los folds en caché
+        path = dataset_cache_dir(cache_dir, 'advanced', 2000, 42, 2)
+        files = {name: os.stat(os.path.join(path, name)).st_mtime_ns for name in ('X.npy', 'y.npy', 'folds.npy')}
+        again = run_sweep('advanced', grid={'n_estimators': [5], 'max_depth': [4], 'max_features': ['sqrt']},
+                          n_samples=2000, n_folds=2, max_workers=1, cache_dir=cache_dir)
+        assert {name: os.stat(os.path.join(path, name)).st_mtime_ns for name in files} == files
+        assert os.listdir(cache_dir) == [os.path.basename(path)]
+        assert again['candidates'][0]['accuracy'] == accuracy[str(again['candidates'][0]['params'])]
+
+        # Otro modelo es otra llave: genera su propio dataset
+        report = run_sweep('basic', grid={'C': [0.1, 1.0]}, n_samples=2000, n_folds=2,
+                           max_workers=1, cache_dir=cache_dir)
+        assert len(report['candidates']) == 2
+        assert sorted(os.listdir(cache_dir)) == ['advanced_2000_s42_k2', 'basic_2000_s42_k2']
+
+    print(f"   Recomendado: {report['recommended']['params']}")
+
+
+if __name__ == "__main__":
+    test_pareto_front()
+    test_run_sweep()
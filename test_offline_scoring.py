@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la re-puntuación masiva fuera del servicio (bulk_score.py)
+"""
+
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from app.load_generator import TrafficMix
+from app.offline_scoring import OUTPUT_COLUMNS, run_bulk_scoring, score_block
+
+MODEL_PATH = 'advanced_flow_model.joblib'
+INPUT_COLUMNS = ('wifi', 'device', 'latitude', 'longitude', 'network_speed', 'battery_level', 'time_of_day')
+
+
+def load_classifier():
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+
+    classifier = AdvancedFlowClassifier()
+    classifier.model_path = MODEL_PATH
+    classifier.load_model()
+    return classifier
+
+
+def make_records(classifier, n: int, seed: int = 0) -> list:
+    mix = TrafficMix(classifier.geo_zones, seed=seed)
+    return [mix.record() for _ in range(n)]
+
+
+def write_inputs(records: list, tmp: str) -> dict:
+    """El mismo tráfico como CSV, .npy estructurado y directorio columnar"""
+    columns = {name: np.array([np.nan if r.get(name) is None else r[name] for r in records])
+               for name in INPUT_COLUMNS if name != 'device'}
+    columns['wifi'] = columns['wifi'].astype(bool)
+    columns['device'] = np.array([r['device'] for r in records], dtype='S7')
+
+    paths = {'csv': os.path.join(tmp, 'entrada.csv'), 'npy': os.path.join(tmp, 'entrada.npy'),
+             'columnar': os.path.join(tmp, 'entrada')}
+    with open(paths['csv'], 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(INPUT_COLUMNS)
+        for r in records:
+            writer.writerow(['' if r.get(name) is None else r[name] for name in INPUT_COLUMNS])
+
+    data = np.empty(len(records), dtype=[(name, columns[name].dtype) for name in INPUT_COLUMNS])
+    for name in INPUT_COLUMNS:
+        data[name] = columns[name]
+    np.save(paths['npy'], data)
+
+    os.makedirs(paths['columnar'])
+    for name in INPUT_COLUMNS:
+        np.save(os.path.join(paths['columnar'], f'{name}.npy'), columns[name])
+    return paths
+
+
+def read_csv_output(path: str) -> list:
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_score_block():
+    """Un bloque puntuado coincide con predict_batch y marca las filas inválidas"""
+
+    print("🧮 Probando la puntuación de un bloque")
+    print("=" * 60)
+
+    classifier = load_classifier()
+    records = make_records(classifier, 300)
+    columns = {name: [r.get(name) for r in records] for name in INPUT_COLUMNS}
+    for name in ('network_speed', 'battery_level', 'time_of_day'):
+        columns[name] = np.array(columns[name], dtype=float)
+    columns['device'][7] = 'blackberry'
+    columns['latitude'][9] = np.nan
+
+    block = score_block(classifier, columns, start=1000)
+    assert list(block) == list(OUTPUT_COLUMNS)
+    assert block['row'][0] == 1000 and block['row'][-1] == 1299
+    assert block['flow_type'][7] == '' and block['flow_type'][9] == ''
+    assert np.isnan(block['confidence_score'][7])
+
+    valid = [i for i in range(300) if i not in (7, 9)]
+    expected = classifier.predict_batch([records[i] for i in valid])
+    for i, prediction in zip(valid, expected):
+        assert block['flow_type'][i] == prediction['flow_type']
+        assert block['confidence_score'][i] == prediction['confidence_score']
+        zone = prediction['zone_info']
+        assert block['zone_name'][i] == zone['zone_name'] and block['plusvalia'][i] == zone['plusvalia']
+        distance = block['distance_to_center'][i]
+        assert (zone['distance_to_center'] is None and np.isnan(distance)) or distance == zone['distance_to_center']
+    print(f"   {len(valid)} filas iguales a predict_batch, 2 inválidas")
+
+
+def test_formats_and_resume():
+    """CSV, .npy y columnar dan lo mismo; una corrida caída se reanuda sin repetir bloques"""
+
+    print("\n🔁 Probando formatos y reanudación")
+    print("=" * 60)
+
+    classifier = load_classifier()
+    records = make_records(classifier, 1000, seed=1)
+    # Una fila inválida en un bloque que se reanuda y otra en uno que se vuelve a puntuar
+    records[3]['device'] = 'blackberry'
+    records[910]['device'] = 'blackberry'
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(records, tmp)
+        output = os.path.join(tmp, 'salida.csv')
+        parts_dir = f'{output}.parts'
+
+        summary = run_bulk_scoring(paths['csv'], output, MODEL_PATH, chunk_rows=150,
+                                   max_workers=2, keep_parts=True)
+        print(f"   {summary}")
+        assert summary['rows'] == 1000 and summary['chunks'] == 7 and summary['invalid_rows'] == 2
+        with open(output, 'rb') as f:
+            first_run = f.read()
+        rows = read_csv_output(output)
+        assert [int(row['row']) for row in rows] == list(range(1000))
+
+        # Simula una caída: se pierden dos partes y la salida
+        os.remove(os.path.join(parts_dir, 'part-00000002.csv'))
+        os.remove(os.path.join(parts_dir, 'part-00000006.csv'))
+        os.remove(output)
+        summary = run_bulk_scoring(paths['csv'], output, MODEL_PATH, chunk_rows=150, max_workers=2)
+        assert summary['resumed_chunks'] == 5 and summary['scored_rows'] == 150 + 100
+        # Las inválidas cuentan las de las partes reanudadas, igual que `rows`
+        assert summary['rows'] == 1000 and summary['invalid_rows'] == 2
+        with open(output, 'rb') as f:
+            assert f.read() == first_run
+        assert not os.path.exists(parts_dir)
+        print(f"   Reanudado: {summary['resumed_chunks']} bloques reutilizados, "
+              f"{summary['scored_rows']} filas puntuadas otra vez")
+
+        # Partes de otra corrida no se mezclan
+        run_bulk_scoring(paths['npy'], output, MODEL_PATH, chunk_rows=150, max_workers=1, keep_parts=True)
+        try:
+            run_bulk_scoring(paths['npy'], output, MODEL_PATH, chunk_rows=200, max_workers=1)
+            raise AssertionError("Debió rechazar partes con otro tamaño de bloque")
+        except ValueError:
+            pass
+        run_bulk_scoring(paths['npy'], output, MODEL_PATH, chunk_rows=200, max_workers=1, restart=True)
+        with open(output, 'rb') as f:
+            assert f.read() == first_run
+
+        # Entrada columnar con salida columnar
+        columnar_output = os.path.join(tmp, 'salida')
+        summary = run_bulk_scoring(paths['columnar'], columnar_output, MODEL_PATH, chunk_rows=300, max_workers=2)
+        assert summary['invalid_rows'] == 2
+        flow_type = np.load(os.path.join(columnar_output, 'flow_type.npy'))
+        confidence = np.load(os.path.join(columnar_output, 'confidence_score.npy'))
+        assert flow_type.tolist() == [row['flow_type'] for row in rows]
+        assert np.array_equal(confidence, [float(row['confidence_score'] or 'nan') for row in rows],
+                              equal_nan=True)
+        print("   CSV, .npy y columnar producen las mismas predicciones")
+
+
+def test_cli():
+    """El script imprime el resumen con filas por segundo"""
+
+    print("\n💻 Probando bulk_score.py")
+    print("=" * 60)
+
+    classifier = load_classifier()
+    records = make_records(classifier, 200, seed=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(records, tmp)
+        output = os.path.join(tmp, 'salida.csv')
+        completed = subprocess.run(
+            [sys.executable, 'bulk_score.py', paths['columnar'], output, '--model', MODEL_PATH,
+             '--workers', '1', '--chunk-rows', '64'],
+            capture_output=True, text=True
+        )
+        assert completed.returncode == 0, completed.stdout + completed.stderr
+        assert 'filas/s' in completed.stdout
+        assert len(read_csv_output(output)) == 200
+    print(completed.stdout.strip().splitlines()[-2])
+
+
+if __name__ == "__main__":
+    test_score_block()
+    test_formats_and_resume()
+    test_cli()
+    print("\n🎉 Prueba de re-puntuación masiva completada")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la serialización rápida de respuestas (bytes idénticos a Starlette)
+"""
+
+import math
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.load_generator import TrafficMix
+from app.models import WebAppExperienceResponse
+from app.serialization import dumps, dumps_stdlib
+
+
+def test_same_bytes_as_stdlib():
+    """Floats difíciles, texto no-ASCII y contenedores dan los mismos bytes"""
+
+    print("🧾 Probando bytes idénticos a json.dumps")
+    print("=" * 60)
+
+    rng = random.Random(0)
+    values = [0.0, -0.0, 1e-05, 3.2e-05, 0.0001, 0.00012, 1e16, 1e+22, 9007199254740992.0,
+              1.5e300, 5e-324, 0.1 + 0.2, 19.4326, -99.1332, 2 ** 70, 'Ñuñoa ✓ "comillas" \\',
+              'texto 1e5 y 0.00001', None, True, (1, 2), {'anidado': [1.25, None]}]
+    values += [rng.uniform(-1, 1) * 10 ** rng.randint(-8, 20) for _ in range(2000)]
+    for value in values:
+        content = {'valor': value, 'lista': [value, value]}
+        assert dumps(content) == dumps_stdlib(content), value
+    assert dumps({1: 'llave entera'}) == dumps_stdlib({1: 'llave entera'})
+    print(f"   {len(values)} valores serializados igual")
+
+
+def test_prediction_endpoints():
+    """Las respuestas de predicción son las mismas que con la validación de FastAPI"""
+
+    print("\n🔬 Probando los endpoints de predicción")
+    print("=" * 60)
+
+    import app.main as main
+
+    def old_body(content, response_model=None):
+        """Lo que producía FastAPI: validación opcional, jsonable_encoder y JSONResponse"""
+        if response_model is not None:
+            content = response_model(**content)
+        return JSONResponse(jsonable_encoder(content)).body
+
+    with TestClient(main.app) as client:
+        mix = TrafficMix(main.advanced_classifier.geo_zones, seed=3, batch_sizes=(5, 20))
+        checked = 0
+        for _ in range(300):
+            endpoint, method, path, params, body = mix.next_request()
+            response = client.request(method, path, params=params, json=body)
+            assert response.status_code == 200, response.text
+            assert response.headers['content-type'] == 'application/json'
+            result = response.json()
+
+            if endpoint == 'web_app_experience':
+                prediction = main.classifier.predict(
+                    params['wifi'], params['device'], params.get('latitude'),
+                    params.get('longitude'), params.get('network_speed')
+                )
+                assert response.content == old_body(prediction, WebAppExperienceResponse)
+            elif endpoint == 'advanced_predict':
+                assert response.content == old_body(result)
+                assert isinstance(result['confidence_score'], float)
+            else:
+                assert response.content == old_body(result)
+            checked += 1
+
+        # Fuera de geocerca la distancia es null
+        outside = client.get('/advanced-flow/predict', params={
+            'wifi': True, 'device': 'ios', 'latitude': 25.0, 'longitude': -100.0
+        }).json()
+        assert outside['zone_info']['distance_to_center'] is None
+
+    print(f"   {checked} respuestas idénticas a las de antes")
+
+
+def test_serialization_cost():
+    """Serializar una predicción cuesta unos pocos microsegundos"""
+
+    print("\n⚡ Probando el costo de serialización")
+    print("=" * 60)
+
+    from app.advanced_flow_classifier import AdvancedFlowClassifier
+
+    classifier = AdvancedFlowClassifier()
+    classifier.load_model()
+    prediction = classifier.predict(True, 'android', 19.4326, -99.1332)
+
+    def per_call(fn, n=2000):
+        best = math.inf
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(n):
+                fn()
+            best = min(best, (time.perf_counter() - started) / n)
+        return best * 1e6
+
+    fast = per_call(lambda: dumps(prediction))
+    before = per_call(lambda: JSONResponse(jsonable_encoder(prediction)).body)
+    print(f"   Antes: {before:.1f} µs, ahora: {fast:.1f} µs ({before / fast:.0f}x)")
+    assert fast < before / 3
+
+
+if __name__ == "__main__":
+    test_same_bytes_as_stdlib()
+    test_prediction_endpoints()
+    test_serialization_cost()
+    print("\n🎉 Prueba de serialización completada")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los modelos compartidos en memoria entre workers
+"""
+
+import os
+import tempfile
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.ml_model import ConnectionQualityClassifier
+from app.shared_models import SharedModelClient, SharedModelPublisher
+from app.supervisor import ModelSupervisor
+
+RECORDS = [
+    {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000,
+     'network_speed': 25.0, 'battery_level': 85.0, 'time_of_day': 14},
+    {'wifi': False, 'device': 'android', 'latitude': 19.3550, 'longitude': -99.0900,
+     'network_speed': 3.0, 'battery_level': 15.0, 'time_of_day': 8}
+]
+
+
+def _attach(artifacts):
+    """Arma los clasificadores de un worker a partir de los artefactos compartidos"""
+    basic = ConnectionQualityClassifier()
+    basic.load_artifact(artifacts['basic'])
+    advanced = AdvancedFlowClassifier()
+    advanced.load_artifact(artifacts['advanced'])
+    return basic, advanced
+
+
+def test_shared_models():
+    """Los workers predicen igual que el padre y ven las versiones nuevas"""
+
+    print("🧠 Probando modelos compartidos en memoria")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        supervisor = ModelSupervisor(
+            basic_model_path=os.path.join(tmp, 'basic.joblib'),
+            advanced_model_path=os.path.join(tmp, 'advanced.joblib'),
+            publisher=SharedModelPublisher(prefix=f'hktest_{os.getpid()}')
+        )
+        try:
+            assert supervisor.publish() == 1
+            originals = supervisor.load_models()
+
+            client = SharedModelClient(supervisor.publisher.prefix)
+            version, artifacts = client.poll()
+            assert version == 1
+            assert client.poll() is None
+
+            basic, advanced = _attach(artifacts)
+            assert not basic._weights_array.flags.writeable
+            assert not advanced.engine.feature.flags.writeable
+            assert advanced.predict_batch(RECORDS) == originals['advanced'].predict_batch(RECORDS)
+            for record in RECORDS:
+                basic_record = {k: record[k] for k in
+                                ('wifi', 'device', 'latitude', 'longitude', 'network_speed')}
+                assert basic.predict(**basic_record) == originals['basic'].predict(**basic_record)
+            print("   ✅ Predicciones idénticas a las del proceso padre")
+
+            # Un modelo re-entrenado en disco se publica como versión nueva
+            retrained = AdvancedFlowClassifier(model_params={'n_estimators': 10})
+            retrained.model_path = supervisor.advanced_model_path
+            retrained.train()
+            assert supervisor.publish() == 2
+            version, artifacts = client.poll()
+            assert version == 2
+            _, advanced = _attach(artifacts)
+            assert advanced.predict_batch(RECORDS) == retrained.predict_batch(RECORDS)
+            print("   ✅ Versión nueva detectada por el worker")
+
+            # Las versiones viejas se liberan; la anterior se conserva
+            supervisor.publish()
+            assert not os.path.exists(f'/dev/shm/{supervisor.publisher.prefix}_basic_v1')
+            assert os.path.exists(f'/dev/shm/{supervisor.publisher.prefix}_basic_v2')
+        finally:
+            supervisor.close()
+        assert not os.path.exists(f'/dev/shm/{supervisor.publisher.prefix}_control')
+
+
+if __name__ == "__main__":
+    test_shared_models()
+    print("\n🎉 Prueba de modelos compartidos completada")
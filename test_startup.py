@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del arranque: imports perezosos, readiness/liveness y calentamiento
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.ml_model import ConnectionQualityClassifier
+from app.startup import warmup_records
+
+ADVANCED_PARAMS = {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000}
+
+
+def test_lazy_imports():
+    """Importar el servicio no carga scikit-learn ni joblib"""
+
+    print("⚡ Probando imports perezosos")
+    print("=" * 60)
+
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('sklearn', 'joblib') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    assert result.stdout.strip() == '', result.stdout
+
+
+def test_ready_after_warmup():
+    """Con artefactos el servicio arranca sin scikit-learn y `/ready` reporta las fases"""
+
+    import app.main as main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        basic = ConnectionQualityClassifier()
+        basic.train()
+        basic.save_model(os.path.join(tmp, 'basic.artifact'))
+        advanced = AdvancedFlowClassifier(model_params={'n_estimators': 10})
+        advanced.model_path = os.path.join(tmp, 'advanced.artifact')
+        advanced.train()
+
+        paths = (main.inference_executor.basic_model_path, main.inference_executor.advanced_model_path)
+        main.inference_executor.basic_model_path = os.path.join(tmp, 'basic.artifact')
+        main.inference_executor.advanced_model_path = os.path.join(tmp, 'advanced.artifact')
+        try:
+            with TestClient(main.app) as client:
+                assert client.get('/live').json() == {'status': 'alive'}
+
+                response = client.get('/ready')
+                assert response.status_code == 200
+                startup = response.json()['startup']
+                for phase in ('imports', 'load_models', 'start_executor', 'warmup'):
+                    assert phase in startup['phases_ms']
+                print(f"   Arranque: {startup}")
+
+                # Los modelos cargados desde artefacto predicen igual que los originales
+                records = warmup_records(50)
+                assert main.advanced_classifier.model is None
+                assert main.advanced_classifier.predict_batch(records) == advanced.predict_batch(records)
+                assert client.get('/advanced-flow/predict', params=ADVANCED_PARAMS).status_code == 200
+
+                # Un modelo sin entrenar responde 503 en lugar de un error interno
+                loaded = main.advanced_classifier
+                main.advanced_classifier = AdvancedFlowClassifier()
+                try:
+                    response = client.get('/advanced-flow/predict', params=ADVANCED_PARAMS)
+                    assert response.status_code == 503
+                finally:
+                    main.advanced_classifier = loaded
+        finally:
+            main.inference_executor.basic_model_path, main.inference_executor.advanced_model_path = paths
+
+
+if __name__ == "__main__":
+    test_lazy_imports()
+    test_ready_after_warmup()
+    print("\n🎉 Prueba de arranque completada")
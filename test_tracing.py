@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del desglose de tiempos por solicitud (Server-Timing y trazas)
+"""
+
+import json
+import os
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.tracing import TraceWriter, TracingMiddleware
+
+
+def parse_server_timing(value: str) -> dict:
+    timings = {}
+    for part in value.split(','):
+        name, dur = part.strip().split(';dur=')
+        timings[name] = float(dur)
+    return timings
+
+
+def test_server_timing_header():
+    """Con `X-Request-Timing: 1` las rutas de predicción desglosan su tiempo"""
+
+    import app.main as main
+
+    print("⏱️ Probando el encabezado Server-Timing")
+    print("=" * 60)
+
+    params = {'wifi': True, 'device': 'ios', 'latitude': 19.4333, 'longitude': -99.2000,
+              'network_speed': 12.5}
+    with TestClient(main.app) as client:
+        response = client.get('/advanced-flow/predict', params=params,
+                              headers={'X-Request-Timing': '1'})
+        assert response.status_code == 200
+        timings = parse_server_timing(response.headers['server-timing'])
+        print(f"   /advanced-flow/predict: {timings}")
+        for stage in ('parse', 'queue', 'zone', 'features', 'cache', 'response', 'serialize', 'total'):
+            assert stage in timings, stage
+        assert timings['total'] >= sum(ms for name, ms in timings.items()
+                                       if name not in ('total', 'batch_wait', 'queue')) * 0.99
+        assert len(response.headers['x-trace-id']) == 16
+
+        response = client.post('/advanced-flow/predict-batch', headers={'X-Request-Timing': '1'},
+                               json={'records': [params] * 20})
+        timings = parse_server_timing(response.headers['server-timing'])
+        print(f"   /advanced-flow/predict-batch: {timings}")
+        assert 'zone' in timings and 'serialize' in timings
+
+        response = client.get('/web-and-app-experience', headers={'X-Request-Timing': '1'},
+                              params={'wifi': False, 'device': 'android'})
+        timings = parse_server_timing(response.headers['server-timing'])
+        print(f"   /web-and-app-experience: {timings}")
+        assert 'inference' in timings and 'zone' not in timings
+
+        # Sin el encabezado (y sin muestreo) no hay desglose
+        response = client.get('/advanced-flow/predict', params=params)
+        assert 'server-timing' not in response.headers
+        response = client.get('/health', headers={'X-Request-Timing': '1'})
+        assert 'server-timing' not in response.headers
+
+
+def test_sampled_traces_file():
+    """Las solicitudes muestreadas se escriben como JSONL y el archivo rota por tamaño"""
+
+    print("\n📝 Probando las trazas muestreadas")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'traces.jsonl')
+        writer = TraceWriter(path, max_bytes=2000, backups=2, flush_interval=0.05)
+
+        demo = FastAPI()
+        demo.add_middleware(TracingMiddleware, writer=writer, sample_percent=100.0)
+
+        @demo.get('/advanced-flow/demo')
+        async def demo_endpoint():
+            tracing.record_stages([('zone', 0.001), ('forest', 0.002)])
+            return {'ok': True}
+
+        @demo.get('/other')
+        async def other_endpoint():
+            return {'ok': True}
+
+        with TestClient(demo) as client:
+            for _ in range(40):
+                response = client.get('/advanced-flow/demo')
+                assert 'server-timing' in response.headers
+                writer.flush()
+            assert 'server-timing' not in client.get('/other').headers
+        writer.close()
+
+        files = sorted(os.listdir(tmp))
+        print(f"   Archivos: {files}")
+        # Sólo se conservan dos rotaciones
+        assert 'traces.jsonl.1' in files and 'traces.jsonl.2' in files
+        assert 'traces.jsonl.3' not in files
+        assert writer.written == 40 and writer.dropped == 0
+
+        traces = tracing.read_traces(path)
+        assert 0 < len(traces) <= 40
+        trace = traces[0]
+        assert trace['reason'] == 'sampled'
+        assert trace['path'] == '/advanced-flow/demo'
+        assert trace['status'] == 200
+        assert trace['stages_ms']['zone'] == 1.0
+        assert trace['stages_ms']['inference'] == 2.0
+
+        slowest = tracing.slowest(traces, top=3)
+        assert slowest[0]['total_ms'] == max(t['total_ms'] for t in traces)
+        print(f"   Más lenta: {json.dumps(slowest[0])}")
+
+
+if __name__ == "__main__":
+    test_server_timing_header()
+    test_sampled_traces_file()
+    print("\n🎉 Prueba del desglose de tiempos completada")
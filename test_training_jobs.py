@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los entrenamientos en segundo plano
+"""
+
+import time
+
+from app.training_jobs import TrainingConflictError, TrainingJobManager
+
+
+def wait_for_job(manager, job_id, timeout=120):
+    """Espera a que un trabajo termine y regresa su estado final"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"El trabajo {job_id} no terminó en {timeout}s")
+
+
+def test_training_job_publishes_model():
+    """El modelo se publica sólo al terminar y validar el entrenamiento"""
+
+    print("🏗️ Probando entrenamiento en segundo plano")
+    print("=" * 60)
+
+    published = {}
+    manager = TrainingJobManager(lambda kind, model: published.update({kind: model}))
+
+    job = manager.submit('advanced')
+    assert job['status'] == 'queued'
+    assert not published
+
+    # Un segundo trabajo del mismo modelo se rechaza mientras el primero corre
+    try:
+        manager.submit('advanced')
+        raise AssertionError("Se esperaba TrainingConflictError")
+    except TrainingConflictError:
+        pass
+
+    job = wait_for_job(manager, job['job_id'])
+    assert job['status'] == 'succeeded', job['error']
+    assert job['metrics']['accuracy'] > 0.8
+    assert 'running' in job['phase_durations']
+
+    model = published['advanced']
+    assert model.is_trained
+    result = model.predict(True, 'ios', 19.4333, -99.2000, 25.0, 85.0, 14)
+    assert 0.0 <= result['confidence_score'] <= 1.0
+
+    print(f"   Fases: {job['phase_durations']}")
+    print(f"   Precisión: {job['metrics']['accuracy']:.3f}")
+    print("✅ Modelo publicado")
+
+
+def test_training_job_rejects_low_accuracy():
+    """Un modelo que no alcanza la precisión mínima no se publica"""
+
+    published = {}
+    manager = TrainingJobManager(
+        lambda kind, model: published.update({kind: model}), min_accuracy=1.01
+    )
+
+    job = wait_for_job(manager, manager.submit('basic')['job_id'])
+    assert job['status'] == 'failed'
+    assert 'Precisión' in job['error']
+    assert not published
+
+
+if __name__ == "__main__":
+    test_training_job_publishes_model()
+    test_training_job_rejects_low_accuracy()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del raster de zonas precalculado (app/zone_raster.py)
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.advanced_flow_classifier import AdvancedFlowClassifier
+from app.artifacts import ModelArtifact
+from app.geo_index import UNRESOLVED_ZONE, GeoZoneIndex, PolygonZoneIndex, polygon_zone
+from app.zone_raster import (
+    ZoneRaster,
+    build_raster,
+    check_raster,
+    load_or_build_raster,
+    zones_fingerprint,
+)
+from geo_fixtures import sample_zones
+
+
+def make_classifier(raster_file: str) -> AdvancedFlowClassifier:
+    """Clasificador con `ZONE_RASTER_FILE` dado ('' = sólo búsqueda exacta)"""
+    previous = os.environ.get('ZONE_RASTER_FILE')
+    os.environ['ZONE_RASTER_FILE'] = raster_file
+    try:
+        return AdvancedFlowClassifier()
+    finally:
+        if previous is None:
+            del os.environ['ZONE_RASTER_FILE']
+        else:
+            os.environ['ZONE_RASTER_FILE'] = previous
+
+
+def test_raster_matches_exact():
+    """En los bordes de zona y al azar el raster da lo mismo que la búsqueda exacta"""
+
+    print("🧩 Probando el raster contra la búsqueda exacta")
+    print("=" * 60)
+
+    # Las geocercas compartidas más un borde diagonal; el círculo queda al final
+    polygons = {
+        'triangulo': polygon_zone([[[[-99.05, 19.33], [-98.95, 19.34], [-99.0, 19.4], [-99.05, 19.33]]]], 'baja'),
+        **sample_zones()
+    }
+    for name, zones, index_class in (('círculos', make_classifier('').geo_zones, GeoZoneIndex),
+                                     ('polígonos', polygons, PolygonZoneIndex)):
+        index = index_class(zones)
+        raster = ZoneRaster(ModelArtifact.from_buffer(build_raster(index, zones, resolution=0.002)))
+        accuracy = check_raster(index, raster, n_random=50000)
+        print(f"   {name}: {accuracy['points']} puntos, {accuracy['mismatches']} diferencias, "
+              f"{raster.unresolved_fraction:.2%} de celdas a búsqueda exacta")
+        assert accuracy['mismatches'] == 0
+        assert raster.unresolved_fraction < 0.02
+
+        # Justo sobre el borde de un círculo el raster nunca decide: va a la búsqueda exacta
+        angle = np.linspace(0, 2 * np.pi, 500)
+        center, radius = index.centers[-1], index.radii[-1]
+        on_edge = raster.lookup(center[0] + radius * np.sin(angle), center[1] + radius * np.cos(angle))
+        assert (on_edge == UNRESOLVED_ZONE).all()
+
+    # Fuera del rectángulo y coordenadas inválidas van a la búsqueda exacta
+    assert raster.lookup_point(18.5, -99.1) == UNRESOLVED_ZONE
+    assert raster.lookup_point(float('nan'), -99.1) == UNRESOLVED_ZONE
+    assert raster.lookup_point(19.4, float('inf')) == UNRESOLVED_ZONE
+    index.attach_raster(raster)
+    assert index.lookup_point(19.41, -99.21) == index._exact_lookup_point(19.41, -99.21)
+    assert index.lookup_point(float('nan'), 0.0) == (-1, float('inf'))
+
+
+def test_rebuild_on_change():
+    """El archivo se reutiliza mientras las geocercas y la resolución no cambien"""
+
+    print("\n🔁 Probando la reconstrucción automática")
+    print("=" * 60)
+
+    zones = make_classifier('').geo_zones
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'zonas.artifact')
+        raster = load_or_build_raster(GeoZoneIndex(zones), zones, path)
+        assert raster.fingerprint == zones_fingerprint(zones) and raster.zones.shape == (1000, 1000)
+        built = os.stat(path).st_mtime_ns
+
+        # Mismas geocercas: se abre con mmap sin reconstruir
+        again = load_or_build_raster(GeoZoneIndex(zones), zones, path)
+        assert os.stat(path).st_mtime_ns == built and np.array_equal(again.zones, raster.zones)
+
+        # Otra geocerca cambia la huella y el raster
+        zones['roma']['radius'] += 0.01
+        changed = load_or_build_raster(GeoZoneIndex(zones), zones, path)
+        assert changed.fingerprint != raster.fingerprint
+        assert not np.array_equal(changed.zones, raster.zones)
+        print(f"   Geocerca modificada: {np.count_nonzero(changed.zones != raster.zones)} celdas cambiaron")
+
+        # Otra resolución también
+        coarse = load_or_build_raster(GeoZoneIndex(zones), zones, path, resolution=0.004)
+        assert coarse.zones.shape == (250, 250)
+
+        # Un archivo dañado se reconstruye
+        with open(path, 'r+b') as f:
+            f.seek(-10, os.SEEK_END)
+            f.write(b'\xff' * 10)
+        repaired = load_or_build_raster(GeoZoneIndex(zones), zones, path, resolution=0.004)
+        assert np.array_equal(repaired.zones, coarse.zones)
+        print("   Archivo dañado reconstruido")
+
+
+def test_classifier_uses_raster():
+    """Con y sin raster el modelo avanzado ve exactamente las mismas features de zona"""
+
+    print("\n🤖 Probando el modelo avanzado con el raster")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with_raster = make_classifier(os.path.join(tmp, 'zonas.artifact'))
+        exact = make_classifier('')
+        assert exact.zone_index.raster is None
+        assert with_raster.get_model_info()['zone_raster'] == os.path.join(tmp, 'zonas.artifact')
+
+        rng = np.random.default_rng(3)
+        centers = np.array([zone['center'] for zone in exact.geo_zones.values()])[rng.integers(0, 9, 20000)]
+        latitude = centers[:, 0] + rng.normal(0, 0.03, 20000)
+        longitude = centers[:, 1] + rng.normal(0, 0.03, 20000)
+        points = list(zip(latitude.tolist(), longitude.tolist()))
+
+        assert [with_raster._get_zone_info(*p) for p in points] == [exact._get_zone_info(*p) for p in points]
+        zone_ids, distances = with_raster.zone_index.lookup(latitude, longitude)
+        expected_ids, expected_distances = exact.zone_index.lookup(latitude, longitude)
+        assert np.array_equal(zone_ids, expected_ids) and np.array_equal(distances, expected_distances)
+
+        timings = {}
+        for name, classifier in (('raster', with_raster), ('exacta', exact)):
+            started = time.perf_counter()
+            for lat, lon in points:
+                classifier.zone_index.lookup_point(lat, lon)
+            timings[name] = (time.perf_counter() - started) / len(points) * 1e6
+        print(f"   Zona por punto: raster {timings['raster']:.2f} µs, exacta {timings['exacta']:.2f} µs")
+
+
+if __name__ == "__main__":
+    test_raster_matches_exact()
+    test_rebuild_on_change()
+    test_classifier_uses_raster()
+    print("\n🎉 Prueba del raster de zonas completada")